@@ -0,0 +1,97 @@
+# Measure encode/decode cost and size of inter service messages
+#
+# Usage: python examples/codec_benchmark.py [--regions 50] [--number 2000]
+import argparse
+import json
+import timeit
+
+from mash.utils.codec import (
+    compressors,
+    decode_message,
+    encode_message,
+    serializers
+)
+from mash.utils.json_format import JsonFormat
+
+
+def build_message(regions):
+    """Build a test result message of an ec2 job with many regions."""
+    target_account_info = {}
+    test_results = {}
+
+    for index in range(regions):
+        region = 'region-{0}'.format(index)
+        target_account_info[region] = {
+            'account': 'test-aws',
+            'target_regions': [region, 'region-{0}-b'.format(index)],
+            'helper_image': 'ami-{0:08x}'.format(index),
+            'subnet': 'subnet-{0:05d}'.format(index),
+            'partition': 'aws'
+        }
+        test_results[region] = {
+            'status': 'success',
+            'instance_type': 't3.small',
+            'tests': [
+                {'name': 'test_sles_{0}'.format(test), 'outcome': 'passed'}
+                for test in range(20)
+            ]
+        }
+
+    return {
+        'test_result': {
+            'id': '12345678-1234-1234-1234-123456789012',
+            'status': 'success',
+            'cloud_image_name': 'sles-15-sp2-v20200101',
+            'target_account_info': target_account_info,
+            'test_results': test_results,
+            'errors': []
+        }
+    }
+
+
+def run(message, number):
+    results = [(
+        'legacy json',
+        lambda: JsonFormat.json_message(message),
+        lambda body: json.loads(body)
+    )]
+
+    for content_type in serializers:
+        for compression in [None] + sorted(compressors):
+            results.append((
+                '{0} {1}'.format(content_type, compression or ''),
+                lambda c=content_type, z=compression: encode_message(
+                    message, c, z
+                )[0],
+                lambda body, c=content_type, z=compression: decode_message(
+                    body, c, z
+                )
+            ))
+
+    print(
+        '{0:<30} {1:>10} {2:>12} {3:>12}'.format(
+            'codec', 'bytes', 'encode us', 'decode us'
+        )
+    )
+
+    for name, encode, decode in results:
+        body = encode()
+        encode_time = timeit.timeit(encode, number=number) / number
+        decode_time = timeit.timeit(
+            lambda: decode(body), number=number
+        ) / number
+
+        print(
+            '{0:<30} {1:>10} {2:>12.1f} {3:>12.1f}'.format(
+                name, len(body), encode_time * 1e6, decode_time * 1e6
+            )
+        )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--regions', type=int, default=50)
+    parser.add_argument('--number', type=int, default=2000)
+    args = parser.parse_args()
+
+    run(build_message(args.regions), args.number)
@@ -17,20 +17,40 @@
 #
 
 import json
+import queue
+import threading
+import time
 
 from amqpstorm import Connection
 
+from collections import Counter
 from logging.handlers import SocketHandler
 
+_stop = object()
+
 
 class RabbitMQHandler(SocketHandler):
     """
     Log handler for sending messages to RabbitMQ.
+
+    Records are formatted on the logging thread and put in a queue.
+    A background thread publishes the queued records in batches, one
+    message with a json list of records per batch. Emitting a record
+    never waits for the broker.
+
+    If the queue is full the overflow policy applies:
+
+    * drop: Discard the record. The number of discarded records of
+      each job is sent as a summary record of the job with the next
+      batch. Records without a job id are not stored by the logger
+      service and are discarded silently.
+    * block: Wait until there is space in the queue.
     """
     def __init__(
         self, host='localhost', port=5672, exchange='logger',
         username='guest', password='guest',
-        routing_key='mash.logger'
+        routing_key='mash.logger', batch_size=100, flush_interval=0.5,
+        max_queue_size=10000, overflow='drop'
     ):
         """
         Initialize the handler instance.
@@ -42,6 +62,145 @@ class RabbitMQHandler(SocketHandler):
         self.exchange = exchange
         self.routing_key = routing_key
 
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overflow = overflow
+        self.queue = queue.Queue(max_queue_size)
+        self.dropped = Counter()
+        self.dropped_lock = threading.Lock()
+        self.worker = None
+        self.worker_lock = threading.Lock()
+
+    def _start_worker(self):
+        """
+        Start the publish thread on first use.
+        """
+        with self.worker_lock:
+            if not self.worker or not self.worker.is_alive():
+                self.worker = threading.Thread(
+                    target=self._publish_records,
+                    name='RabbitMQHandler',
+                    daemon=True
+                )
+                self.worker.start()
+
+    def _get_batch(self):
+        """
+        Wait for the next record and collect a batch of records.
+
+        The batch is complete when it reaches the batch size or the
+        flush interval passed.
+        """
+        batch = [self.queue.get()]
+        deadline = time.monotonic() + self.flush_interval
+
+        while batch[-1] is not _stop and len(batch) < self.batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+
+            try:
+                batch.append(self.queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+
+        return batch
+
+    def _get_dropped_records(self):
+        """
+        Return the summary records for dropped records and reset counts.
+        """
+        with self.dropped_lock:
+            dropped, self.dropped = self.dropped, Counter()
+
+        created = time.time()
+
+        return [
+            json.dumps({
+                'msg': 'RabbitMQHandler dropped {0} log records.'.format(
+                    count
+                ),
+                'job_id': job_id,
+                'created': created,
+                'name': self.__class__.__name__
+            }, sort_keys=True)
+            for job_id, count in dropped.items()
+        ]
+
+    def _publish_records(self):
+        """
+        Publish batches of queued records until stopped.
+        """
+        running = True
+        while running:
+            batch = self._get_batch()
+            records = [record for record in batch if record is not _stop]
+            running = len(records) == len(batch)
+
+            if self.dropped:
+                records.extend(self._get_dropped_records())
+
+            try:
+                if records:
+                    self.send('[{0}]'.format(','.join(records)))
+            except Exception:
+                # Broker is not available, the batch is lost
+                try:
+                    self.sock.close()
+                except Exception:
+                    pass
+
+                self.sock = None
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    def emit(self, record):
+        """
+        Queue the formatted record for the publish thread.
+        """
+        try:
+            data = self.makePickle(record)
+        except Exception:
+            self.handleError(record)
+            return
+
+        self._start_worker()
+
+        if self.overflow == 'block':
+            self.queue.put(data)
+            return
+
+        try:
+            self.queue.put_nowait(data)
+        except queue.Full:
+            job_id = getattr(record, 'job_id', None)
+
+            if job_id:
+                with self.dropped_lock:
+                    self.dropped[job_id] += 1
+
+    def flush(self):
+        """
+        Wait until all queued records are published.
+        """
+        if self.worker and self.worker.is_alive():
+            self.queue.join()
+
+    def close(self, timeout=10):
+        """
+        Publish queued records, stop the publish thread and disconnect.
+
+        Waits up to timeout seconds for the queued records, records
+        still queued afterwards are lost. Services call this on stop,
+        logging.shutdown may not run if the process exits hard.
+        """
+        if self.worker and self.worker.is_alive():
+            self.queue.put(_stop)
+            self.worker.join(timeout=timeout)
+
+        super(RabbitMQHandler, self).close()
+
     def makeSocket(self):
         """
         Create a new instance of RabbitMQ socket connection.
@@ -59,7 +218,7 @@ class RabbitMQHandler(SocketHandler):
         """
         Format the log message to a json string.
         """
-        rabbit_attrs = ['msg', 'job_id']
+        rabbit_attrs = ['msg', 'job_id', 'created', 'name']
 
         data = {}
         record.msg = self.format(record)
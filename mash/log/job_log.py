@@ -0,0 +1,570 @@
+# Copyright (c) 2020 SUSE LLC.  All rights reserved.
+#
+# This file is part of mash.
+#
+# mash is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# mash is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with mash.  If not, see <http://www.gnu.org/licenses/>
+#
+
+import fcntl
+import gzip
+import io
+import os
+
+from collections import namedtuple
+from contextlib import contextmanager, suppress
+
+from mash.utils.mash_utils import compress_file, remove_file
+
+IndexEntry = namedtuple('IndexEntry', ['offset', 'created', 'service'])
+JobLogPart = namedtuple('JobLogPart', ['file', 'size', 'compressed'])
+
+# Records are written to the index at most this many seconds after
+# records created later, searches by creation time rely on it.
+MAX_CREATED_SKEW = 60
+
+
+def get_job_log_file(log_directory, job_id):
+    """
+    Return the path of the log file of the job in the log directory.
+    """
+    return os.path.join(log_directory, ''.join([job_id, '.log']))
+
+
+def get_index_file(log_file):
+    """
+    Return the path of the sidecar index for the job log file.
+    """
+    return '{0}.idx'.format(log_file)
+
+
+def get_compressed_file(log_file):
+    """
+    Return the path of the compressed log or index file.
+    """
+    return '{0}.gz'.format(log_file)
+
+
+_uncompressed_sizes = {}
+
+
+def get_uncompressed_size(compressed):
+    """
+    Return the uncompressed size of the open gzip file.
+
+    The whole file is decompressed to find the size, the result is
+    cached until the file changes.
+    """
+    stat = os.fstat(compressed.fileno())
+    key = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    size = _uncompressed_sizes.get(key)
+    if size is None:
+        if len(_uncompressed_sizes) >= 256:
+            _uncompressed_sizes.clear()
+
+        size = _uncompressed_sizes[key] = compressed.seek(0, os.SEEK_END)
+
+    return size
+
+
+class JobLog(object):
+    """
+    Read only view of the parts of a job log or index file.
+
+    A job that logs again after its log was compressed writes a new
+    uncompressed file. The compressed part holds the earlier data and
+    comes first, offsets refer to the uncompressed data of both parts
+    in order.
+    """
+
+    def __init__(self, log_file):
+        self.parts = []
+        compressed_file = get_compressed_file(log_file)
+
+        while True:
+            inode = None
+            with suppress(FileNotFoundError):
+                compressed = gzip.open(compressed_file, 'rb')
+                inode = os.fstat(compressed.fileno()).st_ino
+                self.parts.append(
+                    JobLogPart(
+                        compressed, get_uncompressed_size(compressed), True
+                    )
+                )
+
+            with suppress(FileNotFoundError):
+                uncompressed = open(log_file, 'rb')
+                self.parts.append(
+                    JobLogPart(
+                        uncompressed,
+                        os.fstat(uncompressed.fileno()).st_size,
+                        False
+                    )
+                )
+
+            try:
+                current = os.stat(compressed_file).st_ino
+            except FileNotFoundError:
+                current = None
+
+            if current == inode:
+                break
+
+            # The uncompressed part was compressed in the meantime
+            self.close()
+
+        if not self.parts:
+            raise FileNotFoundError(
+                'Job log {0} does not exist'.format(log_file)
+            )
+
+        self.size = sum(part.size for part in self.parts)
+        self.position = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        for part in self.parts:
+            part.file.close()
+
+        self.parts = []
+
+    def seek(self, offset):
+        self.position = min(max(offset, 0), self.size)
+        return self.position
+
+    def read(self, size):
+        """
+        Read up to size bytes from the current position.
+        """
+        chunks = []
+        start = 0
+        for part in self.parts:
+            end = start + part.size
+            if size and self.position < end:
+                part.file.seek(self.position - start)
+                chunk = part.file.read(min(size, end - self.position))
+                chunks.append(chunk)
+                self.position += len(chunk)
+                size -= len(chunk)
+
+            start = end
+
+        return b''.join(chunks)
+
+
+def open_log(log_file):
+    """
+    Open the log or index file with its compressed part.
+
+    Offsets always refer to the uncompressed data.
+    """
+    return JobLog(log_file)
+
+
+def get_log_size(log_file):
+    """
+    Return the uncompressed size of the job log file.
+    """
+    with open_log(log_file) as job_log:
+        return job_log.size
+
+
+def get_compressed_log_size(log_file):
+    """
+    Return the uncompressed size of the compressed part of the log.
+    """
+    try:
+        with gzip.open(get_compressed_file(log_file), 'rb') as compressed:
+            return get_uncompressed_size(compressed)
+    except FileNotFoundError:
+        return 0
+
+
+@contextmanager
+def lock_job_log(job_log, exclusive=False):
+    """
+    Hold a lock of the open job log file.
+
+    The logger service writes the log and index with a shared lock,
+    the cleanup service compresses them with an exclusive lock.
+    """
+    fcntl.flock(job_log, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+
+    try:
+        yield
+    finally:
+        fcntl.flock(job_log, fcntl.LOCK_UN)
+
+
+def is_job_log_removed(job_log, log_file):
+    """
+    Return True if the log file of the open job log was removed.
+    """
+    try:
+        return os.stat(log_file).st_ino != os.fstat(job_log.fileno()).st_ino
+    except FileNotFoundError:
+        return True
+
+
+def compress_job_log(log_file):
+    """
+    Compress the job log and its index, return the compressed size.
+
+    The log is compressed with an exclusive lock, lines written by the
+    logger service meanwhile would be lost with the removed log. The
+    logger opens a new log once the lock is released.
+
+    If the log was compressed before the new data is appended to the
+    compressed files. The offsets of the new index entries start at
+    the new log file, they are moved past the earlier log first. The
+    index is compressed before the log, the shift is based on the
+    compressed log and is not applied twice if the log compression
+    fails.
+    """
+    with open(log_file, 'rb') as job_log, \
+            lock_job_log(job_log, exclusive=True):
+        return _compress_job_log(log_file)
+
+
+def _compress_job_log(log_file):
+    """
+    Compress the job log and its index with the lock held.
+    """
+    index_file = get_index_file(log_file)
+    base = get_compressed_log_size(log_file)
+
+    if base and os.path.exists(index_file):
+        temp_file = '{0}.tmp'.format(index_file)
+        with open(index_file, 'rt') as index_log, \
+                open(temp_file, 'wt') as shifted_log:
+            for line in index_log:
+                offset, created, service = line.split()
+                shifted_log.write(
+                    format_index_entry(
+                        int(offset) + base, float(created), service
+                    )
+                )
+
+        stat = os.stat(index_file)
+        os.utime(temp_file, (stat.st_atime, stat.st_mtime))
+        os.rename(temp_file, index_file)
+
+    size = 0
+    for path in (index_file, log_file):
+        if os.path.exists(path):
+            compress_file(path)
+
+        with suppress(FileNotFoundError):
+            size += os.path.getsize(get_compressed_file(path))
+
+    return size
+
+
+def delete_job_log(log_file):
+    """
+    Remove the job log, the index and the compressed files.
+    """
+    for path in (log_file, get_index_file(log_file)):
+        remove_file(path)
+        remove_file(get_compressed_file(path))
+
+
+def format_index_entry(offset, created, service):
+    """
+    Return index line for a log record.
+
+    Each record in the job log has one line with the byte offset,
+    the creation time and the name of the logging service.
+    """
+    return '{0} {1:.3f} {2}\n'.format(offset, created or 0, service or '-')
+
+
+class JobLogIndexPart(object):
+    """
+    Binary search over the lines of one part of a job log index.
+
+    Lines are ordered by the offset of their record, only the lines
+    probed by a search are parsed. Offsets are moved by shift. A
+    partial last line that is still being written is ignored.
+    """
+
+    def __init__(self, index, size, shift):
+        self.index = index
+        self.shift = shift
+        self.size = self.get_line_start(size)
+
+    def get_line_start(self, position):
+        """
+        Return the start of the line that contains the position.
+        """
+        start = position
+        while start > 0:
+            chunk_start = max(start - 256, 0)
+            self.index.seek(chunk_start)
+            newline = self.index.read(start - chunk_start).rfind(b'\n')
+
+            if newline >= 0:
+                return chunk_start + newline + 1
+
+            start = chunk_start
+
+        return 0
+
+    def read_line(self, position):
+        """
+        Return the line at the position and the entry it describes.
+        """
+        self.index.seek(position)
+        line = self.index.readline()
+        offset, created, service = line.decode().split()
+        return line, IndexEntry(int(offset) + self.shift, float(created), service)
+
+    def bisect(self, condition):
+        """
+        Return the position of the first line whose entry meets condition.
+
+        The condition must be false for the entries of the lines before
+        and true for the entries of the lines after that line.
+        """
+        low, high = 0, self.size
+        while low < high:
+            middle = (low + high) // 2
+
+            if middle:
+                # Move to the start of the next line
+                self.index.seek(middle - 1)
+                self.index.readline()
+                middle = self.index.tell()
+
+            if middle >= high:
+                middle = low
+
+            line, entry = self.read_line(middle)
+
+            if condition(entry):
+                high = middle
+            else:
+                low = middle + len(line)
+
+        return low
+
+    def get_entries(self, position=0):
+        """
+        Yield the entries of the lines from the position on.
+        """
+        while position < self.size:
+            line, entry = self.read_line(position)
+            position += len(line)
+            yield entry
+
+
+class JobLogIndex(object):
+    """
+    Search the sidecar index of a job log.
+
+    A job log without index, written before indexes existed, has
+    an empty index. The offsets of an uncompressed index are
+    relative to the uncompressed log and are moved past the
+    compressed part of the log.
+
+    A gzip file cannot seek backwards without decompressing it again
+    from the start. The compressed part of an index is decompressed
+    into memory once and searched there, searches in the index of an
+    active job, which is not compressed, read only the probed lines.
+    """
+
+    def __init__(self, log_file):
+        self.parts = []
+
+        try:
+            self.index_log = open_log(get_index_file(log_file))
+        except FileNotFoundError:
+            self.index_log = None
+            return
+
+        base = get_compressed_log_size(log_file)
+
+        for part in self.index_log.parts:
+            if part.compressed:
+                part.file.seek(0)
+                index, shift = io.BytesIO(part.file.read()), 0
+            else:
+                index, shift = part.file, base
+
+            self.parts.append(JobLogIndexPart(index, part.size, shift))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        if self.index_log:
+            self.index_log.close()
+
+        self.parts = []
+
+    @property
+    def empty(self):
+        return not any(part.size for part in self.parts)
+
+    def get_entries(self, offset=0):
+        """
+        Yield the entries from the record that contains the offset on.
+        """
+        previous = None
+        number = position = 0
+
+        for number, part in enumerate(self.parts):
+            position = part.bisect(lambda entry: entry.offset > offset)
+
+            if position:
+                start = part.get_line_start(position - 1)
+                previous = part.read_line(start)[1]
+
+            if position < part.size:
+                break
+
+        if previous:
+            yield previous
+
+        for part in self.parts[number:]:
+            yield from part.get_entries(position)
+            position = 0
+
+    def find_created(self, since):
+        """
+        Return the first entry, in index order, created since the time.
+
+        Records of different services are not written in order of
+        creation. The search starts at the first entry created up to
+        MAX_CREATED_SKEW seconds before since and continues in order.
+        """
+        earliest = since - MAX_CREATED_SKEW
+
+        for part in self.parts:
+            position = part.bisect(lambda entry: entry.created >= earliest)
+
+            for entry in part.get_entries(position):
+                if entry.created >= since:
+                    return entry
+
+        return None
+
+    def find_tail(self, count):
+        """
+        Return the first of the last count entries.
+        """
+        entry = None
+
+        for part in reversed(self.parts):
+            position = part.size
+
+            while count and position:
+                position = part.get_line_start(position - 1)
+                entry = part.read_line(position)[1]
+                count -= 1
+
+        return entry
+
+
+def read_index(log_file):
+    """
+    Return all index entries of the job log file.
+    """
+    with JobLogIndex(log_file) as index:
+        return list(index.get_entries())
+
+
+def get_record_ranges(entries, size):
+    """
+    Yield (start, end, entry) byte ranges of the records.
+    """
+    previous = None
+
+    for entry in entries:
+        if previous:
+            yield previous.offset, entry.offset, previous
+
+        previous = entry
+
+    if previous:
+        yield previous.offset, size, previous
+
+
+def read_job_log(
+    log_file, offset=0, max_bytes=1048576, since=None, service=None,
+    tail=None
+):
+    """
+    Return a range of the job log file.
+
+    The range starts at the byte offset. Since, a unix timestamp, and
+    tail, the number of records at the end of the log, move the start
+    forward using the index. With service only records logged by the
+    service are returned. At most max_bytes are read.
+
+    Returns a dictionary with the log text, the byte offset and the
+    next offset to continue reading from.
+    """
+    size = get_log_size(log_file)
+    index = JobLogIndex(log_file) if (since or service or tail) else None
+    indexed = index and not index.empty
+
+    try:
+        if indexed and since:
+            entry = index.find_created(since)
+            offset = max(offset, entry.offset if entry else size)
+
+        if indexed and tail:
+            offset = max(offset, index.find_tail(tail).offset)
+
+        offset = min(offset, size)
+        end = min(size, offset + max_bytes)
+        chunks = []
+
+        with open_log(log_file) as job_log:
+            if indexed and service:
+                records = get_record_ranges(index.get_entries(offset), size)
+
+                for start, stop, entry in records:
+                    if start >= end:
+                        break
+
+                    if stop <= offset or entry.service != service:
+                        continue
+
+                    job_log.seek(max(start, offset))
+                    chunks.append(
+                        job_log.read(min(stop, end) - max(start, offset))
+                    )
+            else:
+                job_log.seek(offset)
+                chunks.append(job_log.read(end - offset))
+    finally:
+        if index:
+            index.close()
+
+    return {
+        'logs': b''.join(chunks).decode('utf-8', errors='replace'),
+        'offset': offset,
+        'next_offset': end,
+        'size': size
+    }
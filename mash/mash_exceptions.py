@@ -189,3 +189,15 @@ class MashGCEUtilsException(MashException):
     """
     Exception raised if an error occurs in GCE Utils.
     """
+
+
+class MashJobStoreException(MashException):
+    """
+    Exception raised if an error occurs in the job store.
+    """
+
+
+class MashCodecException(MashException):
+    """
+    Exception raised if a message can not be encoded or decoded.
+    """
@@ -21,6 +21,7 @@ import logging
 from flask import Flask
 from flask.logging import default_handler
 
+from mash.services.api.cloud_data import CloudData
 from mash.services.api.extensions import api, jwt
 
 from mash.log.filter import BaseServiceFilter
@@ -64,6 +65,7 @@ def create_app(config_object):
     register_namespaces()
     configure_logger(app)
     configure_mailer(app)
+    configure_cloud_data(app)
     return app
 
 
@@ -101,6 +103,14 @@ def configure_mailer(app):
     app.notification_class = notification_class
 
 
+def configure_cloud_data(app):
+    """Load immutable cloud data tables."""
+    app.cloud_data = CloudData(
+        app.config['CLOUD_DATA'],
+        app.config.get('CONFIG_FILE')
+    )
+
+
 def register_namespaces():
     """Register Flask restplus namespaces."""
     api.add_namespace(spec_api, path='/api/spec')
@@ -0,0 +1,131 @@
+# Copyright (c) 2021 SUSE LLC.  All rights reserved.
+#
+# This file is part of mash.
+#
+# mash is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# mash is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with mash.  If not, see <http://www.gnu.org/licenses/>
+#
+
+import os
+import threading
+
+from collections import namedtuple
+from types import MappingProxyType
+
+from mash.mash_exceptions import MashConfigException
+from mash.services.base_config import BaseConfig
+
+EC2Tables = namedtuple('EC2Tables', ['regions', 'helper_images'])
+
+
+def freeze(data):
+    """
+    Return a read only copy of the nested dictionaries and lists.
+    """
+    if isinstance(data, dict):
+        return MappingProxyType(
+            {key: freeze(value) for key, value in data.items()}
+        )
+    elif isinstance(data, (list, tuple)):
+        return tuple(freeze(value) for value in data)
+
+    return data
+
+
+def thaw(data):
+    """
+    Return a json serializable copy of frozen data.
+    """
+    if isinstance(data, MappingProxyType):
+        return {key: thaw(value) for key, value in data.items()}
+    elif isinstance(data, tuple):
+        return [thaw(value) for value in data]
+
+    return data
+
+
+def get_ec2_tables(data):
+    """
+    Return the frozen EC2 region and helper image tables.
+
+    Regions maps each partition to a tuple of region names and
+    helper images maps each region to the helper image id.
+    """
+    ec2 = data.get('ec2') or {}
+
+    return EC2Tables(
+        regions=freeze(ec2.get('regions') or {}),
+        helper_images=freeze(ec2.get('helper_images') or {})
+    )
+
+
+class CloudData(object):
+    """
+    Immutable cloud data of the mash config file.
+
+    The data is loaded once and shared by all requests. If the
+    config file is modified the data is reloaded on next access.
+    """
+    def __init__(self, data, config_file=None):
+        self.config_file = config_file
+        self.lock = threading.Lock()
+        self.mtime = self._get_mtime()
+        self._load(data)
+
+    def _get_mtime(self):
+        """
+        Return modification time of the config file or None.
+        """
+        if not self.config_file:
+            return None
+
+        try:
+            return os.stat(self.config_file).st_mtime_ns
+        except OSError:
+            return None
+
+    def _load(self, data):
+        """
+        Build the frozen tables from the cloud data.
+        """
+        self.ec2 = get_ec2_tables(data)
+
+    def refresh(self):
+        """
+        Reload the cloud data if the config file changed.
+
+        If the modified file can not be read the current data is kept.
+        """
+        mtime = self._get_mtime()
+
+        if mtime is None or mtime == self.mtime:
+            return
+
+        with self.lock:
+            if mtime == self.mtime:
+                return
+
+            try:
+                data = BaseConfig(self.config_file).get_cloud_data()
+            except MashConfigException:
+                return
+
+            self._load(data)
+            self.mtime = mtime
+
+    def get_ec2_tables(self):
+        """
+        Return the current EC2 region and helper image tables.
+        """
+        self.refresh()
+        return self.ec2
@@ -40,14 +40,30 @@ class Config(object):
     def AMQP_PASS(self):
         return self.config.get_amqp_pass()
 
+    @property
+    def AMQP_CHANNEL_POOL_SIZE(self):
+        return self.config.get_amqp_channel_pool_size()
+
+    @property
+    def AMQP_PUBLISH_CONFIRM_WINDOW(self):
+        return self.config.get_publish_confirm_window()
+
     @property
     def LOG_FILE(self):
         return self.config.get_log_file('api')
 
+    @property
+    def JOB_LOG_DIRECTORY(self):
+        return self.config.get_job_log_directory()
+
     @property
     def CLOUD_DATA(self):
         return self.config.get_cloud_data()
 
+    @property
+    def CONFIG_FILE(self):
+        return self.config.config_file
+
     @property
     def JWT_BLACKLIST_ENABLED(self):
         return True
@@ -22,15 +22,76 @@ from flask import request, jsonify, make_response, current_app
 from flask_restx import Namespace, Resource
 from flask_jwt_extended import jwt_required, get_jwt_identity
 
+from mash.mash_exceptions import MashException, MashJobException
 from mash.services.api.v1.schema import (
     default_response,
     validation_error,
     job_list
 )
-from mash.services.api.v1.utils.jobs import delete_job, get_job, get_jobs
+from mash.services.api.v1.utils.jobs import (
+    create_jobs,
+    delete_job,
+    get_job,
+    get_job_logs,
+    get_job_status_updates,
+    get_job_summary,
+    get_jobs,
+    get_stage_stats
+)
 from mash.services.database.routes.jobs import job_response, job_data
 
 
+job_filters = {
+    'state': 'Only return jobs in the state',
+    'cloud': 'Only return jobs for the cloud',
+    'current_service': 'Only return jobs running in the service',
+    'failed_service': 'Only return jobs that failed in the service',
+    'image': 'Only return jobs for the image',
+    'since': 'Only return jobs started at or after the UTC time',
+    'until': 'Only return jobs started before the UTC time'
+}
+
+
+def get_job_filters():
+    """
+    Return the job filters of the request query parameters.
+    """
+    return {
+        name: request.args[name]
+        for name in job_filters if request.args.get(name)
+    }
+
+
+def add_batch_jobs(cloud, validate):
+    """
+    Add the batch of jobs in the request for the cloud.
+
+    The route model limits the batch to a list of at most
+    max_batch_jobs job docs. The response has a result for each
+    job doc and the number of created and failed jobs.
+    """
+    job_docs = json.loads(request.data.decode())['jobs']
+
+    for job_doc in job_docs:
+        job_doc['cloud'] = cloud
+        job_doc['requesting_user'] = get_jwt_identity()
+
+    results = create_jobs(job_docs, validate)
+
+    return make_response(
+        jsonify({
+            'jobs': results,
+            'created': len(
+                [result for result in results if result['status'] == 201]
+            ),
+            'failed': len(
+                [result for result in results if result['status'] == 400]
+            )
+        }),
+        200
+    )
+
+
 api = Namespace(
     'Jobs',
     description='Job operations'
@@ -58,9 +119,11 @@ class JobList(Resource):
     """
 
     @api.doc('get_jobs')
+    @api.doc(params=job_filters)
     @jwt_required
     @api.expect(job_list_request)
     @api.response(200, 'Success', job_response)
+    @api.response(400, 'Validation error', default_response)
     def get(self):
         """
         Get paginated jobs.
@@ -80,10 +143,120 @@ class JobList(Resource):
         if per_page:
             kwargs['per_page'] = per_page
 
-        jobs = get_jobs(get_jwt_identity(), **kwargs)
+        kwargs.update(get_job_filters())
+
+        try:
+            jobs = get_jobs(get_jwt_identity(), **kwargs)
+        except MashException as error:
+            return make_response(jsonify({'msg': str(error)}), 400)
+
         return make_response(jsonify(jobs), 200)
 
 
+@api.route('/summary')
+@api.doc(security='apiKey')
+@api.response(400, 'Validation error', default_response)
+@api.response(401, 'Unauthorized', default_response)
+@api.response(422, 'Not processable', default_response)
+class JobSummary(Resource):
+    @api.doc('get_job_summary')
+    @api.doc(params=job_filters)
+    @jwt_required
+    @api.response(200, 'Success')
+    def get(self):
+        """
+        Get number of jobs by state, current service and failed service.
+        """
+        try:
+            summary = get_job_summary(
+                get_jwt_identity(),
+                **get_job_filters()
+            )
+        except MashException as error:
+            return make_response(jsonify({'msg': str(error)}), 400)
+
+        return make_response(jsonify(summary), 200)
+
+
+@api.route('/stage_stats')
+@api.doc(security='apiKey')
+@api.response(400, 'Validation error', default_response)
+@api.response(401, 'Unauthorized', default_response)
+@api.response(422, 'Not processable', default_response)
+class StageStats(Resource):
+    @api.doc('get_stage_stats')
+    @api.doc(params={
+        'cloud': 'Only return stats of the cloud',
+        'service': 'Only return stats of the service',
+        'since': 'First day to return',
+        'until': 'Day after the last day to return'
+    })
+    @jwt_required
+    @api.response(200, 'Success')
+    def get(self):
+        """
+        Get daily duration stats of the service stages by cloud.
+
+        Durations are in seconds, percentiles are estimates.
+        """
+        filters = {
+            name: request.args[name]
+            for name in ('cloud', 'service', 'since', 'until')
+            if request.args.get(name)
+        }
+
+        try:
+            stats = get_stage_stats(**filters)
+        except MashException as error:
+            return make_response(jsonify({'msg': str(error)}), 400)
+
+        return make_response(jsonify(stats), 200)
+
+
+@api.route('/status_updates')
+@api.doc(security='apiKey')
+@api.response(400, 'Validation error', default_response)
+@api.response(401, 'Unauthorized', default_response)
+@api.response(422, 'Not processable', default_response)
+class JobStatusUpdates(Resource):
+    @api.doc('get_job_status_updates')
+    @api.doc(params={
+        'since_version': 'Version of the last update the client has seen',
+        'job_id': 'Only return updates of the job',
+        'wait': 'Seconds to wait for new updates past the version, '
+                'new updates are checked every second (30 at most)'
+    })
+    @jwt_required
+    @api.response(200, 'Success')
+    @api.response(429, 'Too many requests waiting', default_response)
+    def get(self):
+        """
+        Get status updates of jobs.
+
+        Poll with the version of the response as since_version
+        to follow the stage transitions of all jobs of the user.
+        """
+        since_version = request.args.get('since_version', 0, type=int)
+
+        if since_version < 0:
+            return make_response(
+                jsonify({'msg': 'since_version must be positive'}),
+                400
+            )
+
+        try:
+            updates = get_job_status_updates(
+                get_jwt_identity(),
+                since_version=since_version,
+                job_id=request.args.get('job_id'),
+                wait=request.args.get('wait', 0, type=int)
+            )
+        except MashJobException as error:
+            return make_response(jsonify({'msg': str(error)}), 429)
+
+        return make_response(jsonify(updates), 200)
+
+
 @api.route('/<string:job_id>')
 @api.doc(security='apiKey')
 @api.response(400, 'Validation error', validation_error_response)
@@ -131,3 +304,61 @@ class Job(Resource):
             return make_response(jsonify(job), 200)
         else:
             return make_response(jsonify({'msg': 'Job not found'}), 404)
+
+
+@api.route('/<string:job_id>/logs')
+@api.doc(security='apiKey')
+@api.response(400, 'Validation error', default_response)
+@api.response(401, 'Unauthorized', default_response)
+@api.response(422, 'Not processable', default_response)
+class JobLogs(Resource):
+    @api.doc('get_job_logs')
+    @api.doc(params={
+        'offset': 'Byte offset to start reading from',
+        'max_bytes': 'Maximum number of bytes to return',
+        'since': 'Unix timestamp of the first record to return',
+        'service': 'Only return records logged by the service',
+        'tail': 'Number of records at the end of the log to return',
+        'wait': 'Seconds to wait for new log data past the offset'
+    })
+    @jwt_required
+    @api.response(200, 'Success')
+    @api.response(404, 'Not found', default_response)
+    @api.response(429, 'Too many requests waiting', default_response)
+    def get(self, job_id):
+        """
+        Get range of job log.
+        """
+        kwargs = {
+            'offset': request.args.get('offset', 0, type=int),
+            'max_bytes': min(
+                request.args.get('max_bytes', 1048576, type=int),
+                1048576
+            ),
+            'since': request.args.get('since', None, type=float),
+            'service': request.args.get('service'),
+            'tail': request.args.get('tail', None, type=int),
+            'wait': request.args.get('wait', 0, type=int)
+        }
+
+        if kwargs['offset'] < 0 or kwargs['max_bytes'] < 1:
+            return make_response(
+                jsonify({'msg': 'Offset and max_bytes must be positive'}),
+                400
+            )
+
+        if kwargs['tail'] is not None and kwargs['tail'] < 1:
+            return make_response(
+                jsonify({'msg': 'Tail must be greater than zero'}),
+                400
+            )
+
+        try:
+            logs = get_job_logs(job_id, get_jwt_identity(), **kwargs)
+        except MashJobException as error:
+            return make_response(jsonify({'msg': str(error)}), 429)
+
+        if logs is None:
+            return make_response(jsonify({'msg': 'Job not found'}), 404)
+
+        return make_response(jsonify(logs), 200)
@@ -25,9 +25,10 @@ from flask_jwt_extended import jwt_required, get_jwt_identity
 from mash.mash_exceptions import MashException
 from mash.services.api.v1.schema import (
     default_response,
+    job_batch,
     validation_error
 )
-from mash.services.api.v1.routes.jobs import job_response
+from mash.services.api.v1.routes.jobs import add_batch_jobs, job_response
 from mash.services.api.v1.schema.jobs.azure import azure_job_message
 from mash.services.api.v1.utils.jobs import create_job
 from mash.services.api.v1.utils.jobs.azure import validate_azure_job
@@ -36,6 +37,7 @@ api = Namespace(
     'Azure Jobs',
     description='Azure Job operations'
 )
+job_batch_request = api.schema_model('job_batch', job_batch)
 validation_error_response = api.schema_model(
     'validation_error', validation_error
 )
@@ -92,3 +94,19 @@ class AzureJobCreate(Resource):
         Get azure job doc schema.
         """
         return make_response(jsonify(azure_job_message), 200)
+
+
+@api.route('/batch')
+class AzureJobBatch(Resource):
+    @api.doc('add_azure_jobs', security='apiKey')
+    @jwt_required
+    @api.expect(job_batch_request)
+    @api.response(200, 'Results of jobs')
+    @api.response(400, 'Validation error', validation_error_response)
+    @api.response(401, 'Unauthorized', default_response)
+    @api.response(422, 'Not processable', default_response)
+    def post(self):
+        """
+        Add batch of Azure jobs.
+        """
+        return add_batch_jobs('azure', validate_azure_job)
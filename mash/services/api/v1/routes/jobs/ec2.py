@@ -25,12 +25,16 @@ from flask_jwt_extended import jwt_required, get_jwt_identity
 from mash.mash_exceptions import MashException
 from mash.services.api.v1.schema import (
     default_response,
+    job_batch,
     validation_error
 )
-from mash.services.api.v1.routes.jobs import job_response
+from mash.services.api.v1.routes.jobs import add_batch_jobs, job_response
 
 from mash.services.api.v1.schema.jobs.ec2 import ec2_job_message
-from mash.services.api.v1.utils.jobs.ec2 import validate_ec2_job
+from mash.services.api.v1.utils.jobs.ec2 import (
+    get_ec2_region_tables,
+    validate_ec2_job
+)
 from mash.services.api.v1.utils.jobs import create_job
 
 api = Namespace(
@@ -38,6 +42,7 @@ api = Namespace(
     description='EC2 Job operations'
 )
 ec2_job = api.schema_model('ec2_job', ec2_job_message)
+job_batch_request = api.schema_model('job_batch', job_batch)
 validation_error_response = api.schema_model(
     'validation_error', validation_error
 )
@@ -93,3 +98,33 @@ class EC2JobCreate(Resource):
         Get ec2 job doc schema.
         """
         return make_response(jsonify(ec2_job_message), 200)
+
+
+@api.route('/batch')
+class EC2JobBatch(Resource):
+    @api.doc('add_ec2_jobs', security='apiKey')
+    @jwt_required
+    @api.expect(job_batch_request)
+    @api.response(200, 'Results of jobs')
+    @api.response(400, 'Validation error', validation_error_response)
+    @api.response(401, 'Unauthorized', default_response)
+    @api.response(422, 'Not processable', default_response)
+    def post(self):
+        """
+        Add batch of EC2 jobs.
+        """
+        return add_batch_jobs('ec2', validate_ec2_job)
+
+
+@api.route('/regions')
+class EC2Regions(Resource):
+    @api.doc('get_ec2_regions', security='apiKey')
+    @jwt_required
+    @api.response(200, 'Success')
+    @api.response(401, 'Unauthorized', default_response)
+    @api.response(422, 'Not processable', default_response)
+    def get(self):
+        """
+        Get EC2 regions by partition and helper images by region.
+        """
+        return make_response(jsonify(get_ec2_region_tables()), 200)
@@ -25,9 +25,10 @@ from flask_jwt_extended import jwt_required, get_jwt_identity
 from mash.mash_exceptions import MashException
 from mash.services.api.v1.schema import (
     default_response,
+    job_batch,
     validation_error
 )
-from mash.services.api.v1.routes.jobs import job_response
+from mash.services.api.v1.routes.jobs import add_batch_jobs, job_response
 from mash.services.api.v1.schema.jobs.gce import gce_job_message
 from mash.services.api.v1.utils.jobs import create_job
 from mash.services.api.v1.utils.jobs.gce import validate_gce_job
@@ -37,6 +38,7 @@ api = Namespace(
     description='GCE Job operations'
 )
 gce_job = api.schema_model('gce_job', gce_job_message)
+job_batch_request = api.schema_model('job_batch', job_batch)
 validation_error_response = api.schema_model(
     'validation_error', validation_error
 )
@@ -92,3 +94,19 @@ class GCEJob(Resource):
         Get GCE job doc schema.
         """
         return make_response(jsonify(gce_job_message), 200)
+
+
+@api.route('/batch')
+class GCEJobBatch(Resource):
+    @api.doc('add_gce_jobs', security='apiKey')
+    @jwt_required
+    @api.expect(job_batch_request)
+    @api.response(200, 'Results of jobs')
+    @api.response(400, 'Validation error', validation_error_response)
+    @api.response(401, 'Unauthorized', default_response)
+    @api.response(422, 'Not processable', default_response)
+    def post(self):
+        """
+        Add batch of GCE jobs.
+        """
+        return add_batch_jobs('gce', validate_gce_job)
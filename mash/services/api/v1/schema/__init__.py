@@ -148,3 +148,18 @@ job_list = {
     },
     'additionalProperties': False
 }
+
+max_batch_jobs = 100
+
+job_batch = {
+    'type': 'object',
+    'properties': {
+        'jobs': {
+            'type': 'array',
+            'items': {'type': 'object'},
+            'minItems': 1,
+            'maxItems': max_batch_jobs
+        }
+    },
+    'required': ['jobs']
+}
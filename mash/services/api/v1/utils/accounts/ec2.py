@@ -19,6 +19,7 @@
 from flask import current_app
 
 from mash.utils.mash_utils import handle_request
+from mash.services.api.v1.utils.batch import shared_lookup
 from mash.mash_exceptions import MashException
 
 
@@ -36,6 +37,29 @@ def get_accounts_in_ec2_group(group_name, user_id):
     return response.json()
 
 
+@shared_lookup
+def get_ec2_accounts_by_name(names, group_names, user_id):
+    """
+    Get EC2 accounts and groups for user in one request.
+
+    Returns a dictionary of accounts by name and a dictionary
+    of account names by group name.
+    """
+    response = handle_request(
+        current_app.config['DATABASE_API_URL'],
+        'ec2_accounts/bulk',
+        'get',
+        job_data={
+            'names': list(names),
+            'group_names': list(group_names),
+            'user_id': user_id
+        }
+    )
+
+    data = response.json()
+    return data['accounts'], data['groups']
+
+
 def create_ec2_account(user_id, data):
     """
     Create a new EC2 account for user.
@@ -16,42 +16,246 @@
 # along with mash.  If not, see <http://www.gnu.org/licenses/>
 #
 
+import os
 import sys
+import threading
+import time
+
+from contextlib import contextmanager
+from queue import Empty, LifoQueue
 
 from amqpstorm import Connection
 from flask import current_app
 
+from mash.mash_exceptions import MashRabbitConnectionException
+from mash.utils.publisher import ConfirmPublisher
+
 module = sys.modules[__name__]
 
-connection = None
-channel = None
+pool = None
+pool_lock = threading.Lock()
 
 
-def connect():
-    module.connection = Connection(
-        current_app.config['AMQP_HOST'],
-        current_app.config['AMQP_USER'],
-        current_app.config['AMQP_PASS'],
-        kwargs={'heartbeat': 600}
-    )
-    module.channel = connection.channel()
-    channel.confirm_deliveries()
+class ChannelPool(object):
+    """
+    Bounded pool of AMQP channels on one connection per worker.
 
+    Request threads borrow a channel, publish and return it. Each
+    channel is wrapped in a confirm publisher. Channels are never
+    shared between threads at the same time. Closed channels are
+    discarded and the connection is opened again on demand. After a
+    failed connection attempt new attempts are delayed with
+    exponential backoff.
+    """
+    def __init__(
+        self, host, user, password, size=8, timeout=10, max_backoff=30,
+        window=64
+    ):
+        self.host = host
+        self.user = user
+        self.password = password
+        self.size = size
+        self.timeout = timeout
+        self.max_backoff = max_backoff
+        self.window = window
 
-def publish(exchange, routing_key, message):
+        self.pid = os.getpid()
+        self.connection = None
+        self.channels = LifoQueue()
+        self.slots = threading.BoundedSemaphore(size)
+        self.lock = threading.Lock()
+
+        self.backoff = 0
+        self.retry_time = 0
+
+    def _connect(self):
+        """
+        Open the connection if it is closed, respecting the backoff.
+        """
+        with self.lock:
+            if self.connection and self.connection.is_open:
+                return self.connection
+
+            if time.monotonic() < self.retry_time:
+                raise MashRabbitConnectionException(
+                    'Connection to RabbitMQ server failed, retry in '
+                    '{0:.1f} seconds.'.format(
+                        self.retry_time - time.monotonic()
+                    )
+                )
+
+            try:
+                self.connection = Connection(
+                    self.host,
+                    self.user,
+                    self.password,
+                    kwargs={'heartbeat': 600}
+                )
+            except Exception as error:
+                self.backoff = min(
+                    max(self.backoff * 2, 1), self.max_backoff
+                )
+                self.retry_time = time.monotonic() + self.backoff
+                raise MashRabbitConnectionException(
+                    'Connection to RabbitMQ server failed: {0}'.format(error)
+                )
+
+            self.backoff = 0
+            self.retry_time = 0
+            return self.connection
+
+    def _get_channel(self):
+        """
+        Return the publisher of an idle open channel or a new one.
+        """
+        while True:
+            try:
+                publisher = self.channels.get_nowait()
+            except Empty:
+                break
+
+            if publisher.is_open and self.connection.is_open:
+                return publisher
+
+            if publisher.channel.is_open:
+                publisher.channel.close()
+
+        return ConfirmPublisher(
+            self._connect().channel(),
+            window=self.window,
+            timeout=self.timeout
+        )
+
+    @contextmanager
+    def channel(self):
+        """
+        Borrow the publisher of a channel from the pool.
+
+        Waits up to timeout seconds if all channels are in use. A
+        channel that raised an error is closed instead of returned.
+        """
+        if not self.slots.acquire(timeout=self.timeout):
+            raise MashRabbitConnectionException(
+                'No AMQP channel available after {0} seconds.'.format(
+                    self.timeout
+                )
+            )
+
+        publisher = None
+        try:
+            publisher = self._get_channel()
+            yield publisher
+        except Exception:
+            if publisher and publisher.channel.is_open:
+                publisher.channel.close()
+            raise
+        else:
+            self.channels.put(publisher)
+        finally:
+            self.slots.release()
+
+    def close(self):
+        """
+        Close all idle channels and the connection.
+        """
+        while True:
+            try:
+                publisher = self.channels.get_nowait()
+            except Empty:
+                break
+
+            if publisher.channel.is_open:
+                publisher.channel.close()
+
+        if self.connection and self.connection.is_open:
+            self.connection.close()
+
+
+def get_pool():
     """
-    Publish message to the provided exchange with the routing key.
+    Return the channel pool of the current worker process.
+
+    A new pool is created after a fork, connections can not be
+    shared between processes.
     """
-    if not channel or channel.is_closed:
-        connect()
+    with pool_lock:
+        if not pool or pool.pid != os.getpid():
+            module.pool = ChannelPool(
+                current_app.config['AMQP_HOST'],
+                current_app.config['AMQP_USER'],
+                current_app.config['AMQP_PASS'],
+                size=current_app.config['AMQP_CHANNEL_POOL_SIZE'],
+                window=current_app.config['AMQP_PUBLISH_CONFIRM_WINDOW']
+            )
+
+    return pool
 
-    channel.basic.publish(
-        body=message,
-        routing_key=routing_key,
-        exchange=exchange,
-        properties={
+
+def publish_message(publisher, exchange, routing_key, message):
+    """
+    Publish persistent json message, return the future of its confirm.
+    """
+    return publisher.publish(
+        message,
+        routing_key,
+        exchange,
+        {
             'content_type': 'application/json',
             'delivery_mode': 2
-        },
-        mandatory=True
+        }
     )
+
+
+def publish(exchange, routing_key, message):
+    """
+    Publish message to the provided exchange with the routing key.
+    """
+    with get_pool().channel() as publisher:
+        publisher.wait(
+            [publish_message(publisher, exchange, routing_key, message)]
+        )
+
+
+def publish_batch(exchange, routing_key, messages):
+    """
+    Publish messages to the provided exchange on one channel.
+
+    All messages are published before waiting for the confirms, the
+    batch costs one confirm round trip. Returns a list with None for
+    each confirmed message and the error for each failed message.
+    After a publish error the remaining messages are published on a
+    new channel.
+    """
+    results = []
+
+    while len(results) < len(messages):
+        try:
+            with get_pool().channel() as publisher:
+                futures = []
+                failed = None
+
+                for message in messages[len(results):]:
+                    try:
+                        futures.append(
+                            publish_message(
+                                publisher, exchange, routing_key, message
+                            )
+                        )
+                    except Exception as error:
+                        failed = error
+                        break
+
+                for future in futures:
+                    try:
+                        publisher.wait([future])
+                    except Exception as confirm_error:
+                        results.append(confirm_error)
+                    else:
+                        results.append(None)
+
+                if failed:
+                    raise failed
+        except Exception as error:
+            results.append(error)
+
+    return results
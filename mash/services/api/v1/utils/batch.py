@@ -0,0 +1,74 @@
+# Copyright (c) 2021 SUSE LLC.  All rights reserved.
+#
+# This file is part of mash.
+#
+# mash is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# mash is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with mash.  If not, see <http://www.gnu.org/licenses/>
+#
+
+import copy
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+batch_cache = ContextVar('batch_cache', default=None)
+
+
+@contextmanager
+def lookup_batch():
+    """
+    Share the results of lookups in the block.
+
+    Used when validating a batch of job docs which reference the
+    same user, accounts and groups.
+    """
+    token = batch_cache.set({})
+
+    try:
+        yield
+    finally:
+        batch_cache.reset(token)
+
+
+def shared_lookup(function):
+    """
+    Decorator for lookups that are shared in a lookup batch.
+
+    Outside of a batch the function is called as usual. In a batch
+    the result, or the error, is stored by the function arguments and
+    each caller gets its own copy.
+    """
+    @wraps(function)
+    def wrapper(*args):
+        cache = batch_cache.get()
+
+        if cache is None:
+            return function(*args)
+
+        key = (function.__module__, function.__name__, repr(args))
+
+        if key not in cache:
+            try:
+                cache[key] = (function(*args), None)
+            except Exception as error:
+                cache[key] = (None, error)
+
+        result, error = cache[key]
+
+        if error:
+            raise error
+
+        return copy.deepcopy(result)
+
+    return wrapper
@@ -17,42 +17,45 @@
 #
 
 import json
+import threading
+import time
 import uuid
 
 from dateutil import parser
 from flask import current_app
 
-from mash.services.api.v1.utils.amqp import publish
-from mash.mash_exceptions import MashJobException
+from mash.log.job_log import get_job_log_file, get_log_size, read_job_log
+from mash.services.api.v1.utils.amqp import publish, publish_batch
+from mash.services.api.v1.utils.batch import lookup_batch
+from mash.mash_exceptions import MashException, MashJobException
 from mash.utils.mash_utils import normalize_dictionary
 from mash.services.status_levels import RUNNING
 from mash.utils.mash_utils import handle_request
 from mash.services.api.v1.utils.users import get_user_by_id
 
+# Requests waiting for status updates or job logs at the same time at most
+max_long_poll_waiters = 32
+long_poll_waiters = threading.BoundedSemaphore(max_long_poll_waiters)
+
 
 def get_new_job_id():
     return str(uuid.uuid4())
 
 
-def create_job(data):
+def get_job_row(data):
     """
-    Create a new job for user.
+    Assign a new job id and return the database row for the job doc.
     """
-    if data.get('dry_run'):
-        return None
-
     job_id = get_new_job_id()
     data['job_id'] = job_id
 
-    user_id = data['requesting_user']
-
     kwargs = {
         'job_id': job_id,
         'last_service': data['last_service'],
         'utctime': data['utctime'],
         'image': data['image'],
         'download_url': data['download_url'],
-        'user_id': user_id,
+        'user_id': data['requesting_user'],
         'state': RUNNING,
         'current_service': current_app.config['SERVICE_NAMES'][0]
     }
@@ -60,12 +63,42 @@ def create_job(data):
     if data['utctime'] != 'now':
         kwargs['start_time'] = parser.parse(data['utctime'])
 
+    if data.get('cloud'):
+        kwargs['cloud'] = data['cloud']
+
     if data.get('cloud_architecture'):
         kwargs['cloud_architecture'] = data['cloud_architecture']
 
     if data.get('profile'):
         kwargs['profile'] = data['profile']
 
+    return kwargs
+
+
+def delete_failed_job(job_id, user_id):
+    """
+    Attempt to cleanup a job that could not be initialized.
+    """
+    try:
+        handle_request(
+            current_app.config['DATABASE_API_URL'],
+            'jobs/',
+            'delete',
+            job_data={'job_id': job_id, 'user_id': user_id}
+        )
+    except Exception:
+        pass
+
+
+def create_job(data):
+    """
+    Create a new job for user.
+    """
+    if data.get('dry_run'):
+        return None
+
+    kwargs = get_job_row(data)
+
     response = handle_request(
         current_app.config['DATABASE_API_URL'],
         'jobs/',
@@ -80,21 +113,91 @@ def create_job(data):
             json.dumps(data, sort_keys=True)
         )
     except Exception:
-        try:
-            handle_request(
-                current_app.config['DATABASE_API_URL'],
-                'jobs/',
-                'delete',
-                job_data={'job_id': job_id, 'user_id': user_id}
-            )
-        except Exception:
-            pass  # Attempt to cleanup job in database
-
+        delete_failed_job(kwargs['job_id'], kwargs['user_id'])
         raise MashJobException('Failed to initialize job.')
 
     return response.json()
 
 
+def create_jobs(job_docs, validate):
+    """
+    Validate and create multiple jobs for user.
+
+    Lookups of accounts and users are shared by all job docs. The
+    jobs are added to the database in one transaction and the job
+    docs are published on one channel.
+
+    Returns a result for each job doc in order. Each result has the
+    status code a single job request would return and the job or a
+    message. A job doc that fails does not affect the other jobs.
+    """
+    results = [None] * len(job_docs)
+    jobs = []
+
+    with lookup_batch():
+        for index, data in enumerate(job_docs):
+            try:
+                data = validate(data)
+            except MashException as error:
+                results[index] = {
+                    'status': 400,
+                    'msg': 'Job failed: {0}'.format(error)
+                }
+                continue
+            except Exception as error:
+                current_app.logger.warning(error)
+                results[index] = {
+                    'status': 400,
+                    'msg': 'Failed to start job'
+                }
+                continue
+
+            if data.get('dry_run'):
+                results[index] = {'status': 200, 'msg': 'Job doc is valid!'}
+            else:
+                jobs.append((index, data))
+
+    if not jobs:
+        return results
+
+    rows = [get_job_row(data) for index, data in jobs]
+
+    try:
+        response = handle_request(
+            current_app.config['DATABASE_API_URL'],
+            'jobs/batch',
+            'post',
+            job_data={'jobs': rows}
+        )
+    except Exception as error:
+        current_app.logger.warning(error)
+        for index, data in jobs:
+            results[index] = {'status': 400, 'msg': 'Failed to start job'}
+
+        return results
+
+    errors = publish_batch(
+        'jobcreator',
+        'job_document',
+        [json.dumps(data, sort_keys=True) for index, data in jobs]
+    )
+
+    for (index, data), row, job, error in zip(
+        jobs, rows, response.json(), errors
+    ):
+        if error:
+            current_app.logger.warning(error)
+            delete_failed_job(row['job_id'], row['user_id'])
+            results[index] = {
+                'status': 400,
+                'msg': 'Job failed: Failed to initialize job.'
+            }
+        else:
+            results[index] = {'status': 201, 'job': job}
+
+    return results
+
+
 def validate_job(data):
     """
     Validate job doc.
@@ -188,15 +291,176 @@ def get_job(job_id, user_id):
     return response.json()
 
 
-def get_jobs(user_id, page=None, per_page=None):
+def get_jobs(user_id, page=None, per_page=None, **filters):
     """
     Retrieve all jobs for user.
+
+    Filters by state, cloud, current_service, failed_service, image
+    and start time range (since, until) are applied in the database.
     """
+    job_data = {'page': page, 'per_page': per_page}
+    job_data.update(filters)
+
     response = handle_request(
         current_app.config['DATABASE_API_URL'],
         'jobs/list/{user}'.format(user=user_id),
         'get',
-        job_data={'page': page, 'per_page': per_page}
+        job_data=job_data
+    )
+
+    return response.json()
+
+
+def get_job_summary(user_id, **filters):
+    """
+    Get job counts for user by state and service.
+    """
+    response = handle_request(
+        current_app.config['DATABASE_API_URL'],
+        'jobs/summary/{user}'.format(user=user_id),
+        'get',
+        job_data=filters
+    )
+
+    return response.json()
+
+
+def get_job_logs(
+    job_id, user_id, offset=0, max_bytes=1048576, since=None, service=None,
+    tail=None, wait=0
+):
+    """
+    Get a range of the log for given job and user.
+
+    If wait is set and there is no log data past the offset the request
+    polls the log file for up to wait seconds (30 at most). At most
+    max_long_poll_waiters requests wait at the same time, a request
+    past the limit raises MashJobException.
+
+    Returns None if the job does not exist.
+    """
+    if not get_job(job_id, user_id):
+        return None
+
+    log_file = get_job_log_file(
+        current_app.config['JOB_LOG_DIRECTORY'], job_id
+    )
+
+    deadline = time.monotonic() + min(wait or 0, 30)
+    size = _get_job_log_size(log_file)
+
+    if size <= offset and deadline > time.monotonic():
+        _acquire_long_poll_waiter('job logs')
+
+        try:
+            while size <= offset and deadline > time.monotonic():
+                time.sleep(0.5)
+                size = _get_job_log_size(log_file)
+        finally:
+            long_poll_waiters.release()
+
+    if not size:
+        return {
+            'logs': '',
+            'offset': offset,
+            'next_offset': offset,
+            'size': 0
+        }
+
+    return read_job_log(
+        log_file,
+        offset=offset,
+        max_bytes=max_bytes,
+        since=since,
+        service=service,
+        tail=tail
+    )
+
+
+def get_job_status_updates(
+    user_id, since_version=0, job_id=None, wait=0, interval=1
+):
+    """
+    Get status updates of the user's jobs after the version.
+
+    Updates are the stage transitions of the jobs, or of one job if
+    job_id is set. The DB service has no notification of new updates,
+    if wait is set and there are no updates the DB service is polled
+    every interval seconds for up to wait seconds (30 at most).
+
+    Each waiting request holds a worker, at most max_long_poll_waiters
+    requests wait at the same time. A request past the limit raises
+    MashJobException.
+
+    Returns the updates and the version to continue from.
+    """
+    deadline = time.monotonic() + min(wait or 0, 30)
+    job_data = {'since_version': since_version, 'job_id': job_id}
+    result = _request_job_status_updates(user_id, job_data)
+
+    if result['updates'] or deadline <= time.monotonic():
+        return result
+
+    _acquire_long_poll_waiter('status updates')
+
+    try:
+        while not result['updates']:
+            remaining = deadline - time.monotonic()
+
+            if remaining <= 0:
+                break
+
+            time.sleep(min(interval, remaining))
+            result = _request_job_status_updates(user_id, job_data)
+    finally:
+        long_poll_waiters.release()
+
+    return result
+
+
+def _acquire_long_poll_waiter(name):
+    """
+    Acquire a long poll waiter or raise if all are taken.
+    """
+    if not long_poll_waiters.acquire(blocking=False):
+        raise MashJobException(
+            'Too many requests are waiting for {0}, '
+            'try again later.'.format(name)
+        )
+
+
+def _get_job_log_size(log_file):
+    """
+    Return the size of the job log, 0 if there is no log yet.
+    """
+    try:
+        return get_log_size(log_file)
+    except FileNotFoundError:
+        return 0
+
+
+def _request_job_status_updates(user_id, job_data):
+    """
+    Request the status updates from the DB service.
+    """
+    response = handle_request(
+        current_app.config['DATABASE_API_URL'],
+        'jobs/status_updates/{user}'.format(user=user_id),
+        'get',
+        job_data=job_data
+    )
+    return response.json()
+
+
+def get_stage_stats(**filters):
+    """
+    Get daily stage duration stats by cloud and service.
+    """
+    response = handle_request(
+        current_app.config['DATABASE_API_URL'],
+        'jobs/stage_stats',
+        'get',
+        job_data=filters
     )
 
     return response.json()
@@ -16,36 +16,44 @@
 # along with mash.  If not, see <http://www.gnu.org/licenses/>
 #
 
-import copy
+from collections import ChainMap
 
 from flask import current_app
 
 from mash.mash_exceptions import MashJobException
-from mash.services.api.v1.utils.accounts.ec2 import (
-    get_accounts_in_ec2_group,
-    get_ec2_account
-)
+from mash.services.api.cloud_data import thaw
+from mash.services.api.v1.utils.accounts.ec2 import get_ec2_accounts_by_name
 from mash.services.api.v1.utils.jobs import validate_job
 
 
 def get_ec2_regions_by_partition(partition):
     """
     Get EC2 regions from config file based on partition.
+
+    The regions are returned as an immutable tuple.
     """
-    regions = copy.deepcopy(
-        current_app.config['CLOUD_DATA']['ec2']['regions'][partition]
-    )
-    return regions
+    return current_app.cloud_data.get_ec2_tables().regions[partition]
 
 
 def get_ec2_helper_images():
     """
     Get helper image data for EC2 from config file.
+
+    The helper images are returned as a read only mapping.
     """
-    helper_images = copy.deepcopy(
-        current_app.config['CLOUD_DATA']['ec2']['helper_images']
-    )
-    return helper_images
+    return current_app.cloud_data.get_ec2_tables().helper_images
+
+
+def get_ec2_region_tables():
+    """
+    Get EC2 regions by partition and helper images by region.
+    """
+    tables = current_app.cloud_data.get_ec2_tables()
+
+    return {
+        'regions': thaw(tables.regions),
+        'helper_images': thaw(tables.helper_images)
+    }
 
 
 def add_target_ec2_account(
@@ -61,22 +69,29 @@ def add_target_ec2_account(
 
     - Append any additional regions
     - Update ami for root swap if use_root_swap set
+
+    The shared helper images are not modified, additional regions
+    of the account are looked up in an overlay.
     """
     job_doc_data = cloud_accounts.get(account['name'], {})
     region_name = job_doc_data.get('region') or account.get('region')
     subnet = job_doc_data.get('subnet') or account.get('subnet')
+    additional_regions = account.get('additional_regions') or []
+
+    if additional_regions:
+        helper_images = ChainMap(
+            {
+                region['name']: region['helper_image']
+                for region in additional_regions
+            },
+            helper_images
+        )
 
     if skip_replication:
         regions = [region_name]
-        if account.get('additional_regions'):  # In case an additional region is used
-            for region in account['additional_regions']:
-                helper_images[region['name']] = region['helper_image']
     else:
-        regions = get_ec2_regions_by_partition(account['partition'])
-        if account.get('additional_regions'):
-            for region in account['additional_regions']:
-                helper_images[region['name']] = region['helper_image']
-                regions.append(region['name'])
+        regions = list(get_ec2_regions_by_partition(account['partition']))
+        regions += [region['name'] for region in additional_regions]
 
     if use_root_swap:
         try:
@@ -127,20 +142,31 @@ def validate_ec2_job(job_doc):
     cloud_accounts = convert_account_dict(job_doc.get('cloud_accounts', []))
 
     accounts = {}
-    target_accounts = []
+    account_names = []
+
+    if job_doc.get('cloud_account'):
+        account_names.append(job_doc['cloud_account'])
 
+    group_names = job_doc.get('cloud_groups', [])
+    account_names += list(cloud_accounts)
+
+    # Resolve all accounts and groups in one request
+    named_accounts, groups = get_ec2_accounts_by_name(
+        account_names,
+        group_names,
+        user_id
+    )
+
+    target_accounts = []
     if job_doc.get('cloud_account'):
-        account_name = job_doc['cloud_account']
-        cloud_account = get_ec2_account(account_name, user_id)
-        target_accounts.append(cloud_account)
+        target_accounts.append(named_accounts[job_doc['cloud_account']])
 
-    for group_name in job_doc.get('cloud_groups', []):
-        group_accounts = get_accounts_in_ec2_group(group_name, user_id)
-        target_accounts += group_accounts
+    for group_name in group_names:
+        target_accounts += [
+            named_accounts[name] for name in groups[group_name]
+        ]
 
-    for account_name in cloud_accounts:
-        cloud_account = get_ec2_account(account_name, user_id)
-        target_accounts.append(cloud_account)
+    target_accounts += [named_accounts[name] for name in cloud_accounts]
 
     for account in target_accounts:
         if account['name'] not in accounts:
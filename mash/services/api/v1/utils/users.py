@@ -23,6 +23,7 @@ from mash.services.api.variables import (
     password_reset_msg_template
 )
 from mash.mash_exceptions import MashException
+from mash.services.api.v1.utils.batch import shared_lookup
 from mash.utils.mash_utils import handle_request
 
 
@@ -109,6 +110,7 @@ def get_user_by_email(email, create=False):
     return response.json()
 
 
+@shared_lookup
 def get_user_by_id(user_id):
     """
     Retrieve user from database if a match exists.
@@ -0,0 +1,510 @@
+# Copyright (c) 2020 SUSE LLC.  All rights reserved.
+#
+# This file is part of mash.
+#
+# mash is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# mash is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with mash.  If not, see <http://www.gnu.org/licenses/>
+#
+
+import asyncio
+import functools
+import signal
+
+from concurrent.futures import ThreadPoolExecutor
+
+import aio_pika
+import aiohttp
+
+from aio_pika.exceptions import AMQPError
+
+from mash.mash_exceptions import MashListenerServiceException
+from mash.services.listener_service import ListenerService
+from mash.services.status_levels import EXCEPTION, SUCCESS
+from mash.utils.codec import decode_message
+
+
+class AsyncListenerService(ListenerService):
+    """
+    Listener service running jobs as asyncio tasks.
+
+    Shares the job factory, job store and message contract with
+    ListenerService. AMQP and HTTP I/O is done with aio-pika and aiohttp
+    in a single event loop. Each job runs as a task. Job store and job
+    factory calls run in a single thread store executor.
+
+    Only jobs with a native coroutine workflow (EC2 replicate and no-op
+    jobs) run concurrently in the event loop. All other jobs run their
+    blocking run_job in the job executor, at most thread_pool_count of
+    them run at the same time as with the threaded engine. Further
+    jobs wait for a free thread.
+
+    Unacked messages per consumer are limited by prefetch_count,
+    listener messages are acked when the job finishes.
+
+    All AMQP methods of this class are coroutines.
+    """
+    prefetch_count = 1000
+
+    def post_init(self):
+        """
+        Initialize base service class and event loop state.
+
+        Scale out with replica queues is not supported by the
+        asyncio engine, the service refuses to start if configured.
+        """
+        self._setup_listener()
+
+        if self.config.get_scale_out(self.service_exchange):
+            raise MashListenerServiceException(
+                'Scale out is not supported by the asyncio listener '
+                'engine of the {0} service.'.format(self.service_exchange)
+            )
+
+        thread_pool_count = self.custom_args.get(
+            'thread_pool_count',
+            self.config.get_base_thread_pool_count()
+        )
+        self.executor = ThreadPoolExecutor(thread_pool_count)
+        self.store_executor = ThreadPoolExecutor(1)
+        self.use_process_pool = False
+        self.scale_out = False
+
+        self.exchanges = {}
+        self.tasks = {}
+        self.http_session = None
+        self.stopping = None
+
+        self._load_job_index()
+        self.start()
+
+    def _open_connection(self):
+        """
+        The AMQP connection is opened in the event loop on start.
+        """
+        pass
+
+    async def _open_connection_async(self):
+        """
+        Open robust connection and a channel with publisher confirms.
+        """
+        self.connection = await aio_pika.connect_robust(
+            host=self.amqp_host,
+            login=self.amqp_user,
+            password=self.amqp_pass,
+            heartbeat=600
+        )
+        self.channel = await self.connection.channel(publisher_confirms=True)
+        await self.channel.set_qos(prefetch_count=self.prefetch_count)
+
+    async def _run_in_store_executor(self, func, *args):
+        """
+        Run a blocking job store or job factory call in the store executor.
+
+        Calls run one at a time in the order they are made.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.store_executor,
+            functools.partial(func, *args)
+        )
+
+    async def _add_job(self, job_config):
+        """
+        Create job using job factory if job id does not already exist.
+
+        The job is validated and persisted in the store executor, only
+        the job id is kept in memory. The job id is checked again once
+        the job is created, a duplicate job document may have been
+        handled meanwhile.
+        """
+        job_id = job_config['id']
+        job = None
+
+        if job_id not in self.job_index:
+            job = await self._run_in_store_executor(
+                self._create_job, job_config
+            )
+
+        if job_id in self.job_index:
+            self.log.warning(
+                'Job already queued.',
+                extra={'job_id': job_id}
+            )
+            return
+
+        if not job:
+            return
+
+        self.job_index.add(job_id)
+
+        try:
+            await self._run_in_store_executor(self.job_store.add, job_config)
+        except Exception:
+            self.job_index.discard(job_id)
+            raise
+
+        self.log.info(
+            'Job queued, awaiting listener message.',
+            extra=job.get_job_id()
+        )
+
+    async def _delete_job(self, job_id):
+        """
+        Remove job from job store and delete from listener queue.
+        """
+        if job_id in self.jobs or job_id in self.job_index:
+            self.log.info(
+                'Deleting job.',
+                extra={'job_id': job_id}
+            )
+
+            self.jobs.pop(job_id, None)
+            self.job_index.discard(job_id)
+            await self._run_in_store_executor(self.job_store.delete, job_id)
+        else:
+            self.log.warning(
+                'Job deletion failed, job is not queued.',
+                extra={'job_id': job_id}
+            )
+
+    async def _get_job(self, job_id):
+        """
+        Return the job instance for the job id or None.
+
+        The job instance is created from the job store on first access.
+        """
+        if job_id in self.jobs:
+            return self.jobs[job_id]
+
+        if job_id not in self.job_index:
+            return None
+
+        job_config = await self._run_in_store_executor(
+            self.job_store.get, job_id
+        )
+
+        if not job_config:
+            self.job_index.discard(job_id)
+            return None
+
+        job = await self._run_in_store_executor(self._create_job, job_config)
+
+        if job_id in self.jobs:
+            # Created by a concurrent listener message
+            return self.jobs[job_id]
+
+        if job:
+            self.jobs[job_id] = job
+        else:
+            await self._delete_job(job_id)
+
+        return job
+
+    async def _declare_direct_exchange(self, exchange):
+        """
+        Declare/create exchange and set as durable.
+        """
+        if exchange not in self.exchanges:
+            self.exchanges[exchange] = await self.channel.declare_exchange(
+                exchange,
+                aio_pika.ExchangeType.DIRECT,
+                durable=True
+            )
+
+        return self.exchanges[exchange]
+
+    async def _declare_queue(self, queue):
+        """
+        Declare the queue and set as durable.
+        """
+        return await self.channel.declare_queue(queue, durable=True)
+
+    def _decode_message(self, message):
+        """
+        Return the message body decoded based on the message properties.
+        """
+        return decode_message(
+            message.body,
+            message.content_type,
+            message.content_encoding
+        )
+
+    async def _publish(self, exchange, routing_key, message, message_id=None):
+        """
+        Publish message to the provided exchange with the routing key.
+
+        The publish is awaited until the broker confirms the message.
+        """
+        body, properties = self._encode_message(message)
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+
+        amqp_exchange = await self._declare_direct_exchange(exchange)
+        await amqp_exchange.publish(
+            aio_pika.Message(
+                body=body,
+                content_type=properties['content_type'],
+                content_encoding=properties.get('content_encoding'),
+                delivery_mode=aio_pika.DeliveryMode.PERSISTENT,
+                message_id=message_id
+            ),
+            routing_key=routing_key,
+            mandatory=True
+        )
+
+    async def bind_queue(self, exchange, routing_key, name):
+        """
+        Bind queue on exchange to the provided routing key.
+        """
+        amqp_exchange = await self._declare_direct_exchange(exchange)
+        queue = await self._declare_queue(
+            self._get_queue_name(exchange, name)
+        )
+        await queue.bind(amqp_exchange, routing_key=routing_key)
+        return queue
+
+    async def close_connection(self):
+        """
+        Close log handler, http session and AMQP connection if open.
+        """
+        await self._run_in_store_executor(self.close_log_handler)
+
+        if self.http_session and not self.http_session.closed:
+            await self.http_session.close()
+
+        if self.connection and not self.connection.is_closed:
+            await self.connection.close()
+
+    async def _cleanup_job(self, job_id):
+        """
+        Job failed upstream.
+
+        Delete job and notify the next service. The job did not run
+        in this service, the stage times of the upstream service are
+        dropped from the status message.
+        """
+        job = self.jobs[job_id]
+        job.clear_stage_times()
+
+        self.log.warning('Failed upstream.', extra=job.get_job_id())
+        await self._delete_job(job.id)
+
+        message = self._get_status_message(job)
+        await self._publish_message(message, job.id)
+
+    async def _handle_listener_message(self, message):
+        """
+        Callback for listener messages.
+        """
+        listener_msg = self._get_listener_msg(
+            message,
+            '{0}_result'.format(self.prev_service)
+        )
+
+        job_id = None
+        if listener_msg:
+            status = listener_msg['status']
+            job_id = listener_msg['id']
+
+        job = await self._get_job(job_id) if job_id else None
+
+        if job:
+            job.listener_msg = message
+            job.set_status_message(listener_msg)
+
+            if status == SUCCESS and self.stopping and self.stopping.is_set():
+                # Delivered before the consumer was cancelled
+                await message.reject(requeue=True)
+                return
+            elif status == SUCCESS:
+                job.set_queued_time()
+                self._schedule_job(job.id)
+                return  # Don't ack message until job finishes
+            else:
+                await self._cleanup_job(job_id)
+
+        await message.ack()
+
+    async def _handle_service_message(self, message):
+        """
+        Callback for events from jobcreator.
+        """
+        job_key = '{0}_job'.format(self.service_exchange)
+        try:
+            job_desc = self._decode_message(message)
+            await self._add_job(job_desc[job_key])
+        except Exception as e:
+            self.log.error('Error adding job: {0}.'.format(e))
+
+        await message.ack()
+
+    async def _process_job_result(self, job_id, exception=None):
+        """
+        Handle the result of a finished job task.
+
+        Handle exceptions and errors that occur and logs info to job log.
+        """
+        job = self.jobs[job_id]
+        metadata = job.get_job_id()
+
+        await self._delete_job(job_id)
+
+        if exception:
+            job.status = EXCEPTION
+            msg = 'Exception in {0}: {1}'.format(
+                self.service_exchange,
+                exception
+            )
+            job.add_error_msg(msg)
+            self.log.error(
+                msg,
+                extra=metadata
+            )
+        elif job.status == SUCCESS:
+            self.log.info(
+                '{0} successful.'.format(
+                    self.service_exchange
+                ),
+                extra=metadata
+            )
+        else:
+            self.log.error(
+                'Error occurred in {0}.'.format(
+                    self.service_exchange
+                ),
+                extra=metadata
+            )
+
+        message = self._get_status_message(job)
+        await self._publish_message(message, job.id)
+        await job.listener_msg.ack()
+
+    async def _publish_message(self, message, job_id):
+        """
+        Publish message to next service exchange.
+        """
+        try:
+            await self.publish_job_result(
+                self.service_exchange, message, job_id
+            )
+        except AMQPError:
+            self.log.warning(
+                'Message not received: {0}'.format(message),
+                extra={'job_id': job_id}
+            )
+
+    async def _run_job(self, job_id):
+        """
+        Process job based on job id and handle the result.
+        """
+        job = self.jobs[job_id]
+        job.executor = self.executor
+        job.http_session = self.http_session
+        job.event_loop = asyncio.get_running_loop()
+
+        exception = None
+        try:
+            await job.process_job_async()
+        except Exception as error:
+            exception = error
+
+        self.tasks.pop(job_id, None)
+        await self._process_job_result(job_id, exception)
+
+    def _schedule_job(self, job_id):
+        """
+        Create a task in the event loop for job based on id.
+        """
+        if job_id in self.tasks:
+            self.log.warning(
+                'Job already running. Received multiple '
+                'listener messages.',
+                extra={'job_id': job_id}
+            )
+            return
+
+        self.tasks[job_id] = asyncio.ensure_future(self._run_job(job_id))
+
+    async def publish_job_result(self, exchange, message, job_id=None):
+        """
+        Publish the result message to the listener queue on given exchange.
+        """
+        await self._publish(
+            exchange, self.listener_msg_key, message, message_id=job_id
+        )
+
+    async def run(self):
+        """
+        Connect, consume service and listener queues until stopped.
+        """
+        loop = asyncio.get_running_loop()
+        self.stopping = asyncio.Event()
+
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(signum, self.stop, signum)
+
+        self.http_session = aiohttp.ClientSession()
+        await self._open_connection_async()
+
+        service_queue = await self.bind_queue(
+            self.service_exchange, self.job_document_key, self.service_queue
+        )
+        listener_queue = await self.bind_queue(
+            self.prev_service, self.listener_msg_key, self.listener_queue
+        )
+
+        service_tag = await service_queue.consume(
+            self._handle_service_message
+        )
+        listener_tag = await listener_queue.consume(
+            self._handle_listener_message
+        )
+
+        await self.stopping.wait()
+
+        # No new jobs are started while running jobs finish
+        await service_queue.cancel(service_tag)
+        await listener_queue.cancel(listener_tag)
+
+        # Wait for running jobs to finish
+        if self.tasks:
+            await asyncio.gather(
+                *self.tasks.values(),
+                return_exceptions=True
+            )
+
+        await self._run_in_store_executor(self.job_store.close)
+        await self.close_connection()
+
+    def start(self):
+        """
+        Start listener service event loop.
+        """
+        try:
+            asyncio.run(self.run())
+        finally:
+            self.executor.shutdown()
+            self.store_executor.shutdown()
+
+    def stop(self, signum=None, frame=None):
+        """
+        Gracefully stop the service.
+
+        Running jobs are finished before the AMQP connection is closed.
+        """
+        if signum:
+            self.log.info(
+                'Got a TERM/INTERRUPT signal, shutting down gracefully.'
+            )
+
+        self.stopping.set()
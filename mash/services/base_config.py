@@ -19,6 +19,7 @@
 import os
 import yaml
 
+from mash.log.job_log import get_job_log_file
 from mash.mash_exceptions import MashConfigException
 from mash.services.base_defaults import Defaults
 
@@ -32,6 +33,7 @@ class BaseConfig(object):
     """
     def __init__(self, config_file=None):
         config_file = config_file or Defaults.get_config()
+        self.config_file = config_file
         self.config_data = None
         try:
             with open(config_file, 'r') as config:
@@ -103,6 +105,17 @@ class BaseConfig(object):
         base_job_dir = base_job_dir or Defaults.get_base_job_directory()
         return os.path.join(base_job_dir, Defaults.get_job_directory(service_name))
 
+    def get_job_store(self):
+        """
+        Return the type of job store used by services to persist jobs.
+
+        Either file, one json file per job, or sqlite.
+
+        :rtype: string
+        """
+        job_store = self._get_attribute(attribute='job_store')
+        return job_store or Defaults.get_job_store()
+
     def get_log_file(self, service):
         """
         Return log file name based on log_dir attribute.
@@ -114,16 +127,22 @@ class BaseConfig(object):
             dir=log_dir, service=service
         )
 
+    def get_job_log_directory(self):
+        """
+        Return directory of the job log files.
+
+        :rtype: string
+        """
+        log_dir = os.path.join(self.get_log_directory(), 'jobs')
+        return os.path.expanduser(os.path.normpath(log_dir))
+
     def get_job_log_file(self, job_id):
         """
         Return log file given the job_id.
 
         :rtype: string
         """
-        log_file = os.path.join(
-            self.get_log_directory(), 'jobs', ''.join([job_id, '.log'])
-        )
-        return os.path.expanduser(os.path.normpath(log_file))
+        return get_job_log_file(self.get_job_log_directory(), job_id)
 
     def get_cloud_data(self):
         """
@@ -210,6 +229,85 @@ class BaseConfig(object):
 
         return amqp_pass or Defaults.get_amqp_pass()
 
+    def get_amqp_channel_pool_size(self):
+        """
+        Return the max number of AMQP channels of an API worker.
+
+        :rtype: int
+        """
+        pool_size = self._get_attribute(
+            attribute='amqp_channel_pool_size'
+        )
+
+        return pool_size or Defaults.get_amqp_channel_pool_size()
+
+    def get_database_status_consumer(self):
+        """
+        Return True if the database service consumes job status messages.
+
+        If enabled the job creator service does not send job status
+        to the database service.
+
+        :rtype: bool
+        """
+        status_consumer = self._get_attribute(
+            attribute='database_status_consumer'
+        )
+
+        return status_consumer or Defaults.get_database_status_consumer()
+
+    def get_message_content_type(self):
+        """
+        Return the content type of messages published by services.
+
+        Either application/json or application/msgpack.
+
+        :rtype: string
+        """
+        content_type = self._get_attribute(
+            attribute='message_content_type'
+        )
+
+        return content_type or Defaults.get_message_content_type()
+
+    def get_message_compression(self):
+        """
+        Return the compression of large messages, gzip or zstd.
+
+        Messages are not compressed by default.
+
+        :rtype: string
+        """
+        compression = self._get_attribute(
+            attribute='message_compression'
+        )
+
+        return compression or Defaults.get_message_compression()
+
+    def get_message_compression_threshold(self):
+        """
+        Return the size in bytes above which messages are compressed.
+
+        :rtype: int
+        """
+        threshold = self._get_attribute(
+            attribute='message_compression_threshold'
+        )
+
+        return threshold or Defaults.get_message_compression_threshold()
+
+    def get_publish_confirm_window(self):
+        """
+        Return the max number of published messages awaiting confirm.
+
+        :rtype: int
+        """
+        window = self._get_attribute(
+            attribute='publish_confirm_window'
+        )
+
+        return window or Defaults.get_publish_confirm_window()
+
     def get_smtp_host(self):
         """
         Return the smtp hostname.
@@ -287,6 +385,53 @@ class BaseConfig(object):
 
         return notification_subject or Defaults.get_notification_subject()
 
+    def get_notification_min_interval(self):
+        """
+        Return the minimum interval in seconds between two notification
+        emails to the same recipient.
+
+        :rtype: int
+        """
+        min_interval = self._get_attribute(
+            attribute='notification_min_interval'
+        )
+
+        if min_interval is None:
+            min_interval = Defaults.get_notification_min_interval()
+
+        return min_interval
+
+    def get_notification_digest(self):
+        """
+        Return True if pending notifications to a recipient are sent
+        in one digest email.
+
+        :rtype: bool
+        """
+        digest = self._get_attribute(
+            attribute='notification_digest'
+        )
+
+        return digest or Defaults.get_notification_digest()
+
+    def get_job_credentials_cache_ttl(self):
+        """
+        Return the time in seconds credentials are cached in a service
+        process and shared between jobs.
+
+        A ttl of 0 disables the cache.
+
+        :rtype: int
+        """
+        ttl = self._get_attribute(
+            attribute='job_credentials_cache_ttl'
+        )
+
+        if ttl is None:
+            ttl = Defaults.get_job_credentials_cache_ttl()
+
+        return ttl
+
     def get_credentials_url(self):
         """
         Return the credentials API URL.
@@ -402,6 +547,96 @@ class BaseConfig(object):
         )
         return base_thread_pool_count or Defaults.get_base_thread_pool_count()
 
+    def get_listener_engine(self, service_name):
+        """
+        Return the engine used to run the given listener service.
+
+        Either thread, the default blocking consumer with a thread pool,
+        or asyncio. The asyncio engine does not support scale_out:
+
+        replicate:
+          listener_engine: asyncio
+
+        :return: string
+        """
+        listener_engine = self._get_attribute(
+            attribute='listener_engine',
+            element=service_name
+        )
+        return listener_engine or Defaults.get_listener_engine()
+
+    def get_process_pool_count(self, service_name):
+        """
+        Return the process pool count for the given listener service.
+
+        A count of 0 keeps the default thread pool executor. A value
+        greater than 0 runs jobs of the service in worker processes:
+
+        upload:
+          process_pool_count: 4
+
+        :return: int
+        """
+        process_pool_count = self._get_attribute(
+            attribute='process_pool_count',
+            element=service_name
+        )
+        return process_pool_count or Defaults.get_process_pool_count()
+
+    def get_replica_id(self):
+        """
+        Return the replica id of this node for scaled out services.
+
+        Must be unique for every replica of a service, defaults
+        to the hostname.
+
+        :return: string
+        """
+        replica_id = self._get_attribute(attribute='replica_id')
+        return replica_id or Defaults.get_replica_id()
+
+    def get_replica_takeover(self, service_name):
+        """
+        Return the ids of gone replicas of the given scaled out service.
+
+        The queues of the listed replicas are drained and unbound by
+        the running replicas. Used when a replica is removed for good
+        without a clean shutdown:
+
+        test:
+          scale_out: true
+          replica_takeover:
+            - node2
+
+        :return: list
+        """
+        replica_takeover = self._get_attribute(
+            attribute='replica_takeover',
+            element=service_name
+        )
+        return replica_takeover or Defaults.get_replica_takeover()
+
+    def get_scale_out(self, service_name):
+        """
+        Return True if the given listener service is scaled out.
+
+        Scaled out services run multiple replicas. Jobs are distributed
+        to the replicas by a consistent hash of the job id. The job
+        directory of the service is expected to be shared and must use
+        the file job store, listener services refuse to start with the
+        sqlite job store:
+
+        test:
+          scale_out: true
+
+        :return: bool
+        """
+        scale_out = self._get_attribute(
+            attribute='scale_out',
+            element=service_name
+        )
+        return scale_out or Defaults.get_scale_out()
+
     def get_publish_thread_pool_count(self):
         """
         Return the thread pool count for publish background scheduler.
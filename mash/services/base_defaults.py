@@ -16,6 +16,8 @@
 # along with mash.  If not, see <http://www.gnu.org/licenses/>
 #
 
+import socket
+
 
 class Defaults(object):
     """
@@ -37,6 +39,10 @@ class Defaults(object):
     def get_job_directory(self, service_name):
         return '{0}_jobs/'.format(service_name)
 
+    @staticmethod
+    def get_job_store():
+        return 'file'
+
     @classmethod
     def get_jwt_algorithm(self):
         return 'HS256'
@@ -64,6 +70,30 @@ class Defaults(object):
     def get_amqp_pass():
         return 'guest'
 
+    @staticmethod
+    def get_amqp_channel_pool_size():
+        return 8
+
+    @staticmethod
+    def get_database_status_consumer():
+        return False
+
+    @staticmethod
+    def get_message_content_type():
+        return 'application/json'
+
+    @staticmethod
+    def get_message_compression():
+        return None
+
+    @staticmethod
+    def get_message_compression_threshold():
+        return 65536
+
+    @staticmethod
+    def get_publish_confirm_window():
+        return 64
+
     @classmethod
     def get_non_credential_service_names(self):
         return ['obs']
@@ -88,6 +118,18 @@ class Defaults(object):
     def get_smtp_ssl():
         return False
 
+    @staticmethod
+    def get_notification_min_interval():
+        return 10
+
+    @staticmethod
+    def get_job_credentials_cache_ttl():
+        return 60
+
+    @staticmethod
+    def get_notification_digest():
+        return False
+
     @staticmethod
     def get_notification_subject():
         return '[MASH] Job Status Update'
@@ -120,6 +162,26 @@ class Defaults(object):
     def get_base_thread_pool_count():
         return 10
 
+    @staticmethod
+    def get_listener_engine():
+        return 'thread'
+
+    @staticmethod
+    def get_process_pool_count():
+        return 0
+
+    @staticmethod
+    def get_replica_id():
+        return socket.gethostname()
+
+    @staticmethod
+    def get_replica_takeover():
+        return []
+
+    @staticmethod
+    def get_scale_out():
+        return False
+
     @staticmethod
     def get_publish_thread_pool_count():
         return 50
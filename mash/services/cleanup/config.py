@@ -49,3 +49,93 @@ class CleanupConfig(BaseConfig):
         )
         return max_image_age if max_image_age else \
             CleanupDefaults.get_max_image_age()
+
+    def get_job_log_compress_age(self):
+        """
+        Return age (in days) after which idle job logs are compressed:
+
+        cleanup:
+          job_log_compress_age: 1
+
+        if no configuration exists the compress age from
+        the Defaults class is returned
+
+        :rtype: int
+        """
+        compress_age = self._get_attribute(
+            attribute='job_log_compress_age', element='cleanup'
+        )
+        return compress_age if compress_age else \
+            CleanupDefaults.get_job_log_compress_age()
+
+    def get_max_job_log_age(self):
+        """
+        Return maximum job log age (in days):
+
+        cleanup:
+          max_job_log_age: 90
+
+        if no configuration exists the max job log age from
+        the Defaults class is returned
+
+        :rtype: int
+        """
+        max_job_log_age = self._get_attribute(
+            attribute='max_job_log_age', element='cleanup'
+        )
+        return max_job_log_age if max_job_log_age else \
+            CleanupDefaults.get_max_job_log_age()
+
+    def get_max_job_logs_size(self):
+        """
+        Return maximum total size (in MB) of all job logs:
+
+        cleanup:
+          max_job_logs_size: 10240
+
+        if no configuration exists the max size from
+        the Defaults class is returned
+
+        :rtype: int
+        """
+        max_size = self._get_attribute(
+            attribute='max_job_logs_size', element='cleanup'
+        )
+        return max_size if max_size else \
+            CleanupDefaults.get_max_job_logs_size()
+
+    def get_max_service_log_size(self):
+        """
+        Return size (in MB) at which service logs are rotated:
+
+        cleanup:
+          max_service_log_size: 100
+
+        if no configuration exists the max size from
+        the Defaults class is returned
+
+        :rtype: int
+        """
+        max_size = self._get_attribute(
+            attribute='max_service_log_size', element='cleanup'
+        )
+        return max_size if max_size else \
+            CleanupDefaults.get_max_service_log_size()
+
+    def get_service_log_backup_count(self):
+        """
+        Return number of rotated service logs to keep:
+
+        cleanup:
+          service_log_backup_count: 5
+
+        if no configuration exists the backup count from
+        the Defaults class is returned
+
+        :rtype: int
+        """
+        backup_count = self._get_attribute(
+            attribute='service_log_backup_count', element='cleanup'
+        )
+        return backup_count if backup_count else \
+            CleanupDefaults.get_service_log_backup_count()
@@ -24,3 +24,23 @@ class Defaults(object):
     @classmethod
     def get_max_image_age(self):
         return 90
+
+    @classmethod
+    def get_job_log_compress_age(self):
+        return 1
+
+    @classmethod
+    def get_max_job_log_age(self):
+        return 90
+
+    @classmethod
+    def get_max_job_logs_size(self):
+        return 10240
+
+    @classmethod
+    def get_max_service_log_size(self):
+        return 100
+
+    @classmethod
+    def get_service_log_backup_count(self):
+        return 5
@@ -23,8 +23,13 @@ import shutil
 from apscheduler.schedulers.background import BlockingScheduler
 from pytz import utc
 
+from mash.log.job_log import (
+    compress_job_log,
+    delete_job_log,
+    get_compressed_file
+)
 from mash.services.mash_service import MashService
-from mash.utils.mash_utils import setup_logfile
+from mash.utils.mash_utils import compress_file, remove_file, setup_logfile
 
 
 class CleanupService(MashService):
@@ -52,6 +57,16 @@ class CleanupService(MashService):
             hour='5',
             minute='0'
         )
+        self.scheduler.add_job(
+            self._cleanup_job_logs,
+            'cron',
+            minute='15'
+        )
+        self.scheduler.add_job(
+            self._rotate_service_logs,
+            'cron',
+            minute='45'
+        )
         self.scheduler.start()
 
     def _purge_images(self):
@@ -71,3 +86,140 @@ class CleanupService(MashService):
                     if entry.stat().st_mtime < cutoff:
                         self.log.info('Purging {}'.format(entry.name))
                         shutil.rmtree(entry.path)
+
+    def _get_job_logs(self, log_dir):
+        """
+        Return list of (mtime, size, log_file) of all job logs.
+
+        The size includes the index and the log may be compressed.
+        """
+        job_logs = {}
+
+        with os.scandir(log_dir) as scanner:
+            for entry in scanner:
+                if not entry.is_file(follow_symlinks=False):
+                    continue
+
+                log_file = entry.path
+                if log_file.endswith('.gz'):
+                    log_file = log_file[:-3]
+
+                if log_file.endswith('.idx'):
+                    log_file = log_file[:-4]
+                elif not log_file.endswith('.log'):
+                    continue
+
+                stat = entry.stat()
+                mtime, size = job_logs.get(log_file, (0, 0))
+                job_logs[log_file] = (
+                    max(mtime, stat.st_mtime),
+                    size + stat.st_size
+                )
+
+        return sorted(
+            (mtime, size, log_file)
+            for log_file, (mtime, size) in job_logs.items()
+        )
+
+    def _cleanup_job_logs(self):
+        """
+        Compress idle job logs and expire logs by age and total size.
+
+        Logs that have not been written for the compress age belong to
+        finished jobs. Logs are compressed with a lock, if a job still
+        logs the logger service writes the new lines to a new log.
+        """
+        log_dir = self.config.get_job_log_directory()
+
+        if not os.path.isdir(log_dir):
+            return
+
+        now = time.time()
+        compress_cutoff = now - self.config.get_job_log_compress_age() * 86400
+        expire_cutoff = now - self.config.get_max_job_log_age() * 86400
+        max_size = self.config.get_max_job_logs_size() * 1048576
+
+        job_logs = []
+        for mtime, size, log_file in self._get_job_logs(log_dir):
+            if mtime < expire_cutoff:
+                self.log.info('Expiring job log {}'.format(log_file))
+                delete_job_log(log_file)
+                continue
+
+            if mtime < compress_cutoff and os.path.exists(log_file):
+                try:
+                    size = compress_job_log(log_file)
+                except Exception as error:
+                    self.log.error(
+                        'Unable to compress job log {0}: {1}'.format(
+                            log_file, error
+                        )
+                    )
+                    continue
+
+            job_logs.append((size, log_file))
+
+        total_size = sum(size for size, log_file in job_logs)
+
+        # Oldest logs are removed first
+        for size, log_file in job_logs:
+            if total_size <= max_size:
+                break
+
+            self.log.info('Removing job log {}'.format(log_file))
+            delete_job_log(log_file)
+            total_size -= size
+
+    def _rotate_service_log(self, log_file, backup_count):
+        """
+        Rotate service log to log_file.1.gz and shift older logs.
+
+        The services use watched file handlers and re-open the log file.
+        """
+        remove_file(
+            get_compressed_file('{0}.{1}'.format(log_file, backup_count))
+        )
+
+        for number in range(backup_count - 1, 0, -1):
+            backup = get_compressed_file('{0}.{1}'.format(log_file, number))
+            if os.path.exists(backup):
+                os.rename(
+                    backup,
+                    get_compressed_file(
+                        '{0}.{1}'.format(log_file, number + 1)
+                    )
+                )
+
+        backup = '{0}.1'.format(log_file)
+        os.rename(log_file, backup)
+        compress_file(backup)
+
+    def _rotate_service_logs(self):
+        """
+        Rotate service logs that exceed the max service log size.
+        """
+        log_dir = self.config.get_log_directory()
+        max_size = self.config.get_max_service_log_size() * 1048576
+        backup_count = self.config.get_service_log_backup_count()
+
+        if not os.path.isdir(log_dir):
+            return
+
+        with os.scandir(log_dir) as scanner:
+            log_files = [
+                entry for entry in scanner if entry.name.endswith('.log')
+            ]
+
+        for entry in log_files:
+            if not entry.is_file(follow_symlinks=False) or \
+                    entry.stat().st_size <= max_size:
+                continue
+
+            log_file = entry.path
+
+            try:
+                self._rotate_service_log(log_file, backup_count)
+            except Exception as error:
+                self.log.error(
+                    'Unable to rotate log {0}: {1}'.format(log_file, error)
+                )
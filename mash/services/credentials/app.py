@@ -24,6 +24,7 @@ from flask.logging import default_handler
 
 from mash.utils.mash_utils import setup_logfile, setup_rabbitmq_log_handler
 from mash.log.filter import BaseServiceFilter
+from mash.services.credentials.commands import store_cli
 from mash.services.credentials.datastore import CredentialsDatastore
 from mash.services.credentials.routes import credentials
 
@@ -33,7 +34,10 @@ def setup_app(app):
     app.credentials_datastore = CredentialsDatastore(
         app.config['CREDS_DIR'],
         app.config['ENC_KEYS_FILE'],
-        app.logger
+        app.logger,
+        cache_ttl=app.config['CREDENTIALS_CACHE_TTL'],
+        rotation_thread_count=app.config['KEY_ROTATION_THREAD_COUNT'],
+        store_type=app.config['CREDENTIALS_STORE']
     )
     atexit.register(app.credentials_datastore.shutdown)
 
@@ -45,6 +49,7 @@ def create_app(config_object):
     app = Flask('CredentialsService', static_url_path='/static')
     app.config.from_object(config_object)
     register_blueprints(app)
+    register_commands(app)
     configure_logger(app)
     setup_app(app)
     return app
@@ -73,3 +78,8 @@ def configure_logger(app):
 def register_blueprints(app):
     """Register Flask blueprints."""
     app.register_blueprint(credentials.blueprint)
+
+
+def register_commands(app):
+    """Register Click commands."""
+    app.cli.add_command(store_cli)
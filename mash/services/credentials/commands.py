@@ -0,0 +1,72 @@
+# Copyright (c) 2021 SUSE LLC.  All rights reserved.
+#
+# This file is part of mash.
+#
+# mash is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# mash is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with mash.  If not, see <http://www.gnu.org/licenses/>
+#
+
+import click
+
+from flask import current_app
+from flask.cli import AppGroup, with_appcontext
+from mash.services.credentials.store import (
+    credentials_stores,
+    get_credentials_store,
+    migrate_credentials
+)
+
+store_cli = AppGroup('store')
+
+
+@store_cli.command(name='migrate')
+@click.argument('target', type=click.Choice(sorted(credentials_stores)))
+@click.option(
+    '--source',
+    type=click.Choice(sorted(credentials_stores)),
+    default='file',
+    help='Store type to migrate the credentials from.'
+)
+@with_appcontext
+def migrate_store(target, source):
+    """
+    Copy the encrypted credentials from the source to the target store.
+
+    The source store is left unchanged. Set credentials_store in the
+    config file to the target store type after migration.
+    """
+    if target == source:
+        click.echo('Source and target store are the same.')
+        return
+
+    source_store = get_credentials_store(
+        source, current_app.config['CREDS_DIR']
+    )
+    target_store = get_credentials_store(
+        target, current_app.config['CREDS_DIR']
+    )
+
+    try:
+        count = migrate_credentials(source_store, target_store)
+    except Exception as error:
+        click.echo(
+            'Unable to migrate credentials: {error}'.format(error=error)
+        )
+    else:
+        click.echo(
+            'Migrated {count} credentials from {source} to {target} '
+            'store.'.format(count=count, source=source, target=target)
+        )
+    finally:
+        source_store.close()
+        target_store.close()
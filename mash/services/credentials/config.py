@@ -51,3 +51,56 @@ class CredentialsConfig(BaseConfig):
         )
         return credentials_directory if credentials_directory else \
             Defaults.get_credentials_dir()
+
+    def get_credentials_cache_ttl(self):
+        """
+        Return time (in seconds) decrypted credentials are cached.
+
+        credentials:
+          credentials_cache_ttl: 60
+
+        If no configuration exists the cache TTL from the Defaults
+        class is returned. A TTL of 0 disables the cache.
+
+        :rtype: int
+        """
+        cache_ttl = self._get_attribute(
+            attribute='credentials_cache_ttl', element='credentials'
+        )
+        return cache_ttl if cache_ttl is not None else \
+            Defaults.get_credentials_cache_ttl()
+
+    def get_key_rotation_thread_count(self):
+        """
+        Return the number of threads rotating credentials files.
+
+        credentials:
+          key_rotation_thread_count: 10
+
+        If no configuration exists the thread count from the Defaults
+        class is returned.
+
+        :rtype: int
+        """
+        thread_count = self._get_attribute(
+            attribute='key_rotation_thread_count', element='credentials'
+        )
+        return thread_count or Defaults.get_key_rotation_thread_count()
+
+    def get_credentials_store(self):
+        """
+        Return the type of the credentials store.
+
+        credentials:
+          credentials_store: file
+
+        Either file, one file per account, or sqlite. If no
+        configuration exists the store type from the Defaults
+        class is returned.
+
+        :rtype: string
+        """
+        store_type = self._get_attribute(
+            attribute='credentials_store', element='credentials'
+        )
+        return store_type or Defaults.get_credentials_store()
@@ -18,27 +18,50 @@
 
 import json
 import os
-import shutil
+import threading
+import time
 
 from apscheduler import events
 from apscheduler.schedulers.background import BackgroundScheduler
-from contextlib import suppress
 from cryptography.fernet import Fernet, MultiFernet
 from pytz import utc
+from tempfile import NamedTemporaryFile
 
 from mash.mash_exceptions import MashCredentialsDatastoreException
+from mash.services.credentials.store import get_credentials_store
 
 
 class CredentialsDatastore(object):
-    """Class for handling credentials files."""
+    """
+    Class for handling encrypted credentials.
+
+    Encrypted credentials are kept in a credentials store, by default
+    one file per account (see mash.services.credentials.store).
+
+    The parsed encryption keys are cached until the keys file changes.
+    Decrypted credentials are cached for cache_ttl seconds, an entry
+    is dropped if the stored credentials changed. Saving or deleting
+    credentials, removing a user and key rotation invalidate the cache.
+
+    An interrupted key rotation is resumed on start.
+    """
 
     def __init__(
         self, credentials_directory,
-        encryption_keys_file, log_callback
+        encryption_keys_file, log_callback, cache_ttl=60,
+        rotation_thread_count=10, store_type='file'
     ):
         self.credentials_directory = credentials_directory
         self.encryption_keys_file = encryption_keys_file
         self.log_callback = log_callback
+        self.cache_ttl = cache_ttl
+        self.rotation_thread_count = rotation_thread_count
+        self.store = get_credentials_store(store_type, credentials_directory)
+
+        self.fernet = None
+        self.keys_mtime = None
+        self.credentials_cache = {}
+        self.cache_lock = threading.Lock()
 
         if not os.path.exists(self.encryption_keys_file):
             self._create_encryption_keys_file()
@@ -58,6 +81,10 @@ class CredentialsDatastore(object):
             minute='0'
         )
 
+        if self.store.rotation_in_progress():
+            # Resume interrupted key rotation
+            self.scheduler.add_job(self._rotate_key)
+
     def save_credentials(
         self, cloud, account_name, requesting_user, credentials
     ):
@@ -71,24 +98,26 @@ class CredentialsDatastore(object):
         self._store_encrypted_credentials(
             account_name, credentials, cloud, requesting_user
         )
+        self._invalidate_cache(requesting_user, cloud, account_name)
 
     def _check_credentials_exist(self, account, cloud, user):
         """
-        Return True if the credentials file exists.
+        Return True if the credentials exist.
         """
-        path = self._get_credentials_file_path(account, cloud, user)
-        return os.path.exists(path)
+        return self.store.exists(user, cloud, account)
 
     def _clean_old_keys(self):
         """
         Purge old keys from encryption keys file.
 
+        The keys file is replaced atomically with the primary key.
         If there's an error send a message to log callback.
         """
         try:
-            with open(self.encryption_keys_file, 'r+') as f:
-                f.readline()
-                f.truncate(f.tell())
+            with open(self.encryption_keys_file, 'r') as f:
+                primary_key = f.readline().strip()
+
+            self._write_keys_file([primary_key])
         except Exception as error:
             self.log_callback.error(
                 'Unable to clean old keys from {0}: {1}.'.format(
@@ -106,6 +135,7 @@ class CredentialsDatastore(object):
 
     def delete_credentials(self, requesting_user, account_name, cloud):
         """Delete account for requesting user."""
+        self._invalidate_cache(requesting_user, cloud, account_name)
         self._remove_credentials_file(
             account_name, cloud, requesting_user
         )
@@ -116,10 +146,7 @@ class CredentialsDatastore(object):
 
         Returns: Encrypted and decoded string.
         """
-        encryption_keys = self._get_encryption_keys_from_file(
-            self.encryption_keys_file
-        )
-        fernet = MultiFernet(encryption_keys)
+        fernet = self._get_fernet()
 
         try:
             # Ensure creds string is encoded as bytes
@@ -133,10 +160,7 @@ class CredentialsDatastore(object):
         """
         Decrypt credentials string.
         """
-        encryption_keys = self._get_encryption_keys_from_file(
-            self.encryption_keys_file
-        )
-        fernet = MultiFernet(encryption_keys)
+        fernet = self._get_fernet()
 
         try:
             # Ensure string is encoded as bytes before decrypting.
@@ -152,32 +176,81 @@ class CredentialsDatastore(object):
         """
         return Fernet.generate_key().decode()
 
-    def _get_credentials_file_path(self, account, cloud, user):
+    def _get_cached_credentials(self, accounts, cloud, user):
         """
-        Return the string path to the credentials file.
+        Return dictionary of decrypted credentials from cache or store.
 
-        Based on user, cloud and account name.
+        Cache entries expire after the TTL or when the stored
+        credentials change, for example by another worker process.
+        Credentials missing in the cache are read in one batch.
         """
-        path = os.path.join(
-            self.credentials_directory, str(user), cloud, account
-        )
-        return path
+        if not self.cache_ttl:
+            tokens = self.store.read(user, cloud, accounts)
+            return {
+                account: json.loads(self._decrypt_credentials(token))
+                for account, (token, version) in tokens.items()
+            }
+
+        versions = self.store.get_versions(user, cloud, accounts)
+        now = time.monotonic()
+        credentials = {}
+        missing = []
+
+        with self.cache_lock:
+            for account in accounts:
+                entry = self.credentials_cache.get((str(user), cloud, account))
+
+                if entry and entry[0] > now and entry[1] == versions[account]:
+                    credentials[account] = entry[2]
+                else:
+                    missing.append(account)
+
+        if missing:
+            tokens = self.store.read(user, cloud, missing)
 
-    def _get_user_credentials_path(self, user):
+            for account, (token, version) in tokens.items():
+                credentials[account] = json.loads(
+                    self._decrypt_credentials(token)
+                )
+
+                with self.cache_lock:
+                    self.credentials_cache[(str(user), cloud, account)] = (
+                        now + self.cache_ttl, version, credentials[account]
+                    )
+
+        return {account: credentials[account] for account in accounts}
+
+    def _invalidate_cache(self, user=None, cloud=None, account=None):
         """
-        Return the string path to the user's credentials dir.
+        Remove cached credentials of the account, or all accounts of
+        the user, or all cached credentials.
         """
-        return os.path.join(self.credentials_directory, user)
+        with self.cache_lock:
+            if user is None:
+                self.credentials_cache.clear()
+            elif account is not None:
+                self.credentials_cache.pop((str(user), cloud, account), None)
+            else:
+                for key in list(self.credentials_cache):
+                    if key[0] == str(user):
+                        del self.credentials_cache[key]
 
-    def _get_decrypted_credentials(self, account, cloud, user):
+    def _get_fernet(self):
         """
-        Return decrypted credentials string from file.
+        Return MultiFernet of the encryption keys.
+
+        The keys file is parsed again if it has been modified.
         """
-        path = self._get_credentials_file_path(account, cloud, user)
-        with open(path, 'r') as credentials_file:
-            credentials = credentials_file.read()
+        mtime = os.stat(self.encryption_keys_file).st_mtime_ns
+
+        if self.fernet is None or mtime != self.keys_mtime:
+            encryption_keys = self._get_encryption_keys_from_file(
+                self.encryption_keys_file
+            )
+            self.fernet = MultiFernet(encryption_keys)
+            self.keys_mtime = mtime
 
-        return json.loads(self._decrypt_credentials(credentials.strip()))
+        return self.fernet
 
     def _get_encryption_keys_from_file(self, encryption_keys_file):
         """
@@ -217,10 +290,7 @@ class CredentialsDatastore(object):
             )
         )
 
-        path = self._get_credentials_file_path(account_name, cloud, user)
-
-        with suppress(Exception):
-            os.remove(path)
+        self.store.delete(user, cloud, account_name)
 
     def remove_user(self, user):
         """
@@ -230,23 +300,69 @@ class CredentialsDatastore(object):
             'Deleting credentials for user: {0}'.format(user)
         )
 
-        path = self._get_user_credentials_path(user)
-
-        with suppress(Exception):
-            shutil.rmtree(path)
+        self._invalidate_cache(user)
+        self.store.delete_user(user)
 
     def retrieve_credentials(self, cloud_accounts, cloud, requesting_user):
         """
         Retrieve the encrypted credentials strings for the requested accounts.
         """
-        credentials = {}
+        return self._get_cached_credentials(
+            cloud_accounts, cloud, requesting_user
+        )
 
-        for account in cloud_accounts:
-            credentials[account] = self._get_decrypted_credentials(
-                account, cloud, requesting_user
-            )
+    def retrieve_credentials_bulk(self, credentials_requests):
+        """
+        Retrieve credentials for multiple users and clouds.
+
+        Each request is a dictionary with cloud_accounts, cloud and
+        requesting_user. Returns a list with the result for each
+        request in order, either the credentials or an error message.
+        """
+        results = []
+
+        for request in credentials_requests:
+            try:
+                credentials = self.retrieve_credentials(
+                    request['cloud_accounts'],
+                    request['cloud'],
+                    request['requesting_user']
+                )
+            except Exception as error:
+                results.append({
+                    'msg': 'Unable to retrieve credentials: {0}'.format(error)
+                })
+            else:
+                results.append({'credentials': credentials})
+
+        return results
+
+    def _write_keys_file(self, keys):
+        """
+        Write the encryption keys file atomically.
+        """
+        with NamedTemporaryFile(
+            mode='w',
+            dir=os.path.dirname(self.encryption_keys_file) or '.',
+            prefix='.keys-',
+            delete=False
+        ) as temp_file:
+            temp_file.write('\n'.join(keys))
+            temp_file.flush()
+            os.fsync(temp_file.fileno())
 
-        return credentials
+        os.replace(temp_file.name, self.encryption_keys_file)
+
+    def _log_rotation_progress(self, count, total):
+        """
+        Log the key rotation progress about every 10 percent.
+        """
+        if count % max(total // 10, 100) == 0:
+            self.log_callback.info(
+                'Key rotation progress: {0} of {1} credentials.'.format(
+                    count, total
+                )
+            )
 
     def _rotate_key(self):
         """
@@ -254,6 +370,9 @@ class CredentialsDatastore(object):
 
         Will attempt to rotate credentials files to the new key . If
         any fail an exception is raised prior to return.
+
+        If the store has an interrupted rotation it is resumed with
+        the existing keys.
         """
         self.log_callback.info(
             'Starting key rotation with keys file {0} in directory {1}.'.format(
@@ -261,45 +380,42 @@ class CredentialsDatastore(object):
             )
         )
 
-        success = True
-
-        # Create new key
-        keys = [Fernet.generate_key().decode()]
-
-        # Write both keys to file, new key is first
-        with open(self.encryption_keys_file, 'r+') as f:
-            keys += [key.strip() for key in f.readlines()]
-            f.seek(0)
-            f.write('\n'.join(keys))
-
-        fernet_keys = [Fernet(key) for key in keys]
-        fernet = MultiFernet(fernet_keys)
-
-        # Rotate all credentials files
-        for root, dirs, files in os.walk(self.credentials_directory):
-            for credentials_file in files:
-                if credentials_file == 'wsgi.py':
-                    continue
-
-                path = os.path.join(root, credentials_file)
-                with open(path, 'r+b') as f:
-                    credentials = f.read().strip()
-
-                    try:
-                        credentials = fernet.rotate(credentials)
-                    except Exception as error:
-                        self.log_callback.error(
-                            'Failed key rotation on credential file {0}:'
-                            ' {1}: {2}'.format(
-                                path, type(error).__name__, error
-                            )
-                        )
-                        success = False
-                    else:
-                        f.seek(0)
-                        f.write(credentials)
-
-        if not success:
+        start = time.monotonic()
+
+        with open(self.encryption_keys_file, 'r') as f:
+            keys = [key.strip() for key in f.readlines() if key.strip()]
+
+        if self.store.rotation_in_progress():
+            self.log_callback.info('Resuming interrupted key rotation.')
+        else:
+            # Write both keys to file, new key is first
+            keys.insert(0, self._generate_encryption_key())
+            self._write_keys_file(keys)
+            self.store.start_rotation()
+
+        fernet = MultiFernet([Fernet(key) for key in keys])
+        total, failed = self.store.rotate(
+            fernet.rotate,
+            self.rotation_thread_count,
+            self._log_rotation_progress
+        )
+
+        self._invalidate_cache()
+
+        for name, error in failed:
+            self.log_callback.error(
+                'Failed key rotation on credential file {0}:'
+                ' {1}: {2}'.format(
+                    name, type(error).__name__, error
+                )
+            )
+
+        self.log_callback.info(
+            'Key rotation of {0} credentials took {1:.2f} seconds, '
+            '{2} failed.'.format(total, time.monotonic() - start, len(failed))
+        )
+
+        if failed:
             raise MashCredentialsDatastoreException(
                 'All credentials files have not been rotated.'
             )
@@ -308,13 +424,13 @@ class CredentialsDatastore(object):
         self, account, credentials, cloud, user
     ):
         """
-        Store the provided credentials encrypted on disk.
+        Store the provided credentials encrypted in the credentials store.
 
         Expected credentials as a json string.
 
         Example: {"access_key_id": "key123", "secret_access_key": "123456"}
 
-        Path is based on the user, cloud and account.
+        Credentials are stored by user, cloud and account.
         """
         self.log_callback.info(
             'Storing credentials for account: '
@@ -323,15 +439,8 @@ class CredentialsDatastore(object):
             )
         )
 
-        path = self._get_credentials_file_path(account, cloud, user)
-
-        credentials_dir = os.path.dirname(path)
-        if not os.path.isdir(credentials_dir):
-            os.makedirs(credentials_dir)
-
         try:
-            with open(path, 'w') as creds_file:
-                creds_file.write(credentials)
+            self.store.write(user, cloud, account, credentials)
         except Exception as error:
             self.log_callback.error(
                 'Unable to store credentials: {0}.'.format(error)
@@ -339,5 +448,6 @@ class CredentialsDatastore(object):
             raise
 
     def shutdown(self):
-        """Shutdown scheduler."""
+        """Shutdown scheduler and close the credentials store."""
         self.scheduler.shutdown()
+        self.store.close()
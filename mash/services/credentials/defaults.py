@@ -25,3 +25,15 @@ class Defaults(object):
     @classmethod
     def get_credentials_dir(self):
         return '/var/lib/mash/credentials/'
+
+    @classmethod
+    def get_credentials_cache_ttl(self):
+        return 60
+
+    @classmethod
+    def get_key_rotation_thread_count(self):
+        return 10
+
+    @classmethod
+    def get_credentials_store(self):
+        return 'file'
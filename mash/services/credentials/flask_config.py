@@ -49,6 +49,18 @@ class Config(object):
     def ENC_KEYS_FILE(self):
         return self.config.get_encryption_keys_file()
 
+    @property
+    def CREDENTIALS_CACHE_TTL(self):
+        return self.config.get_credentials_cache_ttl()
+
+    @property
+    def CREDENTIALS_STORE(self):
+        return self.config.get_credentials_store()
+
+    @property
+    def KEY_ROTATION_THREAD_COUNT(self):
+        return self.config.get_key_rotation_thread_count()
+
     @property
     def JOB_DIR(self):
         return self.config.get_job_directory(self.service_exchange)
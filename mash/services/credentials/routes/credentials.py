@@ -60,6 +60,22 @@ def get_credentials():
     return make_response(jsonify(credentials), 200)
 
 
+@blueprint.route('/bulk', methods=['GET'])
+def get_credentials_bulk():
+    data = json.loads(request.data.decode())
+
+    try:
+        results = current_app.credentials_datastore.retrieve_credentials_bulk(
+            data['requests']
+        )
+    except Exception as error:
+        msg = 'Unable to retrieve credentials: {0}'.format(error)
+        current_app.logger.warning(msg)
+        return make_response(jsonify({'msg': msg}), 400)
+
+    return make_response(jsonify(results), 200)
+
+
 @blueprint.route('/', methods=['DELETE'])
 def delete_credentials():
     data = json.loads(request.data.decode())
@@ -0,0 +1,667 @@
+# Copyright (c) 2021 SUSE LLC.  All rights reserved.
+#
+# This file is part of mash.
+#
+# mash is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# mash is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with mash.  If not, see <http://www.gnu.org/licenses/>
+#
+
+import os
+import shutil
+import sqlite3
+import threading
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from tempfile import NamedTemporaryFile
+
+from mash.mash_exceptions import MashCredentialsDatastoreException
+from mash.utils.mash_utils import remove_file
+
+ROTATION_TEMP_PREFIX = '.rotate-'
+WRITE_TEMP_PREFIX = '.write-'
+
+
+class BaseCredentialsStore(object):
+    """
+    Base class for storing encrypted credentials.
+
+    Credentials are stored as encrypted tokens per user, cloud and
+    account. Each token has a version that changes whenever the
+    token is written.
+    """
+    def __init__(self, credentials_directory):
+        self.credentials_directory = credentials_directory
+        self.post_init()
+
+    def post_init(self):
+        """
+        Post initialization method.
+
+        Implementation in child class.
+        """
+        pass
+
+    def _not_found(self, user, cloud, account):
+        return MashCredentialsDatastoreException(
+            'Credentials not found for account: '
+            '{0}, cloud: {1}, user: {2}.'.format(account, cloud, user)
+        )
+
+    def read(self, user, cloud, accounts):
+        """
+        Return dictionary of account to (token, version) tuples.
+
+        Raises an exception if the credentials of any account
+        do not exist.
+        """
+        raise NotImplementedError(
+            'This {0} class does not implement the read method.'.format(
+                self.__class__.__name__
+            )
+        )
+
+    def get_versions(self, user, cloud, accounts):
+        """
+        Return dictionary of account to token version.
+        """
+        raise NotImplementedError(
+            'This {0} class does not implement the get_versions '
+            'method.'.format(self.__class__.__name__)
+        )
+
+    def write(self, user, cloud, account, token):
+        """
+        Store the token, replace existing credentials.
+        """
+        raise NotImplementedError(
+            'This {0} class does not implement the write method.'.format(
+                self.__class__.__name__
+            )
+        )
+
+    def delete(self, user, cloud, account):
+        """
+        Delete the credentials if they exist.
+        """
+        raise NotImplementedError(
+            'This {0} class does not implement the delete method.'.format(
+                self.__class__.__name__
+            )
+        )
+
+    def delete_user(self, user):
+        """
+        Delete all credentials of the user.
+        """
+        raise NotImplementedError(
+            'This {0} class does not implement the delete_user '
+            'method.'.format(self.__class__.__name__)
+        )
+
+    def exists(self, user, cloud, account):
+        """
+        Return True if credentials exist for the account.
+        """
+        raise NotImplementedError(
+            'This {0} class does not implement the exists method.'.format(
+                self.__class__.__name__
+            )
+        )
+
+    def get_records(self):
+        """
+        Return list of (user, cloud, account, token) of all credentials.
+        """
+        raise NotImplementedError(
+            'This {0} class does not implement the get_records '
+            'method.'.format(self.__class__.__name__)
+        )
+
+    def import_records(self, records):
+        """
+        Store the (user, cloud, account, token) records.
+        """
+        for user, cloud, account, token in records:
+            self.write(user, cloud, account, token)
+
+    def rotation_in_progress(self):
+        """
+        Return True if an interrupted rotation has to be resumed.
+        """
+        return False
+
+    def start_rotation(self):
+        """
+        Mark the start of a key rotation.
+        """
+        pass
+
+    def rotate(self, rotate_token, thread_count, progress_callback=None):
+        """
+        Rotate all tokens with the rotate_token function.
+
+        Returns the total number of tokens and a list of
+        (name, error) tuples for tokens that failed to rotate.
+        """
+        raise NotImplementedError(
+            'This {0} class does not implement the rotate method.'.format(
+                self.__class__.__name__
+            )
+        )
+
+    def close(self):
+        """
+        Release resources of the store.
+        """
+        pass
+
+
+class FileCredentialsStore(BaseCredentialsStore):
+    """
+    Credentials store with one file per account.
+
+    Files are located at credentials_directory/<user>/<cloud>/<account>
+    and written to a temporary file and renamed. Rotated files are
+    appended to a rotation manifest, an interrupted rotation resumes
+    with the remaining files.
+    """
+    def post_init(self):
+        self.write_lock = threading.Lock()
+        self.manifest_file = os.path.join(
+            self.credentials_directory, '.rotation'
+        )
+
+    def get_path(self, user, cloud, account):
+        """
+        Return the path of the credentials file.
+        """
+        return os.path.join(
+            self.credentials_directory, str(user), cloud, account
+        )
+
+    def read(self, user, cloud, accounts):
+        """
+        Return dictionary of account to (token, mtime) tuples.
+        """
+        tokens = {}
+
+        for account in accounts:
+            try:
+                with open(self.get_path(user, cloud, account), 'r') as f:
+                    version = os.fstat(f.fileno()).st_mtime_ns
+                    tokens[account] = (f.read().strip(), version)
+            except FileNotFoundError:
+                raise self._not_found(user, cloud, account)
+
+        return tokens
+
+    def get_versions(self, user, cloud, accounts):
+        """
+        Return dictionary of account to credentials file mtime.
+        """
+        versions = {}
+
+        for account in accounts:
+            try:
+                versions[account] = os.stat(
+                    self.get_path(user, cloud, account)
+                ).st_mtime_ns
+            except FileNotFoundError:
+                raise self._not_found(user, cloud, account)
+
+        return versions
+
+    def write(self, user, cloud, account, token):
+        """
+        Write the credentials file atomically.
+        """
+        path = self.get_path(user, cloud, account)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.replace_file(path, token.encode(), prefix=WRITE_TEMP_PREFIX)
+
+    def delete(self, user, cloud, account):
+        """
+        Remove the credentials file.
+        """
+        with self.write_lock:
+            remove_file(self.get_path(user, cloud, account))
+
+    def delete_user(self, user):
+        """
+        Remove the credentials directory of the user.
+        """
+        shutil.rmtree(
+            os.path.join(self.credentials_directory, str(user)),
+            ignore_errors=True
+        )
+
+    def exists(self, user, cloud, account):
+        return os.path.exists(self.get_path(user, cloud, account))
+
+    def get_credentials_files(self):
+        """
+        Return the paths of all credentials files.
+
+        Temporary files left behind by an interrupted rotation are
+        removed. Temporary files of writes may belong to a write in
+        progress and are skipped.
+        """
+        paths = []
+
+        for root, dirs, files in os.walk(self.credentials_directory):
+            relative_path = os.path.relpath(root, self.credentials_directory)
+
+            if relative_path.count(os.sep) != 1:
+                # Only files in <user>/<cloud> are credentials files
+                continue
+
+            for credentials_file in files:
+                path = os.path.join(root, credentials_file)
+
+                if credentials_file.startswith(ROTATION_TEMP_PREFIX):
+                    remove_file(path)
+                elif not credentials_file.startswith(WRITE_TEMP_PREFIX):
+                    paths.append(path)
+
+        return sorted(paths)
+
+    def get_records(self):
+        records = []
+
+        for path in self.get_credentials_files():
+            user, cloud, account = os.path.relpath(
+                path, self.credentials_directory
+            ).split(os.sep)
+
+            with open(path, 'r') as f:
+                records.append((user, cloud, account, f.read().strip()))
+
+        return records
+
+    def replace_file(
+        self, path, data, mtime=None, prefix=ROTATION_TEMP_PREFIX
+    ):
+        """
+        Write data to a temporary file and rename it to path.
+
+        If mtime is provided the file is only replaced if it has
+        not been modified since. Returns True if the file was replaced.
+        """
+        with NamedTemporaryFile(
+            dir=os.path.dirname(path) or '.',
+            prefix=prefix,
+            delete=False
+        ) as temp_file:
+            temp_file.write(data)
+            temp_file.flush()
+            os.fsync(temp_file.fileno())
+
+        with self.write_lock:
+            try:
+                modified = mtime is not None and \
+                    os.stat(path).st_mtime_ns != mtime
+            except FileNotFoundError:
+                modified = True
+
+            if modified:
+                # Saved or deleted while rotating, nothing to rotate
+                remove_file(temp_file.name)
+                return False
+
+            os.replace(temp_file.name, path)
+
+        return True
+
+    def _rotate_file(self, path, rotate_token):
+        """
+        Rotate the credentials file.
+
+        Returns the error if rotation failed.
+        """
+        try:
+            mtime = os.stat(path).st_mtime_ns
+
+            with open(path, 'rb') as f:
+                token = f.read().strip()
+
+            self.replace_file(path, rotate_token(token), mtime)
+        except FileNotFoundError:
+            # Credentials deleted while rotating
+            pass
+        except Exception as error:
+            return error
+
+    def rotation_in_progress(self):
+        return os.path.exists(self.manifest_file)
+
+    def start_rotation(self):
+        os.makedirs(self.credentials_directory, exist_ok=True)
+        open(self.manifest_file, 'w').close()
+
+    def rotate(self, rotate_token, thread_count, progress_callback=None):
+        """
+        Rotate the credentials files in a thread pool.
+
+        Each rotated file is appended to the rotation manifest, the
+        manifest is removed when all files have been processed.
+        """
+        with open(self.manifest_file, 'r') as manifest:
+            rotated = {line.strip() for line in manifest if line.strip()}
+
+        paths = [
+            path for path in self.get_credentials_files()
+            if path not in rotated
+        ]
+        total = len(paths)
+        failed = []
+
+        with ThreadPoolExecutor(thread_count) as executor, \
+                open(self.manifest_file, 'a') as manifest:
+            results = executor.map(
+                self._rotate_file, paths, [rotate_token] * total
+            )
+
+            for count, (path, error) in enumerate(zip(paths, results), 1):
+                if error:
+                    failed.append((path, error))
+                else:
+                    manifest.write(path + '\n')
+                    manifest.flush()
+
+                if progress_callback:
+                    progress_callback(count, total)
+
+        remove_file(self.manifest_file)
+        return total, failed
+
+
+class SQLiteCredentialsStore(BaseCredentialsStore):
+    """
+    Credentials store in a single SQLite database in WAL mode.
+
+    Each row holds the encrypted token of one account, the primary
+    key indexes (user, cloud, account). Key rotation rewrites the rows
+    in primary key order in batches of rotation_batch_size, each batch
+    is committed with the key of its last row. Reads and writes run
+    between the batches and an interrupted rotation resumes after the
+    last committed batch.
+    """
+    rotation_batch_size = 100
+
+    def post_init(self):
+        self.lock = threading.Lock()
+        self.db_file = os.path.join(
+            self.credentials_directory, 'credentials.db'
+        )
+
+        try:
+            os.makedirs(self.credentials_directory, exist_ok=True)
+            self.connection = sqlite3.connect(
+                self.db_file,
+                check_same_thread=False,
+                isolation_level=None
+            )
+            self.connection.execute('PRAGMA journal_mode=WAL')
+            self.connection.execute(
+                'CREATE TABLE IF NOT EXISTS credentials ('
+                'user TEXT NOT NULL, '
+                'cloud TEXT NOT NULL, '
+                'account TEXT NOT NULL, '
+                'token TEXT NOT NULL, '
+                'version INTEGER NOT NULL, '
+                'PRIMARY KEY (user, cloud, account)'
+                ') WITHOUT ROWID'
+            )
+            self.connection.execute(
+                'CREATE TABLE IF NOT EXISTS rotation ('
+                'user TEXT NOT NULL, '
+                'cloud TEXT NOT NULL, '
+                'account TEXT NOT NULL'
+                ')'
+            )
+        except (OSError, sqlite3.Error) as error:
+            raise MashCredentialsDatastoreException(
+                'Unable to open credentials store {0}: {1}'.format(
+                    self.db_file, error
+                )
+            )
+
+    def _select(self, columns, user, cloud, accounts):
+        """
+        Return rows of the accounts in one query.
+        """
+        query = (
+            'SELECT account, {0} FROM credentials '
+            'WHERE user = ? AND cloud = ? AND account IN ({1})'
+        ).format(columns, ', '.join('?' * len(accounts)))
+
+        with self.lock:
+            rows = self.connection.execute(
+                query, [str(user), cloud] + list(accounts)
+            ).fetchall()
+
+        rows = {row[0]: row[1:] for row in rows}
+
+        for account in accounts:
+            if account not in rows:
+                raise self._not_found(user, cloud, account)
+
+        return rows
+
+    def read(self, user, cloud, accounts):
+        if not accounts:
+            return {}
+
+        return self._select('token, version', user, cloud, accounts)
+
+    def get_versions(self, user, cloud, accounts):
+        if not accounts:
+            return {}
+
+        rows = self._select('version', user, cloud, accounts)
+        return {account: row[0] for account, row in rows.items()}
+
+    def _upsert(self, user, cloud, account, token):
+        self.connection.execute(
+            'INSERT OR REPLACE INTO credentials '
+            '(user, cloud, account, token, version) VALUES (?, ?, ?, ?, ?)',
+            (str(user), cloud, account, token, time.time_ns())
+        )
+
+    def write(self, user, cloud, account, token):
+        with self.lock:
+            self._upsert(user, cloud, account, token)
+
+    def import_records(self, records):
+        """
+        Store all records in one transaction.
+        """
+        with self.lock:
+            self.connection.execute('BEGIN')
+            try:
+                for user, cloud, account, token in records:
+                    self._upsert(user, cloud, account, token)
+            except Exception:
+                self.connection.execute('ROLLBACK')
+                raise
+            self.connection.execute('COMMIT')
+
+    def delete(self, user, cloud, account):
+        with self.lock:
+            self.connection.execute(
+                'DELETE FROM credentials '
+                'WHERE user = ? AND cloud = ? AND account = ?',
+                (str(user), cloud, account)
+            )
+
+    def delete_user(self, user):
+        with self.lock:
+            self.connection.execute(
+                'DELETE FROM credentials WHERE user = ?', (str(user),)
+            )
+
+    def exists(self, user, cloud, account):
+        with self.lock:
+            row = self.connection.execute(
+                'SELECT 1 FROM credentials '
+                'WHERE user = ? AND cloud = ? AND account = ?',
+                (str(user), cloud, account)
+            ).fetchone()
+
+        return bool(row)
+
+    def get_records(self):
+        with self.lock:
+            return self.connection.execute(
+                'SELECT user, cloud, account, token FROM credentials'
+            ).fetchall()
+
+    def rotation_in_progress(self):
+        with self.lock:
+            row = self.connection.execute(
+                'SELECT 1 FROM rotation'
+            ).fetchone()
+
+        return bool(row)
+
+    def start_rotation(self):
+        with self.lock:
+            self.connection.execute('DELETE FROM rotation')
+            self.connection.execute(
+                "INSERT INTO rotation VALUES ('', '', '')"
+            )
+
+    def _get_last_rotated(self):
+        """
+        Return the key of the last rotated row, called with the lock held.
+        """
+        row = self.connection.execute(
+            'SELECT user, cloud, account FROM rotation'
+        ).fetchone()
+        return tuple(row or ('', '', ''))
+
+    def _get_rotation_batch(self):
+        """
+        Return the next batch of rows after the last rotated row.
+        """
+        with self.lock:
+            return self.connection.execute(
+                'SELECT user, cloud, account, token, version '
+                'FROM credentials WHERE (user, cloud, account) > (?, ?, ?) '
+                'ORDER BY user, cloud, account LIMIT ?',
+                self._get_last_rotated() + (self.rotation_batch_size,)
+            ).fetchall()
+
+    def rotate(self, rotate_token, thread_count, progress_callback=None):
+        """
+        Rotate the tokens in committed batches.
+
+        Tokens are rotated without holding the lock, a token written
+        meanwhile is encrypted with the new key already and is not
+        replaced. Tokens that fail to rotate are left unchanged.
+        """
+        failed = []
+        count = 0
+
+        with self.lock:
+            total = self.connection.execute(
+                'SELECT COUNT(*) FROM credentials '
+                'WHERE (user, cloud, account) > (?, ?, ?)',
+                self._get_last_rotated()
+            ).fetchone()[0]
+
+        version = time.time_ns()
+
+        while True:
+            rows = self._get_rotation_batch()
+
+            if not rows:
+                break
+
+            updates = []
+            for user, cloud, account, token, old_version in rows:
+                try:
+                    token = rotate_token(token.encode()).decode()
+                except Exception as error:
+                    failed.append((os.path.join(user, cloud, account), error))
+                else:
+                    updates.append(
+                        (token, version, user, cloud, account, old_version)
+                    )
+
+            with self.lock:
+                self.connection.execute('BEGIN IMMEDIATE')
+
+                try:
+                    self.connection.executemany(
+                        'UPDATE credentials SET token = ?, version = ? '
+                        'WHERE user = ? AND cloud = ? AND account = ? '
+                        'AND version = ?',
+                        updates
+                    )
+                    self.connection.execute('DELETE FROM rotation')
+                    self.connection.execute(
+                        'INSERT INTO rotation VALUES (?, ?, ?)',
+                        rows[-1][:3]
+                    )
+                except Exception:
+                    self.connection.execute('ROLLBACK')
+                    raise
+
+                self.connection.execute('COMMIT')
+
+            count += len(rows)
+            if progress_callback:
+                progress_callback(min(count, total), total)
+
+        with self.lock:
+            self.connection.execute('DELETE FROM rotation')
+
+        return total, failed
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+
+credentials_stores = {
+    'file': FileCredentialsStore,
+    'sqlite': SQLiteCredentialsStore
+}
+
+
+def get_credentials_store(store_type, credentials_directory):
+    """
+    Return instance of the credentials store type.
+    """
+    try:
+        store_class = credentials_stores[store_type]
+    except KeyError:
+        raise MashCredentialsDatastoreException(
+            'Credentials store type {0} is not supported.'.format(store_type)
+        )
+
+    return store_class(credentials_directory)
+
+
+def migrate_credentials(source, target):
+    """
+    Copy all encrypted credentials from the source to the target store.
+
+    Tokens are copied as is, no decryption is required. Returns the
+    number of migrated credentials.
+    """
+    records = source.get_records()
+    target.import_records(records)
+    return len(records)
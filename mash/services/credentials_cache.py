@@ -0,0 +1,207 @@
+# Copyright (c) 2021 SUSE LLC.  All rights reserved.
+#
+# This file is part of mash.
+#
+# mash is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# mash is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with mash.  If not, see <http://www.gnu.org/licenses/>
+#
+
+import asyncio
+import copy
+import os
+import threading
+import time
+
+from concurrent.futures import Future
+
+from mash.services.base_defaults import Defaults
+
+# Error messages of the cloud frameworks when credentials are rejected.
+AUTHENTICATION_ERRORS = (
+    'authfailure',
+    'authenticationfailed',
+    'authorizationfailed',
+    'expiredtoken',
+    'invalidaccesskeyid',
+    'invalid_client',
+    'invalid_grant',
+    'invalidclienttokenid',
+    'notauthorizedornotfound',
+    'signaturedoesnotmatch',
+    'unauthorized'
+)
+
+
+def is_authentication_error(error):
+    """
+    Return True if the error message indicates rejected credentials.
+    """
+    message = str(error).lower()
+    return any(marker in message for marker in AUTHENTICATION_ERRORS)
+
+
+class CredentialsCache(object):
+    """
+    Process wide in memory cache of job credentials.
+
+    Credentials are cached per requesting user, cloud and account for
+    ttl seconds. Concurrent requests for the same credentials share a
+    single request to the credentials service. Every caller gets its
+    own deep copy of the credentials, a job modifying its credentials
+    does not change them for other jobs.
+    """
+    def __init__(self, ttl=None):
+        self.ttl = Defaults.get_job_credentials_cache_ttl() \
+            if ttl is None else ttl
+        self.reset()
+
+    def reset(self):
+        """
+        Reset lock and cached credentials, used in forked processes.
+        """
+        self.lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        """
+        Remove all cached and in flight credentials.
+        """
+        self.entries = {}
+        self.in_flight = {}
+
+    def _get(self, user, cloud, accounts):
+        """
+        Return the cached credentials or None if any account is missing.
+        """
+        now = time.monotonic()
+        credentials = {}
+
+        for account in accounts:
+            entry = self.entries.get((user, cloud, account))
+
+            if not entry or entry[0] <= now:
+                return None
+
+            credentials[account] = entry[1]
+
+        return credentials
+
+    def _set(self, user, cloud, credentials):
+        """
+        Cache the credentials for the accounts in the response.
+        """
+        if self.ttl <= 0:
+            return
+
+        expires = time.monotonic() + self.ttl
+        for account, credential in credentials.items():
+            self.entries[(user, cloud, account)] = (expires, credential)
+
+    def _start_request(self, user, cloud, accounts):
+        """
+        Return cached credentials or the future of the request.
+
+        The second item is True if the caller has to send the request
+        and set the result of the future.
+        """
+        key = (user, cloud, tuple(sorted(accounts)))
+
+        with self.lock:
+            credentials = self._get(user, cloud, accounts)
+            if credentials is not None:
+                return credentials, False
+
+            future = self.in_flight.get(key)
+            if future:
+                return future, False
+
+            future = self.in_flight[key] = Future()
+            return future, True
+
+    def _finish_request(self, user, cloud, accounts, future, result):
+        """
+        Publish the credentials or the request error to waiting jobs.
+        """
+        key = (user, cloud, tuple(sorted(accounts)))
+
+        with self.lock:
+            if self.in_flight.get(key) is future:
+                del self.in_flight[key]
+
+            if not isinstance(result, Exception):
+                self._set(user, cloud, result)
+
+        if isinstance(result, Exception):
+            future.set_exception(result)
+        else:
+            future.set_result(result)
+
+    def get_credentials(self, user, cloud, accounts, request):
+        """
+        Return credentials for the accounts.
+
+        Request is called without arguments to retrieve the credentials
+        if they are not cached and not already requested.
+        """
+        result, leader = self._start_request(user, cloud, accounts)
+
+        if not isinstance(result, Future):
+            return copy.deepcopy(result)
+
+        if leader:
+            try:
+                credentials = request()
+            except Exception as error:
+                credentials = error
+
+            self._finish_request(user, cloud, accounts, result, credentials)
+
+        return copy.deepcopy(result.result())
+
+    async def get_credentials_async(self, user, cloud, accounts, request):
+        """
+        Return credentials for the accounts in the event loop.
+
+        Request is a coroutine function to retrieve the credentials.
+        """
+        result, leader = self._start_request(user, cloud, accounts)
+
+        if not isinstance(result, Future):
+            return copy.deepcopy(result)
+
+        if leader:
+            try:
+                credentials = await request()
+            except Exception as error:
+                credentials = error
+
+            self._finish_request(user, cloud, accounts, result, credentials)
+
+        return copy.deepcopy(await asyncio.wrap_future(result))
+
+    def invalidate(self, user, cloud=None):
+        """
+        Remove the cached credentials of the user.
+        """
+        with self.lock:
+            for key in list(self.entries):
+                if key[0] == user and cloud in (None, key[1]):
+                    del self.entries[key]
+
+
+credentials_cache = CredentialsCache()
+
+# Forked job processes must not inherit cache state or a held lock.
+# Python 3.6 has no fork hooks, worker processes are spawned there.
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=credentials_cache.reset)
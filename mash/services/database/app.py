@@ -26,7 +26,7 @@ from mash.log.filter import BaseServiceFilter
 from mash.services.database.routes import jobs, tokens, users
 from mash.services.database.routes.accounts import aliyun, azure, ec2, gce, oci
 from mash.services.database.extensions import db, migrate
-from mash.services.database.commands import tokens_cli
+from mash.services.database.commands import status_cli, tokens_cli
 
 
 def register_extensions(app):
@@ -83,3 +83,4 @@ def register_blueprints(app):
 def register_commands(app):
     """Register Click commands."""
     app.cli.add_command(tokens_cli)
+    app.cli.add_command(status_cli)
@@ -18,10 +18,13 @@
 
 import click
 
+from flask import current_app
 from flask.cli import AppGroup, with_appcontext
+from mash.services.database.status_consumer import JobStatusConsumer
 from mash.services.database.utils.tokens import prune_expired_tokens
 
 tokens_cli = AppGroup('tokens')
+status_cli = AppGroup('status')
 
 
 @tokens_cli.command(name='cleanup')
@@ -41,3 +44,24 @@ def cleanup_tokens():
                 rows_deleted=rows_deleted
             )
         )
+
+
+@status_cli.command(name='consume')
+@with_appcontext
+def consume_status():
+    if not current_app.config['DATABASE_STATUS_CONSUMER']:
+        click.echo('The database status consumer is not enabled.')
+        return
+
+    consumer = JobStatusConsumer(
+        current_app.config['AMQP_HOST'],
+        current_app.config['AMQP_USER'],
+        current_app.config['AMQP_PASS'],
+        current_app.config['SERVICE_NAMES'],
+        current_app.logger
+    )
+
+    try:
+        consumer.run()
+    except KeyboardInterrupt:
+        pass
@@ -52,3 +52,11 @@ class Config(object):
     @property
     def CREDENTIALS_URL(self):
         return self.config.get_credentials_url()
+
+    @property
+    def SERVICE_NAMES(self):
+        return self.config.get_service_names()
+
+    @property
+    def DATABASE_STATUS_CONSUMER(self):
+        return self.config.get_database_status_consumer()
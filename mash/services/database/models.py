@@ -17,6 +17,7 @@
 #
 
 import json
+import math
 
 from datetime import datetime
 from werkzeug.security import generate_password_hash, check_password_hash
@@ -238,7 +239,8 @@ class AliyunAccount(db.Model):
 class Job(db.Model):
     __tablename__ = 'job'
     id = db.Column(db.Integer, primary_key=True)
-    job_id = db.Column(db.String(40), nullable=False)
+    job_id = db.Column(db.String(40), nullable=False, index=True)
+    cloud = db.Column(db.String(16))
     last_service = db.Column(db.String(16), nullable=False)
     current_service = db.Column(db.String(16))
     prev_service = db.Column(db.String(16))
@@ -256,6 +258,12 @@ class Job(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     user = db.relationship('User', back_populates='jobs')
 
+    __table_args__ = (
+        db.Index('ix_job_user_state', 'user_id', 'state'),
+        db.Index('ix_job_user_current_service', 'user_id', 'current_service'),
+        db.Index('ix_job_user_start_time', 'user_id', 'start_time'),
+    )
+
     @property
     def data(self):
         return json.loads(self._data) if self._data else None
@@ -274,3 +282,148 @@ class Job(db.Model):
 
     def __repr__(self):
         return '<Job {}>'.format(self.job_id)
+
+
+class JobStatusUpdate(db.Model):
+    """
+    Status update of a job by a service.
+
+    Recorded when the status is saved, redelivered status messages
+    for the same job and service are skipped.
+    """
+    __tablename__ = 'job_status_update'
+    id = db.Column(db.Integer, primary_key=True)
+    job_id = db.Column(db.String(40), nullable=False)
+    service = db.Column(db.String(16), nullable=False)
+    status = db.Column(db.String(12))
+    created = db.Column(db.DateTime, default=datetime.utcnow)
+    queued_at = db.Column(db.DateTime)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    duration = db.Column(db.Float)
+
+    __table_args__ = (
+        db.UniqueConstraint(
+            'job_id', 'service', name='_job_status_update_service_uc'
+        ),
+    )
+
+    def __repr__(self):
+        return '<Job Status Update {0} {1}>'.format(self.job_id, self.service)
+
+
+class JobStageStats(db.Model):
+    """
+    Daily duration statistics of a service stage by cloud.
+
+    Updated with each recorded stage duration. Durations are counted
+    in a histogram with buckets growing by a factor of 2 ** (1 / 4),
+    percentiles are estimated from the histogram.
+    """
+    __tablename__ = 'job_stage_stats'
+    buckets_per_doubling = 4
+
+    id = db.Column(db.Integer, primary_key=True)
+    cloud = db.Column(db.String(16), nullable=False)
+    service = db.Column(db.String(16), nullable=False)
+    day = db.Column(db.Date, nullable=False)
+    count = db.Column(db.Integer, default=0, nullable=False)
+    failed = db.Column(db.Integer, default=0, nullable=False)
+    total = db.Column(db.Float, default=0, nullable=False)
+    minimum = db.Column(db.Float)
+    maximum = db.Column(db.Float)
+    _histogram = db.Column('histogram', db.Text)
+
+    __table_args__ = (
+        db.UniqueConstraint(
+            'cloud', 'service', 'day', name='_job_stage_stats_day_uc'
+        ),
+    )
+
+    @property
+    def histogram(self):
+        """
+        Return dictionary of duration counts by bucket.
+        """
+        if not self._histogram:
+            return {}
+
+        return {
+            int(bucket): count
+            for bucket, count in json.loads(self._histogram).items()
+        }
+
+    @histogram.setter
+    def histogram(self, value):
+        self._histogram = json.dumps(value)
+
+    def get_bucket(self, duration):
+        """
+        Return the histogram bucket of the duration in seconds.
+        """
+        if duration <= 1:
+            return 0
+
+        return math.ceil(math.log2(duration) * self.buckets_per_doubling)
+
+    def add_duration(self, duration, failed=False):
+        """
+        Add the duration in seconds of a stage run.
+        """
+        self.count = (self.count or 0) + 1
+        self.failed = (self.failed or 0) + int(failed)
+        self.total = (self.total or 0) + duration
+
+        if self.minimum is None or duration < self.minimum:
+            self.minimum = duration
+
+        if self.maximum is None or duration > self.maximum:
+            self.maximum = duration
+
+        histogram = self.histogram
+        bucket = self.get_bucket(duration)
+        histogram[bucket] = histogram.get(bucket, 0) + 1
+        self.histogram = histogram
+
+    def percentile(self, percent):
+        """
+        Return estimated duration percentile from the histogram.
+
+        The upper limit of the bucket containing the percentile is
+        returned, capped by the maximum duration.
+        """
+        if not self.count:
+            return None
+
+        rank = self.count * percent / 100
+        seen = 0
+
+        for bucket, count in sorted(self.histogram.items()):
+            seen += count
+
+            if seen >= rank:
+                limit = 2 ** (bucket / self.buckets_per_doubling)
+                return min(limit, self.maximum)
+
+        return self.maximum
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+    @property
+    def p50(self):
+        return self.percentile(50)
+
+    @property
+    def p90(self):
+        return self.percentile(90)
+
+    @property
+    def p99(self):
+        return self.percentile(99)
+
+    def __repr__(self):
+        return '<Job Stage Stats {0} {1} {2}>'.format(
+            self.cloud, self.service, self.day
+        )
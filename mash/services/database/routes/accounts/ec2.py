@@ -26,6 +26,7 @@ from mash.services.database.utils.accounts.ec2 import (
     create_new_ec2_account,
     get_ec2_accounts,
     get_ec2_account_for_user,
+    get_ec2_accounts_by_name,
     delete_ec2_account_for_user,
     update_ec2_account_for_user,
     get_accounts_in_ec2_group
@@ -128,6 +129,29 @@ def get_accounts_in_group():
     return make_response(jsonify(accounts), 200)
 
 
+@blueprint.route('/bulk', methods=['GET'])
+def get_ec2_accounts_bulk():
+    data = json.loads(request.data.decode())
+
+    try:
+        accounts, groups = get_ec2_accounts_by_name(
+            data.get('names', []),
+            data.get('group_names', []),
+            data['user_id']
+        )
+    except Exception as error:
+        return make_response(jsonify({'msg': str(error)}), 404)
+
+    accounts = {
+        name: marshal(account, ec2_account_response, skip_none=True)
+        for name, account in accounts.items()
+    }
+    return make_response(
+        jsonify({'accounts': accounts, 'groups': groups}),
+        200
+    )
+
+
 @blueprint.route('/list/<string:user>', methods=['GET'])
 def get_ec2_account_list(user):
     accounts = get_ec2_accounts(user)
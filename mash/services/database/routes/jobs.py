@@ -18,25 +18,71 @@
 
 import json
 
+from datetime import timezone
+
+from dateutil import parser
 from flask import Blueprint, current_app, jsonify, request, make_response
 from flask_restx import marshal, fields, Model
 
 from mash.services.database.utils.jobs import (
     save_job_status,
+    save_job_statuses,
     get_job_by_user,
     get_jobs,
+    get_job_summary,
+    get_job_status_updates,
+    get_stage_stats,
     delete_job_for_user,
-    create_new_job
+    create_new_job,
+    create_new_jobs
 )
 
 blueprint = Blueprint('jobs', __name__, url_prefix='/jobs')
 
+job_filters = (
+    'state',
+    'cloud',
+    'current_service',
+    'failed_service',
+    'image',
+    'since',
+    'until'
+)
+
 job_data = Model(
     'job_data', {
         '*': fields.Wildcard(fields.String)
     }
 )
 
+status_update_response = Model(
+    'status_update_response', {
+        'version': fields.Integer(attribute='id', example=1),
+        'job_id': fields.String(
+            example='12345678-1234-1234-1234-123456789012'
+        ),
+        'service': fields.String(example='upload'),
+        'status': fields.String(example='success'),
+        'created': fields.DateTime()
+    }
+)
+
+stage_stats_response = Model(
+    'stage_stats_response', {
+        'cloud': fields.String(example='ec2'),
+        'service': fields.String(example='upload'),
+        'day': fields.Date(),
+        'count': fields.Integer(example=10),
+        'failed': fields.Integer(example=1),
+        'mean': fields.Float(example=310.5),
+        'minimum': fields.Float(example=120.2),
+        'maximum': fields.Float(example=840.9),
+        'p50': fields.Float(example=304.4),
+        'p90': fields.Float(example=724.1),
+        'p99': fields.Float(example=840.9)
+    }
+)
+
 job_response = Model(
     'job_response', {
         'job_id': fields.String(
@@ -51,6 +97,7 @@ job_response = Model(
         'download_url': fields.String(
             example='http://download.opensuse.org/repositories/Cloud:Tools/images'
         ),
+        'cloud': fields.String(example='ec2'),
         'cloud_architecture': fields.String(example='x86_64'),
         'profile': fields.String(example='Server'),
         'state': fields.String(example='success'),
@@ -76,6 +123,32 @@ def update_job_status():
     return make_response(jsonify({'msg': 'Job status updated'}), 200)
 
 
+@blueprint.route('/batch', methods=['PUT'])
+def update_job_statuses():
+    data = json.loads(request.data.decode())
+
+    try:
+        failed = save_job_statuses(data)
+    except Exception as error:
+        msg = 'Unable to update job statuses: {0}'.format(error)
+        current_app.logger.warning(msg)
+        return make_response(jsonify({'msg': msg}), 400)
+
+    for failure in failed:
+        current_app.logger.warning(
+            'Unable to update status of job {id}: {msg}'.format(**failure)
+        )
+
+    return make_response(
+        jsonify({
+            'msg': 'Job statuses updated',
+            'updated': len(data) - len(failed),
+            'failed': failed
+        }),
+        200
+    )
+
+
 @blueprint.route('/', methods=['POST'])
 def create_job():
     data = json.loads(request.data.decode())
@@ -93,6 +166,23 @@ def create_job():
     )
 
 
+@blueprint.route('/batch', methods=['POST'])
+def create_jobs():
+    data = json.loads(request.data.decode())
+
+    try:
+        jobs = create_new_jobs(data['jobs'])
+    except Exception as error:
+        msg = 'Unable to create jobs: {0}'.format(error)
+        current_app.logger.warning(msg)
+        return make_response(jsonify({'msg': msg}), 400)
+
+    return make_response(
+        jsonify([marshal(job, job_response, skip_none=True) for job in jobs]),
+        200
+    )
+
+
 @blueprint.route('/', methods=['GET'])
 def get_job():
     data = json.loads(request.data.decode())
@@ -116,13 +206,44 @@ def get_job():
     )
 
 
+def get_job_filters(data):
+    """
+    Return the job filters of the request data.
+
+    Since and until are parsed as datetimes in UTC.
+    """
+    filters = {}
+
+    for name in job_filters:
+        if data.get(name):
+            filters[name] = data[name]
+
+    for name in ('since', 'until'):
+        if name in filters:
+            value = parser.parse(filters[name])
+
+            if value.tzinfo:
+                value = value.astimezone(timezone.utc).replace(tzinfo=None)
+
+            filters[name] = value
+
+    return filters
+
+
 @blueprint.route('/list/<string:user>', methods=['GET'])
 def get_job_list(user):
     data = json.loads(request.data.decode())
     page = data.get('page')
     per_page = data.get('per_page')
 
-    kwargs = {}
+    try:
+        kwargs = get_job_filters(data)
+    except ValueError as error:
+        return make_response(
+            jsonify({'msg': 'Invalid job filter: {0}'.format(error)}),
+            400
+        )
+
     if page:
         kwargs['page'] = page
 
@@ -134,6 +255,73 @@ def get_job_list(user):
     return make_response(jsonify(jobs), 200)
 
 
+@blueprint.route('/summary/<string:user>', methods=['GET'])
+def get_summary(user):
+    data = json.loads(request.data.decode())
+
+    try:
+        filters = get_job_filters(data)
+    except ValueError as error:
+        return make_response(
+            jsonify({'msg': 'Invalid job filter: {0}'.format(error)}),
+            400
+        )
+
+    return make_response(jsonify(get_job_summary(user, **filters)), 200)
+
+
+@blueprint.route('/stage_stats', methods=['GET'])
+def get_stage_stats_list():
+    data = json.loads(request.data.decode())
+    kwargs = {}
+
+    for name in ('cloud', 'service'):
+        if data.get(name):
+            kwargs[name] = data[name]
+
+    try:
+        for name in ('since', 'until'):
+            if data.get(name):
+                kwargs[name] = parser.parse(data[name]).date()
+    except ValueError as error:
+        return make_response(
+            jsonify({'msg': 'Invalid day: {0}'.format(error)}),
+            400
+        )
+
+    stats = get_stage_stats(**kwargs)
+    return make_response(
+        jsonify([marshal(stat, stage_stats_response) for stat in stats]),
+        200
+    )
+
+
+@blueprint.route('/status_updates/<string:user>', methods=['GET'])
+def get_status_updates(user):
+    data = json.loads(request.data.decode())
+    since_version = data.get('since_version') or 0
+
+    kwargs = {'since_version': since_version}
+    if data.get('job_id'):
+        kwargs['job_id'] = data['job_id']
+
+    if data.get('limit'):
+        kwargs['limit'] = min(data['limit'], 500)
+
+    updates = get_job_status_updates(user, **kwargs)
+
+    return make_response(
+        jsonify({
+            'updates': [
+                marshal(update, status_update_response)
+                for update in updates
+            ],
+            'version': updates[-1].id if updates else since_version
+        }),
+        200
+    )
+
+
 @blueprint.route('/', methods=['DELETE'])
 def delete_job():
     data = json.loads(request.data.decode())
@@ -0,0 +1,261 @@
+# Copyright (c) 2021 SUSE LLC.  All rights reserved.
+#
+# This file is part of mash.
+#
+# mash is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# mash is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with mash.  If not, see <http://www.gnu.org/licenses/>
+#
+
+import time
+
+from numbers import Number
+
+from amqpstorm import Connection
+from sqlalchemy.exc import OperationalError
+
+from mash.services.database.utils.jobs import save_job_statuses, stage_times
+from mash.utils.codec import decode_message
+
+
+class JobStatusConsumer(object):
+    """
+    Consumes job status messages of the services and saves the
+    status in batched transactions.
+
+    A queue is bound for each service to the listener message key
+    of the service exchange. The job creator service receives the
+    same messages on its own status queues. Messages are acked once
+    the batch is committed. A batch that keeps failing is saved one
+    job status at a time and the updates that cannot be saved are
+    dropped.
+
+    Must run in a Flask app context.
+    """
+    batch_size = 100
+    flush_interval = 1
+    max_backoff = 60
+    max_retries = 5
+    prefetch_count = 500
+    queue_name = 'database_status'
+
+    def __init__(self, host, user, password, services, log):
+        self.host = host
+        self.user = user
+        self.password = password
+        self.services = services
+        self.log = log
+
+        self.connection = None
+        self.channel = None
+        self.job_docs = []
+        self.pending_tag = None
+        self.backoff = 0
+        self.retries = 0
+        self.flush_time = time.monotonic() + self.flush_interval
+
+    def _get_next_service(self, service):
+        """
+        Return the next service based on the service name.
+        """
+        index = self.services.index(service)
+
+        if index >= len(self.services) - 1:
+            return None
+
+        return self.services[index + 1]
+
+    @staticmethod
+    def _get_job_status_error(job_status):
+        """
+        Return the reason the job status cannot be saved, if any.
+        """
+        if not isinstance(job_status, dict):
+            return 'job status is not an object'
+
+        for key in ('id', 'status'):
+            if not isinstance(job_status.get(key), str):
+                return '{0} is missing or not a string'.format(key)
+
+        for key in stage_times:
+            value = job_status.get(key)
+
+            if value is not None and (
+                isinstance(value, bool) or not isinstance(value, Number)
+            ):
+                return '{0} is not a timestamp'.format(key)
+
+        return None
+
+    def _handle_status_message(self, message):
+        """
+        Buffer the job status of a listener message.
+        """
+        properties = message.properties or {}
+
+        try:
+            job_doc = decode_message(
+                message.body,
+                properties.get('content_type'),
+                properties.get('content_encoding')
+            )
+        except Exception as error:
+            self.log.error('Invalid message received: {0}.'.format(error))
+            message.ack()
+            return
+
+        if not isinstance(job_doc, dict):
+            self.log.error('Invalid message received: not an object.')
+            message.ack()
+            return
+
+        for key, value in job_doc.items():
+            service = key.rsplit('_', maxsplit=1)[0]
+
+            if service not in self.services:
+                self.log.warning(
+                    'Unkown service message received for {0} service.'.format(
+                        service
+                    )
+                )
+                continue
+
+            error = self._get_job_status_error(value)
+
+            if error:
+                self.log.error(
+                    'Invalid {0} status received: {1}.'.format(service, error)
+                )
+                continue
+
+            value['current_service'] = self._get_next_service(service)
+            value['prev_service'] = service
+            value.pop('last_service', None)
+            value.pop('notification_email', None)
+            self.job_docs.append(value)
+
+        self.pending_tag = message.delivery_tag
+
+        if len(self.job_docs) >= self.batch_size and not self.backoff:
+            self._flush_job_status()
+
+    def _save_job_statuses(self):
+        """
+        Save the buffered job status and return the failed updates.
+
+        After max_retries failed transactions the job status updates
+        are saved one at a time. An update that still fails is
+        returned as failed and dropped. Operational errors, for
+        example a lost database connection, are raised without limit
+        as they do not depend on the batch.
+        """
+        try:
+            return save_job_statuses(self.job_docs)
+        except OperationalError:
+            raise
+        except Exception as error:
+            self.retries += 1
+
+            if self.retries < self.max_retries:
+                raise
+
+            self.log.error(
+                'Job status update failed {0} times, saving each job '
+                'status: {1}'.format(self.retries, error)
+            )
+
+        failed = []
+        for job_doc in self.job_docs:
+            try:
+                failed.extend(save_job_statuses([job_doc]))
+            except OperationalError:
+                raise
+            except Exception as error:
+                failed.append({'id': job_doc['id'], 'msg': str(error)})
+
+        return failed
+
+    def _flush_job_status(self):
+        """
+        Save the buffered job status and ack all pending messages.
+
+        If the transaction fails the batch is retried with
+        exponential backoff.
+        """
+        if self.job_docs:
+            try:
+                failed = self._save_job_statuses()
+            except Exception as error:
+                self.backoff = min(max(self.backoff * 2, 1), self.max_backoff)
+                self.flush_time = time.monotonic() + self.backoff
+                self.log.error(
+                    'Job status update failed, retrying in {0} seconds: '
+                    '{1}'.format(self.backoff, error)
+                )
+                return
+
+            for failure in failed:
+                self.log.warning(
+                    'Unable to update status of job {id}: {msg}'.format(
+                        **failure
+                    )
+                )
+
+        if self.pending_tag is not None:
+            self.channel.basic.ack(
+                delivery_tag=self.pending_tag, multiple=True
+            )
+
+        self.job_docs = []
+        self.pending_tag = None
+        self.backoff = 0
+        self.retries = 0
+        self.flush_time = time.monotonic() + self.flush_interval
+
+    def _bind_queues(self):
+        """
+        Bind and consume a status queue for each service.
+        """
+        for service in self.services:
+            queue = '{0}.{1}'.format(service, self.queue_name)
+
+            self.channel.exchange.declare(
+                exchange=service, exchange_type='direct', durable=True
+            )
+            self.channel.queue.declare(queue=queue, durable=True)
+            self.channel.queue.bind(
+                exchange=service, queue=queue, routing_key='listener_msg'
+            )
+            self.channel.basic.consume(
+                callback=self._handle_status_message, queue=queue
+            )
+
+    def run(self):
+        """
+        Consume status messages until interrupted.
+        """
+        self.connection = Connection(self.host, self.user, self.password)
+        self.channel = self.connection.channel()
+        self.channel.basic.qos(prefetch_count=self.prefetch_count)
+        self._bind_queues()
+
+        try:
+            while not self.channel.is_closed and self.channel.consumer_tags:
+                self.channel.process_data_events()
+
+                if time.monotonic() >= self.flush_time:
+                    self._flush_job_status()
+        finally:
+            if not self.channel.is_closed:
+                self._flush_job_status()
+
+            self.connection.close()
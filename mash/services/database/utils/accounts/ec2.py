@@ -17,6 +17,7 @@
 #
 
 from flask import current_app
+from sqlalchemy.orm import joinedload, selectinload
 from sqlalchemy.orm.exc import NoResultFound
 
 from mash.services.database.extensions import db
@@ -41,6 +42,59 @@ def get_accounts_in_ec2_group(name, user_id):
     return accounts
 
 
+def get_ec2_accounts_by_name(names, group_names, user_id):
+    """
+    Retrieve EC2 accounts and groups with their accounts for user.
+
+    Accounts are loaded with their additional regions and group
+    in a fixed number of queries. Returns a dictionary of accounts
+    by name and a dictionary of account names by group name.
+
+    If an account or group does not exist raise exception.
+    """
+    account_options = (
+        selectinload(EC2Account.additional_regions),
+        joinedload(EC2Account.group)
+    )
+    accounts = {}
+    groups = {}
+
+    if names:
+        query = EC2Account.query.options(*account_options).filter(
+            EC2Account.user_id == user_id,
+            EC2Account.name.in_(names)
+        )
+        accounts = {account.name: account for account in query.all()}
+
+        for name in names:
+            if name not in accounts:
+                raise MashDBException(
+                    'EC2 account {account} not found.'.format(account=name)
+                )
+
+    if group_names:
+        query = EC2Group.query.options(
+            selectinload(EC2Group.accounts).options(*account_options)
+        ).filter(
+            EC2Group.user_id == user_id,
+            EC2Group.name.in_(group_names)
+        )
+
+        for group in query.all():
+            groups[group.name] = [account.name for account in group.accounts]
+            accounts.update(
+                (account.name, account) for account in group.accounts
+            )
+
+        for name in group_names:
+            if name not in groups:
+                raise MashDBException(
+                    'Group {group} not found.'.format(group=name)
+                )
+
+    return accounts, groups
+
+
 def _get_or_create_ec2_group(name, user_id):
     """
     Retrieve EC2 group for user.
@@ -16,13 +16,25 @@
 # along with mash.  If not, see <http://www.gnu.org/licenses/>
 #
 
-from datetime import datetime
+from datetime import datetime, timedelta
+
+from sqlalchemy import func
 
 from mash.services.database.extensions import db
-from mash.services.database.models import Job
+from mash.services.database.models import (
+    Job,
+    JobStageStats,
+    JobStatusUpdate
+)
 from mash.services.status_levels import FAILED, EXCEPTION, RUNNING, FINISHED
 
 
+stage_times = ('queued_at', 'started_at', 'finished_at')
+
+# Seconds a status update transaction takes to commit at most
+status_update_settle_time = 5
+
+
 def create_new_job(data):
     """
     Create a new job for user.
@@ -39,6 +51,22 @@ def create_new_job(data):
     return job
 
 
+def create_new_jobs(jobs):
+    """
+    Create multiple jobs in one transaction.
+    """
+    jobs = [Job(**data) for data in jobs]
+
+    try:
+        db.session.add_all(jobs)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    return jobs
+
+
 def get_job(job_id):
     """
     Get job.
@@ -58,11 +86,44 @@ def get_job_by_user(job_id, user_id):
     return job
 
 
-def get_jobs(user_id, page=1, per_page=10):
+def filter_jobs(query, state=None, cloud=None, current_service=None,
+                failed_service=None, image=None, since=None, until=None):
+    """
+    Apply the job filters to the query.
+
+    Since and until limit the start time of the jobs.
+    """
+    filters = {
+        'state': state,
+        'cloud': cloud,
+        'current_service': current_service,
+        'failed_service': failed_service,
+        'image': image
+    }
+    filters = {key: value for key, value in filters.items() if value}
+
+    if filters:
+        query = query.filter_by(**filters)
+
+    if since:
+        query = query.filter(Job.start_time >= since)
+
+    if until:
+        query = query.filter(Job.start_time < until)
+
+    return query
+
+
+def get_jobs(user_id, page=1, per_page=10, **filters):
     """
     Retrieve all jobs for user.
+
+    The jobs can be filtered by the arguments of filter_jobs.
     """
-    job_query = Job.query.filter_by(user_id=user_id).paginate(
+    job_query = filter_jobs(
+        Job.query.filter_by(user_id=user_id),
+        **filters
+    ).paginate(
         page,
         per_page,
         error_out=False,  # Return empty set if no results
@@ -71,12 +132,106 @@ def get_jobs(user_id, page=1, per_page=10):
     return job_query.items
 
 
+def get_job_summary(user_id, **filters):
+    """
+    Count the jobs of the user by state and service.
+
+    Returns the total and the counts by state, current service
+    and failed service. The jobs can be filtered by the arguments
+    of filter_jobs.
+    """
+    summary = {'total': 0}
+    columns = (
+        ('states', Job.state),
+        ('current_services', Job.current_service),
+        ('failed_services', Job.failed_service)
+    )
+
+    for name, column in columns:
+        query = filter_jobs(
+            db.session.query(column, func.count(Job.id)).filter(
+                Job.user_id == user_id
+            ),
+            **filters
+        ).group_by(column)
+
+        counts = dict(query.all())
+
+        if name == 'states':
+            summary['total'] = sum(counts.values())
+
+        counts.pop(None, None)
+        summary[name] = counts
+
+    return summary
+
+
+def get_job_status_updates(
+    user_id, since_version=0, job_id=None, limit=100,
+    settle_time=status_update_settle_time
+):
+    """
+    Retrieve status updates of the user's jobs after the version.
+
+    The version is the id of the status update, it increases with
+    each update. Updates are ordered by version.
+
+    Ids are assigned when an update is inserted, a transaction that
+    commits after a later one makes a lower id visible behind the
+    version a client has already seen. Only updates older than
+    settle_time seconds are returned, by then all updates with a
+    lower id are committed and the version never skips one.
+    """
+    settled = datetime.utcnow() - timedelta(seconds=settle_time)
+
+    query = db.session.query(JobStatusUpdate).join(
+        Job, Job.job_id == JobStatusUpdate.job_id
+    ).filter(
+        Job.user_id == user_id,
+        JobStatusUpdate.id > since_version,
+        JobStatusUpdate.created <= settled
+    )
+
+    if job_id:
+        query = query.filter(JobStatusUpdate.job_id == job_id)
+
+    return query.order_by(JobStatusUpdate.id).limit(limit).all()
+
+
+def get_stage_stats(cloud=None, service=None, since=None, until=None):
+    """
+    Retrieve the daily stage stats.
+
+    Since and until limit the days, until is exclusive.
+    """
+    query = JobStageStats.query
+
+    if cloud:
+        query = query.filter_by(cloud=cloud)
+
+    if service:
+        query = query.filter_by(service=service)
+
+    if since:
+        query = query.filter(JobStageStats.day >= since)
+
+    if until:
+        query = query.filter(JobStageStats.day < until)
+
+    return query.order_by(
+        JobStageStats.day,
+        JobStageStats.cloud,
+        JobStageStats.service
+    ).all()
+
+
 def delete_job_for_user(job_id, user_id):
     """Delete job for user."""
     job = get_job_by_user(job_id, user_id)
 
     if job:
         try:
+            JobStatusUpdate.query.filter_by(job_id=job_id).delete()
             db.session.delete(job)
             db.session.commit()
         except Exception:
@@ -88,18 +243,65 @@ def delete_job_for_user(job_id, user_id):
         return 0
 
 
-def save_job_status(job_doc):
+def get_stage_times(job_doc):
     """
-    Update job in database with new status.
+    Return the stage times of the job doc as UTC datetimes.
 
-    The status is updated when each service finishes.
+    The services add the unix timestamps when the job was queued,
+    started and finished.
+    """
+    times = {}
+
+    for key in stage_times:
+        if job_doc.get(key):
+            times[key] = datetime.utcfromtimestamp(job_doc[key])
+
+    return times
+
+
+def add_stage_stats(cloud, service, finished_at, duration, status):
+    """
+    Add the stage duration to the daily stage stats without committing.
+    """
+    stats = JobStageStats.query.filter_by(
+        cloud=cloud,
+        service=service,
+        day=finished_at.date()
+    ).first()
+
+    if not stats:
+        stats = JobStageStats(
+            cloud=cloud,
+            service=service,
+            day=finished_at.date()
+        )
+
+    stats.add_duration(duration, failed=status in (FAILED, EXCEPTION))
+    db.session.add(stats)
+
+
+def _apply_job_status(job_doc):
     """
-    job = get_job(job_doc.pop('id'))
-    job.prev_service = job_doc.pop('prev_service')
+    Apply the status update to the job without committing.
 
+    Returns the job.
+    """
+    job_doc = dict(job_doc)
+    job_id = job_doc.pop('id')
+    prev_service = job_doc.pop('prev_service')
     status = job_doc.pop('status')
     current_service = job_doc.pop('current_service')
 
+    for key in stage_times:
+        job_doc.pop(key, None)
+
+    job = get_job(job_id)
+
+    if not job:
+        raise Exception('Job {0} does not exist'.format(job_id))
+
+    job.prev_service = prev_service
+
     failed_states = (FAILED, EXCEPTION)
     if status in failed_states and job.state != status:
         job.failed_service = job.prev_service
@@ -117,9 +319,94 @@ def save_job_status(job_doc):
     job.errors = job_doc.pop('errors', [])
     job.data = job_doc
 
+    db.session.add(job)
+    return job
+
+
+def save_job_status(job_doc):
+    """
+    Update job in database with new status.
+
+    The status is updated when each service finishes.
+    """
     try:
-        db.session.add(job)
+        _apply_job_status(job_doc)
         db.session.commit()
     except Exception:
         db.session.rollback()
         raise
+
+
+def status_applied(job_id, service):
+    """
+    Return True if the status of the service has been saved for the job.
+    """
+    update = JobStatusUpdate.query.filter_by(
+        job_id=job_id,
+        service=service
+    ).first()
+
+    return update is not None
+
+
+def save_job_statuses(job_docs):
+    """
+    Update the status of multiple jobs in one transaction.
+
+    Every status update is recorded by job id and service, with the
+    stage times and duration. The duration is added to the daily stage
+    stats. Updates that have been saved before, for example from a
+    redelivered message, are skipped. Updates that cannot be applied,
+    for example because the job has been deleted, are skipped before
+    the job is modified. Returns a list of failed updates with the job
+    id and an error message.
+    """
+    failed = []
+    applied = set()
+
+    try:
+        for job_doc in job_docs:
+            job_id = job_doc.get('id')
+            service = job_doc.get('prev_service')
+            status = job_doc.get('status')
+
+            if (job_id, service) in applied or \
+                    status_applied(job_id, service):
+                continue
+
+            try:
+                job = _apply_job_status(job_doc)
+            except Exception as error:
+                failed.append({'id': job_id, 'msg': str(error)})
+                continue
+
+            times = get_stage_times(job_doc)
+
+            if 'started_at' in times and 'finished_at' in times:
+                times['duration'] = (
+                    times['finished_at'] - times['started_at']
+                ).total_seconds()
+                add_stage_stats(
+                    job.cloud or 'unknown',
+                    service,
+                    times['finished_at'],
+                    times['duration'],
+                    status
+                )
+
+            db.session.add(
+                JobStatusUpdate(
+                    job_id=job_id,
+                    service=service,
+                    status=status,
+                    **times
+                )
+            )
+            applied.add((job_id, service))
+
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    return failed
@@ -24,6 +24,7 @@ import traceback
 from mash.mash_exceptions import MashException
 from mash.services.base_config import BaseConfig
 from mash.services.listener_service import ListenerService
+from mash.services.async_listener_service import AsyncListenerService
 from mash.services.job_factory import BaseJobFactory
 
 from mash.services.no_op_job import NoOpJob
@@ -54,10 +55,17 @@ def main():
             }
         )
 
+        config = BaseConfig()
+
+        if config.get_listener_engine(service_name) == 'asyncio':
+            listener_class = AsyncListenerService
+        else:
+            listener_class = ListenerService
+
         # run service, enter main loop
-        ListenerService(
+        listener_class(
             service_exchange=service_name,
-            config=BaseConfig(),
+            config=config,
             custom_args={
                 'job_factory': job_factory
             }
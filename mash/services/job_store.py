@@ -0,0 +1,392 @@
+# Copyright (c) 2021 SUSE LLC.  All rights reserved.
+#
+# This file is part of mash.
+#
+# mash is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# mash is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with mash.  If not, see <http://www.gnu.org/licenses/>
+#
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from tempfile import NamedTemporaryFile
+
+from mash.mash_exceptions import MashJobStoreException
+from mash.utils.mash_utils import load_json, remove_file
+
+
+class BaseJobStore(object):
+    """
+    Base class for persisting job configs of a service.
+
+    Temp files of interrupted writes are removed on startup.
+    """
+    temp_file_prefix = '.job-'
+    temp_file_max_age = 600
+
+    def __init__(self, job_directory):
+        self.job_directory = job_directory
+        os.makedirs(self.job_directory, exist_ok=True)
+        self._remove_temp_files()
+        self.post_init()
+
+    def post_init(self):
+        """
+        Post initialization method.
+
+        Implementation in child class.
+        """
+        pass
+
+    def add(self, job_config):
+        """
+        Persist the job config, replace the existing job with same id.
+        """
+        raise NotImplementedError(
+            'This {0} class does not implement the add method.'.format(
+                self.__class__.__name__
+            )
+        )
+
+    def add_many(self, job_configs):
+        """
+        Persist a batch of job configs with one sync.
+        """
+        raise NotImplementedError(
+            'This {0} class does not implement the add_many method.'.format(
+                self.__class__.__name__
+            )
+        )
+
+    def delete(self, job_id):
+        """
+        Delete the job config if it exists.
+        """
+        raise NotImplementedError(
+            'This {0} class does not implement the delete method.'.format(
+                self.__class__.__name__
+            )
+        )
+
+    def get(self, job_id):
+        """
+        Return the job config for the job id or None.
+        """
+        raise NotImplementedError(
+            'This {0} class does not implement the get method.'.format(
+                self.__class__.__name__
+            )
+        )
+
+    def get_job_ids(self):
+        """
+        Return the ids of all persisted jobs.
+        """
+        raise NotImplementedError(
+            'This {0} class does not implement the get_job_ids method.'.format(
+                self.__class__.__name__
+            )
+        )
+
+    def load(self, callback):
+        """
+        Call callback with every persisted job config.
+        """
+        raise NotImplementedError(
+            'This {0} class does not implement the load method.'.format(
+                self.__class__.__name__
+            )
+        )
+
+    def close(self):
+        """
+        Release resources of the store.
+        """
+        pass
+
+    def get_job_file(self, job_id):
+        """
+        Return the path of the legacy json file for the job id.
+        """
+        return '{0}job-{1}.json'.format(self.job_directory, job_id)
+
+    def get_job_files(self):
+        """
+        Return the paths of all json job files in the job directory.
+        """
+        return [
+            entry.path for entry in os.scandir(self.job_directory)
+            if entry.name.startswith('job-') and entry.name.endswith('.json')
+        ]
+
+    def _remove_temp_files(self):
+        """
+        Remove temp files left by writes interrupted by a crash.
+
+        Replicas sharing the job directory may be writing their temp
+        files, only files older than temp_file_max_age are removed.
+        """
+        expired = time.time() - self.temp_file_max_age
+
+        for entry in os.scandir(self.job_directory):
+            if not entry.name.startswith(self.temp_file_prefix):
+                continue
+
+            try:
+                modified = entry.stat().st_mtime
+            except FileNotFoundError:
+                continue
+
+            if modified < expired:
+                remove_file(entry.path)
+
+
+class FileJobStore(BaseJobStore):
+    """
+    Job store with one compact json file per job.
+
+    Files are written to a temporary file and renamed, a job file
+    is always complete. Single job files are not synced to disk, like
+    the commits of the SQLite store, batches are synced once.
+    """
+    def add(self, job_config):
+        """
+        Write the job config to the job file atomically.
+        """
+        self.add_many([job_config], sync=False)
+
+    def add_many(self, job_configs, sync=True):
+        """
+        Write the job configs to their job files atomically.
+
+        If sync is set all temp files are written before the first is
+        synced, the later syncs find most data already on disk. The
+        directory is synced once after all files are renamed.
+        """
+        temp_files = []
+
+        try:
+            for job_config in job_configs:
+                job_file = self.get_job_file(job_config['id'])
+                temp_file = NamedTemporaryFile(
+                    mode='w',
+                    dir=self.job_directory,
+                    prefix=self.temp_file_prefix,
+                    suffix='.tmp',
+                    delete=False
+                )
+                temp_files.append((temp_file, job_file))
+                json.dump(job_config, temp_file, separators=(',', ':'))
+                temp_file.flush()
+
+            for temp_file, job_file in temp_files:
+                if sync:
+                    os.fsync(temp_file.fileno())
+                temp_file.close()
+        except Exception:
+            for temp_file, job_file in temp_files:
+                temp_file.close()
+                remove_file(temp_file.name)
+            raise
+
+        for temp_file, job_file in temp_files:
+            os.replace(temp_file.name, job_file)
+
+        if sync:
+            self._sync_directory()
+
+    def _sync_directory(self):
+        """
+        Sync the job directory, renamed job files survive a crash.
+        """
+        directory = os.open(self.job_directory, os.O_RDONLY)
+
+        try:
+            os.fsync(directory)
+        finally:
+            os.close(directory)
+
+    def delete(self, job_id):
+        """
+        Remove the job file if it exists.
+        """
+        remove_file(self.get_job_file(job_id))
+
+    def get(self, job_id):
+        """
+        Return the job config from the job file or None.
+        """
+        try:
+            return load_json(self.get_job_file(job_id))
+        except FileNotFoundError:
+            return None
+
+    def get_job_ids(self):
+        """
+        Return the job ids from the job file names without reading them.
+        """
+        return [
+            os.path.basename(job_file)[4:-5]
+            for job_file in self.get_job_files()
+        ]
+
+    def load(self, callback):
+        """
+        Call callback with the job config of every job file.
+        """
+        for job_file in self.get_job_files():
+            callback(load_json(job_file))
+
+
+class SQLiteJobStore(BaseJobStore):
+    """
+    Job store in a SQLite database in WAL mode.
+
+    Commits are not synced to disk individually, with synchronous
+    NORMAL the WAL is synced on checkpoints. Legacy json job files
+    in the job directory are imported on startup.
+    """
+    def post_init(self):
+        self.lock = threading.Lock()
+        self.db_file = os.path.join(self.job_directory, 'jobs.db')
+
+        try:
+            self.connection = sqlite3.connect(
+                self.db_file,
+                check_same_thread=False,
+                isolation_level=None
+            )
+            self.connection.execute('PRAGMA journal_mode=WAL')
+            self.connection.execute('PRAGMA synchronous=NORMAL')
+            self.connection.execute(
+                'CREATE TABLE IF NOT EXISTS jobs '
+                '(id TEXT PRIMARY KEY, data TEXT NOT NULL)'
+            )
+        except sqlite3.Error as error:
+            raise MashJobStoreException(
+                'Unable to open job store {0}: {1}'.format(
+                    self.db_file, error
+                )
+            )
+
+        self._import_job_files()
+
+    def _import_job_files(self):
+        """
+        Import and remove legacy json job files in one transaction.
+        """
+        job_files = self.get_job_files()
+
+        if not job_files:
+            return
+
+        self.add_many(load_json(job_file) for job_file in job_files)
+
+        for job_file in job_files:
+            remove_file(job_file)
+
+    def _upsert(self, job_config):
+        self.connection.execute(
+            'INSERT OR REPLACE INTO jobs (id, data) VALUES (?, ?)',
+            (job_config['id'], json.dumps(job_config, separators=(',', ':')))
+        )
+
+    def add(self, job_config):
+        """
+        Insert or replace the job config.
+        """
+        with self.lock:
+            self._upsert(job_config)
+
+    def add_many(self, job_configs):
+        """
+        Insert or replace the job configs in one transaction.
+        """
+        with self.lock:
+            self.connection.execute('BEGIN')
+
+            try:
+                for job_config in job_configs:
+                    self._upsert(job_config)
+            except Exception:
+                self.connection.execute('ROLLBACK')
+                raise
+
+            self.connection.execute('COMMIT')
+
+    def delete(self, job_id):
+        """
+        Delete the job config if it exists.
+        """
+        with self.lock:
+            self.connection.execute('DELETE FROM jobs WHERE id = ?', (job_id,))
+
+    def get(self, job_id):
+        """
+        Return the job config for the job id or None.
+        """
+        with self.lock:
+            row = self.connection.execute(
+                'SELECT data FROM jobs WHERE id = ?', (job_id,)
+            ).fetchone()
+
+        return json.loads(row[0]) if row else None
+
+    def get_job_ids(self):
+        """
+        Return the ids of all jobs in the store.
+        """
+        with self.lock:
+            rows = self.connection.execute('SELECT id FROM jobs').fetchall()
+
+        return [row[0] for row in rows]
+
+    def load(self, callback):
+        """
+        Call callback with every job config in the store.
+        """
+        with self.lock:
+            rows = self.connection.execute('SELECT data FROM jobs').fetchall()
+
+        for row in rows:
+            callback(json.loads(row[0]))
+
+    def close(self):
+        """
+        Close the database connection.
+        """
+        with self.lock:
+            self.connection.close()
+
+
+job_stores = {
+    'file': FileJobStore,
+    'sqlite': SQLiteJobStore
+}
+
+
+def get_job_store(store_type, job_directory):
+    """
+    Return instance of the job store type for the job directory.
+    """
+    try:
+        job_store_class = job_stores[store_type]
+    except KeyError:
+        raise MashJobStoreException(
+            'Job store type {0} is not supported.'.format(store_type)
+        )
+
+    return job_store_class(job_directory)
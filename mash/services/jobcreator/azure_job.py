@@ -18,7 +18,6 @@
 
 from mash.mash_exceptions import MashJobCreatorException
 from mash.services.jobcreator.base_job import BaseJob
-from mash.utils.json_format import JsonFormat
 
 
 class AzureJob(BaseJob):
@@ -65,7 +64,7 @@ class AzureJob(BaseJob):
         }
         deprecate_message['deprecate_job'].update(self.base_message)
 
-        return JsonFormat.json_message(deprecate_message)
+        return deprecate_message
 
     def get_publish_message(self):
         """
@@ -102,7 +101,7 @@ class AzureJob(BaseJob):
 
         publish_message['publish_job'].update(self.base_message)
 
-        return JsonFormat.json_message(publish_message)
+        return publish_message
 
     def get_replicate_message(self):
         """
@@ -115,7 +114,7 @@ class AzureJob(BaseJob):
         }
         replicate_message['replicate_job'].update(self.base_message)
 
-        return JsonFormat.json_message(replicate_message)
+        return replicate_message
 
     def get_test_message(self):
         """
@@ -153,7 +152,7 @@ class AzureJob(BaseJob):
 
         test_message['test_job'].update(self.base_message)
 
-        return JsonFormat.json_message(test_message)
+        return test_message
 
     def get_upload_message(self):
         """
@@ -182,7 +181,7 @@ class AzureJob(BaseJob):
 
         upload_message['upload_job'].update(self.base_message)
 
-        return JsonFormat.json_message(upload_message)
+        return upload_message
 
     def get_create_message(self):
         """
@@ -202,4 +201,4 @@ class AzureJob(BaseJob):
 
         create_message['create_job'].update(self.base_message)
 
-        return JsonFormat.json_message(create_message)
+        return create_message
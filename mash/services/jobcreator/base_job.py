@@ -17,7 +17,6 @@
 #
 
 from mash.mash_exceptions import MashJobCreatorException
-from mash.utils.json_format import JsonFormat
 
 
 class BaseJob(object):
@@ -130,7 +129,7 @@ class BaseJob(object):
         if self.disallow_packages:
             obs_message['obs_job']['disallow_packages'] = self.disallow_packages
 
-        return JsonFormat.json_message(obs_message)
+        return obs_message
 
     def get_publish_message(self):
         """
@@ -203,7 +202,7 @@ class BaseJob(object):
         }
         raw_image_upload_message['raw_image_upload_job'].update(self.base_message)
 
-        return JsonFormat.json_message(raw_image_upload_message)
+        return raw_image_upload_message
 
     def post_init(self):
         """
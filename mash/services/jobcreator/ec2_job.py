@@ -17,7 +17,6 @@
 #
 
 from mash.services.jobcreator.base_job import BaseJob
-from mash.utils.json_format import JsonFormat
 
 
 class EC2Job(BaseJob):
@@ -63,7 +62,7 @@ class EC2Job(BaseJob):
             deprecate_message['deprecate_job']['old_cloud_image_name'] = \
                 self.old_cloud_image_name
 
-        return JsonFormat.json_message(deprecate_message)
+        return deprecate_message
 
     def get_deprecate_regions(self):
         """
@@ -86,7 +85,7 @@ class EC2Job(BaseJob):
         }
         publish_message['publish_job'].update(self.base_message)
 
-        return JsonFormat.json_message(publish_message)
+        return publish_message
 
     def get_publish_regions(self):
         """
@@ -108,7 +107,7 @@ class EC2Job(BaseJob):
         }
         replicate_message['replicate_job'].update(self.base_message)
 
-        return JsonFormat.json_message(replicate_message)
+        return replicate_message
 
     def get_replicate_source_regions(self):
         """
@@ -160,7 +159,7 @@ class EC2Job(BaseJob):
 
         test_message['test_job'].update(self.base_message)
 
-        return JsonFormat.json_message(test_message)
+        return test_message
 
     def get_test_regions(self):
         """
@@ -197,7 +196,7 @@ class EC2Job(BaseJob):
             create_message['create_job']['cloud_architecture'] = \
                 self.cloud_architecture
 
-        return JsonFormat.json_message(create_message)
+        return create_message
 
     def get_create_regions(self):
         """
@@ -232,4 +231,4 @@ class EC2Job(BaseJob):
         }
         upload_message['upload_job'].update(self.base_message)
 
-        return JsonFormat.json_message(upload_message)
+        return upload_message
@@ -18,7 +18,6 @@
 
 from mash.mash_exceptions import MashJobCreatorException
 from mash.services.jobcreator.base_job import BaseJob
-from mash.utils.json_format import JsonFormat
 
 
 class GCEJob(BaseJob):
@@ -66,7 +65,7 @@ class GCEJob(BaseJob):
             deprecate_message['deprecate_job']['old_cloud_image_name'] = \
                 self.old_cloud_image_name
 
-        return JsonFormat.json_message(deprecate_message)
+        return deprecate_message
 
     def get_publish_message(self):
         """
@@ -79,7 +78,7 @@ class GCEJob(BaseJob):
         }
         publish_message['publish_job'].update(self.base_message)
 
-        return JsonFormat.json_message(publish_message)
+        return publish_message
 
     def get_replicate_message(self):
         """
@@ -92,7 +91,7 @@ class GCEJob(BaseJob):
         }
         replicate_message['replicate_job'].update(self.base_message)
 
-        return JsonFormat.json_message(replicate_message)
+        return replicate_message
 
     def get_test_message(self):
         """
@@ -130,7 +129,7 @@ class GCEJob(BaseJob):
 
         test_message['test_job'].update(self.base_message)
 
-        return JsonFormat.json_message(test_message)
+        return test_message
 
     def get_upload_message(self):
         """
@@ -152,7 +151,7 @@ class GCEJob(BaseJob):
         }
         upload_message['upload_job'].update(self.base_message)
 
-        return JsonFormat.json_message(upload_message)
+        return upload_message
 
     def get_create_message(self):
         """
@@ -171,4 +170,4 @@ class GCEJob(BaseJob):
         }
         create_message['create_job'].update(self.base_message)
 
-        return JsonFormat.json_message(create_message)
+        return create_message
@@ -18,7 +18,6 @@
 
 from mash.mash_exceptions import MashJobCreatorException
 from mash.services.jobcreator.base_job import BaseJob
-from mash.utils.json_format import JsonFormat
 
 
 class OCIJob(BaseJob):
@@ -68,7 +67,7 @@ class OCIJob(BaseJob):
             deprecate_message['deprecate_job']['old_cloud_image_name'] = \
                 self.old_cloud_image_name
 
-        return JsonFormat.json_message(deprecate_message)
+        return deprecate_message
 
     def get_publish_message(self):
         """
@@ -81,7 +80,7 @@ class OCIJob(BaseJob):
         }
         publish_message['publish_job'].update(self.base_message)
 
-        return JsonFormat.json_message(publish_message)
+        return publish_message
 
     def get_replicate_message(self):
         """
@@ -94,7 +93,7 @@ class OCIJob(BaseJob):
         }
         replicate_message['replicate_job'].update(self.base_message)
 
-        return JsonFormat.json_message(replicate_message)
+        return replicate_message
 
     def get_test_message(self):
         """
@@ -125,7 +124,7 @@ class OCIJob(BaseJob):
 
         test_message['test_job'].update(self.base_message)
 
-        return JsonFormat.json_message(test_message)
+        return test_message
 
     def get_upload_message(self):
         """
@@ -150,7 +149,7 @@ class OCIJob(BaseJob):
         }
         upload_message['upload_job'].update(self.base_message)
 
-        return JsonFormat.json_message(upload_message)
+        return upload_message
 
     def get_create_message(self):
         """
@@ -179,4 +178,4 @@ class OCIJob(BaseJob):
         if self.launch_mode:
             create_message['create_job']['launch_mode'] = self.launch_mode
 
-        return JsonFormat.json_message(create_message)
+        return create_message
@@ -16,7 +16,12 @@
 # along with mash.  If not, see <http://www.gnu.org/licenses/>
 #
 
-import json
+
+import queue
+import threading
+import time
+
+from collections import OrderedDict
 
 from mash.services.mash_service import MashService
 from mash.services.jobcreator import create_job
@@ -24,7 +29,10 @@ from mash.services.status_levels import SUCCESS
 from mash.utils.json_format import JsonFormat
 from mash.utils.mash_utils import setup_logfile
 from mash.utils.mash_utils import handle_request
-from mash.utils.email_notification import EmailNotification
+from mash.utils.email_notification import (
+    EmailNotification,
+    NotificationWorker
+)
 
 
 class JobCreatorService(MashService):
@@ -32,7 +40,25 @@ class JobCreatorService(MashService):
     Implementation of job creator service.
 
     Handles the orchestration of jobs for mash.
+
+    Job status updates are buffered, one update per job and service,
+    and sent to the database service in batches by a writer thread, a
+    slow database service does not stall consuming. A redelivered
+    update replaces the buffered update of the same service. Status
+    messages are acked once the batch is written. If the database
+    service is unavailable the batch is retried with backoff. While a
+    batch is retried at most max_status_buffer updates are buffered,
+    then consuming waits for the writer.
+
+    If the database status consumer is enabled the database service
+    saves the job status and the job creator only sends notifications.
     """
+    max_status_backoff = 60
+    max_status_buffer = 1000
+    prefetch_count = 500
+    status_batch_size = 100
+    status_flush_interval = 1
+    status_flush_timeout = 30
 
     def post_init(self):
         """
@@ -48,18 +74,40 @@ class JobCreatorService(MashService):
         self.services = self.config.get_service_names()
         self.database_api_url = self.config.get_database_api_url()
 
+        # Job status is saved by the database service itself
+        self.status_consumer = self.config.get_database_status_consumer()
+
+        self.status_updates = OrderedDict()
+        self.status_delivery_tag = None
+        self.status_flush_time = time.monotonic() + self.status_flush_interval
+
+        # One batch is written while the next one waits
+        self.status_batches = queue.Queue(maxsize=1)
+        self.status_stop = threading.Event()
+        self.status_writer = threading.Thread(
+            target=self._write_job_status,
+            name='JobStatusWriter',
+            daemon=True
+        )
+        self.status_writer.start()
+
         self.bind_queue(
             self.service_exchange, self.job_document_key, self.service_queue
         )
         self._bind_result_queues()
 
-        # notification settings
-        self.notification_class = EmailNotification(
-            self.config.get_smtp_host(),
-            self.config.get_smtp_port(),
-            self.config.get_smtp_user(),
-            self.config.get_smtp_pass(),
-            self.config.get_smtp_ssl(),
+        # notification settings, emails are sent in a background thread
+        self.notification_class = NotificationWorker(
+            EmailNotification(
+                self.config.get_smtp_host(),
+                self.config.get_smtp_port(),
+                self.config.get_smtp_user(),
+                self.config.get_smtp_pass(),
+                self.config.get_smtp_ssl(),
+                log_callback=self.log
+            ),
+            min_interval=self.config.get_notification_min_interval(),
+            digest=self.config.get_notification_digest(),
             log_callback=self.log
         )
 
@@ -78,7 +126,7 @@ class JobCreatorService(MashService):
         Handle new job messages.
         """
         try:
-            job_doc = json.loads(message.body)
+            job_doc = self._decode_message(message)
             self.send_job(job_doc)
         except Exception as error:
             self.log.error(
@@ -94,12 +142,14 @@ class JobCreatorService(MashService):
         job_doc = None
 
         try:
-            job_doc = json.loads(message.body)
+            job_doc = self._decode_message(message)
         except Exception as error:
             self.log.error(
                 'Invalid message received: {0}.'.format(error)
             )
 
+        buffered = False
+
         if job_doc:
             for key, value in job_doc.items():
                 service = key.rsplit('_', maxsplit=1)[0]
@@ -112,8 +162,17 @@ class JobCreatorService(MashService):
                     )
                 else:
                     self._process_job_status(service, value)
+                    buffered = not self.status_consumer
 
-        message.ack()
+        if not buffered:
+            message.ack()
+            return
+
+        # Message is acked once the status is written to the database
+        self.status_delivery_tag = message.delivery_tag
+
+        if len(self.status_updates) >= self.status_batch_size:
+            self._flush_job_status()
 
     def _get_next_service(self, service):
         """
@@ -128,7 +187,7 @@ class JobCreatorService(MashService):
 
     def _process_job_status(self, service, job_doc):
         """
-        Send job status to DB service.
+        Buffer job status for the DB service.
 
         Include info on prev and next service which DB service
         does not know about.
@@ -138,15 +197,8 @@ class JobCreatorService(MashService):
         last_service = job_doc.pop('last_service')
         notification_email = job_doc.pop('notification_email')
 
-        try:
-            handle_request(
-                self.database_api_url,
-                'jobs/',
-                'put',
-                job_data=job_doc
-            )
-        except Exception as error:
-            self.log.error('Job status update failed: {}'.format(error))
+        if not self.status_consumer:
+            self._buffer_job_status(job_doc)
 
         if notification_email and (last_service == service):
             self.send_notification(
@@ -157,11 +209,113 @@ class JobCreatorService(MashService):
                 job_doc['errors']
             )
 
-    def publish_job_doc(self, service, job_doc):
+    def _buffer_job_status(self, job_doc):
+        """
+        Add job status to the buffer.
+
+        One update is kept per job and service so the status and stage
+        times of every service reach the DB service in order. A
+        redelivered update of the same service replaces the pending
+        update in place.
+        """
+        key = (job_doc['id'], job_doc['prev_service'])
+        self.status_updates[key] = job_doc
+
+    def _flush_job_status(self, timeout=None):
+        """
+        Hand the buffered job status updates to the writer as a batch.
+
+        If the writer is busy the updates stay buffered with later
+        updates. Once max_status_buffer updates are buffered
+        this waits up to timeout seconds, or until the writer takes
+        the batch if timeout is None.
+        """
+        if not self.status_updates:
+            return
+
+        block = len(self.status_updates) >= self.max_status_buffer
+
+        try:
+            self.status_batches.put(
+                (list(self.status_updates.values()), self.status_delivery_tag),
+                block=block or timeout is not None,
+                timeout=timeout
+            )
+        except queue.Full:
+            return
+
+        self.status_updates = OrderedDict()
+        self.status_delivery_tag = None
+        self.status_flush_time = time.monotonic() + self.status_flush_interval
+
+    def _send_job_status(self, job_docs):
+        """
+        Send the job status updates to the DB service.
+
+        Returns True if the batch was written.
+        """
+        try:
+            response = handle_request(
+                self.database_api_url,
+                'jobs/batch',
+                'put',
+                job_data=job_docs
+            )
+        except Exception as error:
+            self.log.error(
+                'Job status update failed: {0}'.format(error)
+            )
+            return False
+
+        for failure in response.json().get('failed', []):
+            self.log.warning(
+                'Job status update failed: {0}'.format(failure['msg']),
+                extra={'job_id': failure['id']}
+            )
+
+        return True
+
+    def _write_job_status(self):
         """
-        Publish the job_doc message to the given service exchange.
+        Write batches of job status updates to the DB service.
+
+        A failed batch is retried with exponential backoff, batches
+        are written in order. Once written the status messages up to
+        the last delivery tag of the batch are acked at once. After
+        stop a failed batch is not retried, its messages and those of
+        later batches are not acked and will be redelivered.
         """
-        self._publish(service, self.job_document_key, job_doc)
+        while True:
+            batch = self.status_batches.get()
+
+            if batch is None:
+                return
+
+            job_docs, delivery_tag = batch
+            backoff = 0
+
+            while not self._send_job_status(job_docs):
+                backoff = min(max(backoff * 2, 1), self.max_status_backoff)
+                self.log.info(
+                    'Retrying job status update in {0} seconds.'.format(
+                        backoff
+                    )
+                )
+
+                if self.status_stop.wait(backoff):
+                    return
+
+            self.channel.basic.ack(delivery_tag=delivery_tag, multiple=True)
+
+    def _consume(self):
+        """
+        Process messages and flush job status on the flush interval.
+        """
+        while not self.channel.is_closed and self.channel.consumer_tags:
+            self.channel.process_data_events()
+
+            if time.monotonic() >= self.status_flush_time:
+                self._flush_job_status()
 
     def send_job(self, job_doc):
         """
@@ -174,43 +328,38 @@ class JobCreatorService(MashService):
             extra={'job_id': job.id}
         )
 
+        messages = []
         for service in self.services:
+            message = None
+
             if service == 'deprecate':
-                self.publish_job_doc(
-                    'deprecate', job.get_deprecate_message()
-                )
+                message = job.get_deprecate_message()
             elif service == 'create':
-                self.publish_job_doc(
-                    'create', job.get_create_message()
-                )
+                message = job.get_create_message()
             elif service == 'obs':
-                self.publish_job_doc(
-                    'obs', job.get_obs_message()
-                )
+                message = job.get_obs_message()
             elif service == 'publish':
-                self.publish_job_doc(
-                    'publish', job.get_publish_message()
-                )
+                message = job.get_publish_message()
             elif service == 'replicate':
-                self.publish_job_doc(
-                    'replicate', job.get_replicate_message()
-                )
+                message = job.get_replicate_message()
             elif service == 'test':
-                self.publish_job_doc(
-                    'test', job.get_test_message()
-                )
+                message = job.get_test_message()
             elif service == 'upload':
-                self.publish_job_doc(
-                    'upload', job.get_upload_message()
-                )
+                message = job.get_upload_message()
             elif service == 'raw_image_upload':
-                self.publish_job_doc(
-                    'raw_image_upload', job.get_raw_image_upload_message()
+                message = job.get_raw_image_upload_message()
+
+            if message:
+                messages.append(
+                    (service, self.job_document_key, message, job.id)
                 )
 
             if service == job.last_service:
                 break
 
+        # Job documents for all services are sent in one batch
+        self.publish_many(messages)
+
     def _create_notification_content(
         self,
         job_id,
@@ -271,6 +420,7 @@ class JobCreatorService(MashService):
         """
         Start job creator service.
         """
+        self.channel.basic.qos(prefetch_count=self.prefetch_count)
         self.consume_queue(
             self._handle_service_message,
             self.service_queue,
@@ -285,7 +435,7 @@ class JobCreatorService(MashService):
             )
 
         try:
-            self.channel.start_consuming()
+            self._consume()
         except KeyboardInterrupt:
             pass
         except Exception:
@@ -297,7 +447,27 @@ class JobCreatorService(MashService):
         """
         Stop job creator service.
 
-        Stop consuming queues and close pika connections.
+        Write pending job status, stop consuming queues, close
+        pika connections and send pending notifications. Pending job
+        status is written once without retry, status messages that
+        could not be written are not acked and will be redelivered.
         """
+        self.status_stop.set()
+
+        # The writer has stopped if a batch failed after stop
+        if self.status_writer.is_alive():
+            if not self.channel.is_closed:
+                self._flush_job_status(timeout=self.status_flush_timeout)
+
+            try:
+                self.status_batches.put(
+                    None, timeout=self.status_flush_timeout
+                )
+            except queue.Full:
+                pass
+
+            self.status_writer.join(self.status_flush_timeout)
+
         self.channel.stop_consuming()
         self.close_connection()
+        self.notification_class.close()
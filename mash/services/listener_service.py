@@ -16,29 +16,32 @@
 # along with mash.  If not, see <http://www.gnu.org/licenses/>
 #
 
-import json
+import logging
+import multiprocessing
 import os
 import signal
 
+from logging.handlers import QueueHandler, QueueListener
+
 from amqpstorm import AMQPError
 
 from apscheduler import events
 from apscheduler.jobstores.base import ConflictingIdError
 from apscheduler.schedulers.background import BackgroundScheduler
-from apscheduler.executors.pool import ThreadPoolExecutor
+from apscheduler.executors.pool import (
+    ProcessPoolExecutor,
+    ThreadPoolExecutor
+)
 
 from pytz import utc
 
+from mash.log.filter import BaseServiceFilter
 from mash.mash_exceptions import MashListenerServiceException
+from mash.services.credentials_cache import credentials_cache
+from mash.services.job_store import get_job_store
 from mash.services.mash_service import MashService
 from mash.services.status_levels import EXCEPTION, SUCCESS
-from mash.utils.json_format import JsonFormat
-from mash.utils.mash_utils import (
-    remove_file,
-    persist_json,
-    restart_jobs,
-    setup_logfile
-)
+from mash.utils.mash_utils import setup_logfile
 
 
 class ListenerService(MashService):
@@ -47,12 +50,77 @@ class ListenerService(MashService):
     """
     def post_init(self):
         """Initialize base service class and job scheduler."""
+        self.scale_out = self.config.get_scale_out(self.service_exchange)
+
+        if self.scale_out and self.config.get_job_store() != 'file':
+            raise MashListenerServiceException(
+                'Scale out of the {0} service requires the file job store, '
+                'the {1} job store cannot be shared by replicas.'.format(
+                    self.service_exchange,
+                    self.config.get_job_store()
+                )
+            )
+
+        self._setup_listener()
+
+        if self.scale_out:
+            self._bind_replica_queues()
+        else:
+            self.bind_queue(
+                self.service_exchange,
+                self.job_document_key,
+                self.service_queue
+            )
+            self.bind_queue(
+                self.prev_service, self.listener_msg_key, self.listener_queue
+            )
+
+        process_pool_count = self.custom_args.get(
+            'process_pool_count',
+            self.config.get_process_pool_count(self.service_exchange)
+        )
+        self.use_process_pool = bool(process_pool_count)
+
+        if self.use_process_pool:
+            executors = {
+                'default': self._get_process_pool_executor(process_pool_count)
+            }
+        else:
+            thread_pool_count = self.custom_args.get(
+                'thread_pool_count',
+                self.config.get_base_thread_pool_count()
+            )
+            executors = {
+                'default': ThreadPoolExecutor(thread_pool_count)
+            }
+
+        self.scheduler = BackgroundScheduler(executors=executors, timezone=utc)
+        self.scheduler.add_listener(
+            self._process_job_result,
+            events.EVENT_JOB_EXECUTED | events.EVENT_JOB_ERROR
+        )
+        self.scheduler.add_listener(
+            self._process_job_missed,
+            events.EVENT_JOB_MISSED
+        )
+
+        signal.signal(signal.SIGINT, self.stop)
+        signal.signal(signal.SIGTERM, self.stop)
+
+        self._load_job_index()
+        self.start()
+
+    def _setup_listener(self):
+        """
+        Setup queue names, job directory, job factory and log file.
+        """
         self.listener_queue = 'listener'
         self.service_queue = 'service'
         self.job_document_key = 'job_document'
         self.listener_msg_key = 'listener_msg'
 
         self.jobs = {}
+        self.job_index = set()
 
         # setup service job directory
         self.job_directory = self.config.get_job_directory(
@@ -61,8 +129,13 @@ class ListenerService(MashService):
         os.makedirs(
             self.job_directory, exist_ok=True
         )
+        self.job_store = get_job_store(
+            self.config.get_job_store(),
+            self.job_directory
+        )
 
         self.prev_service = self._get_previous_service()
+        credentials_cache.ttl = self.config.get_job_credentials_cache_ttl()
 
         if not self.custom_args:
             self.custom_args = {}
@@ -79,63 +152,27 @@ class ListenerService(MashService):
         )
         self.log.addHandler(logfile_handler)
 
-        self.bind_queue(
-            self.service_exchange, self.job_document_key, self.service_queue
-        )
-        self.bind_queue(
-            self.prev_service, self.listener_msg_key, self.listener_queue
-        )
-
-        thread_pool_count = self.custom_args.get(
-            'thread_pool_count',
-            self.config.get_base_thread_pool_count()
-        )
-        executors = {
-            'default': ThreadPoolExecutor(thread_pool_count)
-        }
-        self.scheduler = BackgroundScheduler(executors=executors, timezone=utc)
-        self.scheduler.add_listener(
-            self._process_job_result,
-            events.EVENT_JOB_EXECUTED | events.EVENT_JOB_ERROR
-        )
-        self.scheduler.add_listener(
-            self._process_job_missed,
-            events.EVENT_JOB_MISSED
-        )
-
-        signal.signal(signal.SIGINT, self.stop)
-        signal.signal(signal.SIGTERM, self.stop)
-
-        restart_jobs(self.job_directory, self._add_job)
-        self.start()
-
     def _add_job(self, job_config):
         """
-        Create job using job factory if job id does not already exist.
+        Validate job using job factory if job id does not already exist.
 
-        Job config is persisted to disk if not already done.
+        Job config is persisted in the job store and only the job id is
+        kept in memory. The job instance is created again when the
+        listener message arrives. Jobs store values they pick at random
+        in the job config, the instance created again is the same job.
+        With scale out the job config records the replica that owns it.
         """
         job_id = job_config['id']
 
-        if job_id not in self.jobs:
-            try:
-                job = self.job_factory.create_job(job_config, self.config)
-            except Exception as error:
-                self.log.error(
-                    'Invalid job: {0}.'.format(error)
-                )
-            else:
-                self.jobs[job.id] = job
-                job.log_callback = self.log
-
-                if 'job_file' not in job_config:
-                    job_config['job_file'] = '{0}job-{1}.json'.format(
-                        self.job_directory, job_id
-                    )
-                    persist_json(
-                        job_config['job_file'], job_config
-                    )
-                    job.job_file = job_config['job_file']
+        if job_id not in self.job_index:
+            job = self._create_job(job_config)
+
+            if job:
+                if self.scale_out:
+                    job_config['replica_id'] = self.replica_id
+
+                self.job_store.add(job_config)
+                self.job_index.add(job_id)
 
                 self.log.info(
                     'Job queued, awaiting listener message.',
@@ -147,13 +184,106 @@ class ListenerService(MashService):
                 extra={'job_id': job_id}
             )
 
+    def _bind_replica_queues(self):
+        """
+        Bind the replica queues of this node for scale out mode.
+
+        Job documents and listener messages are routed by a consistent
+        hash of the job id, all messages of a job reach the same replica.
+        The shared queues are unbound, remaining messages are drained
+        by all replicas.
+        """
+        self.replica_id = self.custom_args.get(
+            'replica_id',
+            self.config.get_replica_id()
+        )
+        self.replica_takeover = [
+            replica_id for replica_id in
+            self.config.get_replica_takeover(self.service_exchange)
+            if replica_id != self.replica_id
+        ]
+
+        self.bind_replica_queue(
+            self.service_exchange,
+            self.job_document_key,
+            self.service_queue,
+            self.replica_id
+        )
+        self.bind_replica_queue(
+            self.prev_service,
+            self.listener_msg_key,
+            self.listener_queue,
+            self.replica_id
+        )
+
+        self.unbind_queue(
+            self.service_queue, self.service_exchange, self.job_document_key
+        )
+        self.unbind_queue(
+            self.listener_queue, self.prev_service, self.listener_msg_key
+        )
+
+    def _take_over_replica_queues(self):
+        """
+        Drain the queues of replicas that are gone for good.
+
+        The queues of a replica that is removed without a clean
+        shutdown stay bound to the hash exchanges and their share of
+        jobs is never handled. The queues are consumed by this replica
+        and unbound, which rebalances the share to the remaining
+        replicas. Jobs persisted by the gone replica are taken over
+        from the shared job store with their listener message.
+        """
+        for replica_id in self.replica_takeover:
+            self.log.info(
+                'Taking over queues of replica {0}.'.format(replica_id)
+            )
+            self.consume_queue(
+                self._handle_service_message,
+                '{0}.{1}'.format(self.service_queue, replica_id),
+                self.service_exchange
+            )
+            self.consume_queue(
+                self._handle_listener_message,
+                '{0}.{1}'.format(self.listener_queue, replica_id),
+                self.prev_service
+            )
+            self.unbind_replica_queue(
+                self.service_exchange, self.service_queue, replica_id
+            )
+            self.unbind_replica_queue(
+                self.prev_service, self.listener_queue, replica_id
+            )
+
+    def _unbind_replica_queues(self):
+        """
+        Unbind the replica queues of this node.
+
+        Messages already in the replica queues are handled
+        when the replica is started again.
+        """
+        try:
+            self.unbind_replica_queue(
+                self.service_exchange, self.service_queue, self.replica_id
+            )
+            self.unbind_replica_queue(
+                self.prev_service, self.listener_queue, self.replica_id
+            )
+        except AMQPError as error:
+            self.log.warning(
+                'Unable to unbind replica queues: {0}'.format(error)
+            )
+
     def _cleanup_job(self, job_id):
         """
         Job failed upstream.
 
-        Delete job and notify the next service.
+        Delete job and notify the next service. The job did not run
+        in this service, the stage times of the upstream service are
+        dropped from the status message.
         """
         job = self.jobs[job_id]
+        job.clear_stage_times()
 
         self.log.warning('Failed upstream.', extra=job.get_job_id())
         self._delete_job(job.id)
@@ -161,27 +291,97 @@ class ListenerService(MashService):
         message = self._get_status_message(job)
         self._publish_message(message, job.id)
 
+    def _create_job(self, job_config):
+        """
+        Create job instance using job factory.
+
+        Return None if the job config is invalid.
+        """
+        try:
+            job = self.job_factory.create_job(job_config, self.config)
+        except Exception as error:
+            self.log.error(
+                'Invalid job: {0}.'.format(error)
+            )
+            return None
+
+        job.log_callback = self.log
+        return job
+
     def _delete_job(self, job_id):
         """
-        Remove job from file store and delete from listener queue.
+        Remove job from job store and delete from listener queue.
 
         Also attempt to remove any running instances of the job.
         """
-        if job_id in self.jobs:
-            job = self.jobs[job_id]
+        if job_id in self.jobs or job_id in self.job_index:
             self.log.info(
                 'Deleting job.',
-                extra=job.get_job_id()
+                extra={'job_id': job_id}
             )
 
-            del self.jobs[job_id]
-            remove_file(job.job_file)
+            self.jobs.pop(job_id, None)
+            self.job_index.discard(job_id)
+            self.job_store.delete(job_id)
         else:
             self.log.warning(
                 'Job deletion failed, job is not queued.',
                 extra={'job_id': job_id}
             )
 
+    def _get_process_pool_executor(self, process_pool_count):
+        """
+        Return a process pool executor for running jobs.
+
+        Log records from the worker processes are sent back to the
+        service through a queue and handled by the service log handlers.
+        """
+        context = multiprocessing.get_context('spawn')
+        self.log_queue = context.Queue()
+        self.log_listener = QueueListener(self.log_queue, *self.log.handlers)
+        self.log_listener.start()
+
+        return ProcessPoolExecutor(
+            process_pool_count,
+            pool_kwargs={
+                'mp_context': context,
+                'initializer': setup_worker_process,
+                'initargs': (
+                    self.log_queue,
+                    credentials_cache.ttl
+                )
+            }
+        )
+
+    def _get_job(self, job_id):
+        """
+        Return the job instance for the job id or None.
+
+        The job instance is created from the job store on first access.
+        """
+        if job_id in self.jobs:
+            return self.jobs[job_id]
+
+        if job_id in self.job_index:
+            job_config = self.job_store.get(job_id)
+        elif self.scale_out:
+            job_config = self._take_over_job(job_id)
+        else:
+            job_config = None
+
+        if not job_config:
+            self.job_index.discard(job_id)
+            return None
+
+        job = self._create_job(job_config)
+
+        if job:
+            self.jobs[job_id] = job
+        else:
+            self._delete_job(job_id)
+
+        return job
+
     def _get_previous_service(self):
         """
         Return the previous service based on the current exchange.
@@ -200,23 +400,24 @@ class ListenerService(MashService):
 
     def _get_status_message(self, job):
         """
-        Build and return json message.
+        Build and return status message.
 
         Message contains completion status to post to next service exchange.
         """
         key = '{0}_result'.format(self.service_exchange)
-        return JsonFormat.json_message(
-            {
-                key: job.get_status_message()
-            }
-        )
+        return {
+            key: job.get_status_message()
+        }
 
     def _handle_listener_message(self, message):
         """
         Callback for listener messages.
         """
+        if not self._check_message_id(message):
+            return
+
         listener_msg = self._get_listener_msg(
-            message.body,
+            message,
             '{0}_result'.format(self.prev_service)
         )
 
@@ -225,12 +426,14 @@ class ListenerService(MashService):
             status = listener_msg['status']
             job_id = listener_msg['id']
 
-        if job_id and job_id in self.jobs:
-            job = self.jobs[listener_msg['id']]
+        job = self._get_job(job_id) if job_id else None
+
+        if job:
             job.listener_msg = message
             job.set_status_message(listener_msg)
 
             if status == SUCCESS:
+                job.set_queued_time()
                 self._schedule_job(job.id)
                 return  # Don't ack message until job finishes
             else:
@@ -242,9 +445,12 @@ class ListenerService(MashService):
         """
         Callback for events from jobcreator.
         """
+        if not self._check_message_id(message):
+            return
+
         job_key = '{0}_job'.format(self.service_exchange)
         try:
-            job_desc = json.loads(message.body)
+            job_desc = self._decode_message(message)
             self._add_job(job_desc[job_key])
         except Exception as e:
             self.log.error('Error adding job: {0}.'.format(e))
@@ -263,6 +469,16 @@ class ListenerService(MashService):
 
         self._delete_job(job_id)
 
+        if self.use_process_pool:
+            # Job ran in a worker process, update with the returned status
+            if event.exception:
+                status_msg = getattr(event.exception, 'status_msg', None)
+            else:
+                status_msg = event.retval
+
+            if status_msg:
+                job.set_status_message(status_msg)
+
         if event.exception:
             job.status = EXCEPTION
             msg = 'Exception in {0}: {1}'.format(
@@ -315,7 +531,7 @@ class ListenerService(MashService):
         Publish message to next service exchange.
         """
         try:
-            self.publish_job_result(self.service_exchange, message)
+            self.publish_job_result(self.service_exchange, message, job_id)
         except AMQPError:
             self.log.warning(
                 'Message not received: {0}'.format(message),
@@ -326,10 +542,24 @@ class ListenerService(MashService):
         """
         Schedule new job in background scheduler for job based on id.
         """
+        if self.use_process_pool:
+            job = self.jobs[job_id]
+            func = run_job_in_process
+            args = (
+                self.job_factory,
+                job.job_config,
+                self.config,
+                job.get_status_message(),
+                self.log.name
+            )
+        else:
+            func = self._start_job
+            args = (job_id,)
+
         try:
             self.scheduler.add_job(
-                self._start_job,
-                args=(job_id,),
+                func,
+                args=args,
                 id=job_id,
                 max_instances=1,
                 misfire_grace_time=None,
@@ -342,6 +572,66 @@ class ListenerService(MashService):
                 extra={'job_id': job_id}
             )
 
+    def _check_message_id(self, message):
+        """
+        Return True if the message can be handled by this replica.
+
+        With scale out messages are routed to the replicas by a hash
+        of the message id. Messages published without message id are
+        not routed by job and are rejected.
+        """
+        properties = message.properties or {}
+
+        if not self.scale_out or properties.get('message_id'):
+            return True
+
+        self.log.error(
+            'Message without message id rejected: {0}'.format(message.body)
+        )
+        message.reject(requeue=False)
+        return False
+
+    def _index_replica_job(self, job_config):
+        """
+        Add the job id to the index if the job is owned by this replica.
+        """
+        if job_config.get('replica_id') == self.replica_id:
+            self.job_index.add(job_config['id'])
+
+    def _load_job_index(self):
+        """
+        Load the ids of the persisted jobs from the job store.
+
+        With scale out the job store is shared by all replicas and only
+        the jobs owned by this replica are loaded. Jobs of other replicas
+        are taken over when their listener message reaches this replica.
+        """
+        if self.scale_out:
+            self.job_store.load(self._index_replica_job)
+        else:
+            self.job_index = set(self.job_store.get_job_ids())
+
+    def _take_over_job(self, job_id):
+        """
+        Return job config persisted by any replica in the shared job store.
+
+        When replicas join or leave the jobs are rebalanced and
+        listener messages may reach a replica that never received
+        the job document. The job is persisted as owned by this replica.
+        """
+        job_config = self.job_store.get(job_id)
+
+        if job_config:
+            self.log.info(
+                'Taking over job from shared job directory.',
+                extra={'job_id': job_id}
+            )
+            job_config['replica_id'] = self.replica_id
+            self.job_store.add(job_config)
+            self.job_index.add(job_id)
+
+        return job_config
+
     def _start_job(self, job_id):
         """
         Process job based on job id.
@@ -350,14 +640,14 @@ class ListenerService(MashService):
         job.process_job()
 
     def _get_listener_msg(self, message, key):
-        """Load json and attempt to get message by key."""
+        """Decode message and attempt to get message by key."""
         try:
-            listener_msg = json.loads(message)[key]
+            listener_msg = self._decode_message(message)[key]
         except Exception:
             self.log.error(
                 'Invalid listener message: {0}, '
                 'missing key: {1}'.format(
-                    message,
+                    message.body,
                     key
                 )
             )
@@ -365,11 +655,16 @@ class ListenerService(MashService):
 
         return listener_msg
 
-    def publish_job_result(self, exchange, message):
+    def publish_job_result(self, exchange, message, job_id):
         """
         Publish the result message to the listener queue on given exchange.
+
+        The job id is the message id, replicas of the next service
+        receive all messages of a job.
         """
-        self._publish(exchange, self.listener_msg_key, message)
+        self._publish(
+            exchange, self.listener_msg_key, message, message_id=job_id
+        )
 
     def start(self):
         """
@@ -387,6 +682,19 @@ class ListenerService(MashService):
             self.prev_service
         )
 
+        if self.scale_out:
+            self.consume_queue(
+                self._handle_service_message,
+                '{0}.{1}'.format(self.service_queue, self.replica_id),
+                self.service_exchange
+            )
+            self.consume_queue(
+                self._handle_listener_message,
+                '{0}.{1}'.format(self.listener_queue, self.replica_id),
+                self.prev_service
+            )
+            self._take_over_replica_queues()
+
         try:
             self.channel.start_consuming()
         except Exception:
@@ -410,5 +718,71 @@ class ListenerService(MashService):
                 'shutting down gracefully.'
             )
 
+        if self.scale_out:
+            # Rebalance jobs of this replica to the remaining replicas
+            self._unbind_replica_queues()
+
         self.scheduler.shutdown()
+
+        if self.use_process_pool:
+            self.log_listener.stop()
+
+        self.job_store.close()
         self.close_connection()
+
+
+# Log queue of the current worker process, set by the pool initializer.
+_worker_log_queue = None
+
+
+def setup_worker_process(log_queue, credentials_cache_ttl):
+    """
+    Process pool initializer of the worker processes.
+
+    Store the queue for forwarding log records and set the
+    credentials cache ttl of the service.
+    """
+    global _worker_log_queue
+    _worker_log_queue = log_queue
+    credentials_cache.ttl = credentials_cache_ttl
+
+
+def get_worker_logger(log_name):
+    """
+    Return a logger that forwards records to the service log queue.
+    """
+    log = logging.getLogger(log_name)
+
+    if not log.handlers:
+        log.setLevel(logging.DEBUG)
+        log.propagate = False
+        log.addHandler(QueueHandler(_worker_log_queue))
+        log.addFilter(BaseServiceFilter())
+
+    return log
+
+
+def run_job_in_process(job_factory, job_config, config, status_msg, log_name):
+    """
+    Create and process a job in a process pool worker.
+
+    The job requests credentials itself in the worker process so no
+    credentials are exchanged with the service. Only the resulting
+    status message is returned. The job config of the service's job
+    holds the values the job picked at random, the worker's job is the
+    same job.
+
+    If the job raises, the status message with the stage times is
+    attached to the exception as status_msg.
+    """
+    job = job_factory.create_job(job_config, config)
+    job.log_callback = get_worker_logger(log_name)
+    job.set_status_message(status_msg)
+
+    try:
+        job.process_job()
+    except Exception as error:
+        error.status_msg = job.get_status_message()
+        raise
+
+    return job.get_status_message()
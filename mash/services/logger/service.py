@@ -17,7 +17,16 @@
 #
 
 import json
+import time
 
+from collections import OrderedDict, defaultdict
+
+from mash.log.job_log import (
+    format_index_entry,
+    get_index_file,
+    is_job_log_removed,
+    lock_job_log
+)
 from mash.mash_exceptions import MashLoggerException
 from mash.services.mash_service import MashService
 from mash.utils.mash_utils import setup_logfile
@@ -28,8 +37,22 @@ class LoggerService(MashService):
     Implementation of logger service. Consumes logs from all
     services and persists to files based on job id.
 
+    Log lines are buffered per job log file and written in one
+    batch. Messages are acked after the batch is written. Job log
+    files are kept open in a LRU cache and closed when idle.
+
+    For every job log a sidecar index is written with the offset,
+    time and service of each record. Logs are written with a shared
+    lock, the cleanup service compresses idle logs with an exclusive
+    lock and removes them.
+
     * :attr:`custom_args`
     """
+    flush_interval = 1
+    idle_timeout = 300
+    max_open_files = 256
+    prefetch_count = 500
+
     def post_init(self, custom_args=None):
         """
         Initialize logger class.
@@ -42,6 +65,12 @@ class LoggerService(MashService):
         )
         self.log.addHandler(logfile_handler)
 
+        self.log_files = OrderedDict()
+        self.buffers = defaultdict(list)
+        self.pending_tag = None
+        self.pending_count = 0
+        self.flush_time = time.monotonic() + self.flush_interval
+
         self.bind_queue(self.service_exchange, 'mash.logger', 'logging')
         self.start()
 
@@ -51,37 +80,164 @@ class LoggerService(MashService):
 
         1. Attempt to de-serialize the log message.
         2. Determine log file name based on job_id.
-        3. Write or append to log file.
-        """
-        message.ack()
+        3. Buffer the log lines for the log file.
 
+        A message is either a single log record or a list
+        of log records. The buffer is written once the prefetch
+        count of messages is pending.
+        """
         try:
             data = json.loads(message.body)
         except Exception:
+            message.ack()
             raise MashLoggerException(
                 'Could not de-serialize log message.'
             )
 
-        if 'job_id' in data:
-            file_name = data.get('job_id')
-            log_file = self.config.get_job_log_file(file_name)
+        if isinstance(data, dict):
+            data = [data]
+
+        for record in data:
+            if 'job_id' in record:
+                log_file = self.config.get_job_log_file(record['job_id'])
+                self.buffers[log_file].append((
+                    record['msg'].replace(
+                        'Job[{0}]: '.format(record['job_id']), ''
+                    ),
+                    record.get('created'),
+                    record.get('name')
+                ))
+
+        self.pending_tag = message.delivery_tag
+        self.pending_count += 1
+
+        if self.pending_count >= self.prefetch_count:
+            self._flush_logs()
+
+    def _close_idle_files(self):
+        """
+        Close job log files not written to within the idle timeout.
+        """
+        idle_time = time.monotonic() - self.idle_timeout
+
+        while self.log_files:
+            log_file, (job_log, index_log, last_used) = next(
+                iter(self.log_files.items())
+            )
+
+            if last_used > idle_time:
+                break
+
+            job_log.close()
+            index_log.close()
+            del self.log_files[log_file]
+
+    def _close_log_file(self, log_file):
+        """
+        Close the job log file and its index.
+        """
+        job_log, index_log, last_used = self.log_files.pop(log_file)
+        job_log.close()
+        index_log.close()
+
+    def _close_log_files(self):
+        """
+        Close all open job log files.
+        """
+        for job_log, index_log, last_used in self.log_files.values():
+            job_log.close()
+            index_log.close()
+
+        self.log_files.clear()
 
+    def _get_log_file(self, log_file):
+        """
+        Return open binary file handles for log file and its index.
+
+        The least recently used files are closed if the cache is full.
+        """
+        if log_file in self.log_files:
+            job_log, index_log, last_used = self.log_files.pop(log_file)
+        else:
+            if len(self.log_files) >= self.max_open_files:
+                for handle in self.log_files.popitem(last=False)[1][:2]:
+                    handle.close()
+
+            job_log = open(log_file, 'ab')
+            index_log = open(get_index_file(log_file), 'ab')
+
+        self.log_files[log_file] = (job_log, index_log, time.monotonic())
+        return job_log, index_log
+
+    def _flush_logs(self):
+        """
+        Write buffered log lines and ack all pending messages.
+
+        Lines of a job log file are written with one write call.
+        """
+        for log_file, records in self.buffers.items():
             try:
-                with open(log_file, 'a') as job_log:
-                    job_log.write(
-                        data['msg'].replace(
-                            'Job[{0}]: '.format(data['job_id']), ''
-                        )
-                    )
+                while True:
+                    job_log, index_log = self._get_log_file(log_file)
+
+                    with lock_job_log(job_log):
+                        if not is_job_log_removed(job_log, log_file):
+                            self._write_records(job_log, index_log, records)
+                            break
+
+                    # Compressed by the cleanup service, open a new log
+                    self._close_log_file(log_file)
             except Exception as e:
                 raise MashLoggerException(
                     'Could not write to log file: {0}'.format(e)
                 )
 
+        self.buffers.clear()
+
+        if self.pending_tag is not None:
+            self.channel.basic.ack(
+                delivery_tag=self.pending_tag, multiple=True
+            )
+
+        self.pending_tag = None
+        self.pending_count = 0
+        self.flush_time = time.monotonic() + self.flush_interval
+
+    def _write_records(self, job_log, index_log, records):
+        """
+        Write the lines of the records and their index entries.
+        """
+        offset = job_log.tell()
+        lines = []
+        index = []
+
+        for msg, created, service in records:
+            line = msg.encode('utf-8')
+            index.append(format_index_entry(offset, created, service))
+            lines.append(line)
+            offset += len(line)
+
+        job_log.write(b''.join(lines))
+        job_log.flush()
+        index_log.write(''.join(index).encode('utf-8'))
+        index_log.flush()
+
+    def _consume(self):
+        """
+        Process messages and flush the buffer on the flush interval.
+        """
+        while not self.channel.is_closed and self.channel.consumer_tags:
+            self.channel.process_data_events()
+
+            if time.monotonic() >= self.flush_time:
+                self._flush_logs()
+                self._close_idle_files()
+
     def start(self):
         """
         Start logger service.
         """
+        self.channel.basic.qos(prefetch_count=self.prefetch_count)
         self.consume_queue(
             self._process_log,
             'logging',
@@ -89,10 +245,11 @@ class LoggerService(MashService):
         )
 
         try:
-            self.channel.start_consuming()
+            self._consume()
         except KeyboardInterrupt:
             pass
         except Exception:
             raise
         finally:
+            self._close_log_files()
             self.close_connection()
@@ -16,11 +16,18 @@
 # along with mash.  If not, see <http://www.gnu.org/licenses/>
 #
 
+import asyncio
+import functools
 import logging
+import time
 
 from mash.mash_exceptions import MashJobException
-from mash.services.status_levels import UNKOWN
-from mash.utils.mash_utils import handle_request
+from mash.services.credentials_cache import (
+    credentials_cache,
+    is_authentication_error
+)
+from mash.services.status_levels import SUCCESS, UNKOWN
+from mash.utils.mash_utils import handle_request, handle_request_async
 
 
 class MashJob(object):
@@ -34,11 +41,15 @@ class MashJob(object):
         self._cloud_image_name = None
         self._credentials = None
         self._log_callback = None
-        self._job_file = job_config.get('job_file')
 
         self.config = config
         self.status_msg = {'status': UNKOWN, 'errors': []}
 
+        # Set by the asyncio listener service
+        self.executor = None
+        self.http_session = None
+        self.event_loop = None
+
         try:
             self.id = job_config['id']
             self.last_service = job_config['last_service']
@@ -60,29 +71,84 @@ class MashJob(object):
         """
         return {'job_id': self.id}
 
+    def _get_credentials_request(self, accounts, cloud=None):
+        """
+        Return the credentials request data for the given accounts.
+        """
+        return {
+            'cloud': cloud or self.cloud,
+            'cloud_accounts': accounts,
+            'requesting_user': self.requesting_user
+        }
+
     def request_credentials(self, accounts, cloud=None):
         """
         Request credentials from credential service.
 
         Only send request if credentials not already populated.
+        Credentials are shared with other jobs of the process through
+        the credentials cache.
+
+        Blocking jobs of the asyncio listener service call this in the
+        job executor, the request is sent with the aiohttp session of
+        the service in the event loop.
         """
         if self.credentials:
             return
 
-        data = {
-            'cloud': cloud or self.cloud,
-            'cloud_accounts': accounts,
-            'requesting_user': self.requesting_user
-        }
+        if self.event_loop:
+            asyncio.run_coroutine_threadsafe(
+                self.request_credentials_async(accounts, cloud),
+                self.event_loop
+            ).result()
+            return
 
-        try:
+        data = self._get_credentials_request(accounts, cloud)
+
+        def request():
             response = handle_request(
                 self.config.get_credentials_url(),
                 'credentials/',
                 'get',
                 job_data=data
             )
-            self.credentials = response.json()
+            return response.json()
+
+        try:
+            self.credentials = credentials_cache.get_credentials(
+                self.requesting_user, data['cloud'], accounts, request
+            )
+        except Exception:
+            raise MashJobException(
+                'Credentials request failed for accounts: {accounts}'.format(
+                    accounts=', '.join(accounts)
+                )
+            )
+
+    async def request_credentials_async(self, accounts, cloud=None):
+        """
+        Request credentials from credential service using the http session.
+
+        Only send request if credentials not already populated.
+        """
+        if self.credentials:
+            return
+
+        data = self._get_credentials_request(accounts, cloud)
+
+        def request():
+            return handle_request_async(
+                self.http_session,
+                self.config.get_credentials_url(),
+                'credentials/',
+                'get',
+                job_data=data
+            )
+
+        try:
+            self.credentials = await credentials_cache.get_credentials_async(
+                self.requesting_user, data['cloud'], accounts, request
+            )
         except Exception:
             raise MashJobException(
                 'Credentials request failed for accounts: {accounts}'.format(
@@ -101,6 +167,13 @@ class MashJob(object):
             )
         )
 
+    def _invalidate_credentials(self, errors):
+        """
+        Remove cached credentials of the user if authentication failed.
+        """
+        if any(is_authentication_error(error) for error in errors):
+            credentials_cache.invalidate(self.requesting_user)
+
     def process_job(self):
         """
         Update iteration count and run job.
@@ -108,7 +181,57 @@ class MashJob(object):
         self.log_callback.extra = {
             'job_id': self.id
         }
-        self.run_job()
+        self.status_msg['started_at'] = time.time()
+
+        try:
+            self.run_job()
+        except Exception as error:
+            self._invalidate_credentials([error])
+            raise
+        finally:
+            self.status_msg['finished_at'] = time.time()
+
+        if self.status != SUCCESS:
+            self._invalidate_credentials(self.status_msg['errors'])
+
+    async def run_blocking(self, func, *args, **kwargs):
+        """
+        Run a blocking function in the job executor and await the result.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.executor,
+            functools.partial(func, *args, **kwargs)
+        )
+
+    async def run_job_async(self):
+        """
+        Start and run job workflow in the asyncio listener service.
+
+        By default the blocking run_job method is run in the executor.
+        Jobs that implement a native coroutine workflow override this.
+        """
+        await self.run_blocking(self.run_job)
+
+    async def process_job_async(self):
+        """
+        Run job in the asyncio listener service.
+        """
+        self.log_callback.extra = {
+            'job_id': self.id
+        }
+        self.status_msg['started_at'] = time.time()
+
+        try:
+            await self.run_job_async()
+        except Exception as error:
+            self._invalidate_credentials([error])
+            raise
+        finally:
+            self.status_msg['finished_at'] = time.time()
+
+        if self.status != SUCCESS:
+            self._invalidate_credentials(self.status_msg['errors'])
 
     @property
     def cloud_image_name(self):
@@ -132,16 +255,6 @@ class MashJob(object):
         """Setter for credentials."""
         self._credentials = creds
 
-    @property
-    def job_file(self):
-        """Job file property."""
-        return self._job_file
-
-    @job_file.setter
-    def job_file(self, file):
-        """Setter for job file."""
-        self._job_file = file
-
     @property
     def log_callback(self):
         """Log callback property."""
@@ -167,6 +280,22 @@ class MashJob(object):
         """
         self.status_msg = message
 
+    def clear_stage_times(self):
+        """
+        Remove the stage times of the previous service.
+        """
+        for key in ('queued_at', 'started_at', 'finished_at'):
+            self.status_msg.pop(key, None)
+
+    def set_queued_time(self):
+        """
+        Record the time the job is queued in the status message.
+
+        The stage times of the previous service are removed.
+        """
+        self.clear_stage_times()
+        self.status_msg['queued_at'] = time.time()
+
     def add_error_msg(self, message):
         """
         Append error message to job status_msg dictionary.
@@ -17,13 +17,16 @@
 #
 
 import logging
+import threading
 
 from amqpstorm import Connection
 
 # project
 from mash.log.filter import BaseServiceFilter
 from mash.mash_exceptions import MashRabbitConnectionException
+from mash.utils.codec import decode_message, encode_message
 from mash.utils.mash_utils import setup_rabbitmq_log_handler
+from mash.utils.publisher import ConfirmPublisher
 
 
 class MashService(object):
@@ -41,6 +44,8 @@ class MashService(object):
     def __init__(self, service_exchange, config, custom_args=None):
         self.channel = None
         self.connection = None
+        self.publisher = None
+        self.publisher_lock = threading.Lock()
 
         self.service_exchange = service_exchange
         self.custom_args = custom_args
@@ -51,6 +56,14 @@ class MashService(object):
         self.amqp_user = self.config.get_amqp_user()
         self.amqp_pass = self.config.get_amqp_pass()
 
+        # message codec settings
+        self.message_content_type = self.config.get_message_content_type()
+        self.message_compression = self.config.get_message_compression()
+        self.message_compression_threshold = \
+            self.config.get_message_compression_threshold()
+        self.publish_confirm_window = \
+            self.config.get_publish_confirm_window()
+
         self._open_connection()
 
         logging.basicConfig()
@@ -60,12 +73,12 @@ class MashService(object):
         self.log.setLevel(logging.DEBUG)
         self.log.propagate = False
 
-        rabbit_handler = setup_rabbitmq_log_handler(
+        self.log_handler = setup_rabbitmq_log_handler(
             self.amqp_host,
             self.amqp_user,
             self.amqp_pass
         )
-        self.log.addHandler(rabbit_handler)
+        self.log.addHandler(self.log_handler)
         self.log.addFilter(BaseServiceFilter())
 
         self.post_init()
@@ -94,6 +107,20 @@ class MashService(object):
         """
         return self.channel.queue.declare(queue=queue, durable=True)
 
+    def _declare_hash_exchange(self, exchange):
+        """
+        Declare/create consistent hash exchange and set as durable.
+
+        Messages are routed to bound queues by a hash of the message id.
+        Requires the rabbitmq_consistent_hash_exchange plugin.
+        """
+        self.channel.exchange.declare(
+            exchange=exchange,
+            exchange_type='x-consistent-hash',
+            durable=True,
+            arguments={'hash-property': 'message_id'}
+        )
+
     def _get_queue_name(self, exchange, name):
         """
         Return formatted name based on exchange and queue name.
@@ -102,6 +129,14 @@ class MashService(object):
         """
         return '{0}.{1}'.format(exchange, name)
 
+    def _get_hash_exchange_name(self, exchange, name):
+        """
+        Return formatted hash exchange name based on exchange and queue name.
+
+        Example: obs.service.hash
+        """
+        return '{0}.{1}.hash'.format(exchange, name)
+
     def _open_connection(self):
         """
         Open connection or channel if currently closed or None.
@@ -124,23 +159,94 @@ class MashService(object):
 
         if not self.channel or self.channel.is_closed:
             self.channel = self.connection.channel()
-            self.channel.confirm_deliveries()
 
-    def _publish(self, exchange, routing_key, message):
+    def _get_publisher(self):
         """
-        Publish message to the provided exchange with the routing key.
+        Return the publisher, opening its channel if closed or None.
+
+        Messages are published on a separate channel in confirm mode,
+        the publisher is shared by all threads of the service.
         """
-        self.channel.basic.publish(
-            body=message,
-            routing_key=routing_key,
-            exchange=exchange,
-            properties={
-                'content_type': 'application/json',
-                'delivery_mode': 2
-            },
-            mandatory=True
+        with self.publisher_lock:
+            if not self.publisher or not self.publisher.is_open:
+                if self.publisher and self.publisher.channel.is_open:
+                    self.publisher.channel.close()
+
+                self._open_connection()
+                self.publisher = ConfirmPublisher(
+                    self.connection.channel(),
+                    window=self.publish_confirm_window
+                )
+
+            return self.publisher
+
+    def _decode_message(self, message):
+        """
+        Return the message body decoded based on the message properties.
+
+        Messages without content type are json.
+        """
+        properties = message.properties or {}
+        return decode_message(
+            message.body,
+            properties.get('content_type'),
+            properties.get('content_encoding')
         )
 
+    def _encode_message(self, message, message_id=None):
+        """
+        Return the encoded body and properties for a persistent message.
+
+        Message is either a dict, which is serialized with the configured
+        content type, or a json string. The message id is used to route
+        messages to service replicas.
+        """
+        body, properties = encode_message(
+            message,
+            self.message_content_type,
+            self.message_compression,
+            self.message_compression_threshold
+        )
+        properties['delivery_mode'] = 2
+
+        if message_id:
+            properties['message_id'] = message_id
+
+        return body, properties
+
+    def _publish(self, exchange, routing_key, message, message_id=None):
+        """
+        Publish message to the provided exchange with the routing key.
+
+        Waits for the confirm of the message, publishes of other
+        threads are pipelined on the same channel. The message id is
+        used to route messages to service replicas.
+        """
+        self.publish_many([(exchange, routing_key, message, message_id)])
+
+    def publish_many(self, messages):
+        """
+        Publish a batch of messages and wait for their confirms.
+
+        Messages is a list of (exchange, routing_key, message, message_id)
+        tuples. All messages are published before waiting, the batch
+        costs one confirm round trip instead of one per message.
+
+        Raises AMQPError if a message is nacked or returned as
+        unroutable, the other messages of the batch may have been
+        delivered.
+        """
+        publisher = self._get_publisher()
+        futures = []
+
+        for exchange, routing_key, message, message_id in messages:
+            body, properties = self._encode_message(message, message_id)
+            futures.append(
+                publisher.publish(body, routing_key, exchange, properties)
+            )
+
+        publisher.wait(futures)
+
     def bind_queue(self, exchange, routing_key, name):
         """
         Bind queue on exchange to the provided routing key.
@@ -155,14 +261,56 @@ class MashService(object):
         )
         return queue
 
+    def bind_replica_queue(self, exchange, routing_key, name, replica_id):
+        """
+        Bind replica queue to the consistent hash exchange of the queue.
+
+        The hash exchange is bound to the exchange with the routing key.
+        Every replica binds its own queue and receives a share of
+        the messages based on the message id.
+
+        Example: replicate.service.hash -> replicate.service.node1
+        """
+        self._declare_direct_exchange(exchange)
+        hash_exchange = self._get_hash_exchange_name(exchange, name)
+        self._declare_hash_exchange(hash_exchange)
+        self.channel.exchange.bind(
+            destination=hash_exchange,
+            source=exchange,
+            routing_key=routing_key
+        )
+
+        queue = self._get_queue_name(
+            exchange, '{0}.{1}'.format(name, replica_id)
+        )
+        self._declare_queue(queue)
+        self.channel.queue.bind(
+            exchange=hash_exchange, queue=queue, routing_key='1'
+        )
+        return queue
+
+    def close_log_handler(self):
+        """
+        Publish the queued log records and stop the log handler.
+        """
+        self.log_handler.close()
+
     def close_connection(self):
         """
         If channel or connection open, stop consuming and close.
+
+        The log handler is closed first, queued log records are
+        published before the service exits.
         """
+        self.close_log_handler()
+
         if self.channel and self.channel.is_open:
             self.channel.stop_consuming()
             self.channel.close()
 
+        if self.publisher and self.publisher.channel.is_open:
+            self.publisher.channel.close()
+
         if self.connection and self.connection.is_open:
             self.connection.close()
 
@@ -184,3 +332,19 @@ class MashService(object):
         self.channel.queue.unbind(
             queue=queue, exchange=exchange, routing_key=routing_key
         )
+
+    def unbind_replica_queue(self, exchange, name, replica_id):
+        """
+        Unbind the replica queue from the consistent hash exchange.
+
+        The share of messages of the replica is rebalanced
+        to the remaining replicas.
+        """
+        queue = self._get_queue_name(
+            exchange, '{0}.{1}'.format(name, replica_id)
+        )
+        self.channel.queue.unbind(
+            queue=queue,
+            exchange=self._get_hash_exchange_name(exchange, name),
+            routing_key='1'
+        )
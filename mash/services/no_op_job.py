@@ -41,3 +41,9 @@ class NoOpJob(MashJob):
                 self.cloud
             )
         )
+
+    async def run_job_async(self):
+        """
+        Do nothing and be successful without using the executor.
+        """
+        self.run_job()
@@ -40,9 +40,6 @@ class OBSImageBuildResult(object):
     * :attr:`job_id`
       job id number
 
-    * :attr:`job_file`
-      job file containing the job description
-
     * :attr:`download_url`
       Buildservice URL
 
@@ -90,7 +87,7 @@ class OBSImageBuildResult(object):
       A list of packages to disallow in the image.
     """
     def __init__(
-        self, job_id, job_file, download_url, image_name, last_service,
+        self, job_id, download_url, image_name, last_service,
         log_callback, conditions=None, arch='x86_64',
         download_directory=Defaults.get_download_dir(),
         notification_email=None,
@@ -99,7 +96,6 @@ class OBSImageBuildResult(object):
     ):
         self.arch = arch
         self.job_id = job_id
-        self.job_file = job_file
         self.download_directory = os.path.join(download_directory, job_id)
         self.download_url = download_url
         self.image_name = image_name
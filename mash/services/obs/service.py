@@ -20,10 +20,10 @@ import os
 import dateutil.parser
 
 # project
+from mash.services.job_store import get_job_store
 from mash.services.mash_service import MashService
 from mash.services.obs.build_result import OBSImageBuildResult
-from mash.utils.json_format import JsonFormat
-from mash.utils.mash_utils import persist_json, restart_jobs, setup_logfile
+from mash.utils.mash_utils import setup_logfile
 
 
 class OBSImageBuildResultService(MashService):
@@ -54,13 +54,17 @@ class OBSImageBuildResultService(MashService):
         os.makedirs(
             self.job_directory, exist_ok=True
         )
+        self.job_store = get_job_store(
+            self.config.get_job_store(),
+            self.job_directory
+        )
 
         self.bind_queue(
             self.service_exchange, self.job_document_key, self.service_queue
         )
 
         # read and launch open jobs
-        restart_jobs(self.job_directory, self._start_job)
+        self.job_store.load(self._start_job)
 
         # consume on service queue
         atexit.register(lambda: os._exit(0))
@@ -77,13 +81,15 @@ class OBSImageBuildResultService(MashService):
         except Exception:
             raise
         finally:
+            self.job_store.close()
             self.close_connection()
 
     def _send_job_result_for_upload(self, job_id, trigger_info):
         self._publish(
             self.service_exchange,
             self.listener_msg_key,
-            JsonFormat.json_message(trigger_info)
+            trigger_info,
+            message_id=job_id
         )
         self._delete_job(job_id)
 
@@ -101,7 +107,7 @@ class OBSImageBuildResultService(MashService):
 
     def _process_message(self, message):
         try:
-            job_data = JsonFormat.json_loads(format(message.body))
+            job_data = self._decode_message(message)
         except Exception as e:
             return self._send_control_response(
                 {
@@ -133,7 +139,7 @@ class OBSImageBuildResultService(MashService):
 
     def _add_job(self, data):
         """
-        Add a new job description file and start a watchdog job
+        Persist a new job description and start a watchdog job
 
         job description example:
         {
@@ -160,12 +166,7 @@ class OBSImageBuildResultService(MashService):
         }
         """
         data = data['obs_job']
-        data['job_file'] = '{0}job-{1}.json'.format(
-            self.job_directory, data['id']
-        )
-        persist_json(
-            data['job_file'], data
-        )
+        self.job_store.add(data)
         return self._start_job(data)
 
     def _delete_job(self, job_id):
@@ -184,9 +185,9 @@ class OBSImageBuildResultService(MashService):
             }
         else:
             job_worker = self.jobs[job_id]
-            # delete job file
+            # delete job description
             try:
-                os.remove(job_worker.job_file)
+                self.job_store.delete(job_id)
             except Exception as e:
                 return {
                     'ok': False,
@@ -216,7 +217,6 @@ class OBSImageBuildResultService(MashService):
 
         kwargs = {
             'job_id': job_id,
-            'job_file': job['job_file'],
             'download_url': job['download_url'],
             'image_name': job['image'],
             'last_service': job['last_service'],
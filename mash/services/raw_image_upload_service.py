@@ -23,6 +23,7 @@ import traceback
 from mash.mash_exceptions import MashException
 from mash.services.upload.config import UploadConfig
 from mash.services.listener_service import ListenerService
+from mash.services.async_listener_service import AsyncListenerService
 from mash.services.job_factory import BaseJobFactory
 
 from mash.services.upload.azure_sas_job import AzureSASUploadJob
@@ -51,10 +52,17 @@ def main():
             can_skip=True
         )
 
+        config = UploadConfig()
+
+        if config.get_listener_engine(service_name) == 'asyncio':
+            listener_class = AsyncListenerService
+        else:
+            listener_class = ListenerService
+
         # run service, enter main loop
-        ListenerService(
+        listener_class(
             service_exchange=service_name,
-            config=UploadConfig(),
+            config=config,
             custom_args={
                 'job_factory': job_factory
             }
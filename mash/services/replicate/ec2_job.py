@@ -16,6 +16,7 @@
 # along with mash.  If not, see <http://www.gnu.org/licenses/>
 #
 
+import asyncio
 import time
 
 from botocore.exceptions import ClientError
@@ -54,17 +55,81 @@ class EC2ReplicateJob(MashJob):
         """
         Replicate image to all target regions in each source region.
         """
+        self._reset_results()
+        self.request_credentials(self._get_accounts())
+        self._replicate_source_regions()
+
+        if self.source_region_results:
+            # Wait for images to replicate, this will take time.
+            # Only wait if at least one region was replicated.
+            time.sleep(300)
+
+        for target_region, reg_info in self.source_region_results.items():
+            credential = reg_info['account']
+
+            if reg_info['image_id']:
+                try:
+                    self._wait_on_image(
+                        credential['access_key_id'],
+                        credential['secret_access_key'],
+                        reg_info['image_id'],
+                        target_region
+                    )
+                except Exception as error:
+                    self._replicate_failed(target_region, error)
+
+    async def run_job_async(self):
+        """
+        Replicate image to all target regions in each source region.
+
+        EC2 API calls run in the executor and waits are native
+        asyncio sleeps.
+        """
+        self._reset_results()
+        await self.request_credentials_async(self._get_accounts())
+        await self.run_blocking(self._replicate_source_regions)
+
+        if self.source_region_results:
+            await asyncio.sleep(300)
+
+        for target_region, reg_info in self.source_region_results.items():
+            credential = reg_info['account']
+
+            if reg_info['image_id']:
+                try:
+                    await self._wait_on_image_async(
+                        credential['access_key_id'],
+                        credential['secret_access_key'],
+                        reg_info['image_id'],
+                        target_region
+                    )
+                except Exception as error:
+                    self._replicate_failed(target_region, error)
+
+    def _reset_results(self):
+        """
+        Reset job status and region results before a new run.
+        """
         self.status = SUCCESS
         self.source_region_results = defaultdict(dict)
         self.cloud_image_name = self.status_msg['cloud_image_name']
 
-        # Get all account credentials in one request
+    def _get_accounts(self):
+        """
+        Return the accounts for all source regions.
+
+        All account credentials are retrieved in one request.
+        """
         accounts = []
         for source_region, reg_info in self.replicate_source_regions.items():
             accounts.append(reg_info['account'])
 
-        self.request_credentials(accounts)
+        return accounts
 
+    def _replicate_source_regions(self):
+        """
+        Start replication of image to all target regions.
+        """
         for source_region, reg_info in self.replicate_source_regions.items():
             credential = self.credentials[reg_info['account']]
 
@@ -96,30 +161,17 @@ class EC2ReplicateJob(MashJob):
                     self.source_region_results[target_region]['account'] = \
                         credential
 
-        if self.source_region_results:
-            # Wait for images to replicate, this will take time.
-            # Only wait if at least one region was replicated.
-            time.sleep(300)
-
-        for target_region, reg_info in self.source_region_results.items():
-            credential = reg_info['account']
-
-            if reg_info['image_id']:
-                try:
-                    self._wait_on_image(
-                        credential['access_key_id'],
-                        credential['secret_access_key'],
-                        reg_info['image_id'],
-                        target_region
-                    )
-                except Exception as error:
-                    self.status = FAILED
-                    msg = 'Replicate to {0} region failed: {1}'.format(
-                        target_region,
-                        error
-                    )
-                    self.add_error_msg(msg)
-                    self.log_callback.warning(msg)
+    def _replicate_failed(self, target_region, error):
+        """
+        Set job failed and log error for the target region.
+        """
+        self.status = FAILED
+        msg = 'Replicate to {0} region failed: {1}'.format(
+            target_region,
+            error
+        )
+        self.add_error_msg(msg)
+        self.log_callback.warning(msg)
 
     def _replicate_to_region(
         self, credential, image_id, source_region, target_region
@@ -154,38 +206,74 @@ class EC2ReplicateJob(MashJob):
         return new_image['ImageId']
 
     @staticmethod
-    def _wait_on_image(access_key_id, secret_access_key, image_id, region):
+    def _get_image_state(access_key_id, secret_access_key, image_id, region):
+        """
+        Return the state of the image in the given region.
+
+        Raise an exception if the image is not found or has failed.
+        """
+        client = get_client(
+            'ec2',
+            access_key_id,
+            secret_access_key,
+            region
+        )
+
+        try:
+            images = describe_images(client, [image_id])
+            state = images[0]['State']
+        except (IndexError, KeyError, ClientError):
+            raise MashReplicateException(
+                'The image with ID: {0} was not found.'.format(
+                    image_id
+                )
+            )
+
+        if state == 'failed':
+            raise MashReplicateException(
+                'The image with ID: {0} reached a failed state.'.format(
+                    image_id
+                )
+            )
+
+        return state
+
+    @classmethod
+    def _wait_on_image(
+        cls, access_key_id, secret_access_key, image_id, region
+    ):
         """
         Wait on image to finish replicating in the given region.
         """
         while True:
-            client = get_client(
-                'ec2',
+            state = cls._get_image_state(
+                access_key_id, secret_access_key, image_id, region
+            )
+
+            if state == 'available':
+                break
+            elif state == 'pending':
+                time.sleep(60)
+
+    async def _wait_on_image_async(
+        self, access_key_id, secret_access_key, image_id, region
+    ):
+        """
+        Wait on image to finish replicating in the given region.
+        """
+        while True:
+            state = await self.run_blocking(
+                self._get_image_state,
                 access_key_id,
                 secret_access_key,
+                image_id,
                 region
             )
 
-            try:
-                images = describe_images(client, [image_id])
-                state = images[0]['State']
-            except (IndexError, KeyError, ClientError):
-                raise MashReplicateException(
-                    'The image with ID: {0} was not found.'.format(
-                        image_id
-                    )
-                )
-
             if state == 'available':
                 break
-            elif state == 'failed':
-                raise MashReplicateException(
-                    'The image with ID: {0} reached a failed state.'.format(
-                        image_id
-                    )
-                )
             elif state == 'pending':
-                time.sleep(60)
+                await asyncio.sleep(60)
 
     @staticmethod
     def image_exists(client, cloud_image_name):
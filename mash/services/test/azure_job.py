@@ -68,6 +68,7 @@ class AzureTestJob(MashJob):
 
         if not self.instance_type:
             self.instance_type = random.choice(instance_types)
+            self.job_config['instance_type'] = self.instance_type
 
         self.ssh_private_key_file = self.config.get_ssh_private_key_file()
         self.img_proof_timeout = self.config.get_img_proof_timeout()
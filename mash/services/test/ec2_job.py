@@ -83,6 +83,7 @@ class EC2TestJob(MashJob):
             self.instance_type = random.choice(
                 instance_types[self.cloud_architecture]
             )
+            self.job_config['instance_type'] = self.instance_type
 
         self.ssh_private_key_file = self.config.get_ssh_private_key_file()
         self.img_proof_timeout = self.config.get_img_proof_timeout()
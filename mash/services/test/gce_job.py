@@ -89,12 +89,15 @@ class GCETestJob(MashJob):
             self.sev_capable = False
 
         if 'GVNIC' in self.guest_os_features:
-            self.test_gvnic_with = random.choice(self.boot_firmware)
+            self.test_gvnic_with = self.job_config.setdefault(
+                'test_gvnic_with', random.choice(self.boot_firmware)
+            )
         else:
             self.test_gvnic_with = None
 
         if not self.instance_type:
             self.instance_type = random.choice(instance_types)
+            self.job_config['instance_type'] = self.instance_type
 
         self.ssh_private_key_file = self.config.get_ssh_private_key_file()
         self.img_proof_timeout = self.config.get_img_proof_timeout()
@@ -24,6 +24,7 @@ import traceback
 from mash.mash_exceptions import MashException
 from mash.services.test.config import TestConfig
 from mash.services.listener_service import ListenerService
+from mash.services.async_listener_service import AsyncListenerService
 from mash.services.job_factory import BaseJobFactory
 
 from mash.services.test.azure_job import AzureTestJob
@@ -56,10 +57,17 @@ def main():
             }
         )
 
+        config = TestConfig()
+
+        if config.get_listener_engine(service_name) == 'asyncio':
+            listener_class = AsyncListenerService
+        else:
+            listener_class = ListenerService
+
         # run service, enter main loop
-        ListenerService(
+        listener_class(
             service_exchange=service_name,
-            config=TestConfig(),
+            config=config,
             custom_args={
                 'job_factory': job_factory
             }
@@ -0,0 +1,146 @@
+# Copyright (c) 2020 SUSE LLC.  All rights reserved.
+#
+# This file is part of mash.
+#
+# mash is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# mash is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with mash.  If not, see <http://www.gnu.org/licenses/>
+#
+
+import gzip
+import json
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+from mash.mash_exceptions import MashCodecException
+
+JSON_CONTENT_TYPE = 'application/json'
+MSGPACK_CONTENT_TYPE = 'application/msgpack'
+
+
+def json_dumps(data):
+    """Serialize data to compact json."""
+    return json.dumps(data, separators=(',', ':')).encode('utf-8')
+
+
+def gzip_compress(body):
+    """Compress body with a fast gzip level."""
+    return gzip.compress(body, compresslevel=1)
+
+
+def zstd_compress(body):
+    """Compress body with zstd, compressors are not thread safe."""
+    return zstandard.ZstdCompressor().compress(body)
+
+
+def zstd_decompress(body):
+    """Decompress zstd frame."""
+    return zstandard.ZstdDecompressor().decompress(body)
+
+
+serializers = {
+    JSON_CONTENT_TYPE: (json_dumps, json.loads)
+}
+
+if msgpack:
+    serializers[MSGPACK_CONTENT_TYPE] = (msgpack.packb, msgpack.unpackb)
+
+compressors = {
+    'gzip': (gzip_compress, gzip.decompress)
+}
+
+if zstandard:
+    compressors['zstd'] = (zstd_compress, zstd_decompress)
+
+
+def get_serializer(content_type):
+    """
+    Return serialize and deserialize function for the content type.
+    """
+    try:
+        return serializers[content_type]
+    except KeyError:
+        raise MashCodecException(
+            'Content type {0} is not supported.'.format(content_type)
+        )
+
+
+def get_compressor(content_encoding):
+    """
+    Return compress and decompress function for the content encoding.
+    """
+    try:
+        return compressors[content_encoding]
+    except KeyError:
+        raise MashCodecException(
+            'Content encoding {0} is not supported.'.format(content_encoding)
+        )
+
+
+def encode_message(
+    data, content_type=JSON_CONTENT_TYPE, compression=None,
+    compress_threshold=0
+):
+    """
+    Serialize and optionally compress the message data.
+
+    Data that is already a json string is sent as is. The body is
+    compressed if it is larger than the threshold in bytes.
+
+    Return the body and the message properties that describe the
+    encoding for the consumer.
+    """
+    if isinstance(data, str):
+        content_type = JSON_CONTENT_TYPE
+        body = data
+    else:
+        body = get_serializer(content_type)[0](data)
+
+    properties = {'content_type': content_type}
+
+    if compression and len(body) > compress_threshold:
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+
+        body = get_compressor(compression)[0](body)
+        properties['content_encoding'] = compression
+
+    return body, properties
+
+
+def decode_message(body, content_type=None, content_encoding=None):
+    """
+    Decompress and deserialize message body based on the properties.
+
+    Messages without content type are json. A body that was decoded
+    to a string by the AMQP client is encoded again before binary
+    formats are decoded.
+    """
+    if content_encoding:
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+
+        body = get_compressor(content_encoding)[1](body)
+
+    content_type = content_type or JSON_CONTENT_TYPE
+    if content_type != JSON_CONTENT_TYPE and isinstance(body, str):
+        body = body.encode('utf-8')
+
+    return get_serializer(content_type)[1](body)
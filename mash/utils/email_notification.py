@@ -16,22 +16,40 @@
 # along with mash.  If not, see <http://www.gnu.org/licenses/>
 #
 
+import queue
 import smtplib
+import threading
+import time
 
+from collections import defaultdict, deque
 from email.message import EmailMessage
+from smtplib import SMTPException, SMTPServerDisconnected
 
 
 class EmailNotification(object):
     """
     For sending job notification emails.
+
+    The SMTP connection is kept open and re-used for subsequent
+    emails. If the connection has been idle for longer than the
+    idle timeout or the server dropped it a new connection is opened.
     """
 
-    def __init__(self, host, port, user, password, ssl, log_callback=None):
+    def __init__(
+        self, host, port, user, password, ssl, log_callback=None,
+        timeout=30, idle_timeout=60
+    ):
         self.host = host
         self.port = port
         self.user = user
         self.password = password
         self.log_callback = log_callback
+        self.timeout = timeout
+        self.idle_timeout = idle_timeout
+
+        self.smtp_server = None
+        self.last_used = 0
+        self.lock = threading.Lock()
 
         if ssl:
             self.smtp_class = smtplib.SMTP_SSL
@@ -52,24 +70,86 @@ class EmailNotification(object):
 
         return email_msg
 
+    def _connect(self):
+        """
+        Return an open SMTP connection, connecting if required.
+        """
+        idle = time.monotonic() - self.last_used
+
+        if self.smtp_server and idle > self.idle_timeout:
+            self.close()
+
+        if not self.smtp_server:
+            smtp_server = self.smtp_class(
+                self.host, self.port, timeout=self.timeout
+            )
+
+            if self.user and self.password:
+                smtp_server.login(self.user, self.password)
+
+            self.smtp_server = smtp_server
+
+        return self.smtp_server
+
+    def close(self):
+        """
+        Close the SMTP connection.
+        """
+        smtp_server, self.smtp_server = self.smtp_server, None
+
+        if smtp_server:
+            try:
+                smtp_server.quit()
+            except Exception:
+                pass
+
     def _send_email(self, email_msg):
         """
         Send email message using smtp server.
 
+        If the connection of an existing session was dropped the
+        message is sent once more on a new connection. Other errors,
+        such as rejected recipients, are logged without retry.
+
         :param email_msg:  email.message.EmailMessage
         """
-        try:
-            smtp_server = self.smtp_class(self.host, self.port)
+        with self.lock:
+            for attempt in range(2):
+                reused = self.smtp_server is not None
 
-            if self.user and self.password:
-                smtp_server.login(self.user, self.password)
+                try:
+                    self._connect().send_message(email_msg)
+                except SMTPServerDisconnected as error:
+                    dropped = error
+                except SMTPException as error:
+                    # Rejected sender, recipients or message, the
+                    # connection is still usable.
+                    self._log_send_error(error)
+                    return
+                except OSError as error:
+                    # Timeouts and connection errors, TimeoutError is
+                    # not socket.timeout before Python 3.10.
+                    dropped = error
+                except Exception as error:
+                    self.close()
+                    self._log_send_error(error)
+                    return
+                else:
+                    self.last_used = time.monotonic()
+                    return
 
-            smtp_server.send_message(email_msg)
-        except Exception as error:
-            if self.log_callback:
-                self.log_callback.warning(
-                    'Unable to send notification email: {0}'.format(error)
-                )
+                self.close()
+
+                # Retry once if the server dropped the connection
+                if not (reused and attempt == 0):
+                    self._log_send_error(dropped)
+                    return
+
+    def _log_send_error(self, error):
+        if self.log_callback:
+            self.log_callback.warning(
+                'Unable to send notification email: {0}'.format(error)
+            )
 
     def send_notification(self, content, subject, notification_email):
         """
@@ -77,3 +157,174 @@ class EmailNotification(object):
         """
         email_msg = self._create_email_message(content, subject, notification_email)
         self._send_email(email_msg)
+
+
+class NotificationWorker(object):
+    """
+    Sends notification emails in a background thread.
+
+    Notifications are put on a bounded queue, if the queue is full
+    the notification is dropped. At most one email per min_interval
+    seconds is sent to a recipient, further notifications wait. With
+    digest enabled all waiting notifications of a recipient are sent
+    in one email.
+    """
+
+    def __init__(
+        self, notification_class, min_interval=10, digest=False,
+        max_queue_size=1000, log_callback=None
+    ):
+        self.notification_class = notification_class
+        self.min_interval = min_interval
+        self.digest = digest
+        self.max_queue_size = max_queue_size
+        self.log_callback = log_callback
+
+        self.queue = queue.Queue(max_queue_size)
+        self.pending = defaultdict(deque)
+        self.pending_count = 0
+        self.next_send = {}
+        self._stop = object()
+        self.stopping = threading.Event()
+
+        self.worker = threading.Thread(
+            target=self._run, name='NotificationWorker', daemon=True
+        )
+        self.worker.start()
+
+    def send_notification(self, content, subject, notification_email):
+        """
+        Queue job notification email.
+        """
+        try:
+            self.queue.put_nowait((content, subject, notification_email))
+        except queue.Full:
+            self._log_warning(
+                'Notification queue full, dropped notification '
+                'to {0}'.format(notification_email)
+            )
+
+    def _log_warning(self, msg):
+        if self.log_callback:
+            self.log_callback.warning(msg)
+
+    def _add_pending(self, notification):
+        """
+        Add notification to the pending notifications of the recipient.
+        """
+        if self.pending_count >= self.max_queue_size:
+            self._log_warning(
+                'Too many pending notifications, dropped notification '
+                'to {0}'.format(notification[2])
+            )
+            return
+
+        self.pending[notification[2]].append(notification)
+        self.pending_count += 1
+
+    def _get_digest(self, notifications):
+        """
+        Return content and subject of a digest of the notifications.
+        """
+        content = '\n\n{0}\n\n'.format('-' * 40).join(
+            content for content, subject, to_email in notifications
+        )
+        subject = '{0} ({1} jobs)'.format(
+            notifications[0][1], len(notifications)
+        )
+        return content, subject
+
+    def _send_pending(self, force=False):
+        """
+        Send pending notifications of recipients that are not rate limited.
+
+        Returns the time until the next notification is due.
+        """
+        now = time.monotonic()
+        waits = []
+
+        for to_email in list(self.pending):
+            notifications = self.pending[to_email]
+            due = self.next_send.get(to_email, 0)
+
+            if not force and now < due:
+                waits.append(due - now)
+                continue
+
+            if self.digest and len(notifications) > 1:
+                batch = list(notifications)
+                notifications.clear()
+                content, subject = self._get_digest(batch)
+            else:
+                batch = [notifications.popleft()]
+                content, subject = batch[0][:2]
+
+            self.pending_count -= len(batch)
+            self.next_send[to_email] = now + self.min_interval
+
+            if notifications:
+                waits.append(self.min_interval)
+            else:
+                del self.pending[to_email]
+
+            # Notifications are removed from pending before sending,
+            # a failed send does not leave an empty pending entry.
+            self.notification_class.send_notification(
+                content, subject, to_email
+            )
+
+        # Forget rate limits that expired
+        for to_email, due in list(self.next_send.items()):
+            if due < now and to_email not in self.pending:
+                del self.next_send[to_email]
+
+        return min(waits) if waits else None
+
+    def _run(self):
+        """
+        Receive queued notifications and send them when due.
+        """
+        wait = None
+
+        while True:
+            if self.stopping.is_set() and self.queue.empty():
+                notification = self._stop
+            else:
+                try:
+                    notification = self.queue.get(timeout=wait)
+                except queue.Empty:
+                    notification = None
+
+            if notification is self._stop:
+                while self.pending:
+                    self._send_pending(force=True)
+
+                self.notification_class.close()
+                return
+
+            if notification:
+                self._add_pending(notification)
+
+            try:
+                wait = self._send_pending()
+            except Exception as error:
+                self._log_warning(
+                    'Unable to send notifications: {0}'.format(error)
+                )
+                wait = self.min_interval
+
+    def close(self, timeout=30):
+        """
+        Send pending notifications and stop the worker.
+
+        If the queue is full the worker stops once the queued
+        notifications have been received.
+        """
+        self.stopping.set()
+
+        try:
+            self.queue.put_nowait(self._stop)
+        except queue.Full:
+            pass
+
+        self.worker.join(timeout)
@@ -17,9 +17,11 @@
 #
 
 import datetime
+import gzip
 import json
 import logging
 import os
+import shutil
 import random
 import requests
 import hashlib
@@ -29,6 +31,7 @@ from cryptography.hazmat.primitives.asymmetric import rsa
 from cryptography.hazmat.primitives import serialization
 
 from contextlib import contextmanager, suppress
+from logging.handlers import WatchedFileHandler
 from string import ascii_lowercase
 from tempfile import NamedTemporaryFile
 
@@ -140,12 +143,38 @@ def remove_file(file_path):
         pass
 
 
-def persist_json(file_path, data):
+def compress_file(file_path):
     """
-    Persist the json data to a file on disk.
+    Compress file with gzip and remove the uncompressed file.
+
+    If the compressed file exists the data is appended to it as a new
+    gzip member, readers of the compressed file get the earlier data
+    followed by the new data. The compressed file keeps the
+    modification time of the original. Returns the path of the
+    compressed file.
     """
-    with open(file_path, 'w') as json_file:
-        json_file.write(JsonFormat.json_message(data))
+    target = ''.join([file_path, '.gz'])
+    temp_target = ''.join([target, '.tmp'])
+    stat = os.stat(file_path)
+
+    try:
+        with open(temp_target, 'wb') as temp_file:
+            if os.path.exists(target):
+                with open(target, 'rb') as compressed:
+                    shutil.copyfileobj(compressed, temp_file)
+
+            with open(file_path, 'rb') as source, \
+                    gzip.GzipFile(fileobj=temp_file, mode='wb') as member:
+                shutil.copyfileobj(source, member)
+    except Exception:
+        remove_file(temp_target)
+        raise
+
+    os.utime(temp_target, (stat.st_atime, stat.st_mtime))
+    os.rename(temp_target, target)
+    os.remove(file_path)
+
+    return target
 
 
 def load_json(file_path):
@@ -158,22 +187,6 @@ def load_json(file_path):
     return data
 
 
-def restart_job(job_file, callback):
-    """
-    Restart job from config file using callback.
-    """
-    job_config = load_json(job_file)
-    callback(job_config)
-
-
-def restart_jobs(job_dir, callback):
-    """
-    Restart all jobs in job_dir using callback.
-    """
-    for job_file in os.listdir(job_dir):
-        restart_job(os.path.join(job_dir, job_file), callback)
-
-
 def handle_request(url, endpoint, method, job_data=None):
     """
     Post request based on endpoint and data.
@@ -200,6 +213,31 @@ def handle_request(url, endpoint, method, job_data=None):
     return response
 
 
+async def handle_request_async(session, url, endpoint, method, job_data=None):
+    """
+    Send request based on endpoint and data using an aiohttp session.
+
+    If response is unsuccessful raise exception. Otherwise the
+    decoded json response body is returned.
+    """
+    data = None if not job_data else JsonFormat.json_message(job_data)
+    uri = ''.join([url, endpoint])
+
+    async with session.request(method, uri, data=data) as response:
+        if response.status not in (200, 201):
+            try:
+                msg = (await response.json(content_type=None))['msg']
+            except Exception:
+                msg = 'Request to {uri} failed: {reason}'.format(
+                    uri=uri,
+                    reason=response.reason
+                )
+
+            raise MashException(msg)
+
+        return await response.json(content_type=None)
+
+
 def setup_logfile(logfile):
     """
     Create log dir and log file if either does not already exist.
@@ -213,7 +251,9 @@ def setup_logfile(logfile):
             'Log setup failed: {0}'.format(e)
         )
 
-    logfile_handler = logging.FileHandler(
+    # The cleanup service rotates the log files, the handler
+    # re-opens the file when it has been moved away.
+    logfile_handler = WatchedFileHandler(
         filename=logfile, encoding='utf-8'
     )
 
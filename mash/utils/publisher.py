@@ -0,0 +1,214 @@
+# Copyright (c) 2020 SUSE LLC.  All rights reserved.
+#
+# This file is part of mash.
+#
+# mash is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# mash is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with mash.  If not, see <http://www.gnu.org/licenses/>
+#
+
+import threading
+import time
+
+from collections import OrderedDict
+from concurrent.futures import Future, wait as wait_futures
+
+from amqpstorm import AMQPChannelError, AMQPMessageError
+
+# The frames of pamqp 2.x, the version amqpstorm 2.x is built on
+from pamqp import specification
+
+
+class ConfirmPublisher(object):
+    """
+    Publish messages on a channel with pipelined publisher confirms.
+
+    Amqpstorm waits for the confirm of every message before the next
+    message can be published on a channel in confirm mode. The
+    publisher selects confirm mode itself and tracks the delivery
+    tags of up to window outstanding messages. Each publish returns a
+    future that is resolved when the broker acks the message. The
+    future fails if the broker nacks the message or returns it as
+    unroutable.
+
+    The publisher owns the channel, it must not be used to publish
+    or consume directly.
+    """
+
+    def __init__(self, channel, window=64, timeout=60):
+        self.channel = channel
+        self.window = window
+        self.timeout = timeout
+
+        self.pending = OrderedDict()
+        self.delivery_tag = 0
+        self.error = None
+        self.condition = threading.Condition()
+
+        # Basic.Return is followed by the content frames of the message
+        self.returned = None
+        self.return_body_size = None
+
+        self._on_frame = channel.on_frame
+        channel.on_frame = self.on_frame
+        channel.rpc_request(specification.Confirm.Select())
+
+    @property
+    def is_open(self):
+        """
+        Return True if the channel is open and has not failed.
+        """
+        return self.channel.is_open and not self.error
+
+    def on_frame(self, frame_in):
+        """
+        Handle frame received on the channel.
+
+        Confirms and returned messages are handled by the publisher,
+        other frames by the channel.
+        """
+        if frame_in.name in ('Basic.Ack', 'Basic.Nack'):
+            self._confirm(frame_in)
+        elif frame_in.name == 'Basic.Return':
+            self.returned = AMQPMessageError(
+                "Message not delivered: {0} ({1}) to queue '{2}' "
+                "from exchange '{3}'".format(
+                    frame_in.reply_text,
+                    frame_in.reply_code,
+                    frame_in.routing_key,
+                    frame_in.exchange
+                ),
+                reply_code=frame_in.reply_code
+            )
+            self.return_body_size = 0
+        elif self.return_body_size is not None and \
+                frame_in.name == 'ContentHeader':
+            self.return_body_size = frame_in.body_size or None
+        elif self.return_body_size is not None and \
+                frame_in.name == 'ContentBody':
+            self.return_body_size -= len(frame_in.value)
+            if self.return_body_size <= 0:
+                self.return_body_size = None
+        else:
+            self._on_frame(frame_in)
+
+            if frame_in.name == 'Channel.Close':
+                self._fail(AMQPChannelError('Channel closed by broker'))
+
+    def _confirm(self, frame_in):
+        """
+        Resolve the futures of the confirmed delivery tags.
+
+        The broker sends Basic.Return of an unroutable message right
+        before the ack of the message, the return belongs to the
+        delivery tag of the next ack.
+        """
+        with self.condition:
+            tag = frame_in.delivery_tag
+
+            if frame_in.multiple:
+                tags = [
+                    pending_tag for pending_tag in self.pending
+                    if pending_tag <= tag or not tag
+                ]
+            else:
+                tags = [tag] if tag in self.pending else []
+
+            for pending_tag in tags:
+                future = self.pending.pop(pending_tag)
+
+                if frame_in.name == 'Basic.Nack':
+                    future.set_exception(
+                        AMQPMessageError('Message not confirmed by broker')
+                    )
+                elif self.returned and pending_tag == tag:
+                    future.set_exception(self.returned)
+                else:
+                    future.set_result(True)
+
+            self.returned = None
+            self.condition.notify_all()
+
+    def _fail(self, error):
+        """
+        Fail all pending futures, no confirms arrive for them.
+        """
+        with self.condition:
+            self.error = error
+
+            for future in self.pending.values():
+                future.set_exception(error)
+
+            self.pending.clear()
+            self.condition.notify_all()
+
+    def publish(self, body, routing_key, exchange, properties):
+        """
+        Publish a mandatory message and return the future of its confirm.
+
+        Blocks while window messages are waiting for their confirm.
+        """
+        with self.condition:
+            if not self.condition.wait_for(
+                lambda: self.error or len(self.pending) < self.window,
+                self.timeout
+            ):
+                raise AMQPChannelError(
+                    'Timed out waiting for publisher confirms'
+                )
+
+            if self.error:
+                raise self.error
+
+            self.delivery_tag += 1
+            future = self.pending[self.delivery_tag] = Future()
+
+            try:
+                self.channel.basic.publish(
+                    body=body,
+                    routing_key=routing_key,
+                    exchange=exchange,
+                    properties=properties,
+                    mandatory=True
+                )
+            except Exception as error:
+                # Delivery tags are out of sync with the broker
+                self._fail(error)
+                raise
+
+        return future
+
+    def wait(self, futures):
+        """
+        Wait for the confirms of the futures.
+
+        Raises the error of the first message that was not confirmed.
+        If the confirms time out all pending messages fail and the
+        publisher is closed.
+        """
+        deadline = time.monotonic() + self.timeout
+
+        for future in futures:
+            while not wait_futures([future], timeout=1).done:
+                if self.channel.is_closed:
+                    self._fail(AMQPChannelError('Channel closed'))
+                elif time.monotonic() > deadline:
+                    # Confirms of the window may never arrive
+                    self._fail(
+                        AMQPChannelError(
+                            'Timed out waiting for publisher confirms'
+                        )
+                    )
+
+            error = future.exception()
+            if error:
+                raise error
@@ -38,6 +38,10 @@ BuildRequires:  python3-cryptography >= 2.2.0
 BuildRequires:  python3-PyYAML
 BuildRequires:  python3-PyJWT
 BuildRequires:  python3-amqpstorm >= 2.4.0
+BuildRequires:  python3-amqpstorm < 3.0.0
+BuildRequires:  python3-pamqp < 3.0.0
+BuildRequires:  python3-aio-pika < 7.0.0
+BuildRequires:  python3-aiohttp
 BuildRequires:  python3-APScheduler >= 3.3.1
 BuildRequires:  python3-python-dateutil >= 2.6.0
 BuildRequires:  python3-ec2imgutils >= 9.0.1
@@ -68,6 +72,10 @@ Requires:       python3-cryptography >= 2.2.0
 Requires:       python3-PyYAML
 Requires:       python3-PyJWT
 Requires:       python3-amqpstorm >= 2.4.0
+Requires:       python3-amqpstorm < 3.0.0
+Requires:       python3-pamqp < 3.0.0
+Requires:       python3-aio-pika < 7.0.0
+Requires:       python3-aiohttp
 Requires:       python3-APScheduler >= 3.3.1
 Requires:       python3-python-dateutil >= 2.6.0
 Requires:       python3-ec2imgutils >= 9.0.1
@@ -0,0 +1,232 @@
+import os
+
+from pytest import raises
+from tempfile import TemporaryDirectory
+from unittest.mock import Mock, patch
+
+from mash.log.job_log import (
+    compress_job_log,
+    delete_job_log,
+    JobLogIndex,
+    format_index_entry,
+    get_index_file,
+    get_job_log_file,
+    get_log_size,
+    is_job_log_removed,
+    open_log,
+    read_index,
+    read_job_log
+)
+from mash.utils.mash_utils import compress_file
+
+
+class TestJobLog(object):
+    def setup(self):
+        self.test_dir = TemporaryDirectory()
+        self.log_file = os.path.join(self.test_dir.name, '4711.log')
+
+        records = [
+            ('Obs image\n', 10.0, 'OBSImageBuildResultService'),
+            ('Upload image\n', 20.0, 'UploadService'),
+            ('Test image\n', 30.0, 'TestService'),
+            ('Upload done\n', 40.0, 'UploadService')
+        ]
+
+        offset = 0
+        with open(self.log_file, 'w') as job_log, \
+                open(get_index_file(self.log_file), 'w') as index_log:
+            for msg, created, service in records:
+                job_log.write(msg)
+                index_log.write(format_index_entry(offset, created, service))
+                offset += len(msg)
+
+    def teardown(self):
+        self.test_dir.cleanup()
+
+    def test_read_index(self):
+        entries = read_index(self.log_file)
+
+        assert len(entries) == 4
+        assert entries[1].offset == 10
+        assert entries[1].created == 20.0
+        assert entries[1].service == 'UploadService'
+
+        os.remove(get_index_file(self.log_file))
+        assert read_index(self.log_file) == []
+
+    def test_get_job_log_file(self):
+        assert get_job_log_file('/var/log/mash/jobs', '4711') == \
+            '/var/log/mash/jobs/4711.log'
+
+    def test_job_log_index_search(self):
+        # Index with lines of different length
+        with open(get_index_file(self.log_file), 'w') as index_log:
+            for number in range(1000):
+                index_log.write(
+                    format_index_entry(
+                        number * 10,
+                        1000.0 + number,
+                        'TestService' if number % 3 else 'Upload'
+                    )
+                )
+
+            # Line that is still being written
+            index_log.write('10000 2000')
+
+        with JobLogIndex(self.log_file) as index:
+            for offset in (0, 5, 10, 4995, 9990, 20000):
+                entry = next(index.get_entries(offset))
+                assert entry.offset == min(offset // 10 * 10, 9990)
+
+            assert index.find_created(1500.5).offset == 5010
+            assert index.find_created(3000) is None
+            assert index.find_tail(3).offset == 9970
+            assert index.find_tail(2000).offset == 0
+            assert len(list(index.get_entries())) == 1000
+
+    def test_job_log_index_created_skew(self):
+        with open(get_index_file(self.log_file), 'w') as index_log:
+            for number in range(100):
+                index_log.write(
+                    format_index_entry(number * 10, 1000.0 + number, '-')
+                )
+
+            # Record written late but within the skew
+            index_log.write(format_index_entry(1000, 1050.0, '-'))
+            index_log.write(format_index_entry(1010, 1101.0, '-'))
+
+        with JobLogIndex(self.log_file) as index:
+            assert index.find_created(1100.5).offset == 1010
+
+    def test_job_log_index_missing(self):
+        os.remove(get_index_file(self.log_file))
+
+        with JobLogIndex(self.log_file) as index:
+            assert index.empty
+            assert list(index.get_entries()) == []
+
+    def test_read_job_log(self):
+        result = read_job_log(self.log_file)
+
+        assert result == {
+            'logs': 'Obs image\nUpload image\nTest image\nUpload done\n',
+            'offset': 0,
+            'next_offset': 46,
+            'size': 46
+        }
+
+        # Byte range
+        result = read_job_log(self.log_file, offset=10, max_bytes=13)
+        assert result['logs'] == 'Upload image\n'
+        assert result['next_offset'] == 23
+
+        # Offset past end of log
+        result = read_job_log(self.log_file, offset=100)
+        assert result['logs'] == ''
+        assert result['next_offset'] == 46
+
+    def test_read_job_log_since(self):
+        result = read_job_log(self.log_file, since=25)
+        assert result['logs'] == 'Test image\nUpload done\n'
+        assert result['offset'] == 23
+
+        result = read_job_log(self.log_file, since=50)
+        assert result['logs'] == ''
+        assert result['offset'] == 46
+
+    def test_read_job_log_since_unordered(self):
+        # Records of services are not written in order of creation
+        with open(get_index_file(self.log_file), 'w') as index_log:
+            index_log.write(format_index_entry(0, 30.0, 'TestService'))
+            index_log.write(format_index_entry(10, 10.0, 'UploadService'))
+            index_log.write(format_index_entry(23, 20.0, 'UploadService'))
+            index_log.write(format_index_entry(34, 40.0, 'TestService'))
+
+        result = read_job_log(self.log_file, since=25)
+        assert result['offset'] == 0
+
+    def test_read_job_log_tail(self):
+        result = read_job_log(self.log_file, tail=1)
+        assert result['logs'] == 'Upload done\n'
+
+    def test_read_job_log_service(self):
+        result = read_job_log(self.log_file, service='UploadService')
+        assert result['logs'] == 'Upload image\nUpload done\n'
+        assert result['next_offset'] == 46
+
+        # Range limited to part of a record
+        result = read_job_log(
+            self.log_file, offset=12, max_bytes=15, service='UploadService'
+        )
+        assert result['logs'] == 'load image\n'
+        assert result['next_offset'] == 27
+
+    def test_read_compressed_job_log(self):
+        compress_file(self.log_file)
+        compress_file(get_index_file(self.log_file))
+
+        # Size cache is cleared when full
+        with patch.dict(
+            'mash.log.job_log._uncompressed_sizes',
+            {key: 0 for key in range(256)}
+        ) as sizes:
+            assert get_log_size(self.log_file) == 46
+            assert len(sizes) == 1
+
+        assert get_log_size(self.log_file) == 46
+
+        result = read_job_log(self.log_file, service='TestService')
+        assert result['logs'] == 'Test image\n'
+
+        delete_job_log(self.log_file)
+        assert not os.listdir(self.test_dir.name)
+
+        with raises(FileNotFoundError):
+            get_log_size(self.log_file)
+
+    def test_read_job_log_compressed_twice(self):
+        job_log = open(self.log_file, 'ab')
+        assert not is_job_log_removed(job_log, self.log_file)
+
+        assert compress_job_log(self.log_file) > 0
+
+        # Writers find the log was removed
+        assert is_job_log_removed(job_log, self.log_file)
+        job_log.close()
+
+        # The job logged again after its log was compressed
+        with open(self.log_file, 'w') as job_log, \
+                open(get_index_file(self.log_file), 'w') as index_log:
+            job_log.write('Test again\n')
+            index_log.write(format_index_entry(0, 50.0, 'TestService'))
+
+        # Both parts are read in order before and after compression
+        for compress in (False, True):
+            if compress:
+                compress_job_log(self.log_file)
+                assert sorted(os.listdir(self.test_dir.name)) == [
+                    '4711.log.gz', '4711.log.idx.gz'
+                ]
+
+            assert get_log_size(self.log_file) == 57
+            assert read_index(self.log_file)[-1].offset == 46
+
+            result = read_job_log(self.log_file, offset=40)
+            assert result['logs'] == ' done\nTest again\n'
+
+            result = read_job_log(self.log_file, service='TestService')
+            assert result['logs'] == 'Test image\nTest again\n'
+
+            result = read_job_log(self.log_file, tail=1)
+            assert result['logs'] == 'Test again\n'
+
+    @patch('mash.log.job_log.os.stat')
+    def test_open_log_compressed_while_opened(self, mock_stat):
+        # Log compressed after the parts were opened is opened again
+        mock_stat.side_effect = [Mock(st_ino=1), FileNotFoundError]
+
+        with open_log(self.log_file) as job_log:
+            assert job_log.size == 46
+            assert len(job_log.parts) == 1
+
+        assert mock_stat.call_count == 2
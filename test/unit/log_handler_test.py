@@ -1,10 +1,13 @@
+import json
 import logging
+import queue
 
-from unittest.mock import Mock, patch
+from unittest.mock import ANY, Mock, patch
 
 from mash.log.handler import (
     RabbitMQHandler,
-    RabbitMQSocket
+    RabbitMQSocket,
+    _stop
 )
 
 
@@ -27,15 +30,23 @@ class TestRabbitMQHandler(object):
         log.setLevel(logging.DEBUG)
 
         log.info('Job finished!', extra={'job_id': '4711'})
+        self.handler.flush()
         self.channel.basic.publish.assert_called_once_with(
             exchange='logger',
             routing_key='mash.logger',
-            body='{"job_id": "4711", "msg": "Job finished!"}',
+            body=ANY,
             properties={
                 'content_type': 'application/json',
                 'delivery_mode': 2
             }
         )
+        record = json.loads(
+            self.channel.basic.publish.call_args[1]['body']
+        )[0]
+        assert record['job_id'] == '4711'
+        assert record['msg'] == 'Job finished!'
+        assert record['name'] == 'log_handler_test'
+        assert 'created' in record
         self.channel.basic.publish.reset_mock()
 
         try:
@@ -43,7 +54,98 @@ class TestRabbitMQHandler(object):
         except Exception:
             log.exception('Test exc_info')
 
+        log.info('Job still finished!')
+        self.handler.close()
+        log.removeHandler(self.handler)
+
         assert self.channel.basic.publish.call_count == 1
+        body = self.channel.basic.publish.call_args[1]['body']
+        assert len(json.loads(body)) == 2
+        assert not self.handler.worker.is_alive()
+
+    def test_rabbit_handler_batch(self):
+        self.handler.batch_size = 2
+        self.handler.queue.put('{"msg": "1"}')
+        self.handler.queue.put('{"msg": "2"}')
+        self.handler.queue.put('{"msg": "3"}')
+
+        assert self.handler._get_batch() == ['{"msg": "1"}', '{"msg": "2"}']
+
+        self.handler.flush_interval = 0
+        assert self.handler._get_batch() == ['{"msg": "3"}']
+
+    @patch.object(RabbitMQHandler, 'send')
+    def test_rabbit_handler_drop(self, mock_send):
+        self.handler.queue = queue.Queue(1)
+        self.handler.worker = Mock()
+
+        with patch.object(RabbitMQHandler, '_start_worker'):
+            self.handler.emit(logging.makeLogRecord({'msg': 'first'}))
+            self.handler.emit(
+                logging.makeLogRecord({'msg': 'second', 'job_id': '4711'})
+            )
+            self.handler.emit(logging.makeLogRecord({'msg': 'third'}))
+
+        assert self.handler.dropped == {'4711': 1}
+
+        self.handler.queue.maxsize = 2
+        self.handler.queue.put(_stop)
+        self.handler._publish_records()
+
+        records = json.loads(mock_send.call_args[0][0])
+        assert [record['msg'] for record in records] == [
+            'first', 'RabbitMQHandler dropped 1 log records.'
+        ]
+        assert records[1]['job_id'] == '4711'
+        assert records[1]['name'] == 'RabbitMQHandler'
+        assert 'created' in records[1]
+        assert not self.handler.dropped
+
+    def test_rabbit_handler_block(self):
+        self.handler.overflow = 'block'
+
+        with patch.object(RabbitMQHandler, '_start_worker'):
+            self.handler.emit(logging.makeLogRecord({'msg': 'first'}))
+
+        assert json.loads(self.handler.queue.get_nowait())['msg'] == 'first'
+
+    @patch.object(RabbitMQHandler, 'handleError')
+    @patch.object(RabbitMQHandler, 'makePickle')
+    def test_rabbit_handler_format_error(
+        self, mock_make_pickle, mock_handle_error
+    ):
+        mock_make_pickle.side_effect = Exception('Cannot format')
+        record = logging.makeLogRecord({'msg': 'first'})
+
+        self.handler.emit(record)
+
+        mock_handle_error.assert_called_once_with(record)
+        assert self.handler.queue.empty()
+        assert self.handler.worker is None
+
+    @patch.object(RabbitMQHandler, 'send')
+    def test_rabbit_handler_send_error(self, mock_send):
+        mock_send.side_effect = Exception('Connection refused')
+        sock = Mock()
+        self.handler.sock = sock
+        self.handler.queue.put('{"msg": "1"}')
+        self.handler.queue.put(_stop)
+
+        self.handler._publish_records()
+
+        sock.close.assert_called_once_with()
+        assert self.handler.sock is None
+        assert self.handler.queue.unfinished_tasks == 0
+
+        # Closing the broken socket fails
+        sock.close.side_effect = Exception('Socket closed')
+        self.handler.sock = sock
+        self.handler.queue.put('{"msg": "2"}')
+        self.handler.queue.put(_stop)
+
+        self.handler._publish_records()
+
+        assert self.handler.sock is None
 
     @patch('mash.log.handler.Connection')
     def test_rabbit_socket(self, mock_connection):
@@ -90,3 +192,13 @@ class TestRabbitMQHandler(object):
         socket.close()
         self.connection.close.assert_called_once_with()
         self.channel.close.assert_called_once_with()
+
+    def test_rabbit_handler_close_timeout(self):
+        self.handler.worker = Mock()
+        self.handler.worker.is_alive.return_value = True
+
+        self.handler.close(timeout=2)
+
+        assert self.handler.queue.get_nowait() is _stop
+        self.handler.worker.join.assert_called_once_with(timeout=2)
+        self.handler.worker = None
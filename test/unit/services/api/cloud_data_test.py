@@ -0,0 +1,70 @@
+import os
+import shutil
+
+from tempfile import TemporaryDirectory
+
+from pytest import raises
+
+from mash.services.api.cloud_data import CloudData, freeze, thaw
+
+
+def test_freeze_thaw():
+    data = {'ec2': {'regions': {'aws': ['us-east-1']}}}
+    frozen = freeze(data)
+
+    assert frozen['ec2']['regions']['aws'] == ('us-east-1',)
+
+    with raises(TypeError):
+        frozen['ec2']['regions']['aws-cn'] = ('cn-north-1',)
+
+    assert thaw(frozen) == data
+
+
+def test_cloud_data_reload():
+    with TemporaryDirectory() as test_dir:
+        config_file = os.path.join(test_dir, 'mash_config.yaml')
+        shutil.copy('test/data/mash_config.yaml', config_file)
+
+        cloud_data = CloudData({}, config_file)
+        assert cloud_data.get_ec2_tables().regions == {}
+
+        # Unchanged file is not read again
+        tables = cloud_data.get_ec2_tables()
+        assert cloud_data.get_ec2_tables() is tables
+
+        # Modified file is reloaded
+        cloud_data.mtime = 0
+        tables = cloud_data.get_ec2_tables()
+        assert tables.regions['aws-cn'] == ('cn-north-1',)
+        assert tables.helper_images['cn-north-1'] == 'ami-bcc45885'
+
+        # Unreadable file keeps current data
+        with open(config_file, 'w') as config:
+            config.write('cloud: [')
+
+        cloud_data.mtime = 0
+        assert cloud_data.get_ec2_tables() is tables
+
+        # Missing file keeps current data
+        os.remove(config_file)
+        assert cloud_data.get_ec2_tables() is tables
+
+
+def test_cloud_data_reloaded_by_other_thread():
+    cloud_data = CloudData({}, 'test/data/mash_config.yaml')
+    mtime = cloud_data.mtime
+    tables = cloud_data.ec2
+
+    class Lock(object):
+        # Another thread reloads the data while waiting for the lock
+        def __enter__(self):
+            cloud_data.mtime = mtime
+
+        def __exit__(self, *args):
+            pass
+
+    cloud_data.mtime = 0
+    cloud_data.lock = Lock()
+
+    assert cloud_data.get_ec2_tables() is tables
+    assert cloud_data.mtime == mtime
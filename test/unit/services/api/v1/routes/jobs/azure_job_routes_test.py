@@ -121,3 +121,34 @@ def test_api_get_azure_job_schema(test_client):
     assert response.status_code == 200
     data = json.loads(response.data)  # assert json loads
     assert data['additionalProperties'] is False
+
+
+@patch('mash.services.api.v1.routes.jobs.create_jobs')
+@patch('mash.services.api.v1.routes.jobs.get_jwt_identity')
+@patch('flask_jwt_extended.view_decorators.verify_jwt_in_request')
+def test_api_add_jobs_azure(
+    mock_jwt_required,
+    mock_jwt_identity,
+    mock_create_jobs,
+    test_client
+):
+    mock_jwt_identity.return_value = 'user1'
+    mock_create_jobs.return_value = [
+        {'status': 201, 'job': {'job_id': '1'}}
+    ]
+
+    response = test_client.post(
+        '/v1/jobs/azure/batch',
+        content_type='application/json',
+        data=json.dumps({'jobs': [{'image': '1'}]})
+    )
+
+    assert response.status_code == 200
+    assert response.json['created'] == 1
+    assert response.json['failed'] == 0
+
+    job_docs, validate = mock_create_jobs.mock_calls[0][1]
+    assert job_docs == [
+        {'image': '1', 'cloud': 'azure', 'requesting_user': 'user1'}
+    ]
+    assert validate.__name__ == 'validate_azure_job'
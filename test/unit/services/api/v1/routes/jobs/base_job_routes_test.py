@@ -3,6 +3,8 @@ import json
 from datetime import datetime
 from unittest.mock import patch, Mock
 
+from mash.mash_exceptions import MashException, MashJobException
+
 
 @patch('mash.services.api.v1.routes.jobs.delete_job')
 @patch('mash.services.api.v1.routes.jobs.get_jwt_identity')
@@ -137,3 +139,202 @@ def test_api_get_job_list(
     assert result.json[0]['profile'] == 'Server'
     assert result.json[0]['state'] == 'pending'
     assert result.json[0]['start_time'] == '2011-11-11 11:11:11'
+
+
+@patch('mash.services.api.v1.routes.jobs.get_job_logs')
+@patch('mash.services.api.v1.routes.jobs.get_jwt_identity')
+@patch('flask_jwt_extended.view_decorators.verify_jwt_in_request')
+def test_api_get_job_logs(
+        mock_jwt_required,
+        mock_jwt_identity,
+        mock_get_job_logs,
+        test_client
+):
+    logs = {
+        'logs': 'Test image\n',
+        'offset': 23,
+        'next_offset': 34,
+        'size': 34
+    }
+    mock_get_job_logs.return_value = logs
+    mock_jwt_identity.return_value = 'user1'
+
+    result = test_client.get(
+        '/v1/jobs/12345678-1234-1234-1234-123456789012/logs'
+        '?since=25&service=TestService&wait=5'
+    )
+
+    assert result.status_code == 200
+    assert result.json == logs
+    mock_get_job_logs.assert_called_once_with(
+        '12345678-1234-1234-1234-123456789012',
+        'user1',
+        offset=0,
+        max_bytes=1048576,
+        since=25.0,
+        service='TestService',
+        tail=None,
+        wait=5
+    )
+
+    # Invalid range
+    result = test_client.get(
+        '/v1/jobs/12345678-1234-1234-1234-123456789012/logs?offset=-1'
+    )
+    assert result.status_code == 400
+
+    # Invalid tail
+    result = test_client.get(
+        '/v1/jobs/12345678-1234-1234-1234-123456789012/logs?tail=0'
+    )
+    assert result.status_code == 400
+    assert result.json['msg'] == 'Tail must be greater than zero'
+
+    # Not found
+    mock_get_job_logs.return_value = None
+
+    result = test_client.get(
+        '/v1/jobs/12345678-1234-1234-1234-123456789012/logs'
+    )
+    assert result.status_code == 404
+    assert result.data == b'{"msg":"Job not found"}\n'
+
+    # Too many requests waiting
+    mock_get_job_logs.side_effect = MashJobException(
+        'Too many requests are waiting for job logs'
+    )
+
+    result = test_client.get(
+        '/v1/jobs/12345678-1234-1234-1234-123456789012/logs?wait=5'
+    )
+    assert result.status_code == 429
+
+
+@patch('mash.services.api.v1.routes.jobs.get_job_status_updates')
+@patch('mash.services.api.v1.routes.jobs.get_jwt_identity')
+@patch('flask_jwt_extended.view_decorators.verify_jwt_in_request')
+def test_api_get_job_status_updates(
+    mock_jwt_required,
+    mock_jwt_identity,
+    mock_get_updates,
+    test_client
+):
+    mock_jwt_identity.return_value = 'user1'
+    mock_get_updates.return_value = {
+        'updates': [{'version': 11, 'job_id': '1', 'service': 'upload'}],
+        'version': 11
+    }
+
+    response = test_client.get(
+        '/v1/jobs/status_updates?since_version=10&wait=20'
+    )
+
+    assert response.status_code == 200
+    assert response.json['version'] == 11
+    mock_get_updates.assert_called_once_with(
+        'user1', since_version=10, job_id=None, wait=20
+    )
+
+    # Negative version
+    response = test_client.get('/v1/jobs/status_updates?since_version=-1')
+    assert response.status_code == 400
+
+    # Too many requests waiting
+    mock_get_updates.side_effect = MashJobException(
+        'Too many requests are waiting for status updates'
+    )
+    response = test_client.get('/v1/jobs/status_updates?wait=20')
+    assert response.status_code == 429
+
+
+@patch('mash.services.api.v1.routes.jobs.get_jobs')
+@patch('mash.services.api.v1.routes.jobs.get_jwt_identity')
+@patch('flask_jwt_extended.view_decorators.verify_jwt_in_request')
+def test_api_get_job_list_filtered(
+    mock_jwt_required,
+    mock_jwt_identity,
+    mock_get_jobs,
+    test_client
+):
+    mock_jwt_identity.return_value = 'user1'
+    mock_get_jobs.return_value = []
+
+    result = test_client.get(
+        '/v1/jobs/?state=failed&since=2021-05-01T00:00:00&image=',
+        content_type='application/json',
+        data=json.dumps({'page': 2})
+    )
+
+    assert result.status_code == 200
+    mock_get_jobs.assert_called_once_with(
+        'user1', page=2, state='failed', since='2021-05-01T00:00:00'
+    )
+
+    # Invalid filter
+    mock_get_jobs.side_effect = MashException('Invalid job filter')
+    result = test_client.get(
+        '/v1/jobs/?since=yesterday',
+        content_type='application/json',
+        data=json.dumps({})
+    )
+
+    assert result.status_code == 400
+    assert result.json['msg'] == 'Invalid job filter'
+
+
+@patch('mash.services.api.v1.routes.jobs.get_job_summary')
+@patch('mash.services.api.v1.routes.jobs.get_jwt_identity')
+@patch('flask_jwt_extended.view_decorators.verify_jwt_in_request')
+def test_api_get_job_summary(
+    mock_jwt_required,
+    mock_jwt_identity,
+    mock_get_summary,
+    test_client
+):
+    mock_jwt_identity.return_value = 'user1'
+    summary = {
+        'total': 2,
+        'states': {'running': 2},
+        'current_services': {'test': 2},
+        'failed_services': {}
+    }
+    mock_get_summary.return_value = summary
+
+    result = test_client.get('/v1/jobs/summary?cloud=ec2')
+
+    assert result.status_code == 200
+    assert result.json == summary
+    mock_get_summary.assert_called_once_with('user1', cloud='ec2')
+
+    # Invalid filter
+    mock_get_summary.side_effect = MashException('Invalid job filter')
+    result = test_client.get('/v1/jobs/summary?until=tomorrow')
+
+    assert result.status_code == 400
+
+
+@patch('mash.services.api.v1.routes.jobs.get_stage_stats')
+@patch('flask_jwt_extended.view_decorators.verify_jwt_in_request')
+def test_api_get_stage_stats(
+    mock_jwt_required,
+    mock_get_stage_stats,
+    test_client
+):
+    stats = [{'cloud': 'ec2', 'service': 'upload', 'count': 1}]
+    mock_get_stage_stats.return_value = stats
+
+    result = test_client.get(
+        '/v1/jobs/stage_stats?cloud=ec2&service=upload&since=2021-05-01'
+    )
+
+    assert result.status_code == 200
+    assert result.json == stats
+    mock_get_stage_stats.assert_called_once_with(
+        cloud='ec2', service='upload', since='2021-05-01'
+    )
+
+    # Invalid day
+    mock_get_stage_stats.side_effect = MashException('Invalid day')
+    result = test_client.get('/v1/jobs/stage_stats?until=someday')
+
+    assert result.status_code == 400
@@ -3,10 +3,10 @@ import json
 from unittest.mock import patch
 
 from mash.mash_exceptions import MashException
+from mash.services.api.v1.schema import max_batch_jobs
 
 
-@patch('mash.services.api.v1.utils.jobs.ec2.get_accounts_in_ec2_group')
-@patch('mash.services.api.v1.utils.jobs.ec2.get_ec2_account')
+@patch('mash.services.api.v1.utils.jobs.ec2.get_ec2_accounts_by_name')
 @patch('mash.services.api.v1.utils.jobs.get_user_by_id')
 @patch('mash.services.api.v1.routes.jobs.ec2.create_job')
 @patch('mash.services.api.v1.routes.jobs.ec2.get_jwt_identity')
@@ -16,7 +16,6 @@ def test_api_add_job_ec2(
     mock_jwt_identity,
     mock_create_job,
     mock_get_user,
-    mock_get_account,
     mock_get_accounts,
     test_client
 ):
@@ -41,8 +40,10 @@ def test_api_add_job_ec2(
         'name': 'test-aws-gov',
         'partition': 'aws'
     }
-    mock_get_account.return_value = account
-    mock_get_accounts.return_value = [account]
+    mock_get_accounts.return_value = (
+        {'test-aws-gov': account},
+        {'test': ['test-aws-gov']}
+    )
     mock_get_user.return_value = {'email': 'user1@test.com'}
 
     with open('test/data/job.json', 'r') as job_doc:
@@ -81,7 +82,7 @@ def test_api_add_job_ec2(
     assert response.data == b'{"msg":"Job doc is valid!"}\n'
 
     # Exception
-    mock_get_account.side_effect = Exception('Broken')
+    mock_get_accounts.side_effect = Exception('Broken')
 
     response = test_client.post(
         '/v1/jobs/ec2/',
@@ -92,7 +93,7 @@ def test_api_add_job_ec2(
     assert response.data == b'{"msg":"Failed to start job"}\n'
 
     # Mash Exception
-    mock_get_account.side_effect = MashException('Broken')
+    mock_get_accounts.side_effect = MashException('Broken')
 
     response = test_client.post(
         '/v1/jobs/ec2/',
@@ -108,3 +109,76 @@ def test_api_get_ec2_job_schema(test_client):
     assert response.status_code == 200
     data = json.loads(response.data)  # assert json loads
     assert data['additionalProperties'] is False
+
+
+@patch('flask_jwt_extended.view_decorators.verify_jwt_in_request')
+def test_api_get_ec2_regions(mock_jwt_required, test_client):
+    response = test_client.get('/v1/jobs/ec2/regions')
+
+    assert response.status_code == 200
+    assert response.json['regions']['aws-cn'] == ['cn-north-1']
+    assert response.json['helper_images']['cn-north-1'] == 'ami-bcc45885'
+
+
+@patch('mash.services.api.v1.routes.jobs.create_jobs')
+@patch('mash.services.api.v1.routes.jobs.get_jwt_identity')
+@patch('flask_jwt_extended.view_decorators.verify_jwt_in_request')
+def test_api_add_jobs_ec2(
+    mock_jwt_required,
+    mock_jwt_identity,
+    mock_create_jobs,
+    test_client
+):
+    mock_jwt_identity.return_value = 'user1'
+    mock_create_jobs.return_value = [
+        {'status': 201, 'job': {'job_id': '1'}},
+        {'status': 400, 'msg': 'Job failed: Invalid'}
+    ]
+
+    response = test_client.post(
+        '/v1/jobs/ec2/batch',
+        content_type='application/json',
+        data=json.dumps({'jobs': [{'image': '1'}, {'image': '2'}]})
+    )
+
+    assert response.status_code == 200
+    assert response.json['created'] == 1
+    assert response.json['failed'] == 1
+    assert response.json['jobs'][1]['msg'] == 'Job failed: Invalid'
+
+    job_docs = mock_create_jobs.mock_calls[0][1][0]
+    assert job_docs[0] == {
+        'image': '1',
+        'cloud': 'ec2',
+        'requesting_user': 'user1'
+    }
+
+    # Jobs list is required
+    response = test_client.post(
+        '/v1/jobs/ec2/batch',
+        content_type='application/json',
+        data=json.dumps({'jobs': 'image'})
+    )
+
+    assert response.status_code == 400
+
+    # Batch size is limited
+    response = test_client.post(
+        '/v1/jobs/ec2/batch',
+        content_type='application/json',
+        data=json.dumps({'jobs': [{'image': '1'}] * (max_batch_jobs + 1)})
+    )
+
+    assert response.status_code == 400
+
+    # Body must be a JSON object
+    for data in (json.dumps([{'image': '1'}]), json.dumps('jobs'), 'jobs'):
+        response = test_client.post(
+            '/v1/jobs/ec2/batch',
+            content_type='application/json',
+            data=data
+        )
+
+        assert response.status_code == 400
+
+    assert mock_create_jobs.call_count == 1
@@ -18,7 +18,10 @@
 
 from unittest.mock import patch, Mock
 
-from mash.services.api.v1.utils.accounts.ec2 import get_accounts_in_ec2_group
+from mash.services.api.v1.utils.accounts.ec2 import (
+    get_accounts_in_ec2_group,
+    get_ec2_accounts_by_name
+)
 
 from werkzeug.local import LocalProxy
 
@@ -35,3 +38,31 @@ def test_get_ec2_group(mock_handle_request, mock_get_current_object):
     mock_handle_request.return_value = response
 
     assert get_accounts_in_ec2_group('group1', 1) == ['acnt1']
+
+
+@patch.object(LocalProxy, '_get_current_object')
+@patch('mash.services.api.v1.utils.accounts.ec2.handle_request')
+def test_get_ec2_accounts_by_name(
+    mock_handle_request, mock_get_current_object
+):
+    app = Mock()
+    mock_get_current_object.return_value = app
+    app.config = {'DATABASE_API_URL': 'http://localhost:5000/'}
+
+    response = Mock()
+    response.json.return_value = {
+        'accounts': {'acnt1': {'name': 'acnt1'}},
+        'groups': {'group1': ['acnt1']}
+    }
+    mock_handle_request.return_value = response
+
+    accounts, groups = get_ec2_accounts_by_name(['acnt1'], ['group1'], 1)
+
+    assert accounts == {'acnt1': {'name': 'acnt1'}}
+    assert groups == {'group1': ['acnt1']}
+    mock_handle_request.assert_called_once_with(
+        'http://localhost:5000/',
+        'ec2_accounts/bulk',
+        'get',
+        job_data={'names': ['acnt1'], 'group_names': ['group1'], 'user_id': 1}
+    )
@@ -1,37 +1,185 @@
-from unittest.mock import Mock, patch
+from pytest import raises
+from unittest.mock import call, Mock, patch
 
-from mash.services.api.v1.utils.amqp import connect, publish
+from mash.mash_exceptions import MashRabbitConnectionException
+from mash.services.api.v1.utils import amqp
+from mash.services.api.v1.utils.amqp import (
+    ChannelPool,
+    get_pool,
+    publish,
+    publish_batch
+)
 
 from werkzeug.local import LocalProxy
 
 
-@patch.object(LocalProxy, '_get_current_object')
-@patch('mash.services.api.v1.utils.amqp.Connection')
-def test_connect(mock_connection, mock_get_current_object):
-    connection = Mock()
-    channel = Mock()
-    connection.channel.return_value = channel
-    mock_connection.return_value = connection
+class TestChannelPool(object):
+    def setup(self):
+        self.connection = Mock()
+        self.channel = Mock()
+        self.connection.channel.return_value = self.channel
+        self.pool = ChannelPool('localhost', 'guest', 'guest', size=1)
+
+    @patch('mash.services.api.v1.utils.amqp.ConfirmPublisher')
+    @patch('mash.services.api.v1.utils.amqp.Connection')
+    def test_channel(self, mock_connection, mock_publisher_class):
+        mock_connection.return_value = self.connection
+        publisher = mock_publisher_class.return_value
+        publisher.channel = self.channel
+
+        with self.pool.channel() as channel:
+            assert channel == publisher
+
+        mock_publisher_class.assert_called_once_with(
+            self.channel, window=64, timeout=10
+        )
+
+        # Idle channel is reused
+        with self.pool.channel() as channel:
+            assert channel == publisher
+
+        assert mock_connection.call_count == 1
+        assert self.connection.channel.call_count == 1
+
+        # Failed channel is closed and replaced
+        publisher.is_open = False
+        with self.pool.channel():
+            pass
+
+        self.channel.close.assert_called_once_with()
+        assert self.connection.channel.call_count == 2
+
+        # Closed channel is replaced
+        self.channel.is_open = False
+        with self.pool.channel():
+            pass
+
+        assert self.connection.channel.call_count == 3
+
+        # Idle open channels are closed with the pool
+        self.channel.reset_mock()
+        self.channel.is_open = True
+        self.pool.close()
+        self.channel.close.assert_called_once_with()
+        self.connection.close.assert_called_once_with()
+        assert self.pool.channels.empty()
+
+    @patch('mash.services.api.v1.utils.amqp.ConfirmPublisher')
+    @patch('mash.services.api.v1.utils.amqp.Connection')
+    def test_channel_error(self, mock_connection, mock_publisher_class):
+        mock_connection.return_value = self.connection
+        mock_publisher_class.return_value.channel = self.channel
+
+        with raises(ValueError):
+            with self.pool.channel():
+                raise ValueError('Broken')
+
+        self.channel.close.assert_called_once_with()
+        assert self.pool.channels.empty()
+
+    def test_channel_exhausted(self):
+        self.pool.timeout = 0
+        self.pool.slots.acquire()
+
+        with raises(MashRabbitConnectionException):
+            with self.pool.channel():
+                pass
+
+    @patch('mash.services.api.v1.utils.amqp.time.monotonic')
+    @patch('mash.services.api.v1.utils.amqp.Connection')
+    def test_connect_backoff(self, mock_connection, mock_monotonic):
+        mock_monotonic.return_value = 100
+        mock_connection.side_effect = Exception('Refused')
+
+        with raises(MashRabbitConnectionException):
+            self.pool._connect()
+
+        assert self.pool.backoff == 1
 
-    connect()
-    channel.confirm_deliveries.assert_called_once_with()
+        # Within backoff no connection attempt is made
+        with raises(MashRabbitConnectionException):
+            self.pool._connect()
+
+        assert mock_connection.call_count == 1
+
+        mock_monotonic.return_value = 102
+        mock_connection.side_effect = None
+        mock_connection.return_value = self.connection
+
+        assert self.pool._connect() == self.connection
+        assert self.pool.backoff == 0
 
 
-@patch('mash.services.api.v1.utils.amqp.connect')
 @patch.object(LocalProxy, '_get_current_object')
-@patch('mash.services.api.v1.utils.amqp.channel')
-def test_publish(mock_channel, mock_get_current_object, mock_connect):
-    mock_channel.closed = True
+def test_get_pool(mock_get_current_object):
+    mock_get_current_object.return_value.config = {
+        'AMQP_HOST': 'localhost',
+        'AMQP_USER': 'guest',
+        'AMQP_PASS': 'guest',
+        'AMQP_CHANNEL_POOL_SIZE': 4,
+        'AMQP_PUBLISH_CONFIRM_WINDOW': 16
+    }
+    amqp.pool = None
+    pool = get_pool()
+
+    assert get_pool() == pool
+    assert pool.size == 4
+    assert pool.window == 16
+
+    pool.pid = 0
+    assert get_pool() != pool
+    amqp.pool = None
+
+
+def mock_pool_channel(mock_get_pool, publisher):
+    mock_get_pool.return_value.channel.return_value.__enter__ = Mock(
+        return_value=publisher
+    )
+    mock_get_pool.return_value.channel.return_value.__exit__ = Mock(
+        return_value=None
+    )
+
+
+@patch('mash.services.api.v1.utils.amqp.get_pool')
+def test_publish(mock_get_pool):
+    publisher = Mock()
+    mock_pool_channel(mock_get_pool, publisher)
     publish('test', 'doc', 'msg')
 
-    mock_connect.assert_called_once_with()
-    mock_channel.basic.publish.assert_called_once_with(
-        body='msg',
-        routing_key='doc',
-        exchange='test',
-        properties={
+    publisher.publish.assert_called_once_with(
+        'msg',
+        'doc',
+        'test',
+        {
             'content_type': 'application/json',
             'delivery_mode': 2
-        },
-        mandatory=True
+        }
+    )
+    publisher.wait.assert_called_once_with(
+        [publisher.publish.return_value]
     )
+
+
+@patch('mash.services.api.v1.utils.amqp.get_pool')
+def test_publish_batch(mock_get_pool):
+    publisher = Mock()
+    publisher.publish.side_effect = [
+        'future1', 'future2', Exception('Closed'), 'future4'
+    ]
+    publisher.wait.side_effect = [None, Exception('Nacked'), None]
+    mock_pool_channel(mock_get_pool, publisher)
+
+    results = publish_batch('test', 'doc', ['msg1', 'msg2', 'msg3', 'msg4'])
+
+    assert results[0] is None
+    assert str(results[1]) == 'Nacked'
+    assert str(results[2]) == 'Closed'
+    assert results[3] is None
+
+    # Confirms are awaited after publishing the messages
+    assert publisher.wait.mock_calls == [
+        call(['future1']), call(['future2']), call(['future4'])
+    ]
+
+    # Remaining message is published on a new channel
+    assert mock_get_pool.return_value.channel.call_count == 2
@@ -0,0 +1,37 @@
+from unittest.mock import Mock
+
+from pytest import raises
+
+from mash.services.api.v1.utils.batch import lookup_batch, shared_lookup
+
+
+def test_shared_lookup():
+    lookup = Mock(return_value={'name': 'acnt1'})
+    lookup.__name__ = 'lookup'
+    shared = shared_lookup(lookup)
+
+    # Outside a batch every call is a lookup
+    shared('acnt1', '1')
+    shared('acnt1', '1')
+    assert lookup.call_count == 2
+
+    lookup.reset_mock()
+    with lookup_batch():
+        account = shared('acnt1', '1')
+        account['name'] = 'changed'
+
+        # Callers get a copy of the shared result
+        assert shared('acnt1', '1') == {'name': 'acnt1'}
+        shared('acnt2', '1')
+
+    assert lookup.call_count == 2
+
+    # Errors are shared too
+    lookup.reset_mock()
+    lookup.side_effect = Exception('Account not found')
+    with lookup_batch():
+        for attempt in range(2):
+            with raises(Exception):
+                shared('acnt3', '1')
+
+    assert lookup.call_count == 1
@@ -1,17 +1,23 @@
 import json
 
 from pytest import raises
-from unittest.mock import Mock, patch
+from unittest.mock import call, Mock, patch
 
 from mash.services.api.v1.utils.jobs import (
     create_job,
+    create_jobs,
     delete_job,
+    get_job_logs,
+    get_job_status_updates,
+    get_job_summary,
+    get_jobs,
+    get_stage_stats,
     validate_last_service,
     validate_create_args,
     validate_deprecate_args,
     validate_job
 )
-from mash.mash_exceptions import MashJobException
+from mash.mash_exceptions import MashException, MashJobException
 
 from werkzeug.local import LocalProxy
 
@@ -105,6 +111,89 @@ def test_create_job(
     assert result is None
 
 
+@patch.object(LocalProxy, '_get_current_object')
+@patch('mash.services.api.v1.utils.jobs.publish_batch')
+@patch('mash.services.api.v1.utils.jobs.handle_request')
+def test_create_jobs(
+    mock_handle_request,
+    mock_publish_batch,
+    mock_get_current_obj
+):
+    app = Mock()
+    app.config = {
+        'DATABASE_API_URL': 'http://localhost:5007',
+        'SERVICE_NAMES': ['obs', 'uploader']
+    }
+    mock_get_current_obj.return_value = app
+
+    def validate(data):
+        if data['image'] == 'invalid':
+            raise MashException('Invalid image')
+        elif data['image'] == 'broken':
+            raise Exception('Broken')
+        return data
+
+    def job_doc(image, **kwargs):
+        data = {
+            'last_service': 'uploader',
+            'utctime': 'now',
+            'image': image,
+            'download_url': 'http://download.opensuse.org/images',
+            'requesting_user': '1'
+        }
+        data.update(kwargs)
+        return data
+
+    response = Mock()
+    response.json.return_value = [{'job_id': '1'}, {'job_id': '2'}]
+    mock_handle_request.return_value = response
+    mock_publish_batch.return_value = [None, Exception('Closed')]
+
+    results = create_jobs(
+        [
+            job_doc('image1', cloud='ec2'),
+            job_doc('invalid'),
+            job_doc('broken'),
+            job_doc('image2', dry_run=True),
+            job_doc('image3')
+        ],
+        validate
+    )
+
+    assert results == [
+        {'status': 201, 'job': {'job_id': '1'}},
+        {'status': 400, 'msg': 'Job failed: Invalid image'},
+        {'status': 400, 'msg': 'Failed to start job'},
+        {'status': 200, 'msg': 'Job doc is valid!'},
+        {'status': 400, 'msg': 'Job failed: Failed to initialize job.'}
+    ]
+
+    # All jobs are added in one request
+    rows = mock_handle_request.mock_calls[0][2]['job_data']['jobs']
+    assert [row['image'] for row in rows] == ['image1', 'image3']
+    assert rows[0]['cloud'] == 'ec2'
+    assert mock_publish_batch.call_count == 1
+
+    # Job that failed to publish is deleted
+    mock_handle_request.assert_called_with(
+        'http://localhost:5007',
+        'jobs/',
+        'delete',
+        job_data={'job_id': rows[1]['job_id'], 'user_id': '1'}
+    )
+
+    # Database error
+    mock_handle_request.side_effect = Exception('Broken')
+    results = create_jobs([job_doc('image1')], validate)
+    assert results == [{'status': 400, 'msg': 'Failed to start job'}]
+
+    # Only dry run jobs, nothing is added
+    mock_handle_request.reset_mock()
+    results = create_jobs([job_doc('image1', dry_run=True)], validate)
+    assert results == [{'status': 200, 'msg': 'Job doc is valid!'}]
+    assert not mock_handle_request.called
+
+
 @patch.object(LocalProxy, '_get_current_object')
 @patch('mash.services.api.v1.utils.jobs.publish')
 @patch('mash.services.api.v1.utils.jobs.handle_request')
@@ -130,6 +219,181 @@ def test_delete_jobs(mock_handle_request, mock_publish, mock_get_current_obj):
         delete_job('12345678-1234-1234-1234-123456789012', '1')
 
 
+@patch('mash.services.api.v1.utils.jobs.read_job_log')
+@patch('mash.services.api.v1.utils.jobs.get_log_size')
+@patch('mash.services.api.v1.utils.jobs.time')
+@patch('mash.services.api.v1.utils.jobs.get_job')
+@patch.object(LocalProxy, '_get_current_object')
+def test_get_job_logs(
+    mock_get_current_obj, mock_get_job, mock_time, mock_get_log_size,
+    mock_read_job_log
+):
+    mock_get_current_obj.return_value.config = {
+        'JOB_LOG_DIRECTORY': '/var/log/mash/jobs'
+    }
+    mock_get_job.return_value = {'job_id': '1'}
+    mock_time.monotonic.side_effect = [0, 0, 0, 1, 0, 0]
+    mock_get_log_size.side_effect = [10, 10, 20]
+
+    logs = get_job_logs('1', 'user1', offset=10, service='TestService', wait=60)
+
+    assert logs == mock_read_job_log.return_value
+    assert mock_time.sleep.call_count == 2
+    mock_read_job_log.assert_called_once_with(
+        '/var/log/mash/jobs/1.log',
+        offset=10,
+        max_bytes=1048576,
+        since=None,
+        service='TestService',
+        tail=None
+    )
+
+    # No log file yet
+    mock_get_log_size.side_effect = FileNotFoundError
+    logs = get_job_logs('1', 'user1')
+    assert logs == {'logs': '', 'offset': 0, 'next_offset': 0, 'size': 0}
+
+    # Too many requests waiting
+    mock_get_log_size.side_effect = [10]
+    mock_time.monotonic.side_effect = [0, 0]
+
+    with patch(
+        'mash.services.api.v1.utils.jobs.long_poll_waiters'
+    ) as mock_waiters:
+        mock_waiters.acquire.return_value = False
+
+        with raises(MashJobException):
+            get_job_logs('1', 'user1', offset=10, wait=5)
+
+    mock_waiters.release.assert_not_called()
+
+    # Job not found
+    mock_get_job.return_value = {}
+    assert get_job_logs('1', 'user1') is None
+
+
+@patch('mash.services.api.v1.utils.jobs.handle_request')
+@patch.object(LocalProxy, '_get_current_object')
+def test_get_jobs(mock_get_current_obj, mock_handle_request):
+    mock_get_current_obj.return_value.config = {
+        'DATABASE_API_URL': 'http://localhost:5007/'
+    }
+    mock_handle_request.return_value.json.return_value = []
+
+    assert get_jobs('user1', page=2, state='failed', cloud='ec2') == []
+    mock_handle_request.assert_called_once_with(
+        'http://localhost:5007/',
+        'jobs/list/user1',
+        'get',
+        job_data={
+            'page': 2,
+            'per_page': None,
+            'state': 'failed',
+            'cloud': 'ec2'
+        }
+    )
+
+
+@patch('mash.services.api.v1.utils.jobs.handle_request')
+@patch.object(LocalProxy, '_get_current_object')
+def test_get_job_summary(mock_get_current_obj, mock_handle_request):
+    mock_get_current_obj.return_value.config = {
+        'DATABASE_API_URL': 'http://localhost:5007/'
+    }
+    summary = {'total': 1, 'states': {'running': 1}}
+    mock_handle_request.return_value.json.return_value = summary
+
+    assert get_job_summary('user1', image='test_image') == summary
+    mock_handle_request.assert_called_once_with(
+        'http://localhost:5007/',
+        'jobs/summary/user1',
+        'get',
+        job_data={'image': 'test_image'}
+    )
+
+
+@patch('mash.services.api.v1.utils.jobs.handle_request')
+@patch.object(LocalProxy, '_get_current_object')
+def test_get_stage_stats(mock_get_current_obj, mock_handle_request):
+    mock_get_current_obj.return_value.config = {
+        'DATABASE_API_URL': 'http://localhost:5007/'
+    }
+    stats = [{'cloud': 'ec2', 'service': 'upload', 'count': 1}]
+    mock_handle_request.return_value.json.return_value = stats
+
+    assert get_stage_stats(cloud='ec2') == stats
+    mock_handle_request.assert_called_once_with(
+        'http://localhost:5007/',
+        'jobs/stage_stats',
+        'get',
+        job_data={'cloud': 'ec2'}
+    )
+
+
+@patch('mash.services.api.v1.utils.jobs.time')
+@patch('mash.services.api.v1.utils.jobs.handle_request')
+@patch.object(LocalProxy, '_get_current_object')
+def test_get_job_status_updates(
+    mock_get_current_obj, mock_handle_request, mock_time
+):
+    mock_get_current_obj.return_value.config = {
+        'DATABASE_API_URL': 'http://localhost:5007/'
+    }
+    mock_time.monotonic.side_effect = [0, 0, 0, 1]
+
+    empty = Mock()
+    empty.json.return_value = {'updates': [], 'version': 10}
+    updated = Mock()
+    updated.json.return_value = {
+        'updates': [{'version': 11, 'job_id': '1'}],
+        'version': 11
+    }
+    mock_handle_request.side_effect = [empty, empty, updated]
+
+    result = get_job_status_updates('user1', since_version=10, wait=60)
+
+    assert result['version'] == 11
+    assert mock_time.sleep.call_count == 2
+    mock_handle_request.assert_called_with(
+        'http://localhost:5007/',
+        'jobs/status_updates/user1',
+        'get',
+        job_data={'since_version': 10, 'job_id': None}
+    )
+
+    # Without wait the empty result is returned
+    mock_handle_request.side_effect = [empty]
+    mock_time.monotonic.side_effect = [0, 0]
+    assert get_job_status_updates('user1', since_version=10) == {
+        'updates': [], 'version': 10
+    }
+
+    # Wait times out without updates
+    mock_time.sleep.reset_mock()
+    mock_handle_request.side_effect = [empty, empty, empty]
+    mock_time.monotonic.side_effect = [0, 0, 0, 4.5, 5]
+    assert get_job_status_updates('user1', since_version=10, wait=5) == {
+        'updates': [], 'version': 10
+    }
+    assert mock_time.sleep.call_args_list == [call(1), call(0.5)]
+
+    # Too many requests waiting
+    mock_time.sleep.reset_mock()
+    mock_handle_request.side_effect = [empty]
+    mock_time.monotonic.side_effect = [0, 0]
+
+    with patch(
+        'mash.services.api.v1.utils.jobs.long_poll_waiters'
+    ) as mock_waiters:
+        mock_waiters.acquire.return_value = False
+
+        with raises(MashJobException):
+            get_job_status_updates('user1', since_version=10, wait=5)
+
+    assert not mock_time.sleep.called
+    mock_waiters.release.assert_not_called()
+
+
 @patch.object(LocalProxy, '_get_current_object')
 def test_validate_last_service(mock_get_current_obj):
     app = Mock()
@@ -21,9 +21,11 @@ from unittest.mock import patch, Mock
 from pytest import raises
 
 from mash.mash_exceptions import MashJobException
+from mash.services.api.cloud_data import CloudData, freeze
 from mash.services.api.v1.utils.jobs.ec2 import (
     get_ec2_regions_by_partition,
     get_ec2_helper_images,
+    get_ec2_region_tables,
     add_target_ec2_account,
     convert_account_dict,
     validate_ec2_job
@@ -36,36 +38,52 @@ from werkzeug.local import LocalProxy
 def test_get_ec2_regions_by_partition(mock_get_current_object):
     app = Mock()
     mock_get_current_object.return_value = app
-    app.config = {
-        'CLOUD_DATA': {
-            'ec2': {
-                'regions': {
-                    'aws': ['us-east-99']
-                }
+    app.cloud_data = CloudData({
+        'ec2': {
+            'regions': {
+                'aws': ['us-east-99']
             }
         }
-    }
+    })
 
-    assert get_ec2_regions_by_partition('aws') == ['us-east-99']
+    assert get_ec2_regions_by_partition('aws') == ('us-east-99',)
 
 
 @patch.object(LocalProxy, '_get_current_object')
 def test_get_ec2_helper_images(mock_get_current_object):
     app = Mock()
     mock_get_current_object.return_value = app
-    app.config = {
-        'CLOUD_DATA': {
-            'ec2': {
-                'helper_images': {
-                    'us-east-99': 'ami-789'
-                }
+    app.cloud_data = CloudData({
+        'ec2': {
+            'helper_images': {
+                'us-east-99': 'ami-789'
             }
         }
-    }
+    })
 
     images = get_ec2_helper_images()
     assert images['us-east-99'] == 'ami-789'
 
+    with raises(TypeError):
+        images['us-east-100'] = 'ami-987'
+
+
+@patch.object(LocalProxy, '_get_current_object')
+def test_get_ec2_region_tables(mock_get_current_object):
+    app = Mock()
+    mock_get_current_object.return_value = app
+    app.cloud_data = CloudData({
+        'ec2': {
+            'regions': {'aws': ['us-east-99']},
+            'helper_images': {'us-east-99': 'ami-789'}
+        }
+    })
+
+    assert get_ec2_region_tables() == {
+        'regions': {'aws': ['us-east-99']},
+        'helper_images': {'us-east-99': 'ami-789'}
+    }
+
 
 @patch('mash.services.api.v1.utils.jobs.ec2.get_ec2_regions_by_partition')
 def test_add_target_ec2_account(mock_get_regions):
@@ -81,11 +99,11 @@ def test_add_target_ec2_account(mock_get_regions):
         ]
     }
 
-    mock_get_regions.return_value = ['us-east-99']
+    mock_get_regions.return_value = ('us-east-99',)
 
     cloud_accounts = {'acnt1': {'root_swap_ami': 'ami-456'}}
     accounts = {}
-    helper_images = {'us-east-99': 'ami-789'}
+    helper_images = freeze({'us-east-99': 'ami-789'})
 
     add_target_ec2_account(
         account,
@@ -121,6 +139,9 @@ def test_add_target_ec2_account(mock_get_regions):
 
     assert accounts['us-east-100']['helper_image'] == 'ami-987'
 
+    # Shared helper images are not modified
+    assert 'us-east-100' not in helper_images
+
     add_target_ec2_account(
         account,
         accounts,
@@ -139,13 +160,11 @@ def test_convert_account_dict():
 
 @patch.object(LocalProxy, '_get_current_object')
 @patch('mash.services.api.v1.utils.jobs.ec2.add_target_ec2_account')
-@patch('mash.services.api.v1.utils.jobs.ec2.get_ec2_account')
-@patch('mash.services.api.v1.utils.jobs.ec2.get_accounts_in_ec2_group')
+@patch('mash.services.api.v1.utils.jobs.ec2.get_ec2_accounts_by_name')
 @patch('mash.services.api.v1.utils.jobs.ec2.get_ec2_helper_images')
 def test_validate_ec2_job(
     mock_get_helper_images,
-    mock_get_group_accounts,
-    mock_get_ec2_account,
+    mock_get_accounts,
     mock_add_target_account,
     mock_get_current_obj
 ):
@@ -160,8 +179,10 @@ def test_validate_ec2_job(
             }
         ]
     }
-    mock_get_ec2_account.return_value = account
-    mock_get_group_accounts.return_value = [account]
+    mock_get_accounts.return_value = (
+        {'acnt1': account},
+        {'group1': ['acnt1']}
+    )
 
     app = Mock()
     app.config = {
@@ -195,6 +216,9 @@ def test_validate_ec2_job(
     assert 'cloud_accounts' not in result
     assert 'cloud_groups' not in result
 
+    # All accounts are resolved in one request
+    mock_get_accounts.assert_called_once_with(['acnt1'], ['group1'], '1')
+
     # Test doc with no accounts
     job_doc = {
         'last_service': 'testing',
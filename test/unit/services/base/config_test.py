@@ -10,6 +10,9 @@ class TestBaseConfig(object):
         self.empty_config = BaseConfig('test/data/empty_mash_config.yaml')
         self.config = BaseConfig('test/data/mash_config.yaml')
 
+    def test_config_file(self):
+        assert self.config.config_file == 'test/data/mash_config.yaml'
+
     def test_get_encryption_keys_file(self):
         enc_keys_file = self.empty_config.get_encryption_keys_file()
         assert enc_keys_file == '/var/lib/mash/encryption_keys'
@@ -78,6 +81,37 @@ class TestBaseConfig(object):
         password = self.empty_config.get_amqp_pass()
         assert password == 'guest'
 
+    def test_get_amqp_channel_pool_size(self):
+        assert self.config.get_amqp_channel_pool_size() == 16
+        assert self.empty_config.get_amqp_channel_pool_size() == 8
+
+    def test_get_notification_min_interval(self):
+        assert self.config.get_notification_min_interval() == 0
+        assert self.empty_config.get_notification_min_interval() == 10
+
+    def test_get_notification_digest(self):
+        assert self.config.get_notification_digest()
+        assert not self.empty_config.get_notification_digest()
+
+    def test_get_job_credentials_cache_ttl(self):
+        assert self.config.get_job_credentials_cache_ttl() == 30
+        assert self.empty_config.get_job_credentials_cache_ttl() == 60
+
+    def test_get_database_status_consumer(self):
+        assert self.config.get_database_status_consumer()
+        assert not self.empty_config.get_database_status_consumer()
+
+    def test_get_message_codec(self):
+        assert self.config.get_message_content_type() == 'application/json'
+        assert self.config.get_message_compression() == 'gzip'
+        assert self.config.get_message_compression_threshold() == 1024
+        assert self.empty_config.get_message_compression() is None
+        assert self.empty_config.get_message_compression_threshold() == 65536
+
+    def test_get_publish_confirm_window(self):
+        assert self.config.get_publish_confirm_window() == 32
+        assert self.empty_config.get_publish_confirm_window() == 64
+
     def test_get_smtp_host(self):
         host = self.empty_config.get_smtp_host()
         assert host == 'localhost'
@@ -121,6 +155,12 @@ class TestBaseConfig(object):
         assert self.config.get_log_directory() == '/tmp/log/'
         assert self.empty_config.get_log_directory() == '/var/log/mash/'
 
+    @patch.object(BaseConfig, 'get_log_directory')
+    def test_get_job_log_directory(self, mock_get_log_dir):
+        mock_get_log_dir.return_value = '/var/log/mash/'
+        assert self.empty_config.get_job_log_directory() == \
+            '/var/log/mash/jobs'
+
     @patch.object(BaseConfig, 'get_log_directory')
     def test_get_job_log_file(self, mock_get_log_dir):
         mock_get_log_dir.return_value = '/var/log/mash/'
@@ -159,6 +199,34 @@ class TestBaseConfig(object):
         assert self.config.get_base_thread_pool_count() == 20
         assert self.empty_config.get_base_thread_pool_count() == 10
 
+    def test_get_listener_engine(self):
+        assert self.config.get_listener_engine('replicate') == 'asyncio'
+        assert self.config.get_listener_engine('upload') == 'thread'
+        assert self.empty_config.get_listener_engine('replicate') == 'thread'
+
+    def test_get_job_store(self):
+        assert self.config.get_job_store() == 'sqlite'
+        assert self.empty_config.get_job_store() == 'file'
+
+    def test_get_scale_out(self):
+        assert self.config.get_scale_out('test')
+        assert not self.config.get_scale_out('replicate')
+        assert not self.empty_config.get_scale_out('test')
+
+    def test_get_replica_takeover(self):
+        assert self.config.get_replica_takeover('test') == ['node2']
+        assert self.empty_config.get_replica_takeover('test') == []
+
+    @patch('mash.services.base_defaults.socket.gethostname')
+    def test_get_replica_id(self, mock_gethostname):
+        mock_gethostname.return_value = 'node1'
+        assert self.config.get_replica_id() == 'node1'
+
+    def test_get_process_pool_count(self):
+        assert self.config.get_process_pool_count('upload') == 4
+        assert self.config.get_process_pool_count('test') == 0
+        assert self.empty_config.get_process_pool_count('upload') == 0
+
     def test_get_publish_thread_pool_count(self):
         assert self.config.get_publish_thread_pool_count() == 60
         assert self.empty_config.get_publish_thread_pool_count() == 50
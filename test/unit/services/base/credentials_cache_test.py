@@ -0,0 +1,184 @@
+import asyncio
+import threading
+
+from pytest import raises
+from unittest.mock import Mock, patch
+
+from mash.services.credentials_cache import (
+    CredentialsCache,
+    is_authentication_error
+)
+
+
+class TestCredentialsCache(object):
+    def setup(self):
+        self.cache = CredentialsCache(ttl=60)
+        self.credentials = {
+            'acnt1': {'super': 'secret'},
+            'acnt2': {'super': 'secret2'}
+        }
+
+    @patch('mash.services.credentials_cache.time.monotonic')
+    def test_get_credentials(self, mock_monotonic):
+        mock_monotonic.return_value = 0
+        request = Mock(return_value=self.credentials)
+
+        for attempt in range(2):
+            result = self.cache.get_credentials(
+                'user1', 'ec2', ['acnt1', 'acnt2'], request
+            )
+
+        assert result == self.credentials
+        request.assert_called_once_with()
+
+        # Subset of cached accounts
+        assert self.cache.get_credentials(
+            'user1', 'ec2', ['acnt2'], request
+        ) == {'acnt2': {'super': 'secret2'}}
+        assert request.call_count == 1
+
+        # Other user is not served from the cache
+        self.cache.get_credentials('user2', 'ec2', ['acnt1'], request)
+        assert request.call_count == 2
+
+        # Expired entries are requested again
+        mock_monotonic.return_value = 60
+        self.cache.get_credentials('user1', 'ec2', ['acnt1'], request)
+        assert request.call_count == 3
+
+        assert not self.cache.in_flight
+
+    def test_get_credentials_disabled(self):
+        self.cache.ttl = 0
+        request = Mock(return_value=self.credentials)
+
+        for attempt in range(2):
+            self.cache.get_credentials('user1', 'ec2', ['acnt1'], request)
+
+        assert request.call_count == 2
+        assert not self.cache.entries
+
+    def test_get_credentials_error(self):
+        request = Mock(side_effect=Exception('Connection refused'))
+
+        with raises(Exception):
+            self.cache.get_credentials('user1', 'ec2', ['acnt1'], request)
+
+        assert not self.cache.entries
+        assert not self.cache.in_flight
+
+    def test_get_credentials_single_flight(self):
+        started = threading.Event()
+        release = threading.Event()
+        results = []
+
+        def request():
+            started.set()
+            release.wait(5)
+            return self.credentials
+
+        request = Mock(side_effect=request)
+
+        def get_credentials():
+            results.append(
+                self.cache.get_credentials(
+                    'user1', 'ec2', ['acnt1', 'acnt2'], request
+                )
+            )
+
+        threads = [threading.Thread(target=get_credentials)]
+        threads[0].start()
+        started.wait(5)
+
+        for index in range(4):
+            thread = threading.Thread(target=get_credentials)
+            thread.start()
+            threads.append(thread)
+
+        release.set()
+        for thread in threads:
+            thread.join(5)
+
+        request.assert_called_once_with()
+        assert results == [self.credentials] * 5
+
+    def test_get_credentials_async(self):
+        calls = []
+
+        async def request():
+            calls.append(1)
+            await asyncio.sleep(0)
+            return self.credentials
+
+        async def run():
+            return await asyncio.gather(*[
+                self.cache.get_credentials_async(
+                    'user1', 'ec2', ['acnt1', 'acnt2'], request
+                )
+                for index in range(3)
+            ])
+
+        results = asyncio.run(run())
+        assert results == [self.credentials] * 3
+        assert len(calls) == 1
+
+        # Jobs sharing the request get their own copy
+        results[0]['acnt1']['super'] = 'changed'
+        assert results[1]['acnt1']['super'] == 'secret'
+
+        cached = asyncio.run(run())[0]
+        assert cached == self.credentials
+        assert cached['acnt1'] is not self.credentials['acnt1']
+
+    def test_get_credentials_copy(self):
+        request = Mock(return_value=self.credentials)
+
+        first = self.cache.get_credentials('user1', 'ec2', ['acnt1'], request)
+        first['acnt1']['super'] = 'changed'
+
+        # Cached credentials are not modified by a job
+        second = self.cache.get_credentials(
+            'user1', 'ec2', ['acnt1'], request
+        )
+        assert second == {'acnt1': {'super': 'secret'}}
+        assert request.call_count == 1
+
+    def test_get_credentials_async_error(self):
+        async def request():
+            raise Exception('Connection refused')
+
+        with raises(Exception):
+            asyncio.run(
+                self.cache.get_credentials_async(
+                    'user1', 'ec2', ['acnt1'], request
+                )
+            )
+
+        assert not self.cache.in_flight
+
+    def test_invalidate(self):
+        request = Mock(return_value=self.credentials)
+        self.cache.get_credentials('user1', 'ec2', ['acnt1'], request)
+        self.cache.get_credentials('user1', 'gce', ['acnt1'], request)
+        self.cache.get_credentials('user2', 'ec2', ['acnt1'], request)
+
+        self.cache.invalidate('user1', 'gce')
+        assert ('user1', 'gce', 'acnt1') not in self.cache.entries
+        assert ('user1', 'ec2', 'acnt1') in self.cache.entries
+
+        self.cache.invalidate('user1')
+        assert {key[0] for key in self.cache.entries} == {'user2'}
+
+        self.cache.reset()
+        assert not self.cache.entries
+
+
+def test_is_authentication_error():
+    assert is_authentication_error(
+        Exception(
+            'An error occurred (AuthFailure) when calling the '
+            'DescribeImages operation'
+        )
+    )
+    assert is_authentication_error('invalid_grant: Invalid JWT Signature.')
+    assert not is_authentication_error(Exception('Image not found'))
@@ -0,0 +1,190 @@
+import json
+import os
+import sqlite3
+import time
+
+from pytest import raises
+from tempfile import TemporaryDirectory
+from unittest.mock import Mock, patch
+
+from mash.mash_exceptions import MashJobStoreException
+from mash.services.job_store import (
+    BaseJobStore,
+    FileJobStore,
+    SQLiteJobStore,
+    get_job_store
+)
+
+
+class TestBaseJobStore(object):
+    def test_not_implemented(self):
+        with TemporaryDirectory() as test_dir:
+            store = BaseJobStore(test_dir + '/')
+
+            with raises(NotImplementedError):
+                store.add({'id': '1'})
+
+            with raises(NotImplementedError):
+                store.add_many([{'id': '1'}])
+
+            with raises(NotImplementedError):
+                store.delete('1')
+
+            with raises(NotImplementedError):
+                store.get('1')
+
+            with raises(NotImplementedError):
+                store.get_job_ids()
+
+            with raises(NotImplementedError):
+                store.load(Mock())
+
+            store.close()
+
+    def test_remove_temp_files(self):
+        with TemporaryDirectory() as test_dir:
+            for name in ('.job-old.tmp', '.job-new.tmp', 'job-1.json'):
+                open(os.path.join(test_dir, name), 'w').close()
+
+            old = time.time() - 3600
+            os.utime(os.path.join(test_dir, '.job-old.tmp'), (old, old))
+            os.utime(os.path.join(test_dir, 'job-1.json'), (old, old))
+
+            BaseJobStore(test_dir + '/')
+
+            # Temp files of running writers are kept
+            assert sorted(os.listdir(test_dir)) == [
+                '.job-new.tmp', 'job-1.json'
+            ]
+
+    @patch('mash.services.job_store.remove_file')
+    def test_remove_temp_files_renamed(self, mock_remove_file):
+        entry = Mock()
+        entry.name = '.job-1.tmp'
+        entry.stat.side_effect = FileNotFoundError
+
+        with TemporaryDirectory() as test_dir:
+            with patch('mash.services.job_store.os.scandir') as mock_scandir:
+                mock_scandir.return_value = [entry]
+                BaseJobStore(test_dir + '/')
+
+        # Temp file renamed by its writer meanwhile
+        assert not mock_remove_file.called
+
+
+class TestFileJobStore(object):
+    def test_file_job_store(self):
+        with TemporaryDirectory() as test_dir:
+            store = FileJobStore(test_dir + '/')
+            store.add({'id': '1', 'cloud': 'ec2'})
+            store.add({'id': '2', 'cloud': 'gce'})
+            store.add({'id': '1', 'cloud': 'azure'})
+
+            assert sorted(os.listdir(test_dir)) == ['job-1.json', 'job-2.json']
+
+            with open(os.path.join(test_dir, 'job-1.json')) as job_file:
+                assert job_file.read() == '{"id":"1","cloud":"azure"}'
+
+            assert store.get('2') == {'id': '2', 'cloud': 'gce'}
+            assert store.get('3') is None
+            assert sorted(store.get_job_ids()) == ['1', '2']
+
+            callback = Mock()
+            store.load(callback)
+            assert callback.call_count == 2
+
+            store.delete('1')
+            store.delete('3')
+            assert os.listdir(test_dir) == ['job-2.json']
+
+    def test_file_job_store_add_many(self):
+        with TemporaryDirectory() as test_dir:
+            store = FileJobStore(test_dir + '/')
+
+            with patch('mash.services.job_store.os.fsync') as mock_fsync:
+                store.add({'id': '1'})
+                assert not mock_fsync.called
+
+                # Files and directory of a batch are synced
+                store.add_many([{'id': '1'}, {'id': '2'}])
+                assert mock_fsync.call_count == 3
+
+            assert sorted(os.listdir(test_dir)) == ['job-1.json', 'job-2.json']
+            assert store.get('2') == {'id': '2'}
+
+            # Failed batch leaves no temp files
+            with raises(KeyError):
+                store.add_many([{'id': '3'}, {'cloud': 'ec2'}])
+
+            assert sorted(os.listdir(test_dir)) == ['job-1.json', 'job-2.json']
+
+
+class TestSQLiteJobStore(object):
+    def test_sqlite_job_store(self):
+        with TemporaryDirectory() as test_dir:
+            store = SQLiteJobStore(test_dir + '/')
+            store.add({'id': '1', 'cloud': 'ec2'})
+            store.add({'id': '2', 'cloud': 'gce'})
+            store.add({'id': '1', 'cloud': 'azure'})
+
+            assert store.get('1') == {'id': '1', 'cloud': 'azure'}
+            assert store.get('3') is None
+
+            store.delete('2')
+            store.delete('3')
+            assert store.get_job_ids() == ['1']
+
+            callback = Mock()
+            store.load(callback)
+            callback.assert_called_once_with({'id': '1', 'cloud': 'azure'})
+
+            journal_mode = store.connection.execute(
+                'PRAGMA journal_mode'
+            ).fetchone()[0]
+            assert journal_mode == 'wal'
+            store.close()
+
+    def test_sqlite_job_store_add_many(self):
+        with TemporaryDirectory() as test_dir:
+            store = SQLiteJobStore(test_dir + '/')
+            store.add_many([{'id': '1'}, {'id': '2'}])
+
+            assert sorted(store.get_job_ids()) == ['1', '2']
+
+            # Failed batch is rolled back
+            with raises(KeyError):
+                store.add_many([{'id': '3'}, {'cloud': 'ec2'}])
+
+            assert store.get('3') is None
+            store.close()
+
+    def test_sqlite_job_store_import_job_files(self):
+        with TemporaryDirectory() as test_dir:
+            with open(os.path.join(test_dir, 'job-1.json'), 'w') as job_file:
+                json.dump({'id': '1', 'cloud': 'ec2'}, job_file, indent=4)
+
+            store = SQLiteJobStore(test_dir + '/')
+
+            assert not os.path.exists(os.path.join(test_dir, 'job-1.json'))
+            assert store.get('1') == {'id': '1', 'cloud': 'ec2'}
+            store.close()
+
+    @patch('mash.services.job_store.sqlite3.connect')
+    def test_sqlite_job_store_error(self, mock_connect):
+        mock_connect.side_effect = sqlite3.Error('Broken')
+
+        with TemporaryDirectory() as test_dir:
+            with raises(MashJobStoreException):
+                SQLiteJobStore(test_dir + '/')
+
+
+def test_get_job_store():
+    with TemporaryDirectory() as test_dir:
+        assert isinstance(get_job_store('file', test_dir + '/'), FileJobStore)
+
+        store = get_job_store('sqlite', test_dir + '/')
+        assert isinstance(store, SQLiteJobStore)
+        store.close()
+
+        with raises(MashJobStoreException):
+            get_job_store('redis', test_dir + '/')
@@ -1,6 +1,9 @@
+import asyncio
+
 from pytest import raises
 from unittest.mock import Mock, patch
 
+from mash.services.credentials_cache import credentials_cache
 from mash.services.mash_job import MashJob
 from mash.mash_exceptions import MashJobException
 
@@ -16,6 +19,7 @@ class TestMashJob(object):
         }
         self.config = Mock()
         self.config.get_credentials_url.return_value = 'http://localhost:5000'
+        credentials_cache.clear()
 
     def test_missing_key(self):
         del self.job_config['cloud']
@@ -58,29 +62,117 @@ class TestMashJob(object):
         # Test credentials already exist
         job.request_credentials(['acnt1'])
 
+        # Test credentials shared with other jobs of the user
+        other_job = MashJob(self.job_config, self.config)
+        other_job.request_credentials(['acnt1'])
+
+        assert other_job.credentials == job.credentials
+        assert mock_handle_request.call_count == 1
+
         # Test request failed
         mock_handle_request.side_effect = Exception('Failed')
         job.credentials = None
+        credentials_cache.clear()
 
         with raises(MashJobException):
             job.request_credentials(['acnt1'])
 
+    @patch('mash.services.mash_job.handle_request_async')
+    def test_request_credentials_async(self, mock_handle_request):
+        job = MashJob(self.job_config, self.config)
+        job.http_session = Mock()
+        mock_handle_request.return_value = {'acnt1': {'super': 'secret'}}
+
+        asyncio.run(job.request_credentials_async(['acnt1']))
+
+        assert job.credentials['acnt1']['super'] == 'secret'
+        mock_handle_request.assert_called_once_with(
+            job.http_session,
+            'http://localhost:5000',
+            'credentials/',
+            'get',
+            job_data={
+                'cloud': 'ec2',
+                'cloud_accounts': ['acnt1'],
+                'requesting_user': 'user1'
+            }
+        )
+
+        # Test credentials already exist
+        asyncio.run(job.request_credentials_async(['acnt1']))
+        assert mock_handle_request.call_count == 1
+
+        # Test credentials shared with other jobs of the user
+        other_job = MashJob(self.job_config, self.config)
+        asyncio.run(other_job.request_credentials_async(['acnt1']))
+        assert mock_handle_request.call_count == 1
+
+        # Test request failed
+        mock_handle_request.side_effect = Exception('Failed')
+        job.credentials = None
+        credentials_cache.clear()
+
+        with raises(MashJobException):
+            asyncio.run(job.request_credentials_async(['acnt1']))
+
+    @patch('mash.services.mash_job.handle_request_async')
+    def test_request_credentials_event_loop(self, mock_handle_request):
+        job = MashJob(self.job_config, self.config)
+        job.http_session = Mock()
+        mock_handle_request.return_value = {'acnt1': {'super': 'secret'}}
+
+        async def run_job():
+            job.event_loop = asyncio.get_running_loop()
+            await job.run_blocking(job.request_credentials, ['acnt1'])
+
+        # Blocking job requests credentials with the aiohttp session
+        asyncio.run(run_job())
+
+        assert job.credentials['acnt1']['super'] == 'secret'
+        mock_handle_request.assert_called_once_with(
+            job.http_session,
+            'http://localhost:5000',
+            'credentials/',
+            'get',
+            job_data={
+                'cloud': 'ec2',
+                'cloud_accounts': ['acnt1'],
+                'requesting_user': 'user1'
+            }
+        )
+
     def test_run_job(self):
         job = MashJob(self.job_config, self.config)
 
         with raises(NotImplementedError):
             job.run_job()
 
+    def test_process_job_async(self):
+        job = MashJob(self.job_config, self.config)
+        job.log_callback = Mock()
+        job.run_job = Mock()
+
+        asyncio.run(job.process_job_async())
+
+        assert job.log_callback.extra == {'job_id': '1'}
+        job.run_job.assert_called_once_with()
+        status_msg = job.get_status_message()
+        assert status_msg['started_at'] <= status_msg['finished_at']
+
+    def test_run_blocking(self):
+        job = MashJob(self.job_config, self.config)
+        func = Mock(return_value='result')
+
+        result = asyncio.run(job.run_blocking(func, 'arg', key='value'))
+
+        assert result == 'result'
+        func.assert_called_once_with('arg', key='value')
+
     def test_job_get_job_id(self):
         job = MashJob(self.job_config, self.config)
         metadata = job.get_job_id()
         assert metadata == {'job_id': '1'}
 
-    def test_job_file_property(self):
-        job = MashJob(self.job_config, self.config)
-        job.job_file = 'test.file'
-        assert job.job_file == 'test.file'
-
     def test_set_cloud_image_name(self):
         job = MashJob(self.job_config, self.config)
         job.cloud_image_name = 'name123'
@@ -101,6 +193,44 @@ class TestMashJob(object):
         job._log_callback = Mock()
         job.process_job()
         mock_run_job.assert_called_once_with()
+        status_msg = job.get_status_message()
+        assert status_msg['started_at'] <= status_msg['finished_at']
+
+        # Finish time is set if the job raises
+        del status_msg['finished_at']
+        mock_run_job.side_effect = Exception('Broken')
+
+        with raises(Exception):
+            job.process_job()
+
+        assert 'finished_at' in job.get_status_message()
+
+    @patch('mash.services.mash_job.credentials_cache')
+    @patch.object(MashJob, 'run_job')
+    def test_process_job_authentication_error(
+        self, mock_run_job, mock_credentials_cache
+    ):
+        job = MashJob(self.job_config, self.config)
+        job._log_callback = Mock()
+
+        # Failed job with other error keeps the credentials
+        job.status = 'failed'
+        job.add_error_msg('Image not found')
+        job.process_job()
+        assert not mock_credentials_cache.invalidate.called
+
+        job.add_error_msg('An error occurred (AuthFailure)')
+        job.process_job()
+        mock_credentials_cache.invalidate.assert_called_once_with('user1')
+
+        # Exception
+        mock_credentials_cache.invalidate.reset_mock()
+        mock_run_job.side_effect = Exception('Unauthorized')
+
+        with raises(Exception):
+            asyncio.run(job.process_job_async())
+
+        mock_credentials_cache.invalidate.assert_called_once_with('user1')
 
     def test_get_set_status(self):
         job = MashJob(self.job_config, self.config)
@@ -116,3 +246,32 @@ class TestMashJob(object):
 
         assert status_msg['id'] == '1'
         assert status_msg['status'] == 'success'
+
+    def test_clear_stage_times(self):
+        job = MashJob(self.job_config, self.config)
+        job.set_status_message({
+            'id': '1',
+            'status': 'failed',
+            'queued_at': 10.0,
+            'started_at': 11.0,
+            'finished_at': 12.0
+        })
+        job.clear_stage_times()
+
+        assert job.get_status_message() == {'id': '1', 'status': 'failed'}
+
+    def test_set_queued_time(self):
+        job = MashJob(self.job_config, self.config)
+        job.set_status_message({
+            'id': '1',
+            'status': 'success',
+            'queued_at': 10.0,
+            'started_at': 11.0,
+            'finished_at': 12.0
+        })
+        job.set_queued_time()
+        status_msg = job.get_status_message()
+
+        assert status_msg['queued_at'] > 12.0
+        assert 'started_at' not in status_msg
+        assert 'finished_at' not in status_msg
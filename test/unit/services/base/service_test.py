@@ -2,6 +2,8 @@ from unittest.mock import patch
 from unittest.mock import Mock
 from pytest import raises
 
+from amqpstorm import AMQPError
+
 from mash.services.mash_service import MashService
 
 from mash.mash_exceptions import MashRabbitConnectionException
@@ -31,6 +33,10 @@ class TestBaseService(object):
             'obs', 'upload', 'create', 'raw_image_upload', 'test',
             'replicate', 'publish', 'deprecate'
         ]
+        config.get_message_content_type.return_value = 'application/json'
+        config.get_message_compression.return_value = None
+        config.get_message_compression_threshold.return_value = 65536
+        config.get_publish_confirm_window.return_value = 64
 
         self.service = MashService('obs', config=config)
 
@@ -53,10 +59,18 @@ class TestBaseService(object):
     def test_close_connection(self):
         self.connection.close.return_value = None
         self.channel.close.return_value = None
+        self.service.log_handler = Mock()
         self.service.close_connection()
+        self.service.log_handler.close.assert_called_once_with()
         self.connection.close.assert_called_once_with()
         self.channel.close.assert_called_once_with()
 
+        # Publish channel is closed as well
+        self.channel.reset_mock()
+        self.service.publisher = Mock()
+        self.service.close_connection()
+        self.service.publisher.channel.close.assert_called_once_with()
+
     def test_unbind_queue(self):
         self.service.unbind_queue(
             'service', 'test', '1'
@@ -64,3 +78,114 @@ class TestBaseService(object):
         self.service.channel.queue.unbind.assert_called_once_with(
             queue='test.service', exchange='test', routing_key='1'
         )
+
+    def test_bind_replica_queue(self):
+        queue = self.service.bind_replica_queue(
+            'test', 'job_document', 'service', 'node1'
+        )
+
+        assert queue == 'test.service.node1'
+        self.channel.exchange.declare.assert_called_with(
+            exchange='test.service.hash',
+            exchange_type='x-consistent-hash',
+            durable=True,
+            arguments={'hash-property': 'message_id'}
+        )
+        self.channel.exchange.bind.assert_called_once_with(
+            destination='test.service.hash',
+            source='test',
+            routing_key='job_document'
+        )
+        self.channel.queue.declare.assert_called_once_with(
+            queue='test.service.node1', durable=True
+        )
+        self.channel.queue.bind.assert_called_once_with(
+            exchange='test.service.hash',
+            queue='test.service.node1',
+            routing_key='1'
+        )
+
+    def test_unbind_replica_queue(self):
+        self.service.unbind_replica_queue('test', 'service', 'node1')
+        self.channel.queue.unbind.assert_called_once_with(
+            queue='test.service.node1',
+            exchange='test.service.hash',
+            routing_key='1'
+        )
+
+    @patch('mash.services.mash_service.ConfirmPublisher')
+    def test_publish_message_id(self, mock_publisher_class):
+        self.connection.is_closed = False
+        publisher = mock_publisher_class.return_value
+        self.service._publish('obs', 'listener_msg', 'message', '1')
+
+        mock_publisher_class.assert_called_once_with(
+            self.channel, window=64
+        )
+        self.msg_properties['message_id'] = '1'
+        publisher.publish.assert_called_once_with(
+            'message', 'listener_msg', 'obs', self.msg_properties
+        )
+        publisher.wait.assert_called_once_with(
+            [publisher.publish.return_value]
+        )
+
+    @patch('mash.services.mash_service.ConfirmPublisher')
+    def test_publish_many(self, mock_publisher_class):
+        self.connection.is_closed = False
+        publisher = mock_publisher_class.return_value
+        publisher.publish.side_effect = ['future1', 'future2', 'future3']
+
+        self.service.publish_many([
+            ('obs', 'job_document', 'message1', '1'),
+            ('upload', 'job_document', 'message2', '1')
+        ])
+
+        # All messages are published before waiting for confirms
+        assert publisher.publish.call_count == 2
+        self.msg_properties['message_id'] = '1'
+        publisher.publish.assert_called_with(
+            'message2', 'job_document', 'upload', self.msg_properties
+        )
+        publisher.wait.assert_called_once_with(['future1', 'future2'])
+
+        # Publisher is reused while its channel is open
+        self.service.publish_many([('obs', 'job_document', 'message', '1')])
+        assert mock_publisher_class.call_count == 1
+
+    @patch('mash.services.mash_service.ConfirmPublisher')
+    def test_publish_many_error(self, mock_publisher_class):
+        self.connection.is_closed = False
+        publisher = mock_publisher_class.return_value
+        publisher.wait.side_effect = AMQPError('Nacked')
+
+        with raises(AMQPError):
+            self.service.publish_many([
+                ('obs', 'job_document', 'message', '1')
+            ])
+
+        # Failed publisher is replaced and its channel closed
+        publisher.is_open = False
+        publisher.wait.side_effect = None
+        self.service.publish_many([])
+        publisher.channel.close.assert_called_once_with()
+        assert mock_publisher_class.call_count == 2
+
+    @patch('mash.services.mash_service.ConfirmPublisher')
+    def test_publish_compressed(self, mock_publisher_class):
+        self.connection.is_closed = False
+        publisher = mock_publisher_class.return_value
+        self.service.message_compression = 'gzip'
+        self.service.message_compression_threshold = 10
+        self.service._publish('obs', 'listener_msg', {'id': '1' * 20})
+
+        body, routing_key, exchange, properties = \
+            publisher.publish.call_args[0]
+        assert properties == {
+            'content_type': 'application/json',
+            'content_encoding': 'gzip',
+            'delivery_mode': 2
+        }
+
+        message = Mock(body=body, properties=properties)
+        assert self.service._decode_message(message) == {'id': '1' * 20}
@@ -8,3 +8,21 @@ class TestTestConfig(object):
 
     def test_get_max_image_age(self):
         assert self.empty_config.get_max_image_age() == 90
+
+    def test_get_job_log_compress_age(self):
+        assert self.empty_config.get_job_log_compress_age() == 1
+
+    def test_get_max_job_log_age(self):
+        assert self.config.get_max_job_log_age() == 30
+        assert self.empty_config.get_max_job_log_age() == 90
+
+    def test_get_max_job_logs_size(self):
+        assert self.config.get_max_job_logs_size() == 2048
+        assert self.empty_config.get_max_job_logs_size() == 10240
+
+    def test_get_max_service_log_size(self):
+        assert self.empty_config.get_max_service_log_size() == 100
+
+    def test_get_service_log_backup_count(self):
+        assert self.config.get_service_log_backup_count() == 3
+        assert self.empty_config.get_service_log_backup_count() == 5
@@ -1,5 +1,10 @@
-from unittest.mock import MagicMock, Mock, patch
+import os
+import time
 
+from tempfile import TemporaryDirectory
+from unittest.mock import MagicMock, Mock, call, patch
+
+from mash.log.job_log import read_index, read_job_log
 from mash.services.cleanup_service import CleanupService
 from mash.services.mash_service import MashService
 
@@ -51,12 +56,16 @@ class TestCleanupService(object):
         mock_setup_logfile.assert_called_once_with(
             '/var/log/mash/cleanup_service.log'
         )
-        scheduler.add_job.assert_called_once_with(
-            self.cleanup._purge_images,
-            'cron',
-            hour='5',
-            minute='0'
-        )
+        scheduler.add_job.assert_has_calls([
+            call(
+                self.cleanup._purge_images,
+                'cron',
+                hour='5',
+                minute='0'
+            ),
+            call(self.cleanup._cleanup_job_logs, 'cron', minute='15'),
+            call(self.cleanup._rotate_service_logs, 'cron', minute='45')
+        ])
         scheduler.start.assert_called_once()
 
     @patch('shutil.rmtree')
@@ -85,3 +94,134 @@ class TestCleanupService(object):
 
         mock_isdir.return_value = False
         self.cleanup._purge_images()
+
+    def _write_file(self, path, data, age=0):
+        with open(path, 'w') as test_file:
+            test_file.write(data)
+
+        mtime = time.time() - age * 86400
+        os.utime(path, (mtime, mtime))
+
+    def test_cleanup_job_logs(self):
+        self.cleanup.config = self.config
+        self.config.get_job_log_compress_age.return_value = 1
+        self.config.get_max_job_log_age.return_value = 30
+        self.config.get_max_job_logs_size.return_value = 1
+
+        with TemporaryDirectory() as log_dir:
+            self.config.get_job_log_directory.return_value = log_dir
+
+            self._write_file(os.path.join(log_dir, '1.log'), 'Old\n', 40)
+            self._write_file(os.path.join(log_dir, '1.log.idx'), '0 1 -\n', 40)
+            self._write_file(os.path.join(log_dir, '2.log'), 'Done\n', 2)
+            self._write_file(os.path.join(log_dir, '2.log.idx'), '0 2 -\n', 2)
+            self._write_file(os.path.join(log_dir, '3.log'), 'Running\n')
+
+            # Only job log files are cleaned up
+            self._write_file(os.path.join(log_dir, 'notes.txt'), 'Keep\n', 40)
+            os.mkdir(os.path.join(log_dir, 'archive'))
+
+            self.cleanup._cleanup_job_logs()
+
+            assert sorted(os.listdir(log_dir)) == [
+                '2.log.gz', '2.log.idx.gz', '3.log', 'archive', 'notes.txt'
+            ]
+
+            # Oldest logs removed when max size is exceeded
+            self.config.get_max_job_logs_size.return_value = 0.00001
+            self.cleanup._cleanup_job_logs()
+
+            assert sorted(os.listdir(log_dir)) == [
+                '3.log', 'archive', 'notes.txt'
+            ]
+
+        # Missing log directory
+        self.cleanup._cleanup_job_logs()
+
+    def test_cleanup_job_logs_compress_twice(self):
+        self.cleanup.config = self.config
+        self.config.get_job_log_compress_age.return_value = 1
+        self.config.get_max_job_log_age.return_value = 30
+        self.config.get_max_job_logs_size.return_value = 1
+
+        with TemporaryDirectory() as log_dir:
+            self.config.get_job_log_directory.return_value = log_dir
+            log_file = os.path.join(log_dir, '1.log')
+
+            self._write_file(log_file, 'First\n', 2)
+            self._write_file(log_file + '.idx', '0 1 -\n', 2)
+            self.cleanup._cleanup_job_logs()
+
+            # The job logged again after its log was compressed
+            self._write_file(log_file, 'Second\n', 2)
+            self._write_file(log_file + '.idx', '0 2 -\n', 2)
+            self.cleanup._cleanup_job_logs()
+
+            assert sorted(os.listdir(log_dir)) == ['1.log.gz', '1.log.idx.gz']
+            assert read_job_log(log_file)['logs'] == 'First\nSecond\n'
+            assert [entry.offset for entry in read_index(log_file)] == [0, 6]
+
+    def test_cleanup_job_logs_compress_error(self):
+        self.cleanup.config = self.config
+        self.config.get_job_log_compress_age.return_value = 1
+        self.config.get_max_job_log_age.return_value = 30
+        self.config.get_max_job_logs_size.return_value = 0.00001
+
+        with TemporaryDirectory() as log_dir:
+            self.config.get_job_log_directory.return_value = log_dir
+            log_file = os.path.join(log_dir, '1.log')
+            self._write_file(log_file, 'Done\n', 2)
+
+            with patch(
+                'mash.services.cleanup.service.compress_job_log'
+            ) as mock_compress_job_log:
+                mock_compress_job_log.side_effect = OSError('Disk full')
+                self.cleanup._cleanup_job_logs()
+
+            # Log that failed to compress is kept
+            assert os.listdir(log_dir) == ['1.log']
+
+        self.cleanup.log.error.assert_called_once_with(
+            'Unable to compress job log {0}: Disk full'.format(log_file)
+        )
+
+    def test_rotate_service_logs(self):
+        self.cleanup.config = self.config
+        self.config.get_max_service_log_size.return_value = 0.00001
+        self.config.get_service_log_backup_count.return_value = 2
+
+        with TemporaryDirectory() as log_dir:
+            self.config.get_log_directory.return_value = log_dir
+            log_file = os.path.join(log_dir, 'obs_service.log')
+
+            for data in ('First\n' * 5, 'Second\n' * 5, 'Third\n' * 5):
+                self._write_file(log_file, data)
+                self.cleanup._rotate_service_logs()
+
+            self._write_file(log_file, 'Small\n')
+            self.cleanup._rotate_service_logs()
+
+            assert sorted(os.listdir(log_dir)) == [
+                'obs_service.log',
+                'obs_service.log.1.gz',
+                'obs_service.log.2.gz'
+            ]
+
+        # Missing log directory
+        self.cleanup._rotate_service_logs()
+
+        # Rotation error is logged
+        with patch('mash.services.cleanup.service.os') as mock_os:
+            mock_os.path.isdir.return_value = True
+            entry = Mock()
+            entry.name = 'obs_service.log'
+            entry.path = '/var/log/mash/obs_service.log'
+            entry.stat.return_value.st_size = 1048576
+            mock_os.scandir.return_value.__enter__.return_value = [entry]
+            mock_os.rename.side_effect = Exception('Broken')
+
+            self.cleanup._rotate_service_logs()
+
+        self.cleanup.log.error.assert_called_once_with(
+            'Unable to rotate log /var/log/mash/obs_service.log: Broken'
+        )
@@ -24,6 +24,27 @@ class TestCreate(object):
             }
         )
 
+    @patch('mash.services.create_service.BaseJobFactory')
+    @patch('mash.services.create_service.BaseConfig')
+    @patch('mash.services.create_service.AsyncListenerService')
+    def test_main_asyncio(self, mock_create_service, mock_config, mock_factory):
+        config = Mock()
+        config.get_listener_engine.return_value = 'asyncio'
+        mock_config.return_value = config
+
+        factory = Mock()
+        mock_factory.return_value = factory
+
+        main()
+        config.get_listener_engine.assert_called_once_with('create')
+        mock_create_service.assert_called_once_with(
+            service_exchange='create',
+            config=config,
+            custom_args={
+                'job_factory': factory
+            }
+        )
+
     @patch('mash.services.create_service.BaseConfig')
     @patch('mash.services.create_service.ListenerService')
     @patch('sys.exit')
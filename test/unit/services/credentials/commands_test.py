@@ -0,0 +1,46 @@
+import pytest
+
+from unittest.mock import patch
+
+from mash.services.credentials.app import create_app
+from mash.services.credentials.flask_config import Config
+from mash.services.credentials.commands import store_cli
+
+
+@pytest.fixture(scope='module')
+def test_app():
+    flask_config = Config(
+        config_file='test/data/mash_config.yaml',
+        test=True
+    )
+    app = create_app(flask_config)
+
+    ctx = app.app_context()
+    ctx.push()
+
+    yield app
+    ctx.pop()
+
+
+@patch('mash.services.credentials.commands.migrate_credentials')
+@patch('mash.services.credentials.commands.get_credentials_store')
+def test_store_migrate(mock_get_store, mock_migrate, test_app):
+    runner = test_app.test_cli_runner()
+    mock_migrate.return_value = 3
+
+    # Success
+    result = runner.invoke(store_cli, ['migrate', 'sqlite'])
+    assert 'Migrated 3 credentials from file to sqlite store.' in \
+        result.output
+    mock_get_store.assert_any_call('sqlite', '/var/lib/mash/credentials/')
+    assert mock_get_store.return_value.close.call_count == 2
+
+    # Failure
+    mock_migrate.side_effect = Exception('Database is locked')
+    result = runner.invoke(store_cli, ['migrate', 'sqlite'])
+    assert 'Unable to migrate credentials: Database is locked' in \
+        result.output
+
+    # Same store
+    result = runner.invoke(store_cli, ['migrate', 'file'])
+    assert 'Source and target store are the same.' in result.output
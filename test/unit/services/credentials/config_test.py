@@ -17,3 +17,12 @@ class TestCredentialsConfig(object):
     def test_get_credentials_dir(self):
         assert self.config.get_credentials_dir() == \
             '/var/lib/mash/credentials/'
+
+    def test_get_credentials_cache_ttl(self):
+        assert self.config.get_credentials_cache_ttl() == 60
+
+    def test_get_key_rotation_thread_count(self):
+        assert self.config.get_key_rotation_thread_count() == 10
+
+    def test_get_credentials_store(self):
+        assert self.config.get_credentials_store() == 'file'
@@ -105,6 +105,42 @@ def test_get_credentials(mock_app, test_client):
         b'{"msg":"Unable to retrieve credentials: Permission denied"}\n'
 
 
+@patch('mash.services.credentials.routes.credentials.current_app')
+def test_get_credentials_bulk(mock_app, test_client):
+    results = [{'credentials': {'test-aws': {'super': 'secret'}}}]
+    data = {
+        'requests': [{
+            'cloud': 'ec2',
+            'cloud_accounts': ['test-aws'],
+            'requesting_user': 'user1'
+        }]
+    }
+    mock_app.credentials_datastore.retrieve_credentials_bulk.return_value = \
+        results
+
+    response = test_client.get(
+        '/credentials/bulk',
+        content_type='application/json',
+        data=json.dumps(data, sort_keys=True)
+    )
+
+    assert response.status_code == 200
+    assert response.json == results
+    mock_app.credentials_datastore.retrieve_credentials_bulk.\
+        assert_called_once_with(data['requests'])
+
+    # Error
+    response = test_client.get(
+        '/credentials/bulk',
+        content_type='application/json',
+        data=json.dumps({}, sort_keys=True)
+    )
+
+    assert response.status_code == 400
+    assert response.data == \
+        b'{"msg":"Unable to retrieve credentials: \'requests\'"}\n'
+
+
 @patch('mash.services.credentials.routes.credentials.current_app')
 def test_delete_credentials(mock_app, test_client):
     job_doc = {
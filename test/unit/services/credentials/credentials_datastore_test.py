@@ -3,11 +3,13 @@ import os
 import pytest
 
 from apscheduler.schedulers.background import BackgroundScheduler
+from cryptography.fernet import Fernet
 from tempfile import TemporaryDirectory
 from unittest.mock import MagicMock, Mock, patch
 
 from mash.mash_exceptions import MashCredentialsDatastoreException
 from mash.services.credentials.datastore import CredentialsDatastore
+from mash.services.credentials.store import FileCredentialsStore
 
 
 class TestCredentialsDatastore(object):
@@ -31,27 +33,47 @@ class TestCredentialsDatastore(object):
             file_handle = mock_open.return_value.__enter__.return_value
             assert file_handle.write.call_count == 1
 
-    @patch('mash.services.credentials.datastore.os')
-    def test_datastore_save_credentials(self, mock_os):
-        mock_os.path.isdir.return_value = False
+        self.store = Mock()
+        self.datastore.store = self.store
 
-        with patch('builtins.open', create=True) as mock_open:
-            mock_open.return_value = MagicMock(spec=io.IOBase)
-            file_handle = mock_open.return_value.__enter__.return_value
-            file_handle.readlines.return_value = [
-                b'WPRWDoAakA0NQFeJhJUFofF9O2-OdjyJR_rQP8KnVd4='
-            ]
+    @patch('mash.services.credentials.datastore.BackgroundScheduler')
+    @patch('mash.services.credentials.datastore.get_credentials_store')
+    def test_datastore_resume_rotation(self, mock_get_store, mock_scheduler):
+        mock_get_store.return_value.rotation_in_progress.return_value = True
+        mock_scheduler.return_value = self.scheduler
+        self.scheduler.reset_mock()
 
-            self.datastore.save_credentials(
-                'ec2', 'acnt1', 'user1', {'super': 'secret'}
-            )
+        datastore = CredentialsDatastore(
+            '/var/lib/mash/credentials/',
+            'test/data/encryption_keys',
+            self.log_callback
+        )
 
-            assert file_handle.write.call_count == 1
+        self.scheduler.add_job.assert_called_with(datastore._rotate_key)
 
-    @patch('mash.services.credentials.datastore.os')
-    def test_datastore_delete_credentials(self, mock_os):
-        mock_os.path.join.return_value = 'creds_file.path'
+    def use_directory(self, test_dir):
+        keys_file = os.path.join(test_dir, 'keys.file')
+        creds_dir = os.path.join(test_dir, 'creds')
+
+        with open(keys_file, 'w') as f:
+            f.write('XxgkVrKyG9gZqdvbycZgaSZF1Ro0Vr8DBMXjBuc4uRo=')
+
+        self.datastore.encryption_keys_file = keys_file
+        self.datastore.credentials_directory = creds_dir
+        self.datastore.store = FileCredentialsStore(creds_dir)
+        return keys_file, creds_dir
+
+    def test_datastore_save_credentials(self):
+        self.datastore.save_credentials(
+            'ec2', 'acnt1', 'user1', {'super': 'secret'}
+        )
 
+        user, cloud, account, token = self.store.write.call_args[0]
+        assert (user, cloud, account) == ('user1', 'ec2', 'acnt1')
+        assert self.datastore._decrypt_credentials(token) == \
+            '{"super": "secret"}'
+
+    def test_datastore_delete_credentials(self):
         self.datastore.delete_credentials(
             'user1', 'acnt123', 'ec2'
         )
@@ -59,23 +81,25 @@ class TestCredentialsDatastore(object):
             'Deleting credentials for account: acnt123, '
             'cloud: ec2, user: user1.'
         )
-        mock_os.remove.assert_called_once_with(
-            'creds_file.path'
-        )
+        self.store.delete.assert_called_once_with('user1', 'ec2', 'acnt123')
 
     def test_shutdown(self):
         self.datastore.shutdown()
         self.scheduler.shutdown.assert_called_once_with()
+        self.store.close.assert_called_once_with()
 
-    @patch.object(CredentialsDatastore, '_get_decrypted_credentials')
+    @patch.object(CredentialsDatastore, '_get_cached_credentials')
     def test_retrieve_credentials(self, mock_get_dec_creds):
         creds = {'super': 'secret'}
-        mock_get_dec_creds.return_value = creds
+        mock_get_dec_creds.return_value = {'test123': creds}
 
         value = self.datastore.retrieve_credentials(
             ['test123'], 'gce', 'user1'
         )
         assert creds == value['test123']
+        mock_get_dec_creds.assert_called_once_with(
+            ['test123'], 'gce', 'user1'
+        )
 
     def test_encrypt_credentials(self):
         # Test creds as bytes encode error is caught and passed
@@ -104,40 +128,42 @@ class TestCredentialsDatastore(object):
         )
 
     def test_clean_old_keys(self):
-        with patch('builtins.open', create=True) as mock_open:
-            mock_open.return_value = MagicMock(spec=io.IOBase)
-            file_handle = mock_open.return_value.__enter__.return_value
-            file_handle.readline.return_value = 'test-key123'
-            file_handle.truncate.side_effect = Exception('unable to remove keys')
+        with TemporaryDirectory() as test_dir:
+            keys_file = os.path.join(test_dir, 'keys.file')
+            self.datastore.encryption_keys_file = keys_file
+
+            with open(keys_file, 'w') as f:
+                f.write('new-key\nold-key')
 
             self.datastore._clean_old_keys()
 
+            with open(keys_file) as f:
+                assert f.read() == 'new-key'
+
+            assert os.listdir(test_dir) == ['keys.file']
+
+        # Keys file is missing
+        self.datastore._clean_old_keys()
+
         self.log_callback.error.assert_called_once_with(
-            'Unable to clean old keys from test/data/encryption_keys:'
-            ' unable to remove keys.'
+            'Unable to clean old keys from {0}: [Errno 2] No such file or '
+            "directory: '{0}'.".format(keys_file)
         )
 
     def test_rotate_key(self):
         with TemporaryDirectory() as test_dir:
-            creds_dir = os.path.join(test_dir, 'creds')
-            keys_file = os.path.join(test_dir, 'keys.file')
-
-            self.datastore.encryption_keys_file = keys_file
-            self.datastore.credentials_directory = creds_dir
-
-            os.makedirs(creds_dir)
-
-            with open(keys_file, 'w') as f:
-                f.write('XxgkVrKyG9gZqdvbycZgaSZF1Ro0Vr8DBMXjBuc4uRo=')
+            keys_file, creds_dir = self.use_directory(test_dir)
+            acnt_dir = os.path.join(creds_dir, 'user1', 'ec2')
+            os.makedirs(acnt_dir)
 
             # Create an empty invalid cred file
-            open(os.path.join(creds_dir, 'invalid.creds'), 'a').close()
+            open(os.path.join(acnt_dir, 'invalid.creds'), 'a').close()
 
             # Create an empty wsgi.py file
             open(os.path.join(creds_dir, 'wsgi.py'), 'a').close()
 
             # Create a valid cred file
-            with open(os.path.join(creds_dir, 'valid.creds'), 'w') as cred_file:
+            with open(os.path.join(acnt_dir, 'valid.creds'), 'w') as cred_file:
                 cred_file.write(
                     'gAAAAABbFapolPqpWrLf5rpEj2xyFLkXlwclSQH-_t3tuJnACyRvOxLdw9qR'
                     '3kKMBlz3XIrGH9GJdiA9IJl9y_iQLeCfIAM_4ckDMcYHMLe0WWNnsn4zj9E='
@@ -149,7 +175,7 @@ class TestCredentialsDatastore(object):
             assert str(error.value) == \
                 'All credentials files have not been rotated.'
 
-            self.log_callback.info.assert_called_once_with(
+            self.log_callback.info.assert_any_call(
                 'Starting key rotation with keys file {0} '
                 'in directory {1}.'.format(
                     keys_file, creds_dir
@@ -158,37 +184,82 @@ class TestCredentialsDatastore(object):
             self.log_callback.error.assert_called_once_with(
                 'Failed key rotation on credential file {0}:'
                 ' InvalidToken: '.format(
-                    os.path.join(creds_dir, 'invalid.creds')
+                    os.path.join(acnt_dir, 'invalid.creds')
                 )
             )
 
-    @patch('mash.services.credentials.datastore.os')
-    def test_store_encrypted_credentials(self, mock_os):
-        mock_os.isdir.return_value = True
+            # New key is first, valid file is encrypted with the new key
+            with open(keys_file) as f:
+                keys = f.read().split('\n')
 
-        with patch('builtins.open', create=True) as mock_open:
-            mock_open.return_value = MagicMock(spec=io.IOBase)
-            file_handle = mock_open.return_value.__enter__.return_value
-            file_handle.write.side_effect = Exception('Cannot write file')
+            assert len(keys) == 2
+            assert keys[1] == 'XxgkVrKyG9gZqdvbycZgaSZF1Ro0Vr8DBMXjBuc4uRo='
 
-            with pytest.raises(Exception):
-                self.datastore._store_encrypted_credentials(
-                    'account1', 'encrypted_secrets', 'ec2', 'user1'
-                )
-            self.log_callback.info.assert_called_once_with(
-                'Storing credentials for account: account1, '
-                'cloud: ec2, user: user1.'
-            )
-            self.log_callback.error.assert_called_once_with(
-                'Unable to store credentials: Cannot write file.'
+            with open(os.path.join(acnt_dir, 'valid.creds'), 'rb') as f:
+                credentials = f.read()
+
+            assert Fernet(keys[0]).decrypt(credentials)
+            assert not self.datastore.store.rotation_in_progress()
+            assert sorted(os.listdir(acnt_dir)) == [
+                'invalid.creds', 'valid.creds'
+            ]
+            assert sorted(os.listdir(test_dir)) == ['creds', 'keys.file']
+
+    def test_log_rotation_progress(self):
+        self.datastore._log_rotation_progress(99, 1000)
+        assert not self.log_callback.info.called
+
+        self.datastore._log_rotation_progress(100, 1000)
+        self.log_callback.info.assert_called_once_with(
+            'Key rotation progress: 100 of 1000 credentials.'
+        )
+
+    def test_rotate_key_resume(self):
+        self.store.rotation_in_progress.return_value = True
+        self.store.rotate.return_value = (2, [])
+
+        with TemporaryDirectory() as test_dir:
+            keys_file = os.path.join(test_dir, 'keys.file')
+            self.datastore.encryption_keys_file = keys_file
+
+            keys = [
+                Fernet.generate_key().decode(),
+                'XxgkVrKyG9gZqdvbycZgaSZF1Ro0Vr8DBMXjBuc4uRo='
+            ]
+            with open(keys_file, 'w') as f:
+                f.write('\n'.join(keys))
+
+            self.datastore._rotate_key()
+
+            # No new key is created when resuming
+            with open(keys_file) as f:
+                assert f.read().split('\n') == keys
+
+        assert not self.store.start_rotation.called
+        assert self.store.rotate.call_args[0][1] == 10
+        self.log_callback.info.assert_any_call(
+            'Resuming interrupted key rotation.'
+        )
+
+    def test_store_encrypted_credentials(self):
+        self.store.write.side_effect = Exception('Cannot write file')
+
+        with pytest.raises(Exception):
+            self.datastore._store_encrypted_credentials(
+                'account1', 'encrypted_secrets', 'ec2', 'user1'
             )
+        self.log_callback.info.assert_called_once_with(
+            'Storing credentials for account: account1, '
+            'cloud: ec2, user: user1.'
+        )
+        self.log_callback.error.assert_called_once_with(
+            'Unable to store credentials: Cannot write file.'
+        )
 
-    @patch('mash.services.credentials.datastore.os')
-    @patch.object(CredentialsDatastore, '_get_credentials_file_path')
-    def test_check_credentials_exist(self, mock_get_creds_path, mock_os):
-        mock_get_creds_path.return_value = 'creds.path'
-        mock_os.path.exists.return_value = True
+    def test_check_credentials_exist(self):
+        self.store.exists.return_value = True
         assert self.datastore._check_credentials_exist('acnt1', 'aws', 'user1')
+        self.store.exists.assert_called_once_with('user1', 'aws', 'acnt1')
 
     def test_decrypt_credentials(self):
         credentials = (
@@ -222,25 +293,117 @@ class TestCredentialsDatastore(object):
             self.datastore._decrypt_credentials(credentials)
 
     @patch.object(CredentialsDatastore, '_decrypt_credentials')
-    @patch.object(CredentialsDatastore, '_get_credentials_file_path')
-    def test_get_decrypted_credentials(self, mock_get_creds_path, mock_dec_creds):
-        mock_get_creds_path.return_value = 'creds.path'
+    def test_get_cached_credentials_disabled(self, mock_dec_creds):
+        self.datastore.cache_ttl = 0
+        self.store.read.return_value = {'acnt1': ('encrypted_creds', 1)}
         mock_dec_creds.return_value = '{"super": "secret"}'
 
-        with patch('builtins.open', create=True) as mock_open:
-            mock_open.return_value = MagicMock(spec=io.IOBase)
-            file_handle = mock_open.return_value.__enter__.return_value
-            file_handle.read.return_value = 'encrypted_creds'
+        result = self.datastore._get_cached_credentials(
+            ['acnt1'], 'ec2', 'user1'
+        )
 
-            result = self.datastore._get_decrypted_credentials(
-                'acnt1', 'ec2', 'user1'
+        assert result['acnt1']['super'] == 'secret'
+        mock_dec_creds.assert_called_once_with('encrypted_creds')
+        assert not self.store.get_versions.called
+        assert not self.datastore.credentials_cache
+
+    def test_remove_user(self):
+        self.datastore.remove_user('fakeuser101')
+        self.store.delete_user.assert_called_once_with('fakeuser101')
+
+    @patch.object(CredentialsDatastore, 'retrieve_credentials')
+    def test_retrieve_credentials_bulk(self, mock_retrieve_credentials):
+        mock_retrieve_credentials.side_effect = [
+            {'acnt1': {'super': 'secret'}},
+            Exception('No such file')
+        ]
+
+        results = self.datastore.retrieve_credentials_bulk([
+            {
+                'cloud_accounts': ['acnt1'],
+                'cloud': 'ec2',
+                'requesting_user': 'user1'
+            },
+            {
+                'cloud_accounts': ['acnt2'],
+                'cloud': 'gce',
+                'requesting_user': 'user2'
+            }
+        ])
+
+        assert results == [
+            {'credentials': {'acnt1': {'super': 'secret'}}},
+            {'msg': 'Unable to retrieve credentials: No such file'}
+        ]
+
+    def test_credentials_cache(self):
+        with TemporaryDirectory() as test_dir:
+            self.use_directory(test_dir)
+
+            self.datastore.save_credentials(
+                'ec2', 'acnt1', 'user1', {'super': 'secret'}
             )
+            self.datastore.save_credentials(
+                'ec2', 'acnt2', 'user1', {'super': 'secret2'}
+            )
+            fernet = self.datastore.fernet
+
+            with patch.object(
+                CredentialsDatastore, '_decrypt_credentials',
+                wraps=self.datastore._decrypt_credentials
+            ) as mock_get_dec_creds:
+                for attempt in range(2):
+                    value = self.datastore.retrieve_credentials(
+                        ['acnt1', 'acnt2'], 'ec2', 'user1'
+                    )
+
+                assert value == {
+                    'acnt1': {'super': 'secret'},
+                    'acnt2': {'super': 'secret2'}
+                }
+
+                # Parsed keys and decrypted credentials are re-used
+                assert self.datastore.fernet == fernet
+                assert mock_get_dec_creds.call_count == 2
+
+                # Saving credentials invalidates the cache entry
+                self.datastore.save_credentials(
+                    'ec2', 'acnt1', 'user1', {'super': 'new'}
+                )
+                value = self.datastore.retrieve_credentials(
+                    ['acnt1', 'acnt2'], 'ec2', 'user1'
+                )
+                assert value['acnt1'] == {'super': 'new'}
+                assert mock_get_dec_creds.call_count == 3
+
+                # Expired entries are read again
+                self.datastore.credentials_cache[('user1', 'ec2', 'acnt1')] = \
+                    (0, 0, {'super': 'expired'})
+                value = self.datastore.retrieve_credentials(
+                    ['acnt1'], 'ec2', 'user1'
+                )
+                assert value['acnt1'] == {'super': 'new'}
 
-            assert result['super'] == 'secret'
+            self.datastore.remove_user('user1')
+            assert not self.datastore.credentials_cache
 
-    @patch('mash.services.credentials.datastore.shutil')
-    def test_remove_user(self, mock_shutil):
-        self.datastore.remove_user('fakeuser101')
-        mock_shutil.rmtree.assert_called_once_with(
-            '/var/lib/mash/credentials/fakeuser101'
-        )
+            with pytest.raises(MashCredentialsDatastoreException):
+                self.datastore.retrieve_credentials(['acnt1'], 'ec2', 'user1')
+
+    def test_invalidate_cache(self):
+        self.datastore.credentials_cache = {
+            ('user1', 'ec2', 'acnt1'): (0, 0, {}),
+            ('user1', 'ec2', 'acnt2'): (0, 0, {}),
+            ('user2', 'ec2', 'acnt1'): (0, 0, {})
+        }
+
+        self.datastore._invalidate_cache('user1', 'ec2', 'acnt1')
+        assert ('user1', 'ec2', 'acnt1') not in self.datastore.credentials_cache
+
+        self.datastore._invalidate_cache('user1')
+        assert list(self.datastore.credentials_cache) == [
+            ('user2', 'ec2', 'acnt1')
+        ]
+
+        self.datastore._invalidate_cache()
+        assert not self.datastore.credentials_cache
@@ -0,0 +1,303 @@
+import os
+
+from cryptography.fernet import Fernet, MultiFernet
+from pytest import raises
+from tempfile import TemporaryDirectory
+from unittest.mock import Mock, patch
+
+from mash.mash_exceptions import MashCredentialsDatastoreException
+from mash.services.credentials.store import (
+    BaseCredentialsStore,
+    FileCredentialsStore,
+    SQLiteCredentialsStore,
+    get_credentials_store,
+    migrate_credentials
+)
+
+
+class TestCredentialsStores(object):
+    def setup(self):
+        self.old_key = Fernet.generate_key()
+        self.new_key = Fernet.generate_key()
+        self.token = Fernet(self.old_key).encrypt(b'{"super": "secret"}')
+
+    def check_store(self, store):
+        store.write('user1', 'ec2', 'acnt1', self.token.decode())
+        store.write('user1', 'ec2', 'acnt2', self.token.decode())
+        store.write('user2', 'gce', 'acnt1', self.token.decode())
+
+        tokens = store.read('user1', 'ec2', ['acnt1', 'acnt2'])
+        assert tokens['acnt1'][0] == self.token.decode()
+        assert store.get_versions('user1', 'ec2', ['acnt1', 'acnt2']) == {
+            account: token[1] for account, token in tokens.items()
+        }
+
+        with raises(MashCredentialsDatastoreException):
+            store.read('user1', 'ec2', ['acnt1', 'acnt3'])
+
+        with raises(MashCredentialsDatastoreException):
+            store.get_versions('user1', 'gce', ['acnt1'])
+
+        assert store.exists('user1', 'ec2', 'acnt1')
+        assert not store.exists('user1', 'gce', 'acnt1')
+        assert sorted(store.get_records()) == [
+            ('user1', 'ec2', 'acnt1', self.token.decode()),
+            ('user1', 'ec2', 'acnt2', self.token.decode()),
+            ('user2', 'gce', 'acnt1', self.token.decode())
+        ]
+
+        # Rotation
+        store.start_rotation()
+        fernet = MultiFernet([Fernet(self.new_key), Fernet(self.old_key)])
+        progress_callback = Mock()
+        total, failed = store.rotate(fernet.rotate, 2, progress_callback)
+
+        assert total == 3
+        assert failed == []
+        assert not store.rotation_in_progress()
+        progress_callback.assert_called_with(3, 3)
+
+        token = store.read('user2', 'gce', ['acnt1'])['acnt1'][0]
+        assert Fernet(self.new_key).decrypt(token.encode())
+
+        store.delete('user1', 'ec2', 'acnt2')
+        assert not store.exists('user1', 'ec2', 'acnt2')
+
+        store.delete_user('user1')
+        assert [record[0] for record in store.get_records()] == ['user2']
+
+        store.close()
+
+    def test_file_store(self):
+        with TemporaryDirectory() as test_dir:
+            store = get_credentials_store('file', test_dir)
+            self.check_store(store)
+
+            assert os.path.exists(store.get_path('user2', 'gce', 'acnt1'))
+
+    def test_sqlite_store(self):
+        with TemporaryDirectory() as test_dir:
+            store = get_credentials_store('sqlite', test_dir)
+            self.check_store(store)
+
+    def test_sqlite_store_rotate_failed(self):
+        with TemporaryDirectory() as test_dir:
+            store = SQLiteCredentialsStore(test_dir)
+            store.write('user1', 'ec2', 'acnt1', 'invalid')
+            store.write('user1', 'ec2', 'acnt2', self.token.decode())
+
+            fernet = MultiFernet([Fernet(self.new_key), Fernet(self.old_key)])
+            total, failed = store.rotate(fernet.rotate, 1)
+
+            assert total == 2
+            assert failed[0][0] == os.path.join('user1', 'ec2', 'acnt1')
+
+            # Failed token is left unchanged
+            tokens = store.read('user1', 'ec2', ['acnt1', 'acnt2'])
+            assert tokens['acnt1'][0] == 'invalid'
+            assert Fernet(self.new_key).decrypt(tokens['acnt2'][0].encode())
+
+    def test_sqlite_store_no_accounts(self):
+        with TemporaryDirectory() as test_dir:
+            store = SQLiteCredentialsStore(test_dir)
+
+            assert store.read('user1', 'ec2', []) == {}
+            assert store.get_versions('user1', 'ec2', []) == {}
+            store.close()
+
+    def test_sqlite_store_import_rollback(self):
+        with TemporaryDirectory() as test_dir:
+            store = SQLiteCredentialsStore(test_dir)
+
+            # Record without token is rejected, no record is imported
+            with raises(Exception):
+                store.import_records([
+                    ('user1', 'ec2', 'acnt1', 'token'),
+                    ('user1', 'ec2', 'acnt2', None)
+                ])
+
+            assert store.get_records() == []
+            store.close()
+
+    def test_sqlite_store_rotate_rollback(self):
+        with TemporaryDirectory() as test_dir:
+            store = SQLiteCredentialsStore(test_dir)
+            store.write('user1', 'ec2', 'acnt1', self.token.decode())
+            connection = store.connection
+            store.connection = Mock(wraps=connection)
+            store.connection.executemany.side_effect = Exception('Broken')
+
+            fernet = MultiFernet([Fernet(self.new_key), Fernet(self.old_key)])
+            with raises(Exception):
+                store.rotate(fernet.rotate, 1)
+
+            # Rotated token is rolled back
+            store.connection = connection
+            token = store.read('user1', 'ec2', ['acnt1'])['acnt1'][0]
+            assert token == self.token.decode()
+            store.close()
+
+    def test_sqlite_store_rotate_resume(self):
+        with TemporaryDirectory() as test_dir:
+            store = SQLiteCredentialsStore(test_dir)
+            store.rotation_batch_size = 1
+            store.write('user1', 'ec2', 'acnt1', self.token.decode())
+            store.write('user1', 'ec2', 'acnt2', self.token.decode())
+            progress_callback = Mock(side_effect=Exception('Interrupted'))
+
+            store.start_rotation()
+            fernet = MultiFernet([Fernet(self.new_key), Fernet(self.old_key)])
+            with raises(Exception):
+                store.rotate(fernet.rotate, 1, progress_callback)
+
+            # First batch is committed
+            assert store.rotation_in_progress()
+            tokens = store.read('user1', 'ec2', ['acnt1', 'acnt2'])
+            assert Fernet(self.new_key).decrypt(tokens['acnt1'][0].encode())
+            assert tokens['acnt2'][0] == self.token.decode()
+
+            # Token written during rotation is not replaced
+            new_token = Fernet(self.new_key).encrypt(b'{"new": "secret"}')
+            store.write('user1', 'ec2', 'acnt2', new_token.decode())
+            rows = store._get_rotation_batch()
+            store._get_rotation_batch = Mock(side_effect=[rows, []])
+            store.write('user1', 'ec2', 'acnt2', new_token.decode())
+
+            total, failed = store.rotate(fernet.rotate, 1)
+
+            assert total == 1
+            assert not failed
+            assert not store.rotation_in_progress()
+            token = store.read('user1', 'ec2', ['acnt2'])['acnt2'][0]
+            assert token == new_token.decode()
+            store.close()
+
+    def test_sqlite_store_open_error(self):
+        with raises(MashCredentialsDatastoreException):
+            SQLiteCredentialsStore('/proc/invalid')
+
+    def test_file_store_rotate_resume(self):
+        with TemporaryDirectory() as test_dir:
+            store = FileCredentialsStore(test_dir)
+
+            for account in ('acnt1', 'acnt2', 'acnt3'):
+                store.write('user1', 'ec2', account, self.token.decode())
+
+            # Interrupted rotation finished acnt1 and left a temp file
+            store.start_rotation()
+            with open(store.manifest_file, 'w') as f:
+                f.write(store.get_path('user1', 'ec2', 'acnt1') + '\n')
+
+            open(
+                os.path.join(test_dir, 'user1', 'ec2', '.rotate-abc123'), 'w'
+            ).close()
+
+            # Temp file of a write in progress is kept
+            open(
+                os.path.join(test_dir, 'user1', 'ec2', '.write-def456'), 'w'
+            ).close()
+
+            assert store.rotation_in_progress()
+
+            fernet = MultiFernet([Fernet(self.new_key), Fernet(self.old_key)])
+            total, failed = store.rotate(fernet.rotate, 2)
+
+            assert total == 2
+            tokens = store.read('user1', 'ec2', ['acnt1', 'acnt2', 'acnt3'])
+
+            # Skipped file keeps the old key
+            assert Fernet(self.old_key).decrypt(tokens['acnt1'][0].encode())
+            assert Fernet(self.new_key).decrypt(tokens['acnt2'][0].encode())
+            assert sorted(os.listdir(os.path.join(test_dir, 'user1', 'ec2'))) \
+                == ['.write-def456', 'acnt1', 'acnt2', 'acnt3']
+
+    def test_file_store_rotate_deleted(self):
+        with TemporaryDirectory() as test_dir:
+            store = FileCredentialsStore(test_dir)
+            path = store.get_path('user1', 'ec2', 'acnt1')
+
+            # Credentials deleted while rotating
+            assert store._rotate_file(path, Mock()) is None
+
+    def test_file_store_write_prefix(self):
+        with TemporaryDirectory() as test_dir:
+            store = FileCredentialsStore(test_dir)
+
+            with patch.object(store, 'replace_file') as mock_replace_file:
+                store.write('user1', 'ec2', 'acnt1', 'token')
+
+            mock_replace_file.assert_called_once_with(
+                store.get_path('user1', 'ec2', 'acnt1'),
+                b'token',
+                prefix='.write-'
+            )
+
+    def test_file_store_replace_file_modified(self):
+        with TemporaryDirectory() as test_dir:
+            store = FileCredentialsStore(test_dir)
+            path = os.path.join(test_dir, 'acnt1')
+
+            with open(path, 'w') as f:
+                f.write('new')
+
+            assert not store.replace_file(path, b'rotated', 0)
+            assert not store.replace_file(
+                os.path.join(test_dir, 'acnt2'), b'rotated', 0
+            )
+            assert store.replace_file(
+                os.path.join(test_dir, 'acnt3'), b'rotated'
+            )
+
+            with open(path) as f:
+                assert f.read() == 'new'
+
+            assert sorted(os.listdir(test_dir)) == ['acnt1', 'acnt3']
+
+    def test_get_credentials_store_invalid(self):
+        with raises(MashCredentialsDatastoreException):
+            get_credentials_store('lmdb', '/var/lib/mash/credentials/')
+
+    def test_migrate_credentials(self):
+        with TemporaryDirectory() as test_dir:
+            source = FileCredentialsStore(test_dir)
+            source.write('user1', 'ec2', 'acnt1', self.token.decode())
+            source.write('user2', 'gce', 'acnt1', self.token.decode())
+
+            # Database file is not a credentials file
+            target = SQLiteCredentialsStore(test_dir)
+
+            assert migrate_credentials(source, target) == 2
+            assert sorted(target.get_records()) == sorted(source.get_records())
+            target.close()
+
+
+class TestBaseCredentialsStore(object):
+    def setup(self):
+        self.store = BaseCredentialsStore('/var/lib/mash/credentials/')
+
+    def test_not_implemented(self):
+        calls = [
+            (self.store.read, ('user1', 'ec2', ['acnt1'])),
+            (self.store.get_versions, ('user1', 'ec2', ['acnt1'])),
+            (self.store.write, ('user1', 'ec2', 'acnt1', 'token')),
+            (self.store.delete, ('user1', 'ec2', 'acnt1')),
+            (self.store.delete_user, ('user1',)),
+            (self.store.exists, ('user1', 'ec2', 'acnt1')),
+            (self.store.get_records, ()),
+            (self.store.rotate, (Mock(), 1))
+        ]
+
+        for method, args in calls:
+            with raises(NotImplementedError):
+                method(*args)
+
+    def test_rotation(self):
+        assert not self.store.rotation_in_progress()
+        self.store.start_rotation()
+        self.store.close()
+
+    def test_import_records(self):
+        with patch.object(BaseCredentialsStore, 'write') as mock_write:
+            self.store.import_records([('user1', 'ec2', 'acnt1', 'token')])
+
+        mock_write.assert_called_once_with('user1', 'ec2', 'acnt1', 'token')
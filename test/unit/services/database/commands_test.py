@@ -5,7 +5,7 @@ from unittest.mock import patch, Mock
 
 from mash.services.database.app import create_app
 from mash.services.database.flask_config import Config
-from mash.services.database.commands import tokens_cli
+from mash.services.database.commands import status_cli, tokens_cli
 
 
 @pytest.fixture(scope='module')
@@ -42,3 +42,32 @@ def test_tokens_cleanup(mock_db, mock_token, test_app):
     mock_db.session.commit.side_effect = Exception('Access denied!')
     result = runner.invoke(tokens_cli, ['cleanup'])
     assert 'Unable to cleanup tokens: Access denied!' in result.output
+
+
+@patch('mash.services.database.commands.JobStatusConsumer')
+def test_status_consume(mock_consumer, test_app):
+    runner = test_app.test_cli_runner()
+
+    result = runner.invoke(status_cli, ['consume'])
+    assert result.exit_code == 0
+    mock_consumer.assert_called_once_with(
+        'localhost',
+        'guest',
+        'guest',
+        ['obs', 'upload', 'test', 'replicate', 'publish', 'deprecate'],
+        test_app.logger
+    )
+    mock_consumer.return_value.run.assert_called_once_with()
+
+    # Stopped with ctrl-c
+    mock_consumer.return_value.run.side_effect = KeyboardInterrupt
+    result = runner.invoke(status_cli, ['consume'])
+    assert result.exit_code == 0
+
+    # Consumer not enabled
+    mock_consumer.reset_mock()
+    test_app.config['DATABASE_STATUS_CONSUMER'] = False
+
+    result = runner.invoke(status_cli, ['consume'])
+    assert 'The database status consumer is not enabled.' in result.output
+    assert not mock_consumer.called
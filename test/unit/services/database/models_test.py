@@ -1,3 +1,5 @@
+from datetime import date
+
 from mash.services.database.models import (
     User,
     Token,
@@ -8,6 +10,8 @@ from mash.services.database.models import (
     AzureAccount,
     AliyunAccount,
     Job,
+    JobStageStats,
+    JobStatusUpdate,
     OCIAccount
 )
 
@@ -122,3 +126,43 @@ def test_oci_account_model():
         tenancy='ocid1.tenancy.oc1..'
     )
     assert account.__repr__() == '<OCI Account acnt1>'
+
+
+def test_job_status_update_model():
+    update = JobStatusUpdate(
+        job_id='12345678-1234-1234-1234-123456789012',
+        service='upload',
+        status='success'
+    )
+    assert update.__repr__() == \
+        '<Job Status Update 12345678-1234-1234-1234-123456789012 upload>'
+
+
+def test_job_stage_stats_model():
+    stats = JobStageStats(
+        cloud='ec2',
+        service='upload',
+        day=date(2021, 5, 1)
+    )
+    assert stats.__repr__() == '<Job Stage Stats ec2 upload 2021-05-01>'
+    assert stats.mean is None
+    assert stats.p50 is None
+
+    for duration in (0.5, 30, 60, 60, 300):
+        stats.add_duration(duration)
+
+    stats.add_duration(120, failed=True)
+
+    assert stats.count == 6
+    assert stats.failed == 1
+    assert stats.minimum == 0.5
+    assert stats.maximum == 300
+    assert stats.mean == 570.5 / 6
+    assert 60 <= stats.p50 < 60 * 2 ** 0.25
+    assert 120 <= stats.p90 <= 300
+    assert stats.p99 == 300
+    assert stats.histogram[0] == 1
+
+    # Histogram does not cover all durations
+    stats.histogram = {0: 1}
+    assert stats.p50 == 300
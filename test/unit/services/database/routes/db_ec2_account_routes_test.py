@@ -181,6 +181,50 @@ def test_get_account_list_ec2(mock_get_user, test_client):
     assert response.json[0]['region'] == "us-east-1"
 
 
+@patch('mash.services.database.routes.accounts.ec2.get_ec2_accounts_by_name')
+def test_get_ec2_accounts_bulk(mock_get_accounts, test_client):
+    account = Mock()
+    account.id = '1'
+    account.name = 'acnt1'
+    account.partition = 'aws'
+    account.region = 'us-east-1'
+    account.subnet = None
+    account.additional_regions = None
+    account.group = None
+
+    mock_get_accounts.return_value = (
+        {'acnt1': account},
+        {'group1': ['acnt1']}
+    )
+    request = {
+        'names': ['acnt1'],
+        'group_names': ['group1'],
+        'user_id': 'user1'
+    }
+
+    response = test_client.get(
+        '/ec2_accounts/bulk',
+        content_type='application/json',
+        data=json.dumps(request, sort_keys=True)
+    )
+
+    assert response.status_code == 200
+    assert response.json['accounts']['acnt1']['region'] == 'us-east-1'
+    assert response.json['groups'] == {'group1': ['acnt1']}
+    mock_get_accounts.assert_called_once_with(['acnt1'], ['group1'], 'user1')
+
+    # Not found
+    mock_get_accounts.side_effect = Exception('Group group1 not found.')
+
+    response = test_client.get(
+        '/ec2_accounts/bulk',
+        content_type='application/json',
+        data=json.dumps(request, sort_keys=True)
+    )
+    assert response.status_code == 404
+    assert response.data == b'{"msg":"Group group1 not found."}\n'
+
+
 @patch('mash.services.database.utils.accounts.ec2.EC2Group')
 def test_get_accounts_in_ec2_group(mock_group, test_client):
     group = Mock()
@@ -18,7 +18,7 @@
 
 import json
 
-from datetime import datetime
+from datetime import date, datetime
 from unittest.mock import patch, Mock
 
 
@@ -57,6 +57,44 @@ def test_create_job(mock_db, test_client):
     assert response.data == b'{"msg":"Unable to create job: Broken"}\n'
 
 
+@patch('mash.services.database.utils.jobs.db')
+def test_create_jobs(mock_db, test_client):
+    data = {
+        'last_service': 'deprecate',
+        'utctime': 'now',
+        'image': 'test_oem_image',
+        'download_url': 'http://download.opensuse.org/repositories/Cloud:Tools/images'
+    }
+    jobs = [
+        dict(data, job_id='12345678-1234-1234-1234-123456789012'),
+        dict(data, job_id='12345678-1234-1234-1234-123456789013')
+    ]
+
+    response = test_client.post(
+        '/jobs/batch',
+        content_type='application/json',
+        data=json.dumps({'jobs': jobs}, sort_keys=True)
+    )
+
+    assert response.status_code == 200
+    assert [job['job_id'] for job in response.json] == [
+        '12345678-1234-1234-1234-123456789012',
+        '12345678-1234-1234-1234-123456789013'
+    ]
+    mock_db.session.commit.assert_called_once_with()
+
+    # Mash Exception
+    mock_db.session.commit.side_effect = Exception('Broken')
+
+    response = test_client.post(
+        '/jobs/batch',
+        content_type='application/json',
+        data=json.dumps({'jobs': jobs}, sort_keys=True)
+    )
+    mock_db.session.rollback.assert_called_once_with()
+    assert response.status_code == 400
+
+
 @patch('mash.services.database.utils.jobs.get_job')
 @patch('mash.services.database.utils.jobs.db')
 def test_update_job_status(mock_db, mock_get_job, test_client):
@@ -114,6 +152,42 @@ def test_update_job_status(mock_db, mock_get_job, test_client):
     assert response.data == b'{"msg":"Unable to update job status: Broken"}\n'
 
 
+@patch('mash.services.database.routes.jobs.save_job_statuses')
+def test_update_job_statuses(mock_save_job_statuses, test_client):
+    mock_save_job_statuses.return_value = [
+        {'id': '2', 'msg': 'Job 2 does not exist'}
+    ]
+    data = [
+        {'id': '1', 'status': 'success'},
+        {'id': '2', 'status': 'success'}
+    ]
+
+    response = test_client.put(
+        '/jobs/batch',
+        content_type='application/json',
+        data=json.dumps(data, sort_keys=True)
+    )
+
+    assert response.status_code == 200
+    assert response.json['updated'] == 1
+    assert response.json['failed'] == [
+        {'id': '2', 'msg': 'Job 2 does not exist'}
+    ]
+    mock_save_job_statuses.assert_called_once_with(data)
+
+    # Mash Exception
+    mock_save_job_statuses.side_effect = Exception('Broken')
+
+    response = test_client.put(
+        '/jobs/batch',
+        content_type='application/json',
+        data=json.dumps(data, sort_keys=True)
+    )
+    assert response.status_code == 400
+    assert response.data == \
+        b'{"msg":"Unable to update job statuses: Broken"}\n'
+
+
 @patch('mash.services.database.utils.jobs.Job')
 def test_get_job(mock_job, test_client):
     job = Mock()
@@ -196,9 +270,113 @@ def test_get_job_list(mock_job, test_client):
     assert response.json[0]['profile'] == 'Server'
 
 
+@patch('mash.services.database.routes.jobs.get_jobs')
+def test_get_job_list_filtered(mock_get_jobs, test_client):
+    mock_get_jobs.return_value = []
+
+    response = test_client.get(
+        '/jobs/list/user1',
+        content_type='application/json',
+        data=json.dumps({
+            'state': 'failed',
+            'current_service': None,
+            'since': '2021-05-01T02:00:00+02:00'
+        })
+    )
+
+    assert response.status_code == 200
+    mock_get_jobs.assert_called_once_with(
+        'user1', state='failed', since=datetime(2021, 5, 1, 0, 0, 0)
+    )
+
+    # Invalid time
+    response = test_client.get(
+        '/jobs/list/user1',
+        content_type='application/json',
+        data=json.dumps({'until': 'yesterday'})
+    )
+
+    assert response.status_code == 400
+
+
+@patch('mash.services.database.routes.jobs.get_job_summary')
+def test_get_summary(mock_get_summary, test_client):
+    summary = {
+        'total': 3,
+        'states': {'failed': 1, 'running': 2},
+        'current_services': {'test': 2},
+        'failed_services': {'upload': 1}
+    }
+    mock_get_summary.return_value = summary
+
+    response = test_client.get(
+        '/jobs/summary/user1',
+        content_type='application/json',
+        data=json.dumps({'cloud': 'ec2'})
+    )
+
+    assert response.status_code == 200
+    assert response.json == summary
+    mock_get_summary.assert_called_once_with('user1', cloud='ec2')
+
+    # Invalid time
+    response = test_client.get(
+        '/jobs/summary/user1',
+        content_type='application/json',
+        data=json.dumps({'since': 'yesterday'})
+    )
+
+    assert response.status_code == 400
+
+
+@patch('mash.services.database.routes.jobs.get_job_status_updates')
+def test_get_status_updates(mock_get_updates, test_client):
+    update = Mock()
+    update.id = 12
+    update.job_id = '12345678-1234-1234-1234-123456789012'
+    update.service = 'upload'
+    update.status = 'success'
+    update.created = datetime(2021, 5, 1, 10, 0, 0)
+    mock_get_updates.return_value = [update]
+
+    response = test_client.get(
+        '/jobs/status_updates/user1',
+        content_type='application/json',
+        data=json.dumps({'since_version': 10, 'limit': 1000})
+    )
+
+    assert response.status_code == 200
+    assert response.json['version'] == 12
+    assert response.json['updates'] == [{
+        'version': 12,
+        'job_id': '12345678-1234-1234-1234-123456789012',
+        'service': 'upload',
+        'status': 'success',
+        'created': '2021-05-01T10:00:00'
+    }]
+    mock_get_updates.assert_called_once_with(
+        'user1', since_version=10, limit=500
+    )
+
+    # No new updates
+    mock_get_updates.return_value = []
+
+    response = test_client.get(
+        '/jobs/status_updates/user1',
+        content_type='application/json',
+        data=json.dumps({'since_version': 12, 'job_id': '4711'})
+    )
+
+    assert response.json == {'updates': [], 'version': 12}
+    mock_get_updates.assert_called_with(
+        'user1', since_version=12, job_id='4711'
+    )
+
+
+@patch('mash.services.database.utils.jobs.JobStatusUpdate')
 @patch('mash.services.database.utils.jobs.db')
 @patch('mash.services.database.utils.jobs.get_job_by_user')
-def test_delete_job(mock_get_job, mock_db, test_client):
+def test_delete_job(mock_get_job, mock_db, mock_status_update, test_client):
     job = Mock()
     job.job_id = '12345678-1234-1234-1234-123456789012'
     job.last_service = 'test'
@@ -249,3 +427,53 @@ def test_delete_job(mock_get_job, mock_db, test_client):
 
     assert response.status_code == 200
     assert response.json['rows_deleted'] == 0
+
+
+@patch('mash.services.database.routes.jobs.get_stage_stats')
+def test_get_stage_stats_list(mock_get_stage_stats, test_client):
+    stats = Mock()
+    stats.cloud = 'ec2'
+    stats.service = 'upload'
+    stats.day = date(2021, 5, 1)
+    stats.count = 2
+    stats.failed = 0
+    stats.mean = 45.0
+    stats.minimum = 30.0
+    stats.maximum = 60.0
+    stats.p50 = 32.0
+    stats.p90 = 60.0
+    stats.p99 = 60.0
+    mock_get_stage_stats.return_value = [stats]
+
+    response = test_client.get(
+        '/jobs/stage_stats',
+        content_type='application/json',
+        data=json.dumps({'cloud': 'ec2', 'since': '2021-05-01'})
+    )
+
+    assert response.status_code == 200
+    assert response.json == [{
+        'cloud': 'ec2',
+        'service': 'upload',
+        'day': '2021-05-01',
+        'count': 2,
+        'failed': 0,
+        'mean': 45.0,
+        'minimum': 30.0,
+        'maximum': 60.0,
+        'p50': 32.0,
+        'p90': 60.0,
+        'p99': 60.0
+    }]
+    mock_get_stage_stats.assert_called_once_with(
+        cloud='ec2', since=date(2021, 5, 1)
+    )
+
+    # Invalid day
+    response = test_client.get(
+        '/jobs/stage_stats',
+        content_type='application/json',
+        data=json.dumps({'until': 'someday'})
+    )
+
+    assert response.status_code == 400
@@ -0,0 +1,248 @@
+import json
+
+from unittest.mock import MagicMock, Mock, call, patch
+
+from pytest import raises
+from sqlalchemy.exc import OperationalError
+
+from mash.services.database.status_consumer import JobStatusConsumer
+
+
+class TestJobStatusConsumer(object):
+    def setup(self):
+        self.log = Mock()
+        self.channel = Mock()
+        self.consumer = JobStatusConsumer(
+            'localhost', 'guest', 'guest', ['obs', 'upload', 'test'], self.log
+        )
+        self.consumer.channel = self.channel
+
+        self.message = MagicMock(properties={}, delivery_tag=7)
+        self.message.body = json.dumps({
+            'upload_result': {
+                'id': '1',
+                'status': 'success',
+                'errors': [],
+                'last_service': 'test',
+                'notification_email': 'test@fake.com'
+            }
+        })
+
+    @patch.object(JobStatusConsumer, '_flush_job_status')
+    def test_handle_status_message(self, mock_flush_job_status):
+        self.consumer._handle_status_message(self.message)
+
+        assert self.consumer.job_docs == [{
+            'id': '1',
+            'status': 'success',
+            'errors': [],
+            'current_service': 'test',
+            'prev_service': 'upload'
+        }]
+        assert self.consumer.pending_tag == 7
+        assert not mock_flush_job_status.called
+
+        # Batch is full
+        self.consumer.batch_size = 1
+        self.consumer._handle_status_message(self.message)
+        mock_flush_job_status.assert_called_once_with()
+
+        # Last service has no next service
+        self.consumer.job_docs = []
+        self.message.body = json.dumps({
+            'test_result': {'id': '1', 'status': 'success'}
+        })
+        self.consumer._handle_status_message(self.message)
+        assert self.consumer.job_docs[0]['current_service'] is None
+
+        # Unknown service
+        self.message.body = json.dumps({'fake_result': {'id': '1'}})
+        self.consumer._handle_status_message(self.message)
+        self.log.warning.assert_called_once_with(
+            'Unkown service message received for fake service.'
+        )
+
+        # Invalid message
+        self.message.body = 'Not json'
+        self.consumer._handle_status_message(self.message)
+        self.log.error.assert_called_once_with(
+            'Invalid message received: '
+            'Expecting value: line 1 column 1 (char 0).'
+        )
+        self.message.ack.assert_called_once_with()
+
+    def test_handle_status_message_invalid(self):
+        # Message body is not an object
+        self.message.body = json.dumps(['upload_result'])
+        self.consumer._handle_status_message(self.message)
+
+        self.log.error.assert_called_once_with(
+            'Invalid message received: not an object.'
+        )
+        self.message.ack.assert_called_once_with()
+        assert self.consumer.pending_tag is None
+
+        # Invalid job status is not buffered
+        invalid = (
+            ('Not a dict', 'job status is not an object'),
+            ({'status': 'success'}, 'id is missing or not a string'),
+            ({'id': '1', 'status': 1}, 'status is missing or not a string'),
+            (
+                {'id': '1', 'status': 'success', 'started_at': 'now'},
+                'started_at is not a timestamp'
+            ),
+            (
+                {'id': '1', 'status': 'success', 'finished_at': True},
+                'finished_at is not a timestamp'
+            )
+        )
+
+        for job_status, error in invalid:
+            self.message.body = json.dumps({'upload_result': job_status})
+            self.consumer._handle_status_message(self.message)
+            self.log.error.assert_called_with(
+                'Invalid upload status received: {0}.'.format(error)
+            )
+
+        assert self.consumer.job_docs == []
+
+        # Message is acked with the next flush
+        assert self.consumer.pending_tag == 7
+        assert self.message.ack.call_count == 1
+
+    @patch('mash.services.database.status_consumer.save_job_statuses')
+    def test_flush_job_status(self, mock_save_job_statuses):
+        self.consumer.job_docs = [{'id': '1'}]
+        self.consumer.pending_tag = 7
+
+        # Transaction failed
+        mock_save_job_statuses.side_effect = Exception('Locked')
+
+        self.consumer._flush_job_status()
+        self.consumer._flush_job_status()
+
+        assert self.consumer.backoff == 2
+        self.log.error.assert_called_with(
+            'Job status update failed, retrying in 2 seconds: Locked'
+        )
+        assert not self.channel.basic.ack.called
+
+        # Transaction succeeds
+        mock_save_job_statuses.side_effect = None
+        mock_save_job_statuses.return_value = [
+            {'id': '1', 'msg': 'Job 1 does not exist'}
+        ]
+
+        self.consumer._flush_job_status()
+
+        mock_save_job_statuses.assert_called_with([{'id': '1'}])
+        self.log.warning.assert_called_once_with(
+            'Unable to update status of job 1: Job 1 does not exist'
+        )
+        self.channel.basic.ack.assert_called_once_with(
+            delivery_tag=7, multiple=True
+        )
+        assert self.consumer.job_docs == []
+        assert self.consumer.pending_tag is None
+        assert self.consumer.backoff == 0
+
+    @patch('mash.services.database.status_consumer.time.monotonic')
+    @patch.object(JobStatusConsumer, '_flush_job_status')
+    @patch('mash.services.database.status_consumer.Connection')
+    def test_run(self, mock_connection, mock_flush_job_status, mock_monotonic):
+        mock_connection.return_value.channel.return_value = self.channel
+        self.channel.is_closed = False
+        self.channel.consumer_tags = ['tag']
+        self.consumer.flush_time = 0
+        mock_monotonic.return_value = 10
+
+        def stop():
+            self.channel.consumer_tags = []
+
+        self.channel.process_data_events.side_effect = stop
+
+        self.consumer.run()
+
+        self.channel.basic.qos.assert_called_once_with(prefetch_count=500)
+        self.channel.queue.bind.assert_has_calls([
+            call(
+                exchange='obs',
+                queue='obs.database_status',
+                routing_key='listener_msg'
+            ),
+            call(
+                exchange='upload',
+                queue='upload.database_status',
+                routing_key='listener_msg'
+            ),
+            call(
+                exchange='test',
+                queue='test.database_status',
+                routing_key='listener_msg'
+            )
+        ])
+        assert self.channel.basic.consume.call_count == 3
+        assert mock_flush_job_status.call_count == 2
+        mock_connection.return_value.close.assert_called_once_with()
+
+    @patch('mash.services.database.status_consumer.save_job_statuses')
+    def test_flush_job_status_max_retries(self, mock_save_job_statuses):
+        self.consumer.job_docs = [{'id': '1'}, {'id': '2'}]
+        self.consumer.pending_tag = 7
+        self.consumer.max_retries = 2
+
+        # Poison batch is saved one job status at a time
+        mock_save_job_statuses.side_effect = [
+            Exception('Broken'),
+            Exception('Broken'),
+            Exception('Broken'),
+            []
+        ]
+
+        self.consumer._flush_job_status()
+        assert self.consumer.retries == 1
+        assert not self.channel.basic.ack.called
+
+        self.consumer._flush_job_status()
+
+        mock_save_job_statuses.assert_has_calls([
+            call([{'id': '1'}]),
+            call([{'id': '2'}])
+        ])
+        self.log.error.assert_has_calls([
+            call('Job status update failed 2 times, saving each job '
+                 'status: Broken')
+        ])
+        self.log.warning.assert_called_once_with(
+            'Unable to update status of job 1: Broken'
+        )
+        self.channel.basic.ack.assert_called_once_with(
+            delivery_tag=7, multiple=True
+        )
+        assert self.consumer.job_docs == []
+        assert self.consumer.retries == 0
+
+    @patch('mash.services.database.status_consumer.save_job_statuses')
+    def test_flush_job_status_database_unavailable(
+        self, mock_save_job_statuses
+    ):
+        self.consumer.job_docs = [{'id': '1'}, {'id': '2'}]
+        self.consumer.max_retries = 1
+        error = OperationalError('commit', {}, Exception('Connection lost'))
+
+        # Connection errors are retried without limit
+        mock_save_job_statuses.side_effect = error
+
+        self.consumer._flush_job_status()
+        self.consumer._flush_job_status()
+
+        assert self.consumer.retries == 0
+        assert self.consumer.backoff == 2
+
+        # Connection lost while saving each job status
+        mock_save_job_statuses.side_effect = [Exception('Broken'), [], error]
+
+        with raises(OperationalError):
+            self.consumer._save_job_statuses()
+
+        assert self.consumer.job_docs == [{'id': '1'}, {'id': '2'}]
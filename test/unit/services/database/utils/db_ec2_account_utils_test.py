@@ -20,10 +20,12 @@ from unittest.mock import patch, Mock, call
 
 from pytest import raises
 
+from mash.mash_exceptions import MashDBException
 from mash.services.database.models import EC2Account
 from mash.services.database.utils.accounts.ec2 import (
     create_new_ec2_region,
     create_new_ec2_account,
+    get_ec2_accounts_by_name,
     update_ec2_account_for_user
 )
 
@@ -201,3 +203,46 @@ def test_update_ec2_account(
 
     mock_db.session.add.assert_called_once_with(account)
     mock_db.session.commit.assert_called_once_with()
+
+
+@patch('mash.services.database.utils.accounts.ec2.selectinload')
+@patch('mash.services.database.utils.accounts.ec2.joinedload')
+@patch('mash.services.database.utils.accounts.ec2.EC2Group')
+@patch('mash.services.database.utils.accounts.ec2.EC2Account')
+def test_get_ec2_accounts_by_name(
+    mock_account, mock_group, mock_joinedload, mock_selectinload
+):
+    account1 = Mock()
+    account1.name = 'acnt1'
+    account2 = Mock()
+    account2.name = 'acnt2'
+    group = Mock()
+    group.name = 'group1'
+    group.accounts = [account2]
+
+    mock_account.query.options.return_value.filter.return_value.all.\
+        return_value = [account1]
+    mock_group.query.options.return_value.filter.return_value.all.\
+        return_value = [group]
+
+    accounts, groups = get_ec2_accounts_by_name(['acnt1'], ['group1'], 1)
+
+    assert accounts == {'acnt1': account1, 'acnt2': account2}
+    assert groups == {'group1': ['acnt2']}
+
+    # Relationships are loaded eagerly
+    mock_selectinload.assert_any_call(mock_account.additional_regions)
+    mock_joinedload.assert_called_with(mock_account.group)
+
+    # Not found
+    with raises(MashDBException) as error:
+        get_ec2_accounts_by_name(['acnt1', 'acnt3'], [], 1)
+
+    assert str(error.value) == 'EC2 account acnt3 not found.'
+
+    with raises(MashDBException) as error:
+        get_ec2_accounts_by_name([], ['group1', 'group2'], 1)
+
+    assert str(error.value) == 'Group group2 not found.'
+
+    assert get_ec2_accounts_by_name([], [], 1) == ({}, {})
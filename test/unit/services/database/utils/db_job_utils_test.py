@@ -16,10 +16,21 @@
 # along with mash.  If not, see <http://www.gnu.org/licenses/>
 #
 
+from datetime import date, datetime
+
+from pytest import raises
 from unittest.mock import patch, Mock
 
+from mash.services.database.models import JobStageStats
 from mash.services.database.utils.jobs import (
-    get_job
+    add_stage_stats,
+    create_new_jobs,
+    filter_jobs,
+    get_job,
+    get_job_status_updates,
+    get_job_summary,
+    get_stage_stats,
+    save_job_statuses
 )
 
 
@@ -33,3 +44,242 @@ def test_get_job(mock_job):
     result = get_job('12345678-1234-1234-1234-123456789012')
 
     assert result == job
+
+
+@patch('mash.services.database.utils.jobs.Job')
+@patch('mash.services.database.utils.jobs.db')
+def test_create_new_jobs(mock_db, mock_job):
+    jobs = create_new_jobs([{'job_id': '1'}, {'job_id': '2'}])
+
+    assert len(jobs) == 2
+    mock_db.session.add_all.assert_called_once_with(jobs)
+    mock_db.session.commit.assert_called_once_with()
+
+    # Nothing is added if one job fails
+    mock_db.session.commit.side_effect = Exception('Broken')
+    with raises(Exception):
+        create_new_jobs([{'job_id': '3'}])
+
+    mock_db.session.rollback.assert_called_once_with()
+
+
+def test_filter_jobs():
+    query = Mock()
+    query.filter_by.return_value = query
+    query.filter.return_value = query
+
+    # No filters
+    assert filter_jobs(query) == query
+    assert not query.filter_by.called
+
+    filter_jobs(
+        query,
+        state='failed',
+        image=None,
+        since=datetime(2021, 5, 1),
+        until=datetime(2021, 5, 2)
+    )
+
+    query.filter_by.assert_called_once_with(state='failed')
+    assert query.filter.call_count == 2
+
+
+@patch('mash.services.database.utils.jobs.filter_jobs')
+@patch('mash.services.database.utils.jobs.db')
+def test_get_job_summary(mock_db, mock_filter_jobs):
+    query = mock_filter_jobs.return_value.group_by.return_value
+    query.all.side_effect = [
+        [('failed', 1), ('running', 2), (None, 1)],
+        [('test', 2), (None, 2)],
+        [('upload', 1), (None, 3)]
+    ]
+
+    assert get_job_summary('1', cloud='ec2') == {
+        'total': 4,
+        'states': {'failed': 1, 'running': 2},
+        'current_services': {'test': 2},
+        'failed_services': {'upload': 1}
+    }
+    assert mock_filter_jobs.mock_calls[0][2] == {'cloud': 'ec2'}
+
+
+@patch('mash.services.database.utils.jobs.db')
+def test_get_job_status_updates(mock_db):
+    query = mock_db.session.query.return_value.join.return_value
+    query = query.filter.return_value
+    updates = [Mock(), Mock()]
+    query.order_by.return_value.limit.return_value.all.return_value = updates
+
+    assert get_job_status_updates('1', since_version=10) == updates
+    assert not query.filter.called
+
+    # Updates that may not be committed in id order yet are held back
+    filters = mock_db.session.query.return_value.join.return_value.filter
+    settled = filters.call_args[0][2]
+    assert str(settled) == 'job_status_update.created <= :created_1'
+    query.order_by.return_value.limit.assert_called_once_with(100)
+
+    # Updates of one job
+    query.filter.return_value = query
+    get_job_status_updates('1', job_id='4711')
+    assert query.filter.call_count == 1
+
+
+@patch('mash.services.database.utils.jobs.JobStatusUpdate')
+@patch('mash.services.database.utils.jobs.db')
+@patch('mash.services.database.utils.jobs.get_job')
+def test_save_job_statuses(mock_get_job, mock_db, mock_status_update):
+    job = Mock()
+    job.state = 'running'
+    job.last_service = 'deprecate'
+    mock_get_job.side_effect = [job, None]
+
+    # Status of job 3 has been saved before
+    mock_status_update.query.filter_by.return_value.first.side_effect = [
+        None, None, Mock()
+    ]
+
+    failed = save_job_statuses([
+        {
+            'id': '1',
+            'status': 'failed',
+            'prev_service': 'test',
+            'current_service': 'replicate',
+            'errors': ['Broken']
+        },
+        {
+            'id': '1',
+            'status': 'failed',
+            'prev_service': 'test',
+            'current_service': 'replicate'
+        },
+        {
+            'id': '2',
+            'status': 'success',
+            'prev_service': 'test',
+            'current_service': 'replicate'
+        },
+        {
+            'id': '3',
+            'status': 'success',
+            'prev_service': 'test',
+            'current_service': 'replicate'
+        }
+    ])
+
+    assert failed == [{'id': '2', 'msg': 'Job 2 does not exist'}]
+    assert job.state == 'failed'
+    assert job.failed_service == 'test'
+    assert job.current_service == 'replicate'
+    assert job.errors == ['Broken']
+    assert mock_get_job.call_count == 2
+    mock_status_update.assert_called_once_with(
+        job_id='1', service='test', status='failed'
+    )
+    assert mock_db.session.add.call_count == 2
+    mock_db.session.commit.assert_called_once_with()
+
+    # Commit failed
+    mock_db.session.commit.side_effect = Exception('Broken')
+    mock_status_update.query.filter_by.return_value.first.side_effect = None
+    mock_status_update.query.filter_by.return_value.first.return_value = \
+        Mock()
+
+    with raises(Exception):
+        save_job_statuses([{'id': '1', 'prev_service': 'test'}])
+
+    mock_db.session.rollback.assert_called_once_with()
+
+
+@patch('mash.services.database.utils.jobs.add_stage_stats')
+@patch('mash.services.database.utils.jobs.JobStatusUpdate')
+@patch('mash.services.database.utils.jobs.db')
+@patch('mash.services.database.utils.jobs.get_job')
+def test_save_job_statuses_stage_times(
+    mock_get_job, mock_db, mock_status_update, mock_add_stage_stats
+):
+    job = Mock()
+    job.state = 'running'
+    job.last_service = 'deprecate'
+    job.cloud = 'ec2'
+    mock_get_job.return_value = job
+    mock_status_update.query.filter_by.return_value.first.return_value = None
+
+    save_job_statuses([{
+        'id': '1',
+        'status': 'success',
+        'prev_service': 'upload',
+        'current_service': 'create',
+        'queued_at': 1620000000.0,
+        'started_at': 1620000010.0,
+        'finished_at': 1620000070.5
+    }])
+
+    mock_status_update.assert_called_once_with(
+        job_id='1',
+        service='upload',
+        status='success',
+        queued_at=datetime(2021, 5, 3, 0, 0, 0),
+        started_at=datetime(2021, 5, 3, 0, 0, 10),
+        finished_at=datetime(2021, 5, 3, 0, 1, 10, 500000),
+        duration=60.5
+    )
+    mock_add_stage_stats.assert_called_once_with(
+        'ec2',
+        'upload',
+        datetime(2021, 5, 3, 0, 1, 10, 500000),
+        60.5,
+        'success'
+    )
+
+    # Stage times are not part of the job data
+    assert job.data == {}
+
+
+@patch('mash.services.database.utils.jobs.JobStageStats')
+@patch('mash.services.database.utils.jobs.db')
+def test_add_stage_stats(mock_db, mock_stage_stats):
+    stats = Mock()
+    mock_stage_stats.query.filter_by.return_value.first.return_value = stats
+
+    add_stage_stats('ec2', 'upload', datetime(2021, 5, 3, 10), 60, 'failed')
+
+    mock_stage_stats.query.filter_by.assert_called_once_with(
+        cloud='ec2', service='upload', day=date(2021, 5, 3)
+    )
+    stats.add_duration.assert_called_once_with(60, failed=True)
+    mock_db.session.add.assert_called_once_with(stats)
+
+    # First duration of the day
+    mock_stage_stats.query.filter_by.return_value.first.return_value = None
+    add_stage_stats('ec2', 'upload', datetime(2021, 5, 4), 30, 'success')
+
+    mock_stage_stats.assert_called_once_with(
+        cloud='ec2', service='upload', day=date(2021, 5, 4)
+    )
+    mock_stage_stats.return_value.add_duration.assert_called_once_with(
+        30, failed=False
+    )
+
+
+@patch('mash.services.database.utils.jobs.JobStageStats')
+def test_get_stage_stats(mock_stage_stats):
+    mock_stage_stats.day = JobStageStats.day
+    query = mock_stage_stats.query
+    query.filter_by.return_value = query
+    query.filter.return_value = query
+    stats = [Mock()]
+    query.order_by.return_value.all.return_value = stats
+
+    assert get_stage_stats() == stats
+    assert not query.filter_by.called
+
+    get_stage_stats(
+        cloud='ec2',
+        service='upload',
+        since=date(2021, 5, 1),
+        until=date(2021, 5, 8)
+    )
+
+    assert query.filter_by.call_count == 2
+    assert query.filter.call_count == 2
@@ -24,6 +24,27 @@ class TestDeprecateServiceMain(object):
             }
         )
 
+    @patch('mash.services.deprecate_service.BaseJobFactory')
+    @patch('mash.services.deprecate_service.BaseConfig')
+    @patch('mash.services.deprecate_service.AsyncListenerService')
+    def test_main_asyncio(self, mock_deprecate_service, mock_config, mock_factory):
+        config = Mock()
+        config.get_listener_engine.return_value = 'asyncio'
+        mock_config.return_value = config
+
+        factory = Mock()
+        mock_factory.return_value = factory
+
+        main()
+        config.get_listener_engine.assert_called_once_with('deprecate')
+        mock_deprecate_service.assert_called_once_with(
+            service_exchange='deprecate',
+            config=config,
+            custom_args={
+                'job_factory': factory
+            }
+        )
+
     @patch('mash.services.deprecate_service.BaseJobFactory')
     @patch('mash.services.deprecate_service.BaseConfig')
     @patch('mash.services.deprecate_service.ListenerService')
@@ -1,4 +1,3 @@
-import json
 import pytest
 
 from unittest.mock import patch
@@ -66,7 +65,7 @@ def test_aliyun_job_test_message(mock_init):
 
     job.post_init()
 
-    test_message = json.loads(job.get_test_message())
+    test_message = job.get_test_message()
     assert test_message['test_job']['cleanup_images'] is False
 
     # Test cleanup images on test only
@@ -75,5 +74,5 @@ def test_aliyun_job_test_message(mock_init):
 
     job.post_init()
 
-    test_message = json.loads(job.get_test_message())
+    test_message = job.get_test_message()
     assert test_message['test_job']['cleanup_images'] is True
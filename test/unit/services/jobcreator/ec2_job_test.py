@@ -1,7 +1,6 @@
 from unittest.mock import patch
 
 from mash.services.jobcreator.ec2_job import EC2Job
-from mash.utils.json_format import JsonFormat
 
 
 @patch.object(EC2Job, 'get_test_regions')
@@ -25,9 +24,9 @@ def test_get_test_message_cleanup(mock_get_test_regions):
     })
 
     message = job.get_test_message()
-    assert JsonFormat.json_loads(message)['test_job']['cleanup_images']
+    assert message['test_job']['cleanup_images']
 
     # Explicit False for no cleanup even on failure
     job.cleanup_images = False
     message = job.get_test_message()
-    assert JsonFormat.json_loads(message)['test_job']['cleanup_images'] is False
+    assert message['test_job']['cleanup_images'] is False
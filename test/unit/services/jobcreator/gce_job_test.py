@@ -1,4 +1,3 @@
-import json
 import pytest
 
 from unittest.mock import patch
@@ -68,7 +67,7 @@ def test_gce_job_test_message(mock_init):
 
     job.post_init()
 
-    test_message = json.loads(job.get_test_message())
+    test_message = job.get_test_message()
     assert test_message['test_job']['cleanup_images'] is False
 
     # Test cleanup images on test only
@@ -77,5 +76,5 @@ def test_gce_job_test_message(mock_init):
 
     job.post_init()
 
-    test_message = json.loads(job.get_test_message())
+    test_message = job.get_test_message()
     assert test_message['test_job']['cleanup_images'] is True
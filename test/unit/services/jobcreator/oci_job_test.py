@@ -1,4 +1,3 @@
-import json
 import pytest
 
 from unittest.mock import patch
@@ -72,7 +71,7 @@ def test_oci_job_test_message(mock_init):
 
     job.post_init()
 
-    test_message = json.loads(job.get_test_message())
+    test_message = job.get_test_message()
     assert test_message['test_job']['cleanup_images'] is False
 
     # Test cleanup images on test only
@@ -81,5 +80,5 @@ def test_oci_job_test_message(mock_init):
 
     job.post_init()
 
-    test_message = json.loads(job.get_test_message())
+    test_message = job.get_test_message()
     assert test_message['test_job']['cleanup_images'] is True
@@ -1,5 +1,8 @@
 import json
+import queue
+import threading
 
+from collections import OrderedDict
 from pytest import raises
 from unittest.mock import MagicMock, Mock, patch
 
@@ -38,7 +41,17 @@ class TestJobCreatorService(object):
         self.jobcreator.service_queue = 'service'
         self.jobcreator.job_document_key = 'job_document'
         self.jobcreator.services = services
-
+        self.jobcreator.database_api_url = 'http://localhost:5007/'
+        self.jobcreator.status_updates = OrderedDict()
+        self.jobcreator.status_delivery_tag = None
+        self.jobcreator.status_flush_time = 0
+        self.jobcreator.status_batches = queue.Queue(maxsize=1)
+        self.jobcreator.status_stop = threading.Event()
+        self.jobcreator.status_writer = Mock()
+        self.jobcreator.status_consumer = False
+
+    @patch('mash.services.jobcreator.service.threading.Thread')
+    @patch('mash.services.jobcreator.service.NotificationWorker')
     @patch('mash.services.jobcreator.service.EmailNotification')
     @patch('mash.services.jobcreator.service.setup_logfile')
     @patch.object(JobCreatorService, 'start')
@@ -46,7 +59,7 @@ class TestJobCreatorService(object):
     def test_jobcreator_post_init(
         self, mock_bind_queue,
         mock_start, mock_setup_logfile,
-        mock_email_notif
+        mock_email_notif, mock_notification_worker, mock_thread
     ):
         self.jobcreator.config = self.config
         self.config.get_log_file.return_value = \
@@ -62,9 +75,21 @@ class TestJobCreatorService(object):
         mock_bind_queue.call_count == 9
         mock_start.assert_called_once_with()
         assert mock_email_notif.call_count == 1
+        mock_notification_worker.assert_called_once_with(
+            mock_email_notif.return_value,
+            min_interval=self.config.get_notification_min_interval.return_value,
+            digest=self.config.get_notification_digest.return_value,
+            log_callback=self.jobcreator.log
+        )
+        mock_thread.assert_called_once_with(
+            target=self.jobcreator._write_job_status,
+            name='JobStatusWriter',
+            daemon=True
+        )
+        mock_thread.return_value.start.assert_called_once_with()
 
-    @patch.object(JobCreatorService, '_publish')
-    def test_jobcreator_handle_service_message(self, mock_publish):
+    @patch.object(JobCreatorService, 'publish_many')
+    def test_jobcreator_handle_service_message(self, mock_publish_many):
         def check_base_attrs(job_data, cloud=True):
             assert job_data['id'] == '12345678-1234-1234-1234-123456789012'
             assert job_data['utctime'] == 'now'
@@ -99,13 +124,15 @@ class TestJobCreatorService(object):
         del job['cloud_groups']
         job['notification_email'] = 'test@fake.com'
 
-        message = MagicMock()
+        message = MagicMock(properties={})
         message.body = JsonFormat.json_message(job)
         self.jobcreator._handle_service_message(message)
+        messages = mock_publish_many.call_args[0][0]
 
         # OBS Job Doc
 
-        data = json.loads(mock_publish.mock_calls[0][1][2])['obs_job']
+        data = messages[0][2]['obs_job']
+        assert messages[0][3] == data['id']
         check_base_attrs(data, cloud=False)
         assert data['cloud_architecture'] == 'aarch64'
         assert data['download_url'] == \
@@ -124,13 +151,13 @@ class TestJobCreatorService(object):
 
         # Upload Job Doc
 
-        data = json.loads(mock_publish.mock_calls[1][1][2])['upload_job']
+        data = messages[1][2]['upload_job']
         check_base_attrs(data)
         assert data['cloud_image_name'] == 'new_image_123'
 
         # Create Job Doc
 
-        data = json.loads(mock_publish.mock_calls[2][1][2])['create_job']
+        data = messages[2][2]['create_job']
         check_base_attrs(data)
         assert data['cloud_architecture'] == 'aarch64'
         assert data['cloud_image_name'] == 'new_image_123'
@@ -149,7 +176,7 @@ class TestJobCreatorService(object):
 
         # Test Job Doc
 
-        data = json.loads(mock_publish.mock_calls[3][1][2])['test_job']
+        data = messages[3][2]['test_job']
         check_base_attrs(data)
         assert data['distro'] == 'sles'
         assert data['instance_type'] == 't2.micro'
@@ -166,7 +193,7 @@ class TestJobCreatorService(object):
 
         # Raw Image Upload Job Doc
 
-        data = json.loads(mock_publish.mock_calls[4][1][2])['raw_image_upload_job']
+        data = messages[4][2]['raw_image_upload_job']
         check_base_attrs(data)
         assert data['raw_image_upload_type'] == 's3bucket'
         assert data['raw_image_upload_account'] == 'account'
@@ -174,7 +201,7 @@ class TestJobCreatorService(object):
 
         # Replicate Job Doc
 
-        data = json.loads(mock_publish.mock_calls[5][1][2])['replicate_job']
+        data = messages[5][2]['replicate_job']
         check_base_attrs(data)
         assert data['image_description'] == 'New Image #123'
 
@@ -191,7 +218,7 @@ class TestJobCreatorService(object):
 
         # Publish Job Doc
 
-        data = json.loads(mock_publish.mock_calls[6][1][2])['publish_job']
+        data = messages[6][2]['publish_job']
         check_base_attrs(data)
         assert data['allow_copy'] == 'none'
         assert data['share_with'] == 'all'
@@ -209,7 +236,7 @@ class TestJobCreatorService(object):
 
         # Deprecate Job Doc
 
-        data = json.loads(mock_publish.mock_calls[7][1][2])['deprecate_job']
+        data = messages[7][2]['deprecate_job']
         check_base_attrs(data)
         assert data['old_cloud_image_name'] == 'old_new_image_123'
 
@@ -224,8 +251,8 @@ class TestJobCreatorService(object):
                 assert 'ap-northeast-2' in region['target_regions']
                 assert 'ap-northeast-3' in region['target_regions']
 
-    @patch.object(JobCreatorService, '_publish')
-    def test_jobcreator_handle_service_message_azure(self, mock_publish):
+    @patch.object(JobCreatorService, 'publish_many')
+    def test_jobcreator_handle_service_message_azure(self, mock_publish_many):
         def check_base_attrs(job_data, cloud=True):
             assert job_data['id'] == '12345678-1234-1234-1234-123456789012'
             assert job_data['utctime'] == 'now'
@@ -239,13 +266,14 @@ class TestJobCreatorService(object):
             job = json.load(job_doc)
 
         job['notification_email'] = 'test@fake.com'
-        message = MagicMock()
+        message = MagicMock(properties={})
         message.body = json.dumps(job)
         self.jobcreator._handle_service_message(message)
+        messages = mock_publish_many.call_args[0][0]
 
         # OBS Job Doc
 
-        data = json.loads(mock_publish.mock_calls[0][1][2])['obs_job']
+        data = messages[0][2]['obs_job']
         check_base_attrs(data, cloud=False)
         assert data['cloud_architecture'] == 'x86_64'
         assert data['download_url'] == \
@@ -262,7 +290,7 @@ class TestJobCreatorService(object):
 
         # Upload Job Doc
 
-        data = json.loads(mock_publish.mock_calls[1][1][2])['upload_job']
+        data = messages[1][2]['upload_job']
         check_base_attrs(data)
         assert data['cloud_image_name'] == 'new_image_123'
         assert data['account'] == 'test-azure'
@@ -273,7 +301,7 @@ class TestJobCreatorService(object):
 
         # create Job Doc
 
-        data = json.loads(mock_publish.mock_calls[2][1][2])['create_job']
+        data = messages[2][2]['create_job']
         check_base_attrs(data)
         assert data['account'] == 'test-azure'
         assert data['container'] == 'container1'
@@ -282,7 +310,7 @@ class TestJobCreatorService(object):
 
         # Test Job Doc
 
-        data = json.loads(mock_publish.mock_calls[3][1][2])['test_job']
+        data = messages[3][2]['test_job']
         check_base_attrs(data)
         assert data['distro'] == 'sles'
         assert data['instance_type'] == 'Basic_A2'
@@ -295,7 +323,7 @@ class TestJobCreatorService(object):
 
         # Raw Image Upload Job Doc
 
-        data = json.loads(mock_publish.mock_calls[4][1][2])['raw_image_upload_job']
+        data = messages[4][2]['raw_image_upload_job']
         check_base_attrs(data)
         assert data['raw_image_upload_type'] == 's3bucket'
         assert data['raw_image_upload_account'] == 'account'
@@ -303,7 +331,7 @@ class TestJobCreatorService(object):
 
         # Publish Job Doc
 
-        data = json.loads(mock_publish.mock_calls[6][1][2])['publish_job']
+        data = messages[6][2]['publish_job']
         check_base_attrs(data)
         assert data['image_description'] == 'New Image #123'
         assert data['label'] == 'New Image 123'
@@ -320,11 +348,11 @@ class TestJobCreatorService(object):
 
         # Deprecate Job Doc
 
-        data = json.loads(mock_publish.mock_calls[7][1][2])['deprecate_job']
+        data = messages[7][2]['deprecate_job']
         check_base_attrs(data)
 
-    @patch.object(JobCreatorService, '_publish')
-    def test_jobcreator_handle_service_message_gce(self, mock_publish):
+    @patch.object(JobCreatorService, 'publish_many')
+    def test_jobcreator_handle_service_message_gce(self, mock_publish_many):
         def check_base_attrs(job_data, cloud=True):
             assert job_data['id'] == '12345678-1234-1234-1234-123456789012'
             assert job_data['utctime'] == 'now'
@@ -338,13 +366,14 @@ class TestJobCreatorService(object):
             job = json.load(job_doc)
 
         job['notification_email'] = 'test@fake.com'
-        message = MagicMock()
+        message = MagicMock(properties={})
         message.body = json.dumps(job)
         self.jobcreator._handle_service_message(message)
+        messages = mock_publish_many.call_args[0][0]
 
         # OBS Job Doc
 
-        data = json.loads(mock_publish.mock_calls[0][1][2])['obs_job']
+        data = messages[0][2]['obs_job']
         check_base_attrs(data, cloud=False)
         assert data['cloud_architecture'] == 'x86_64'
         assert data['download_url'] == \
@@ -361,7 +390,7 @@ class TestJobCreatorService(object):
 
         # Upload Job Doc
 
-        data = json.loads(mock_publish.mock_calls[1][1][2])['upload_job']
+        data = messages[1][2]['upload_job']
         check_base_attrs(data)
         assert data['cloud_image_name'] == 'new_image_123'
         assert data['region'] == 'us-west1'
@@ -370,7 +399,7 @@ class TestJobCreatorService(object):
 
         # create Job Doc
 
-        data = json.loads(mock_publish.mock_calls[2][1][2])['create_job']
+        data = messages[2][2]['create_job']
         check_base_attrs(data)
         assert data['image_description'] == 'New Image #123'
         assert data['region'] == 'us-west1'
@@ -381,7 +410,7 @@ class TestJobCreatorService(object):
 
         # Test Job Doc
 
-        data = json.loads(mock_publish.mock_calls[3][1][2])['test_job']
+        data = messages[3][2]['test_job']
         check_base_attrs(data)
         assert data['distro'] == 'sles'
         assert data['instance_type'] == 'n1-standard-1'
@@ -392,7 +421,7 @@ class TestJobCreatorService(object):
         assert data['image_project'] == 'test'
 
         # Raw Image Upload Job Doc
-        data = json.loads(mock_publish.mock_calls[4][1][2])['raw_image_upload_job']
+        data = messages[4][2]['raw_image_upload_job']
         check_base_attrs(data)
         assert data['raw_image_upload_type'] == 's3bucket'
         assert data['raw_image_upload_account'] == 'account'
@@ -400,23 +429,23 @@ class TestJobCreatorService(object):
 
         # Replicate Job Doc
 
-        data = json.loads(mock_publish.mock_calls[5][1][2])['replicate_job']
+        data = messages[5][2]['replicate_job']
         check_base_attrs(data)
 
         # Publish Job Doc
 
-        data = json.loads(mock_publish.mock_calls[6][1][2])['publish_job']
+        data = messages[6][2]['publish_job']
         check_base_attrs(data)
 
         # Deprecate Job Doc
 
-        data = json.loads(mock_publish.mock_calls[7][1][2])['deprecate_job']
+        data = messages[7][2]['deprecate_job']
         check_base_attrs(data)
         assert data['old_cloud_image_name'] == 'old_new_image_123'
         assert data['account'] == 'test-gce'
 
-    @patch.object(JobCreatorService, '_publish')
-    def test_jobcreator_handle_service_message_oci(self, mock_publish):
+    @patch.object(JobCreatorService, 'publish_many')
+    def test_jobcreator_handle_service_message_oci(self, mock_publish_many):
         def check_base_attrs(job_data, cloud=True):
             assert job_data['id'] == '12345678-1234-1234-1234-123456789012'
             assert job_data['utctime'] == 'now'
@@ -428,13 +457,14 @@ class TestJobCreatorService(object):
         with open('test/data/oci_job.json', 'r') as job_doc:
             job = json.load(job_doc)
 
-        message = MagicMock()
+        message = MagicMock(properties={})
         message.body = json.dumps(job)
         self.jobcreator._handle_service_message(message)
+        messages = mock_publish_many.call_args[0][0]
 
         # OBS Job Doc
 
-        data = json.loads(mock_publish.mock_calls[0][1][2])['obs_job']
+        data = messages[0][2]['obs_job']
         check_base_attrs(data, cloud=False)
         assert data['cloud_architecture'] == 'x86_64'
         assert data['download_url'] == \
@@ -443,7 +473,7 @@ class TestJobCreatorService(object):
 
         # Upload Job Doc
 
-        data = json.loads(mock_publish.mock_calls[1][1][2])['upload_job']
+        data = messages[1][2]['upload_job']
         check_base_attrs(data)
         assert data['cloud_image_name'] == 'new_image_123'
         assert data['region'] == 'us-phoenix-1'
@@ -456,7 +486,7 @@ class TestJobCreatorService(object):
 
         # create Job Doc
 
-        data = json.loads(mock_publish.mock_calls[2][1][2])['create_job']
+        data = messages[2][2]['create_job']
         check_base_attrs(data)
         assert data['image_description'] == 'New Image #123'
         assert data['region'] == 'us-phoenix-1'
@@ -465,7 +495,7 @@ class TestJobCreatorService(object):
 
         # Test Job Doc
 
-        data = json.loads(mock_publish.mock_calls[3][1][2])['test_job']
+        data = messages[3][2]['test_job']
         check_base_attrs(data)
         assert data['distro'] == 'sles'
         assert data['instance_type'] == 'VM.Standard2.1'
@@ -474,29 +504,29 @@ class TestJobCreatorService(object):
         assert data['account'] == 'test-oci'
 
         # Raw Image Upload Job Doc
-        data = json.loads(mock_publish.mock_calls[4][1][2])['raw_image_upload_job']
+        data = messages[4][2]['raw_image_upload_job']
         check_base_attrs(data)
         assert data['raw_image_upload_type'] is None
 
         # Replicate Job Doc
 
-        data = json.loads(mock_publish.mock_calls[5][1][2])['replicate_job']
+        data = messages[5][2]['replicate_job']
         check_base_attrs(data)
 
         # Publish Job Doc
 
-        data = json.loads(mock_publish.mock_calls[6][1][2])['publish_job']
+        data = messages[6][2]['publish_job']
         check_base_attrs(data)
 
         # Deprecate Job Doc
 
-        data = json.loads(mock_publish.mock_calls[7][1][2])['deprecate_job']
+        data = messages[7][2]['deprecate_job']
         check_base_attrs(data)
         assert data['old_cloud_image_name'] == 'old_new_image_123'
         assert data['account'] == 'test-oci'
 
     def test_jobcreator_handle_invalid_service_message(self):
-        message = MagicMock()
+        message = MagicMock(properties={})
         message.body = 'invalid message'
 
         with open('test/data/job.json', 'r') as job_doc:
@@ -510,12 +540,12 @@ class TestJobCreatorService(object):
             'Expecting value: line 1 column 1 (char 0).'
         )
 
+    @patch.object(JobCreatorService, '_flush_job_status')
     @patch.object(JobCreatorService, 'send_notification')
-    @patch('mash.services.jobcreator.service.handle_request')
     def test_jobcreator_handle_status_message(
         self,
-        mock_handle_request,
-        mock_send_notif
+        mock_send_notif,
+        mock_flush_job_status
     ):
         data = {
             'publish_status': {
@@ -527,19 +557,39 @@ class TestJobCreatorService(object):
                 'errors': []
             }
         }
-        message = MagicMock()
+        message = MagicMock(properties={}, delivery_tag=4)
         message.body = json.dumps(data)
-        self.jobcreator.database_api_url = 'http://localhost:5007/'
 
         self.jobcreator._handle_status_message(message)
         assert mock_send_notif.call_count == 1
+        assert self.jobcreator.status_updates[
+            ('12345678-1234-1234-1234-123456789012', 'publish')
+        ] == {
+            'id': '12345678-1234-1234-1234-123456789012',
+            'state': 'running',
+            'status': 'success',
+            'errors': [],
+            'current_service': 'deprecate',
+            'prev_service': 'publish'
+        }
+        assert self.jobcreator.status_delivery_tag == 4
+        assert not message.ack.called
+        assert not mock_flush_job_status.called
 
-        # Request failed
-        mock_handle_request.side_effect = Exception('Not found')
+        # Batch is full
+        self.jobcreator.status_batch_size = 1
         self.jobcreator._handle_status_message(message)
-        self.jobcreator.log.error.assert_called_once_with(
-            'Job status update failed: Not found'
-        )
+        mock_flush_job_status.assert_called_once_with()
+
+        # Status saved by database status consumer
+        self.jobcreator.status_consumer = True
+        self.jobcreator.status_updates.clear()
+
+        self.jobcreator._handle_status_message(message)
+        assert not self.jobcreator.status_updates
+        message.ack.assert_called_once_with()
+        message.ack.reset_mock()
+        self.jobcreator.status_consumer = False
 
         # Fake service
         data['fake_status'] = data['publish_status']
@@ -550,42 +600,180 @@ class TestJobCreatorService(object):
         self.jobcreator.log.warning.assert_called_once_with(
             'Unkown service message received for fake service.'
         )
+        message.ack.assert_called_once_with()
 
         # Invalid message
         message.body = 'Not json'
-        self.jobcreator.log.error.reset_mock()
 
         self.jobcreator._handle_status_message(message)
         self.jobcreator.log.error.assert_called_once_with(
             'Invalid message received: Expecting value: line 1 column 1 (char 0).'
         )
+        assert message.ack.call_count == 2
+
+    def test_jobcreator_buffer_job_status(self):
+        self.jobcreator._buffer_job_status({
+            'id': '1', 'status': 'failed', 'prev_service': 'upload'
+        })
+        self.jobcreator._buffer_job_status({
+            'id': '1', 'status': 'failed', 'prev_service': 'create'
+        })
+        self.jobcreator._buffer_job_status({
+            'id': '2', 'status': 'success', 'prev_service': 'upload',
+            'finished_at': 10.0
+        })
+        self.jobcreator._buffer_job_status({
+            'id': '2', 'status': 'success', 'prev_service': 'create'
+        })
+
+        # Redelivered update replaces the pending update
+        self.jobcreator._buffer_job_status({
+            'id': '2', 'status': 'success', 'prev_service': 'upload',
+            'finished_at': 11.0
+        })
+
+        assert list(self.jobcreator.status_updates.values()) == [
+            {'id': '1', 'status': 'failed', 'prev_service': 'upload'},
+            {'id': '1', 'status': 'failed', 'prev_service': 'create'},
+            {
+                'id': '2',
+                'status': 'success',
+                'prev_service': 'upload',
+                'finished_at': 11.0
+            },
+            {'id': '2', 'status': 'success', 'prev_service': 'create'}
+        ]
+
+    def test_jobcreator_flush_job_status(self):
+        # Nothing to flush
+        self.jobcreator._flush_job_status()
+        assert self.jobcreator.status_batches.empty()
+
+        self.jobcreator.status_updates[('1', 'test')] = {'id': '1'}
+        self.jobcreator.status_delivery_tag = 4
+        self.jobcreator._flush_job_status()
+
+        assert self.jobcreator.status_batches.get_nowait() == ([{'id': '1'}], 4)
+        assert not self.jobcreator.status_updates
+        assert self.jobcreator.status_delivery_tag is None
+        assert self.jobcreator.status_flush_time > 0
+
+        # Writer is busy, updates stay buffered
+        self.jobcreator.status_batches.put('batch')
+        self.jobcreator.status_updates[('2', 'test')] = {'id': '2'}
+        self.jobcreator.status_delivery_tag = 5
+        self.jobcreator._flush_job_status()
+
+        assert self.jobcreator.status_updates
+        assert self.jobcreator.status_delivery_tag == 5
+
+        # Full buffer waits for the writer
+        self.jobcreator.max_status_buffer = 1
+        self.jobcreator._flush_job_status(timeout=0)
+        assert self.jobcreator.status_updates
+
+    @patch('mash.services.jobcreator.service.handle_request')
+    def test_jobcreator_write_job_status(self, mock_handle_request):
+        self.jobcreator.channel = self.channel
+        self.jobcreator.status_stop = Mock()
+        self.jobcreator.status_stop.wait.return_value = False
+
+        response = Mock()
+        response.json.return_value = {
+            'failed': [{'id': '1', 'msg': 'Job 1 does not exist'}]
+        }
+        mock_handle_request.side_effect = [Exception('Not found'), response]
+
+        self.jobcreator.status_batches = queue.Queue()
+        self.jobcreator.status_batches.put(([{'id': '1'}], 4))
+        self.jobcreator.status_batches.put(None)
+        self.jobcreator._write_job_status()
+
+        mock_handle_request.assert_called_with(
+            'http://localhost:5007/',
+            'jobs/batch',
+            'put',
+            job_data=[{'id': '1'}]
+        )
+        self.jobcreator.log.error.assert_called_once_with(
+            'Job status update failed: Not found'
+        )
+        self.jobcreator.log.info.assert_called_once_with(
+            'Retrying job status update in 1 seconds.'
+        )
+        self.jobcreator.status_stop.wait.assert_called_once_with(1)
+        self.jobcreator.log.warning.assert_called_once_with(
+            'Job status update failed: Job 1 does not exist',
+            extra={'job_id': '1'}
+        )
+
+        # Messages up to the last delivery tag are acked at once
+        self.channel.basic.ack.assert_called_once_with(
+            delivery_tag=4, multiple=True
+        )
+
+    @patch('mash.services.jobcreator.service.handle_request')
+    def test_jobcreator_write_job_status_stopped(self, mock_handle_request):
+        self.jobcreator.channel = self.channel
+        self.jobcreator.status_stop.set()
+        mock_handle_request.side_effect = Exception('Not found')
+
+        self.jobcreator.status_batches.put(([{'id': '1'}], 4))
+        self.jobcreator._write_job_status()
+
+        # Failed batch is not retried after stop
+        assert mock_handle_request.call_count == 1
+        assert not self.channel.basic.ack.called
+
+    @patch('mash.services.jobcreator.service.time.monotonic')
+    @patch.object(JobCreatorService, '_flush_job_status')
+    def test_jobcreator_consume(self, mock_flush_job_status, mock_monotonic):
+        self.jobcreator.channel = self.channel
+        self.channel.is_closed = False
+        self.channel.consumer_tags = ['tag']
+        mock_monotonic.return_value = 10
+
+        def stop():
+            self.channel.consumer_tags = []
+
+        self.channel.process_data_events.side_effect = stop
+        self.jobcreator._consume()
+
+        mock_flush_job_status.assert_called_once_with()
 
     def test_get_next_service(self):
         result = self.jobcreator._get_next_service('deprecate')
         assert result is None
 
+    @patch.object(JobCreatorService, '_consume')
     @patch.object(JobCreatorService, 'consume_queue')
     @patch.object(JobCreatorService, 'stop')
-    def test_jobcreator_start(self, mock_stop, mock_consume_queue):
+    def test_jobcreator_start(
+        self, mock_stop, mock_consume_queue, mock_consume
+    ):
         self.jobcreator.channel = self.channel
 
         self.jobcreator.start()
-        self.channel.start_consuming.assert_called_once_with()
+        self.channel.basic.qos.assert_called_once_with(prefetch_count=500)
+        mock_consume.assert_called_once_with()
 
         mock_consume_queue.call_count == 9
         mock_stop.assert_called_once_with()
 
+    @patch.object(JobCreatorService, '_consume')
     @patch.object(JobCreatorService, 'consume_queue')
     @patch.object(JobCreatorService, 'stop')
-    def test_jobcreator_start_exception(self, mock_stop, mock_consume_queue):
-        self.channel.start_consuming.side_effect = KeyboardInterrupt()
+    def test_jobcreator_start_exception(
+        self, mock_stop, mock_consume_queue, mock_consume
+    ):
+        mock_consume.side_effect = KeyboardInterrupt()
         self.jobcreator.channel = self.channel
 
         self.jobcreator.start()
         mock_stop.assert_called_once_with()
         mock_stop.reset_mock()
 
-        self.channel.start_consuming.side_effect = Exception(
+        mock_consume.side_effect = Exception(
             'Cannot start job creator service.'
         )
 
@@ -594,13 +782,37 @@ class TestJobCreatorService(object):
 
         assert 'Cannot start job creator service.' == str(error.value)
 
+    @patch.object(JobCreatorService, '_flush_job_status')
     @patch.object(JobCreatorService, 'close_connection')
-    def test_jobcreator_stop(self, mock_close_connection):
+    def test_jobcreator_stop(
+        self, mock_close_connection, mock_flush_job_status
+    ):
         self.jobcreator.channel = self.channel
+        self.channel.is_closed = False
+        self.jobcreator.status_writer.is_alive.return_value = True
+
+        self.jobcreator.notification_class = Mock()
 
         self.jobcreator.stop()
+        assert self.jobcreator.status_stop.is_set()
+        mock_flush_job_status.assert_called_once_with(timeout=30)
+        assert self.jobcreator.status_batches.get_nowait() is None
+        self.jobcreator.status_writer.join.assert_called_once_with(30)
         self.channel.stop_consuming.assert_called_once_with()
         mock_close_connection.assert_called_once_with()
+        self.jobcreator.notification_class.close.assert_called_once_with()
+
+        # Writer is busy with a full queue
+        self.jobcreator.status_flush_timeout = 0
+        self.jobcreator.status_batches.put('batch')
+        self.jobcreator.stop()
+        assert self.jobcreator.status_batches.get_nowait() == 'batch'
+
+        # Writer stopped after a failed batch
+        mock_flush_job_status.reset_mock()
+        self.jobcreator.status_writer.is_alive.return_value = False
+        self.jobcreator.stop()
+        assert not mock_flush_job_status.called
 
     def test_create_notification_content(self):
         # Failed message
@@ -637,8 +849,8 @@ class TestJobCreatorService(object):
         )
         assert notif_class.send_notification.call_count == 1
 
-    @patch.object(JobCreatorService, '_publish')
-    def test_jobcreator_handle_service_message_aliyun(self, mock_publish):
+    @patch.object(JobCreatorService, 'publish_many')
+    def test_jobcreator_handle_service_message_aliyun(self, mock_publish_many):
         def check_base_attrs(job_data, cloud=True):
             assert job_data['id'] == '12345678-1234-1234-1234-123456789012'
             assert job_data['utctime'] == 'now'
@@ -650,13 +862,14 @@ class TestJobCreatorService(object):
         with open('test/data/aliyun_job.json', 'r') as job_doc:
             job = json.load(job_doc)
 
-        message = MagicMock()
+        message = MagicMock(properties={})
         message.body = json.dumps(job)
         self.jobcreator._handle_service_message(message)
+        messages = mock_publish_many.call_args[0][0]
 
         # OBS Job Doc
 
-        data = json.loads(mock_publish.mock_calls[0][1][2])['obs_job']
+        data = messages[0][2]['obs_job']
         check_base_attrs(data, cloud=False)
         assert data['cloud_architecture'] == 'x86_64'
         assert data['download_url'] == \
@@ -665,7 +878,7 @@ class TestJobCreatorService(object):
 
         # Upload Job Doc
 
-        data = json.loads(mock_publish.mock_calls[1][1][2])['upload_job']
+        data = messages[1][2]['upload_job']
         check_base_attrs(data)
         assert data['cloud_image_name'] == 'new_image_123'
         assert data['region'] == 'cn-beijing'
@@ -674,7 +887,7 @@ class TestJobCreatorService(object):
 
         # create Job Doc
 
-        data = json.loads(mock_publish.mock_calls[2][1][2])['create_job']
+        data = messages[2][2]['create_job']
         check_base_attrs(data)
         assert data['image_description'] == 'New Image #123'
         assert data['region'] == 'cn-beijing'
@@ -684,7 +897,7 @@ class TestJobCreatorService(object):
 
         # Test Job Doc
 
-        data = json.loads(mock_publish.mock_calls[3][1][2])['test_job']
+        data = messages[3][2]['test_job']
         check_base_attrs(data)
         assert data['distro'] == 'sles'
         assert data['instance_type'] == 'ecs.t5-lc1m1.small'
@@ -693,26 +906,26 @@ class TestJobCreatorService(object):
         assert data['account'] == 'test-aliyun'
 
         # Raw Image Upload Job Doc
-        data = json.loads(mock_publish.mock_calls[4][1][2])['raw_image_upload_job']
+        data = messages[4][2]['raw_image_upload_job']
         check_base_attrs(data)
         assert data['raw_image_upload_type'] == 's3bucket'
 
         # Replicate Job Doc
 
-        data = json.loads(mock_publish.mock_calls[5][1][2])['replicate_job']
+        data = messages[5][2]['replicate_job']
         check_base_attrs(data)
         assert data['account'] == 'test-aliyun'
 
         # Publish Job Doc
 
-        data = json.loads(mock_publish.mock_calls[6][1][2])['publish_job']
+        data = messages[6][2]['publish_job']
         check_base_attrs(data)
         assert data['account'] == 'test-aliyun'
         assert data['launch_permission'] == 'HIDDEN'
 
         # Deprecate Job Doc
 
-        data = json.loads(mock_publish.mock_calls[7][1][2])['deprecate_job']
+        data = messages[7][2]['deprecate_job']
         check_base_attrs(data)
         assert data['old_cloud_image_name'] == 'old_new_image_123'
         assert data['account'] == 'test-aliyun'
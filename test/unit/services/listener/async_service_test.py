@@ -0,0 +1,582 @@
+import asyncio
+
+from unittest.mock import AsyncMock, MagicMock, Mock, call, patch
+
+from aio_pika.exceptions import AMQPError
+from pytest import raises
+
+from mash.mash_exceptions import MashListenerServiceException
+from mash.services.mash_job import MashJob
+from mash.services.mash_service import MashService
+from mash.services.async_listener_service import AsyncListenerService
+from mash.utils.json_format import JsonFormat
+
+
+class TestAsyncListenerService(object):
+    @patch.object(MashService, '__init__')
+    def setup(self, mock_base_init):
+        mock_base_init.return_value = None
+        self.config = Mock()
+        self.config.get_job_credentials_cache_ttl.return_value = 60
+        self.config.config_data = None
+        self.config.get_service_names.return_value = [
+            'obs', 'upload', 'test', 'replicate', 'publish',
+            'deprecate'
+        ]
+        self.config.get_job_directory.return_value = \
+            '/var/lib/mash/replicate_jobs/'
+        self.config.get_base_thread_pool_count.return_value = 10
+        self.config.get_scale_out.return_value = False
+
+        self.message = MagicMock(content_type=None, content_encoding=None)
+        self.message.ack = AsyncMock()
+        self.message.reject = AsyncMock()
+
+        self.error_message = JsonFormat.json_message({
+            "test_result": {
+                "id": "1",
+                "status": "failed"
+            }
+        })
+        self.status_message = JsonFormat.json_message({
+            "test_result": {
+                "cloud_image_name": "image123",
+                "id": "1",
+                "status": "success"
+            }
+        })
+
+        self.service = AsyncListenerService()
+        self.service.jobs = {}
+        self.service.job_index = set()
+        self.service.scale_out = False
+        self.service.tasks = {}
+        self.service.stopping = None
+        self.service.exchanges = {}
+        self.service.log = Mock()
+        self.service.config = self.config
+        self.service.channel = AsyncMock()
+        self.service.connection = None
+        self.service.http_session = None
+        self.service.executor = Mock()
+        self.service.store_executor = None
+        self.service.job_store = Mock()
+        self.service.log_handler = Mock()
+        self.service.message_content_type = 'application/json'
+        self.service.message_compression = None
+        self.service.message_compression_threshold = 65536
+        self.service.amqp_host = 'localhost'
+        self.service.amqp_user = 'guest'
+        self.service.amqp_pass = 'guest'
+
+        self.service.service_exchange = 'replicate'
+        self.service.service_queue = 'service'
+        self.service.listener_queue = 'listener'
+        self.service.job_document_key = 'job_document'
+        self.service.listener_msg_key = 'listener_msg'
+        self.service.prev_service = 'test'
+        self.service.custom_args = None
+
+    @patch('mash.services.async_listener_service.ThreadPoolExecutor')
+    @patch('mash.services.listener_service.os.makedirs')
+    @patch('mash.services.listener_service.get_job_store')
+    @patch('mash.services.listener_service.setup_logfile')
+    @patch.object(AsyncListenerService, 'start')
+    def test_service_post_init(
+        self, mock_start, mock_setup_logfile, mock_get_job_store,
+        mock_makedirs, mock_executor
+    ):
+        self.service.custom_args = {'job_factory': Mock()}
+        self.config.get_log_file.return_value = \
+            '/var/log/mash/service_service.log'
+
+        self.service.post_init()
+
+        mock_executor.assert_has_calls([call(10), call(1)])
+        assert not self.service.use_process_pool
+        mock_get_job_store.return_value.get_job_ids.assert_called_once_with()
+        mock_start.assert_called_once_with()
+
+    @patch('mash.services.listener_service.os.makedirs')
+    @patch('mash.services.listener_service.get_job_store')
+    @patch('mash.services.listener_service.setup_logfile')
+    @patch.object(AsyncListenerService, 'start')
+    def test_service_post_init_scale_out(
+        self, mock_start, mock_setup_logfile, mock_get_job_store,
+        mock_makedirs
+    ):
+        self.service.custom_args = {'job_factory': Mock()}
+        self.config.get_scale_out.return_value = True
+
+        with raises(MashListenerServiceException):
+            self.service.post_init()
+
+        self.config.get_scale_out.assert_called_once_with('replicate')
+        assert not mock_start.called
+
+    def test_service_open_connection(self):
+        # Connection is opened in the event loop on start
+        self.service._open_connection()
+        assert self.service.connection is None
+
+    def test_service_publish(self):
+        exchange = AsyncMock()
+        self.service.channel.declare_exchange.return_value = exchange
+
+        asyncio.run(
+            self.service.publish_job_result('replicate', self.status_message)
+        )
+
+        self.service.channel.declare_exchange.assert_called_once()
+        message = exchange.publish.call_args[0][0]
+        assert message.body == self.status_message.encode()
+        assert message.content_type == 'application/json'
+        assert message.content_encoding is None
+        assert exchange.publish.call_args[1] == {
+            'routing_key': 'listener_msg',
+            'mandatory': True
+        }
+
+        # Exchange is only declared once
+        asyncio.run(
+            self.service.publish_job_result('replicate', self.status_message)
+        )
+        self.service.channel.declare_exchange.assert_called_once()
+
+    def test_service_bind_queue(self):
+        exchange = AsyncMock()
+        queue = AsyncMock()
+        self.service.channel.declare_exchange.return_value = exchange
+        self.service.channel.declare_queue.return_value = queue
+
+        result = asyncio.run(
+            self.service.bind_queue('replicate', 'job_document', 'service')
+        )
+
+        assert result == queue
+        self.service.channel.declare_queue.assert_called_once_with(
+            'replicate.service', durable=True
+        )
+        queue.bind.assert_called_once_with(
+            exchange, routing_key='job_document'
+        )
+
+    def test_service_add_job(self):
+        job = Mock()
+        job.get_job_id.return_value = {'job_id': '1'}
+        factory = Mock()
+        factory.create_job.return_value = job
+        self.service.job_factory = factory
+
+        job_config = {'id': '1', 'cloud': 'ec2'}
+        asyncio.run(self.service._add_job(job_config))
+
+        assert '1' not in self.service.jobs
+        assert '1' in self.service.job_index
+        self.service.job_store.add.assert_called_once_with(job_config)
+        self.service.log.info.assert_called_once_with(
+            'Job queued, awaiting listener message.',
+            extra={'job_id': '1'}
+        )
+
+        # Job already queued
+        asyncio.run(self.service._add_job(job_config))
+
+        factory.create_job.assert_called_once_with(job_config, self.config)
+        self.service.log.warning.assert_called_once_with(
+            'Job already queued.',
+            extra={'job_id': '1'}
+        )
+
+    def test_service_add_job_duplicate(self):
+        factory = Mock()
+        self.service.job_factory = factory
+
+        def create_job(job_config, config):
+            # Duplicate job document handled meanwhile
+            self.service.job_index.add('1')
+            return Mock()
+
+        factory.create_job.side_effect = create_job
+
+        asyncio.run(self.service._add_job({'id': '1'}))
+
+        assert '1' not in self.service.jobs
+        assert not self.service.job_store.add.called
+        self.service.log.warning.assert_called_once_with(
+            'Job already queued.',
+            extra={'job_id': '1'}
+        )
+
+    def test_service_add_job_invalid(self):
+        factory = Mock()
+        factory.create_job.side_effect = Exception('Cannot create job')
+        self.service.job_factory = factory
+
+        asyncio.run(self.service._add_job({'id': '1'}))
+
+        self.service.log.error.assert_called_once_with(
+            'Invalid job: Cannot create job.'
+        )
+        assert not self.service.job_store.add.called
+
+    def test_service_add_job_store_error(self):
+        self.service.job_factory = Mock()
+        self.service.job_store.add.side_effect = Exception('Disk full')
+
+        with raises(Exception):
+            asyncio.run(self.service._add_job({'id': '1'}))
+
+        assert '1' not in self.service.jobs
+        assert '1' not in self.service.job_index
+
+    def test_service_delete_job(self):
+        self.service.jobs['1'] = Mock()
+        self.service.job_index.add('1')
+
+        asyncio.run(self.service._delete_job('1'))
+
+        assert '1' not in self.service.jobs
+        assert '1' not in self.service.job_index
+        self.service.job_store.delete.assert_called_once_with('1')
+
+        # Job is not queued
+        asyncio.run(self.service._delete_job('1'))
+
+        self.service.log.warning.assert_called_once_with(
+            'Job deletion failed, job is not queued.',
+            extra={'job_id': '1'}
+        )
+        self.service.job_store.delete.assert_called_once_with('1')
+
+    def test_service_get_job(self):
+        job = Mock()
+        factory = Mock()
+        factory.create_job.return_value = job
+        self.service.job_factory = factory
+        self.service.job_index.update(('1', '2'))
+        self.service.job_store.get.side_effect = [{'id': '1'}, None]
+
+        # Unknown job
+        assert asyncio.run(self.service._get_job('3')) is None
+
+        # Created from the job store and kept
+        assert asyncio.run(self.service._get_job('1')) == job
+        assert asyncio.run(self.service._get_job('1')) == job
+        factory.create_job.assert_called_once_with({'id': '1'}, self.config)
+
+        # Job config is gone
+        assert asyncio.run(self.service._get_job('2')) is None
+        assert '2' not in self.service.job_index
+
+    def test_service_get_job_concurrent(self):
+        job = Mock()
+        factory = Mock()
+        self.service.job_factory = factory
+        self.service.job_index.add('1')
+        self.service.job_store.get.return_value = {'id': '1'}
+
+        def create_job(job_config, config):
+            # Created by a concurrent listener message
+            self.service.jobs['1'] = job
+            return Mock()
+
+        factory.create_job.side_effect = create_job
+
+        assert asyncio.run(self.service._get_job('1')) == job
+
+    def test_service_get_job_invalid(self):
+        factory = Mock()
+        factory.create_job.side_effect = Exception('Cannot create job')
+        self.service.job_factory = factory
+        self.service.job_index.add('1')
+        self.service.job_store.get.return_value = {'id': '1'}
+
+        assert asyncio.run(self.service._get_job('1')) is None
+        assert '1' not in self.service.job_index
+        self.service.job_store.delete.assert_called_once_with('1')
+
+    @patch.object(AsyncListenerService, '_add_job')
+    def test_service_handle_service_message(self, mock_add_job):
+        self.message.body = b'{"replicate_job": {"id": "1"}}'
+
+        asyncio.run(self.service._handle_service_message(self.message))
+
+        mock_add_job.assert_called_once_with({'id': '1'})
+        self.message.ack.assert_awaited_once_with()
+
+    def test_service_handle_service_message_invalid(self):
+        self.message.body = b'{"replicate_job": "invalid"'
+
+        asyncio.run(self.service._handle_service_message(self.message))
+
+        assert self.service.log.error.call_count == 1
+        self.message.ack.assert_awaited_once_with()
+
+    @patch.object(AsyncListenerService, '_schedule_job')
+    def test_service_handle_listener_message(self, mock_schedule_job):
+        job = Mock()
+        job.id = '1'
+        self.service.jobs['1'] = job
+        self.message.body = self.status_message.encode()
+
+        asyncio.run(self.service._handle_listener_message(self.message))
+
+        assert job.listener_msg == self.message
+        job.set_queued_time.assert_called_once_with()
+        mock_schedule_job.assert_called_once_with('1')
+        assert not self.message.ack.called
+
+        # Delivered while the service is stopping
+        mock_schedule_job.reset_mock()
+        self.service.stopping = Mock()
+        self.service.stopping.is_set.return_value = True
+
+        asyncio.run(self.service._handle_listener_message(self.message))
+
+        assert not mock_schedule_job.called
+        self.message.reject.assert_awaited_once_with(requeue=True)
+        assert not self.message.ack.called
+
+    @patch.object(AsyncListenerService, '_publish_message')
+    @patch.object(AsyncListenerService, '_delete_job')
+    def test_service_handle_listener_message_failed(
+        self, mock_delete_job, mock_publish_message
+    ):
+        job = Mock()
+        job.id = '1'
+        job.get_status_message.return_value = {'id': '1', 'status': 'failed'}
+        self.service.jobs['1'] = job
+        self.message.body = self.error_message.encode()
+
+        asyncio.run(self.service._handle_listener_message(self.message))
+
+        mock_delete_job.assert_called_once_with('1')
+        mock_publish_message.assert_awaited_once_with(
+            {'replicate_result': {'id': '1', 'status': 'failed'}},
+            '1'
+        )
+        self.message.ack.assert_awaited_once_with()
+
+    @patch.object(AsyncListenerService, '_publish_message')
+    @patch.object(AsyncListenerService, '_delete_job')
+    def test_service_handle_listener_message_failed_upstream_times(
+        self, mock_delete_job, mock_publish_message
+    ):
+        job = MashJob(
+            {
+                'id': '1',
+                'last_service': 'test',
+                'requesting_user': 'user1',
+                'cloud': 'ec2',
+                'utctime': 'now'
+            },
+            self.config
+        )
+        self.service.jobs['1'] = job
+        self.message.body = JsonFormat.json_message({
+            'test_result': {
+                'id': '1',
+                'status': 'failed',
+                'queued_at': 10.0,
+                'started_at': 11.0,
+                'finished_at': 12.0
+            }
+        }).encode()
+
+        asyncio.run(self.service._handle_listener_message(self.message))
+
+        mock_publish_message.assert_awaited_once_with(
+            {'replicate_result': {'id': '1', 'status': 'failed'}},
+            '1'
+        )
+
+    def test_service_handle_listener_message_unknown_job(self):
+        self.message.body = self.status_message.encode()
+
+        asyncio.run(self.service._handle_listener_message(self.message))
+
+        self.message.ack.assert_awaited_once_with()
+
+    @patch.object(AsyncListenerService, '_publish_message')
+    @patch.object(AsyncListenerService, '_delete_job')
+    def test_service_run_job(self, mock_delete_job, mock_publish_message):
+        job = Mock()
+        job.id = '1'
+        job.status = 'success'
+        job.process_job_async = AsyncMock()
+        job.listener_msg.ack = AsyncMock()
+        job.get_status_message.return_value = {'id': '1', 'status': 'success'}
+        self.service.jobs['1'] = job
+        self.service.tasks['1'] = Mock()
+
+        asyncio.run(self.service._run_job('1'))
+
+        assert job.executor == self.service.executor
+        assert job.event_loop is not None
+        job.process_job_async.assert_awaited_once_with()
+        assert '1' not in self.service.tasks
+        mock_delete_job.assert_called_once_with('1')
+        self.service.log.info.assert_called_once_with(
+            'replicate successful.',
+            extra=job.get_job_id.return_value
+        )
+        mock_publish_message.assert_awaited_once_with(
+            {'replicate_result': {'id': '1', 'status': 'success'}},
+            '1'
+        )
+        job.listener_msg.ack.assert_awaited_once_with()
+
+    @patch.object(AsyncListenerService, '_publish_message')
+    @patch.object(AsyncListenerService, '_delete_job')
+    def test_service_run_job_exception(
+        self, mock_delete_job, mock_publish_message
+    ):
+        job = Mock()
+        job.id = '1'
+        job.process_job_async = AsyncMock(side_effect=Exception('Broken!'))
+        job.listener_msg.ack = AsyncMock()
+        job.get_status_message.return_value = {'id': '1'}
+        self.service.jobs['1'] = job
+
+        asyncio.run(self.service._run_job('1'))
+
+        assert job.status == 'exception'
+        job.add_error_msg.assert_called_once_with(
+            'Exception in replicate: Broken!'
+        )
+        job.listener_msg.ack.assert_awaited_once_with()
+
+    @patch.object(AsyncListenerService, '_publish_message')
+    @patch.object(AsyncListenerService, '_delete_job')
+    def test_service_run_job_failed(
+        self, mock_delete_job, mock_publish_message
+    ):
+        job = Mock()
+        job.id = '1'
+        job.status = 'failed'
+        job.process_job_async = AsyncMock()
+        job.listener_msg.ack = AsyncMock()
+        job.get_status_message.return_value = {'id': '1'}
+        self.service.jobs['1'] = job
+
+        asyncio.run(self.service._run_job('1'))
+
+        self.service.log.error.assert_called_once_with(
+            'Error occurred in replicate.',
+            extra=job.get_job_id.return_value
+        )
+
+    @patch('mash.services.async_listener_service.asyncio.ensure_future')
+    def test_service_schedule_job(self, mock_ensure_future):
+        task = Mock()
+        mock_ensure_future.return_value = task
+
+        with patch.object(AsyncListenerService, '_run_job', Mock()):
+            self.service._schedule_job('1')
+            self.service._schedule_job('1')
+
+        assert self.service.tasks['1'] == task
+        mock_ensure_future.assert_called_once()
+        self.service.log.warning.assert_called_once_with(
+            'Job already running. Received multiple listener messages.',
+            extra={'job_id': '1'}
+        )
+
+    @patch.object(AsyncListenerService, 'publish_job_result')
+    def test_service_publish_message_exception(self, mock_publish):
+        mock_publish.side_effect = AMQPError('Broken')
+
+        asyncio.run(self.service._publish_message('message', '1'))
+
+        self.service.log.warning.assert_called_once_with(
+            'Message not received: message',
+            extra={'job_id': '1'}
+        )
+
+    @patch('mash.services.async_listener_service.aiohttp')
+    @patch('mash.services.async_listener_service.aio_pika')
+    def test_service_run(self, mock_aio_pika, mock_aiohttp):
+        connection = AsyncMock()
+        connection.is_closed = False
+        channel = AsyncMock()
+        connection.channel.return_value = channel
+        mock_aio_pika.connect_robust = AsyncMock(return_value=connection)
+
+        session = AsyncMock()
+        session.closed = False
+        mock_aiohttp.ClientSession.return_value = session
+
+        queue = AsyncMock()
+        channel.declare_queue.return_value = queue
+
+        job_task = AsyncMock()
+
+        async def consume(callback):
+            # Stop service once consumers are registered
+            if callback == self.service._handle_listener_message:
+                self.service.tasks['1'] = asyncio.ensure_future(job_task())
+                self.service.stop()
+                return 'listener'
+            return 'service'
+
+        queue.consume.side_effect = consume
+
+        asyncio.run(self.service.run())
+
+        mock_aio_pika.connect_robust.assert_awaited_once_with(
+            host='localhost',
+            login='guest',
+            password='guest',
+            heartbeat=600
+        )
+        connection.channel.assert_awaited_once_with(publisher_confirms=True)
+        channel.set_qos.assert_awaited_once_with(prefetch_count=1000)
+        assert queue.consume.await_count == 2
+        assert queue.cancel.await_args_list == [
+            call('service'), call('listener')
+        ]
+        job_task.assert_awaited_once_with()
+        self.service.job_store.close.assert_called_once_with()
+        self.service.log_handler.close.assert_called_once_with()
+        session.close.assert_awaited_once_with()
+        connection.close.assert_awaited_once_with()
+
+    @patch.object(AsyncListenerService, 'run', new_callable=Mock)
+    @patch('mash.services.async_listener_service.asyncio')
+    def test_service_start(self, mock_asyncio, mock_run):
+        self.service.store_executor = Mock()
+        self.service.start()
+
+        mock_asyncio.run.assert_called_once_with(mock_run.return_value)
+        self.service.executor.shutdown.assert_called_once_with()
+        self.service.store_executor.shutdown.assert_called_once_with()
+
+    def test_service_stop(self):
+        self.service.stopping = Mock()
+
+        self.service.stop(15)
+
+        self.service.log.info.assert_called_once_with(
+            'Got a TERM/INTERRUPT signal, shutting down gracefully.'
+        )
+        self.service.stopping.set.assert_called_once_with()
+
+    def test_service_publish_compressed(self):
+        exchange = AsyncMock()
+        self.service.channel.declare_exchange.return_value = exchange
+        self.service.message_compression = 'gzip'
+        self.service.message_compression_threshold = 10
+
+        asyncio.run(
+            self.service.publish_job_result(
+                'replicate', {'test_result': {'id': '1'}}, '1'
+            )
+        )
+
+        message = exchange.publish.call_args[0][0]
+        assert message.content_encoding == 'gzip'
+        assert message.message_id == '1'
+        assert self.service._decode_message(message) == {
+            'test_result': {'id': '1'}
+        }
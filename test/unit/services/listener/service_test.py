@@ -1,5 +1,7 @@
 import pytest
+import threading
 
+from pytz import utc
 from unittest.mock import call, MagicMock, Mock, patch
 
 from amqpstorm import AMQPError
@@ -7,8 +9,15 @@ from amqpstorm import AMQPError
 from apscheduler.jobstores.base import ConflictingIdError
 
 from mash.services.base_defaults import Defaults
+from mash.services.mash_job import MashJob
 from mash.services.mash_service import MashService
-from mash.services.listener_service import ListenerService
+from mash.services.credentials_cache import credentials_cache
+from mash.services.listener_service import (
+    ListenerService,
+    get_worker_logger,
+    run_job_in_process,
+    setup_worker_process
+)
 from mash.mash_exceptions import MashListenerServiceException
 from mash.utils.json_format import JsonFormat
 
@@ -20,6 +29,7 @@ class TestListenerService(object):
     ):
         mock_base_init.return_value = None
         self.config = Mock()
+        self.config.get_job_credentials_cache_ttl.return_value = 60
         self.config.config_data = None
         self.config.get_service_names.return_value = [
             'obs', 'upload', 'test', 'replicate', 'publish',
@@ -27,11 +37,13 @@ class TestListenerService(object):
         ]
         self.config.get_job_directory.return_value = '/var/lib/mash/replicate_jobs/'
         self.config.get_base_thread_pool_count.return_value = 10
+        self.config.get_process_pool_count.return_value = 0
+        self.config.get_scale_out.return_value = False
 
         self.channel = Mock()
         self.channel.basic_ack.return_value = None
 
-        self.connection = Mock()
+        self.connection = Mock(is_closed=False)
 
         self.tag = Mock()
         self.method = {'delivery_tag': self.tag}
@@ -39,6 +51,7 @@ class TestListenerService(object):
         self.message = MagicMock(
             channel=self.channel,
             method=self.method,
+            properties={}
         )
 
         self.msg_properties = {
@@ -65,9 +78,14 @@ class TestListenerService(object):
         self.service.jwt_secret = 'a-secret'
         self.service.jwt_algorithm = 'HS256'
         self.service.jobs = {}
+        self.service.job_index = set()
         self.service.log = Mock()
 
         self.service.channel = self.channel
+        self.service.connection = self.connection
+        self.service.publisher = None
+        self.service.publish_confirm_window = 64
+        self.service.publisher_lock = threading.Lock()
         self.service.config = self.config
 
         scheduler = Mock()
@@ -82,15 +100,21 @@ class TestListenerService(object):
         self.service.custom_args = None
         self.service.listener_msg_args = ['cloud_image_name']
         self.service.status_msg_args = ['cloud_image_name']
+        self.service.use_process_pool = False
+        self.service.scale_out = False
+        self.service.job_store = Mock()
+        self.service.message_content_type = 'application/json'
+        self.service.message_compression = None
+        self.service.message_compression_threshold = 65536
 
     @patch('mash.services.listener_service.os.makedirs')
     @patch.object(ListenerService, 'bind_queue')
-    @patch('mash.services.listener_service.restart_jobs')
+    @patch('mash.services.listener_service.get_job_store')
     @patch('mash.services.listener_service.setup_logfile')
     @patch.object(ListenerService, 'start')
     def test_service_post_init(
         self, mock_start,
-        mock_setup_logfile, mock_restart_jobs,
+        mock_setup_logfile, mock_get_job_store,
         mock_bind_queue, mock_makedirs
     ):
         self.service.config = self.config
@@ -107,6 +131,7 @@ class TestListenerService(object):
         }
         self.config.get_job_directory.reset_mock()
         mock_makedirs.reset_mock()
+        mock_get_job_store.reset_mock()
 
         self.service.post_init()
 
@@ -124,21 +149,22 @@ class TestListenerService(object):
             call('replicate', 'job_document', 'service'),
             call('replicate', 'listener_msg', 'listener')
         ])
-        mock_restart_jobs.assert_called_once_with(
-            '/var/lib/mash/replicate_jobs/',
-            self.service._add_job
+        mock_get_job_store.assert_called_once_with(
+            self.config.get_job_store.return_value,
+            '/var/lib/mash/replicate_jobs/'
         )
+        mock_get_job_store.return_value.get_job_ids.assert_called_once_with()
         mock_start.assert_called_once_with()
 
     @patch('mash.services.listener_service.os.makedirs')
     @patch.object(Defaults, 'get_job_directory')
     @patch.object(ListenerService, 'bind_queue')
-    @patch('mash.services.listener_service.restart_jobs')
+    @patch('mash.services.listener_service.get_job_store')
     @patch('mash.services.listener_service.setup_logfile')
     @patch.object(ListenerService, 'start')
     def test_service_post_init_custom_args(
         self, mock_start,
-        mock_setup_logfile, mock_restart_jobs,
+        mock_setup_logfile, mock_get_job_store,
         mock_bind_queue, mock_get_job_directory, mock_makedirs
     ):
         mock_makedirs.return_value = True
@@ -153,6 +179,131 @@ class TestListenerService(object):
 
         self.service.post_init()
 
+    @patch('mash.services.listener_service.os.makedirs')
+    @patch('mash.services.listener_service.get_job_store')
+    @patch('mash.services.listener_service.setup_logfile')
+    @patch.object(ListenerService, 'start')
+    def test_service_post_init_scale_out(
+        self, mock_start, mock_setup_logfile, mock_get_job_store,
+        mock_makedirs
+    ):
+        self.config.get_scale_out.return_value = True
+        self.config.get_job_store.return_value = 'sqlite'
+        self.config.get_replica_id.return_value = 'node1'
+        self.config.get_replica_takeover.return_value = ['node1', 'node2']
+        self.config.get_log_file.return_value = \
+            '/var/log/mash/service_service.log'
+        self.service.custom_args = {'job_factory': Mock()}
+
+        # SQLite job store cannot be shared by replicas
+        with pytest.raises(MashListenerServiceException) as error:
+            self.service.post_init()
+
+        assert 'requires the file job store' in str(error.value)
+        assert not mock_get_job_store.called
+
+        self.config.get_job_store.return_value = 'file'
+        self.service.post_init()
+
+        assert self.service.replica_id == 'node1'
+        assert self.service.replica_takeover == ['node2']
+        self.channel.exchange.declare.assert_has_calls([
+            call(
+                exchange='replicate.service.hash',
+                exchange_type='x-consistent-hash',
+                durable=True,
+                arguments={'hash-property': 'message_id'}
+            ),
+            call(
+                exchange='test.listener.hash',
+                exchange_type='x-consistent-hash',
+                durable=True,
+                arguments={'hash-property': 'message_id'}
+            )
+        ], any_order=True)
+        self.channel.exchange.bind.assert_has_calls([
+            call(
+                destination='replicate.service.hash',
+                source='replicate',
+                routing_key='job_document'
+            ),
+            call(
+                destination='test.listener.hash',
+                source='test',
+                routing_key='listener_msg'
+            )
+        ])
+        self.channel.queue.bind.assert_has_calls([
+            call(
+                exchange='replicate.service.hash',
+                queue='replicate.service.node1',
+                routing_key='1'
+            ),
+            call(
+                exchange='test.listener.hash',
+                queue='test.listener.node1',
+                routing_key='1'
+            )
+        ])
+        self.channel.queue.unbind.assert_has_calls([
+            call(
+                queue='replicate.service',
+                exchange='replicate',
+                routing_key='job_document'
+            ),
+            call(
+                queue='test.listener',
+                exchange='test',
+                routing_key='listener_msg'
+            )
+        ])
+        # Only the jobs of the replica are indexed
+        job_store = mock_get_job_store.return_value
+        assert not job_store.get_job_ids.called
+        index_job = job_store.load.call_args[0][0]
+        index_job({'id': '1', 'replica_id': 'node1'})
+        index_job({'id': '2', 'replica_id': 'node2'})
+        index_job({'id': '3'})
+        assert self.service.job_index == {'1'}
+
+    @patch('mash.services.listener_service.BackgroundScheduler')
+    @patch('mash.services.listener_service.ProcessPoolExecutor')
+    @patch('mash.services.listener_service.QueueListener')
+    @patch('mash.services.listener_service.os.makedirs')
+    @patch.object(ListenerService, 'bind_queue')
+    @patch('mash.services.listener_service.get_job_store')
+    @patch('mash.services.listener_service.setup_logfile')
+    @patch.object(ListenerService, 'start')
+    def test_service_post_init_process_pool(
+        self, mock_start, mock_setup_logfile, mock_get_job_store,
+        mock_bind_queue, mock_makedirs, mock_queue_listener,
+        mock_process_pool, mock_scheduler
+    ):
+        log_listener = Mock()
+        mock_queue_listener.return_value = log_listener
+
+        self.config.get_process_pool_count.return_value = 4
+        self.service.log.handlers = []
+        self.config.get_log_file.return_value = \
+            '/var/log/mash/service_service.log'
+        self.service.custom_args = {'job_factory': Mock()}
+
+        self.service.post_init()
+
+        assert self.service.use_process_pool
+        self.config.get_process_pool_count.assert_called_once_with(
+            'replicate'
+        )
+        log_listener.start.assert_called_once_with()
+        assert mock_process_pool.call_args[0][0] == 4
+        pool_kwargs = mock_process_pool.call_args[1]['pool_kwargs']
+        assert pool_kwargs['initializer'] == setup_worker_process
+        assert pool_kwargs['initargs'] == (self.service.log_queue, 60)
+        mock_scheduler.assert_called_once_with(
+            executors={'default': mock_process_pool.return_value},
+            timezone=utc
+        )
+
     @patch.object(ListenerService, '_delete_job')
     @patch.object(ListenerService, '_publish_message')
     def test_service_cleanup_job(
@@ -175,16 +326,45 @@ class TestListenerService(object):
         mock_delete_job.assert_called_once_with('1')
         msg = {"replicate_result": {"id": "1", "status": "failed"}}
         mock_publish_message.assert_called_once_with(
-            JsonFormat.json_message(msg),
+            msg,
             '1'
         )
 
+    @patch.object(ListenerService, '_delete_job')
+    @patch.object(ListenerService, '_publish_message')
+    def test_service_cleanup_job_upstream_times(
+        self, mock_publish_message, mock_delete_job
+    ):
+        job = MashJob(
+            {
+                'id': '1',
+                'last_service': 'test',
+                'requesting_user': 'user1',
+                'cloud': 'ec2',
+                'utctime': 'now'
+            },
+            self.config
+        )
+        job.set_status_message({
+            'id': '1',
+            'status': 'failed',
+            'queued_at': 10.0,
+            'started_at': 11.0,
+            'finished_at': 12.0
+        })
+
+        self.service.jobs['1'] = job
+        self.service._cleanup_job('1')
+
+        msg = {'replicate_result': {'id': '1', 'status': 'failed'}}
+        mock_publish_message.assert_called_once_with(msg, '1')
+
     def test_service_add_job_exists(self):
         job = Mock()
         job.id = '1'
         job.get_metadata.return_value = {'job_id': job.id}
 
-        self.service.jobs[job.id] = Mock()
+        self.service.job_index.add(job.id)
         self.service._add_job({'id': job.id, 'cloud': 'ec2'})
 
         self.service.log.warning.assert_called_once_with(
@@ -192,8 +372,7 @@ class TestListenerService(object):
             extra={'job_id': job.id}
         )
 
-    @patch('mash.services.listener_service.persist_json')
-    def test_service_add_job(self, mock_persist_json):
+    def test_service_add_job(self):
         job = Mock()
         job.id = '1'
         job.get_job_id.return_value = {'job_id': '1'}
@@ -208,11 +387,24 @@ class TestListenerService(object):
         self.service._add_job(job_config)
 
         assert job.log_callback == self.service.log
-        assert job.job_file == 'tmp-dir/job-1.json'
+        assert '1' in self.service.job_index
+        self.service.job_store.add.assert_called_once_with(job_config)
+
+        assert '1' not in self.service.jobs
         self.service.log.info.assert_called_once_with(
             'Job queued, awaiting listener message.',
             extra={'job_id': '1'}
         )
+        assert 'replica_id' not in job_config
+
+        # The job config records the replica that owns the job
+        self.service.scale_out = True
+        self.service.replica_id = 'node1'
+        job_config = {'id': '2', 'cloud': 'ec2'}
+        self.service._add_job(job_config)
+
+        assert job_config['replica_id'] == 'node1'
+        assert '2' in self.service.job_index
 
     def test_service_add_job_exception(self):
         job_config = {'id': '1', 'cloud': 'ec2'}
@@ -225,19 +417,19 @@ class TestListenerService(object):
         self.service.log.error.assert_called_once_with(
             'Invalid job: Cannot create job.'
         )
+        self.service.job_store.add.assert_not_called()
 
-    @patch('mash.services.listener_service.remove_file')
     @patch.object(ListenerService, 'unbind_queue')
-    def test_service_delete_job(self, mock_unbind_queue, mock_remove_file):
+    def test_service_delete_job(self, mock_unbind_queue):
         job = Mock()
         job.id = '1'
-        job.job_file = 'job-test.json'
         job.last_service = 'replicate'
         job.status = 'success'
         job.utctime = 'now'
         job.get_job_id.return_value = {'job_id': '1'}
 
         self.service.jobs['1'] = job
+        self.service.job_index.add('1')
         self.service._delete_job('1')
 
         self.service.log.info.assert_called_once_with(
@@ -246,7 +438,8 @@ class TestListenerService(object):
         )
 
         assert '1' not in self.service.jobs
-        mock_remove_file.assert_called_once_with('job-test.json')
+        assert '1' not in self.service.job_index
+        self.service.job_store.delete.assert_called_once_with('1')
 
     def test_service_delete_invalid_job(self):
         self.service._delete_job('1')
@@ -274,6 +467,7 @@ class TestListenerService(object):
         self.service._handle_listener_message(self.message)
 
         assert self.service.jobs['1'].listener_msg == self.message
+        job.set_queued_time.assert_called_once_with()
         mock_schedule_job.assert_called_once_with('1')
 
     def test_service_handle_listener_message_no_job(self):
@@ -286,8 +480,112 @@ class TestListenerService(object):
             }
         })
         self.service._handle_listener_message(self.message)
+        self.service.job_store.get.assert_not_called()
+        self.message.ack.assert_called_once_with()
+
+    @patch.object(ListenerService, '_schedule_job')
+    def test_service_handle_listener_message_load_job(
+        self, mock_schedule_job
+    ):
+        job = Mock()
+        job.id = '1'
+        factory = Mock()
+        factory.create_job.return_value = job
+
+        self.service.job_factory = factory
+        self.service.job_index.add('1')
+        self.service.job_store.get.return_value = {'id': '1'}
+
+        self.message.body = JsonFormat.json_message({
+            "test_result": {
+                "id": "1",
+                "status": "success",
+                "errors": []
+            }
+        })
+        self.service._handle_listener_message(self.message)
+
+        self.service.job_store.get.assert_called_once_with('1')
+        factory.create_job.assert_called_once_with({'id': '1'}, self.config)
+        assert self.service.jobs['1'] == job
+        assert job.listener_msg == self.message
+        mock_schedule_job.assert_called_once_with('1')
+
+    def test_service_handle_listener_message_invalid_job(self):
+        factory = Mock()
+        factory.create_job.side_effect = Exception('Cannot create job')
+
+        self.service.job_factory = factory
+        self.service.job_index.add('1')
+        self.service.job_store.get.return_value = {'id': '1'}
+
+        self.message.body = JsonFormat.json_message({
+            "test_result": {
+                "id": "1",
+                "status": "success",
+                "errors": []
+            }
+        })
+        self.service._handle_listener_message(self.message)
+
+        assert '1' not in self.service.job_index
+        self.service.job_store.delete.assert_called_once_with('1')
         self.message.ack.assert_called_once_with()
 
+    @patch.object(ListenerService, '_cleanup_job')
+    def test_service_handle_listener_message_take_over(
+        self, mock_cleanup_job
+    ):
+        job = Mock()
+        job.id = '1'
+        factory = Mock()
+        factory.create_job.return_value = job
+
+        self.service.job_factory = factory
+        self.service.scale_out = True
+        self.service.replica_id = 'node2'
+        self.service.job_store.get.return_value = {
+            'id': '1', 'replica_id': 'node1'
+        }
+        self.message.properties = {'message_id': '1'}
+
+        self.message.body = JsonFormat.json_message({
+            "test_result": {
+                "id": "1",
+                "status": "failed",
+                "errors": []
+            }
+        })
+        self.service._handle_listener_message(self.message)
+
+        self.service.job_store.get.assert_called_once_with('1')
+        self.service.job_store.add.assert_called_once_with(
+            {'id': '1', 'replica_id': 'node2'}
+        )
+        assert '1' in self.service.job_index
+        self.service.log.info.assert_called_once_with(
+            'Taking over job from shared job directory.',
+            extra={'job_id': '1'}
+        )
+        mock_cleanup_job.assert_called_once_with('1')
+        self.message.ack.assert_called_once_with()
+
+    def test_service_handle_message_without_message_id(self):
+        self.service.scale_out = True
+        self.message.body = self.status_message
+
+        self.service._handle_listener_message(self.message)
+        self.service._handle_service_message(self.message)
+
+        assert self.message.reject.call_count == 2
+        self.message.reject.assert_called_with(requeue=False)
+        self.service.log.error.assert_called_with(
+            'Message without message id rejected: {0}'.format(
+                self.status_message
+            )
+        )
+        self.message.ack.assert_not_called()
+
     def test_service_handle_listener_msg_invalid(self):
         self.message.body = self.status_message
         self.service._handle_listener_message(self.message)
@@ -370,6 +668,50 @@ class TestListenerService(object):
         )
         msg.ack.assert_called_once_with()
 
+    @patch.object(ListenerService, '_delete_job')
+    @patch.object(ListenerService, '_publish_message')
+    def test_service_process_job_result_process_pool(
+        self, mock_publish_message, mock_delete_job
+    ):
+        event = Mock()
+        event.job_id = '1'
+        event.exception = None
+        event.retval = {'id': '1', 'status': 'success'}
+
+        job = Mock()
+        job.id = '1'
+        job.status = 'success'
+        job.get_job_id.return_value = {'job_id': '1'}
+        job.get_status_message.return_value = event.retval
+
+        self.service.use_process_pool = True
+        self.service.jobs['1'] = job
+        self.service._process_job_result(event)
+
+        job.set_status_message.assert_called_once_with(
+            {'id': '1', 'status': 'success'}
+        )
+        job.listener_msg.ack.assert_called_once_with()
+
+        # Exception raised in the worker process carries the status
+        job.set_status_message.reset_mock()
+        event.exception = Exception('Image not found!')
+        event.exception.status_msg = {'id': '1', 'started_at': 1.0}
+        self.service.jobs['1'] = job
+        self.service._process_job_result(event)
+
+        job.set_status_message.assert_called_once_with(
+            {'id': '1', 'started_at': 1.0}
+        )
+
+        # Worker process failed without a status
+        job.set_status_message.reset_mock()
+        event.exception = Exception('Process pool broken')
+        self.service.jobs['1'] = job
+        self.service._process_job_result(event)
+
+        assert not job.set_status_message.called
+
     @patch.object(ListenerService, '_get_status_message')
     @patch.object(ListenerService, '_delete_job')
     @patch.object(ListenerService, '_publish_message')
@@ -429,7 +771,7 @@ class TestListenerService(object):
         mock_delete_job('1')
         msg = {"replicate_result": {"id": "1", "status": "error"}}
         mock_publish_message.assert_called_once_with(
-            JsonFormat.json_message(msg),
+            msg,
             '1'
         )
 
@@ -469,7 +811,8 @@ class TestListenerService(object):
         self.service._publish_message('{"test": "message"}', job.id)
         mock_publish.assert_called_once_with(
             'replicate',
-            '{"test": "message"}'
+            '{"test": "message"}',
+            '1'
         )
 
     @patch.object(ListenerService, '_get_status_message')
@@ -518,6 +861,90 @@ class TestListenerService(object):
             coalesce=True
         )
 
+    def test_service_schedule_job_process_pool(self):
+        job = Mock()
+        job.job_config = {'id': '1', 'cloud': 'ec2'}
+        job.get_status_message.return_value = {'status': 'success'}
+        self.service.jobs['1'] = job
+        self.service.job_factory = Mock()
+        self.service.use_process_pool = True
+        self.service.log.name = 'ReplicateService'
+
+        self.service._schedule_job('1')
+        self.service.scheduler.add_job.assert_called_once_with(
+            run_job_in_process,
+            args=(
+                self.service.job_factory,
+                {'id': '1', 'cloud': 'ec2'},
+                self.config,
+                {'status': 'success'},
+                'ReplicateService'
+            ),
+            id='1',
+            max_instances=1,
+            misfire_grace_time=None,
+            coalesce=True
+        )
+
+    @patch('mash.services.listener_service.get_worker_logger')
+    def test_run_job_in_process(self, mock_get_worker_logger):
+        job = Mock()
+        job.get_status_message.return_value = {'status': 'success'}
+        factory = Mock()
+        factory.create_job.return_value = job
+        log = Mock()
+        mock_get_worker_logger.return_value = log
+
+        status_msg = run_job_in_process(
+            factory,
+            {'id': '1'},
+            self.config,
+            {'status': 'unknown'},
+            'ReplicateService'
+        )
+
+        assert status_msg == {'status': 'success'}
+        factory.create_job.assert_called_once_with({'id': '1'}, self.config)
+        mock_get_worker_logger.assert_called_once_with('ReplicateService')
+        assert job.log_callback == log
+        job.set_status_message.assert_called_once_with({'status': 'unknown'})
+        job.process_job.assert_called_once_with()
+
+        # Status with the stage times is attached to the exception
+        job.process_job.side_effect = Exception('Image not found!')
+
+        with pytest.raises(Exception) as error:
+            run_job_in_process(
+                factory,
+                {'id': '1'},
+                self.config,
+                {'status': 'unknown'},
+                'ReplicateService'
+            )
+
+        assert error.value.status_msg == {'status': 'success'}
+
+    @patch('mash.services.listener_service.QueueHandler')
+    def test_setup_worker_process(self, mock_queue_handler):
+        log_queue = Mock()
+        ttl = credentials_cache.ttl
+
+        try:
+            setup_worker_process(log_queue, 120)
+            assert credentials_cache.ttl == 120
+
+            log = get_worker_logger('WorkerTestService')
+        finally:
+            credentials_cache.ttl = ttl
+
+        mock_queue_handler.assert_called_once_with(log_queue)
+        assert log.handlers == [mock_queue_handler.return_value]
+        assert not log.propagate
+
+        # Handlers are only added once per process
+        assert get_worker_logger('WorkerTestService') == log
+        assert len(log.handlers) == 1
+
     @patch.object(ListenerService, 'consume_queue')
     def test_service_start(
         self, mock_consume_queue
@@ -539,6 +966,54 @@ class TestListenerService(object):
             )
         ])
 
+    @patch.object(ListenerService, 'consume_queue')
+    def test_service_start_scale_out(self, mock_consume_queue):
+        self.service.scale_out = True
+        self.service.replica_id = 'node1'
+        self.service.replica_takeover = ['node2']
+
+        self.service.start()
+
+        mock_consume_queue.assert_has_calls([
+            call(
+                self.service._handle_service_message,
+                'service.node1',
+                'replicate'
+            ),
+            call(
+                self.service._handle_listener_message,
+                'listener.node1',
+                'test'
+            ),
+            call(
+                self.service._handle_service_message,
+                'service.node2',
+                'replicate'
+            ),
+            call(
+                self.service._handle_listener_message,
+                'listener.node2',
+                'test'
+            )
+        ])
+
+        # Queues of the gone replica are unbound
+        self.service.log.info.assert_called_once_with(
+            'Taking over queues of replica node2.'
+        )
+        self.channel.queue.unbind.assert_has_calls([
+            call(
+                queue='replicate.service.node2',
+                exchange='replicate.service.hash',
+                routing_key='1'
+            ),
+            call(
+                queue='test.listener.node2',
+                exchange='test.listener.hash',
+                routing_key='1'
+            )
+        ])
+
     @patch.object(ListenerService, 'close_connection')
     def test_service_start_exception(self, mock_close_connection):
         self.service.channel = self.channel
@@ -568,13 +1043,20 @@ class TestListenerService(object):
         prev_service = self.service._get_previous_service()
         assert prev_service is None
 
-    @patch('mash.services.mash_service.Connection')
-    def test_publish_job_result(self, mock_connection):
-        mock_connection.return_value = self.connection
-        self.service.publish_job_result('exchange', 'message')
-        self.channel.basic.publish.assert_called_once_with(
-            body='message', exchange='exchange', mandatory=True,
-            properties=self.msg_properties, routing_key='listener_msg'
+    @patch('mash.services.mash_service.ConfirmPublisher')
+    def test_publish_job_result(self, mock_publisher_class):
+        publisher = mock_publisher_class.return_value
+
+        self.service.publish_job_result('exchange', 'message', '1')
+        mock_publisher_class.assert_called_once_with(
+            self.connection.channel.return_value, window=64
+        )
+        self.msg_properties['message_id'] = '1'
+        publisher.publish.assert_called_once_with(
+            'message', 'listener_msg', 'exchange', self.msg_properties
+        )
+        publisher.wait.assert_called_once_with(
+            [publisher.publish.return_value]
         )
 
     def test_service_start_job(self):
@@ -595,7 +1077,52 @@ class TestListenerService(object):
         }
 
         data = self.service._get_status_message(job)
-        assert data == self.status_message
+        assert data == {
+            'replicate_result': {
+                'id': '1',
+                'status': 'success',
+                'cloud_image_name': 'image123'
+            }
+        }
+
+    @patch.object(ListenerService, 'close_connection')
+    def test_service_stop_scale_out(self, mock_close_connection):
+        self.service.scale_out = True
+        self.service.replica_id = 'node1'
+
+        self.service.stop(signum=15)
+
+        self.channel.queue.unbind.assert_has_calls([
+            call(
+                queue='replicate.service.node1',
+                exchange='replicate.service.hash',
+                routing_key='1'
+            ),
+            call(
+                queue='test.listener.node1',
+                exchange='test.listener.hash',
+                routing_key='1'
+            )
+        ])
+        mock_close_connection.assert_called_once_with()
+
+        # Unbind failure is logged
+        self.channel.queue.unbind.side_effect = AMQPError('Broken')
+        self.service.stop(signum=15)
+        self.service.log.warning.assert_called_once_with(
+            'Unable to unbind replica queues: Broken'
+        )
+
+    @patch.object(ListenerService, 'close_connection')
+    def test_service_stop_process_pool(self, mock_close_connection):
+        self.service.use_process_pool = True
+        self.service.log_listener = Mock()
+
+        self.service.stop(signum=15)
+
+        self.service.log_listener.stop.assert_called_once_with()
+        self.service.job_store.close.assert_called_once_with()
+        mock_close_connection.assert_called_once_with()
 
     @patch.object(ListenerService, 'close_connection')
     def test_service_stop(self, mock_close_connection):
@@ -1,9 +1,13 @@
 import io
 import json
+import os
 import sys
 
+from collections import OrderedDict, defaultdict
+
 from unittest.mock import MagicMock, Mock, patch
 from pytest import raises
+from tempfile import TemporaryDirectory
 
 from mash.mash_exceptions import MashLoggerException
 from mash.services.mash_service import MashService
@@ -44,6 +48,11 @@ class TestLoggerService(object):
         self.logger.log = MagicMock()
         self.logger.service_exchange = 'logger'
         self.logger.channel = self.channel
+        self.logger.log_files = OrderedDict()
+        self.logger.buffers = defaultdict(list)
+        self.logger.pending_tag = None
+        self.logger.pending_count = 0
+        self.logger.flush_time = 0
 
     @patch('mash.services.logger.service.setup_logfile')
     @patch.object(LoggerService, 'start')
@@ -73,67 +82,198 @@ class TestLoggerService(object):
         with raises(MashLoggerException):
             self.logger._process_log(self.message)
 
-    @patch('os.path.exists')
-    def test_logger_process_append(
-        self, mock_path_exists
-    ):
-        mock_path_exists.return_value = True
+        self.message.ack.assert_called_once_with()
+
+    @patch.object(LoggerService, '_flush_logs')
+    def test_logger_process_log(self, mock_flush_logs):
         self.logger.config = self.config
+        self.config.get_job_log_file.return_value = '/var/log/mash/4711.log'
 
-        with patch(open_name, create=True) as mock_open:
-            mock_open.return_value = MagicMock(spec=io.IOBase)
-            self.logger._process_log(self.message)
-            file_handle = mock_open.return_value.__enter__.return_value
-            file_handle.write.assert_called_with(
-                u'INFO 2017-11-01 11:36:36.782072 '
-                'LoggerService \n Test log message! \n'
-            )
-
-    @patch('os.path.exists')
-    def test_logger_process_write_exception(
-        self, mock_path_exists
-    ):
-        mock_path_exists.return_value = True
+        self.logger._process_log(self.message)
+
+        assert self.logger.buffers['/var/log/mash/4711.log'] == [(
+            'INFO 2017-11-01 11:36:36.782072 '
+            'LoggerService \n Test log message! \n',
+            None,
+            None
+        )]
+        assert self.logger.pending_tag == self.message.delivery_tag
+        assert not self.message.ack.called
+        assert not mock_flush_logs.called
+
+        # Prefetch count reached
+        self.logger.prefetch_count = 2
+        self.logger._process_log(self.message)
+        mock_flush_logs.assert_called_once_with()
+
+    def test_logger_process_batch(self):
         self.logger.config = self.config
+        self.config.get_job_log_file.side_effect = lambda job_id: job_id
+        self.message.body = json.dumps([
+            {
+                'msg': 'Job[4711]: First\n', 'job_id': '4711',
+                'created': 1.5, 'name': 'UploadService'
+            },
+            {'msg': 'No job\n'},
+            {'msg': 'Job[4711]: Second\n', 'job_id': '4711'},
+            {'msg': 'Job[4712]: Third\n', 'job_id': '4712'}
+        ])
+
+        self.logger._process_log(self.message)
+
+        assert self.logger.buffers == {
+            '4711': [
+                ('First\n', 1.5, 'UploadService'),
+                ('Second\n', None, None)
+            ],
+            '4712': [('Third\n', None, None)]
+        }
+
+    def test_logger_flush_logs(self):
+        with TemporaryDirectory() as test_dir:
+            log_file = os.path.join(test_dir, '4711.log')
+            self.logger.buffers[log_file] = [
+                ('First\n', 1.5, 'UploadService'),
+                ('Second\n', 2.5, 'UploadService')
+            ]
+            self.logger.pending_tag = 12
+            self.logger.pending_count = 2
+
+            self.logger._flush_logs()
+
+            # File handles are reused
+            job_log = self.logger.log_files[log_file][0]
+            self.logger.buffers[log_file] = [('Third\n', 3.5, None)]
+            self.logger._flush_logs()
+            assert self.logger.log_files[log_file][0] == job_log
+
+            with open(log_file) as job_log:
+                assert job_log.read() == 'First\nSecond\nThird\n'
+
+            with open(log_file + '.idx') as index_log:
+                assert index_log.read() == \
+                    '0 1.500 UploadService\n' \
+                    '6 2.500 UploadService\n' \
+                    '13 3.500 -\n'
+
+            # Log compressed and removed by the cleanup service
+            os.remove(log_file)
+            os.remove(log_file + '.idx')
+            self.logger.buffers[log_file] = [('Fourth\n', 4.5, None)]
+            self.logger._flush_logs()
+            self.logger._close_log_files()
+
+            with open(log_file) as job_log:
+                assert job_log.read() == 'Fourth\n'
+
+            with open(log_file + '.idx') as index_log:
+                assert index_log.read() == '0 4.500 -\n'
+
+        self.channel.basic.ack.assert_called_once_with(
+            delivery_tag=12, multiple=True
+        )
+        assert self.logger.pending_tag is None
+        assert self.logger.pending_count == 0
+        assert not self.logger.buffers
+
+    def test_logger_flush_logs_write_exception(self):
+        self.logger.buffers['/var/log/mash/4711.log'] = [('First\n', 0, '-')]
+        self.logger.pending_tag = 12
 
         with patch(open_name, create=True) as mock_open:
-            mock_open.return_value = MagicMock(spec=io.IOBase)
-            file_handle = mock_open.return_value.__enter__.return_value
-            file_handle.write.side_effect = Exception('Error writing file!')
+            mock_open.side_effect = Exception('Error writing file!')
 
             with raises(MashLoggerException):
-                self.logger._process_log(self.message)
+                self.logger._flush_logs()
+
+        assert not self.channel.basic.ack.called
+
+    @patch('mash.services.logger.service.time.monotonic')
+    def test_logger_log_file_cache(self, mock_monotonic):
+        self.logger.max_open_files = 2
+        mock_monotonic.return_value = 0
+
+        with patch(open_name, create=True) as mock_open:
+            mock_open.side_effect = lambda *args: MagicMock(spec=io.IOBase)
+
+            first = self.logger._get_log_file('1.log')
+            self.logger._get_log_file('2.log')
+            assert self.logger._get_log_file('1.log') == first
+
+            # Least recently used file is closed
+            mock_monotonic.return_value = 10
+            self.logger._get_log_file('3.log')
+
+        assert list(self.logger.log_files) == ['1.log', '3.log']
 
+        # Idle file is closed
+        mock_monotonic.return_value = 305
+        self.logger._close_idle_files()
+        assert list(self.logger.log_files) == ['3.log']
+        first[0].close.assert_called_once_with()
+        first[1].close.assert_called_once_with()
+
+        self.logger._close_log_files()
+        assert not self.logger.log_files
+
+    @patch('mash.services.logger.service.time.monotonic')
+    @patch.object(LoggerService, '_close_idle_files')
+    @patch.object(LoggerService, '_flush_logs')
+    def test_logger_consume(
+        self, mock_flush_logs, mock_close_idle_files, mock_monotonic
+    ):
+        self.channel.is_closed = False
+        self.channel.consumer_tags = ['tag']
+        mock_monotonic.return_value = 10
+
+        def stop():
+            self.channel.consumer_tags = []
+
+        self.channel.process_data_events.side_effect = stop
+        self.logger._consume()
+
+        mock_flush_logs.assert_called_once_with()
+        mock_close_idle_files.assert_called_once_with()
+
+    @patch.object(LoggerService, '_consume')
     @patch.object(LoggerService, 'consume_queue')
     @patch.object(LoggerService, 'close_connection')
-    def test_logger_start(self, mock_close_connection, mock_consume_queue):
+    def test_logger_start(
+        self, mock_close_connection, mock_consume_queue, mock_consume
+    ):
         self.logger.channel = self.channel
         self.logger.start()
-        self.channel.start_consuming.assert_called_once_with()
+        self.channel.basic.qos.assert_called_once_with(prefetch_count=500)
+        mock_consume.assert_called_once_with()
         mock_consume_queue.assert_called_once_with(
             self.logger._process_log, 'logging', 'logger'
         )
         mock_close_connection.assert_called_once_with()
 
+    @patch.object(LoggerService, '_consume')
     @patch.object(LoggerService, 'consume_queue')
     @patch.object(LoggerService, 'close_connection')
     def test_logger_start_exception(
-        self, mock_close_connection, mock_consume_queue
+        self, mock_close_connection, mock_consume_queue, mock_consume
     ):
-        scheduler = Mock()
-        self.logger.scheduler = scheduler
         self.logger.channel = self.channel
 
-        self.channel.start_consuming.side_effect = KeyboardInterrupt()
+        mock_consume.side_effect = KeyboardInterrupt()
         self.logger.start()
 
         mock_close_connection.assert_called_once_with()
-        mock_close_connection.reset_mock()
-        self.channel.start_consuming.side_effect = Exception(
-            'Cannot start scheduler.'
+
+        # Open log files are closed on error
+        job_log, index_log = Mock(), Mock()
+        self.logger.log_files['/var/log/mash/jobs/1.log'] = (
+            job_log, index_log, 0
         )
+        mock_consume.side_effect = MashLoggerException('Disk full')
 
-        with raises(Exception) as error:
+        with raises(MashLoggerException):
             self.logger.start()
 
-        assert 'Cannot start scheduler.' == str(error.value)
+        job_log.close.assert_called_once_with()
+        index_log.close.assert_called_once_with()
+        assert not self.logger.log_files
+        assert mock_close_connection.call_count == 2
@@ -1,3 +1,5 @@
+import asyncio
+
 from unittest.mock import Mock
 
 from mash.services.no_op_job import NoOpJob
@@ -18,3 +20,7 @@ class TestNoOpJob(object):
 
     def test_run_job(self):
         self.job.run_job()
+
+    def test_run_job_async(self):
+        asyncio.run(self.job.run_job_async())
+        assert self.job.status == 'success'
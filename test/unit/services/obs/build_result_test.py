@@ -22,7 +22,7 @@ class TestOBSImageBuildResult(object):
         mock_logging.LoggerAdapter.return_value = self.log_callback
 
         self.obs_result = OBSImageBuildResult(
-            '815', 'job_file', 'obs_project', 'obs_package', 'publish',
+            '815', 'obs_project', 'obs_package', 'publish',
             self.logger,
             notification_email='test@fake.com',
             profile='Proxy', disallow_licenses=["MIT"],
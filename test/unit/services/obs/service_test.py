@@ -3,10 +3,6 @@ from unittest.mock import patch
 from unittest.mock import call
 from unittest.mock import Mock
 
-from test.unit.test_helper import (
-    patch_open
-)
-
 from mash.services.obs.service import OBSImageBuildResultService
 from mash.services.mash_service import MashService
 
@@ -17,14 +13,14 @@ class TestOBSImageBuildResultService(object):
     @patch('mash.services.obs.service.setup_logfile')
     @patch.object(OBSImageBuildResultService, '_process_message')
     @patch.object(OBSImageBuildResultService, '_send_job_result_for_upload')
-    @patch('mash.services.obs.service.restart_jobs')
+    @patch('mash.services.obs.service.get_job_store')
     @patch.object(MashService, '__init__')
     @patch('os.listdir')
     @patch('logging.getLogger')
     @patch('atexit.register')
     def setup(
         self, mock_register, mock_log, mock_listdir, mock_MashService,
-        mock_restart_jobs, mock_send_job_result_for_upload,
+        mock_get_job_store, mock_send_job_result_for_upload,
         mock_process_message,
         mock_setup_logfile, mock_makedirs
     ):
@@ -58,10 +54,15 @@ class TestOBSImageBuildResultService(object):
         )
 
         mock_setup_logfile.assert_called_once_with('logfile')
-        mock_restart_jobs.assert_called_once_with(
-            '/var/lib/mash/obs_jobs/',
+        mock_get_job_store.assert_called_once_with(
+            config.get_job_store.return_value,
+            '/var/lib/mash/obs_jobs/'
+        )
+        self.job_store = mock_get_job_store.return_value
+        self.job_store.load.assert_called_once_with(
             self.obs_result._start_job
         )
+        self.job_store.close.assert_called_once_with()
 
         self.obs_result.consume_queue.assert_called_once_with(
             mock_process_message, 'service', 'obs'
@@ -86,7 +87,7 @@ class TestOBSImageBuildResultService(object):
         self.obs_result._send_job_result_for_upload('815', {})
         mock_delete_job.assert_called_once_with('815')
         mock_publish.assert_called_once_with(
-            'obs', 'listener_msg', '{}'
+            'obs', 'listener_msg', {}, message_id='815'
         )
 
     def test_send_control_response_local(self):
@@ -119,7 +120,7 @@ class TestOBSImageBuildResultService(object):
         self, mock_send_control_response, mock_add_job, mock_delete_job,
         mock_publish
     ):
-        message = Mock()
+        message = Mock(properties={})
         message.method = {'routing_key': 'job_document'}
         message.body = '{"obs_job":{"id": "4711","download_url": ' + \
             '"http://download.suse.de/ibs/Devel:/PubCloud:/Stable:/' + \
@@ -165,11 +166,8 @@ class TestOBSImageBuildResultService(object):
             )
         ]
 
-    @patch('mash.services.obs.service.persist_json')
     @patch.object(OBSImageBuildResultService, '_start_job')
-    @patch_open
-    def test_add_job(self, mock_open, mock_start_job, mock_persist_json):
-        self.obs_result.job_directory = 'tmp/'
+    def test_add_job(self, mock_start_job):
         job_data = {
             "obs_job": {
                 "id": "123",
@@ -190,28 +188,23 @@ class TestOBSImageBuildResultService(object):
             }
         }
         self.obs_result._add_job(job_data)
-        mock_persist_json.assert_called_once_with(
-            'tmp/job-123.json',
-            job_data['obs_job']
-        )
+        self.job_store.add.assert_called_once_with(job_data['obs_job'])
         mock_start_job.assert_called_once_with(job_data['obs_job'])
 
-    @patch('os.remove')
-    def test_delete_job(self, mock_os_remove):
+    def test_delete_job(self):
         assert self.obs_result._delete_job('815') == {
             'message': 'Job does not exist, can not delete it', 'ok': False
         }
         job_worker = Mock()
-        job_worker.job_file = 'job_file'
         self.obs_result.jobs = {'815': job_worker}
         assert self.obs_result._delete_job('815') == {
             'message': 'Job Deleted', 'ok': True
         }
-        mock_os_remove.assert_called_once_with('job_file')
+        self.job_store.delete.assert_called_once_with('815')
         job_worker.stop_watchdog.assert_called_once_with()
         assert '815' not in self.obs_result.jobs
         self.obs_result.jobs = {'815': job_worker}
-        mock_os_remove.side_effect = Exception('remove_error')
+        self.job_store.delete.side_effect = Exception('remove_error')
         assert self.obs_result._delete_job('815') == {
             'message': 'Job deletion failed: remove_error', 'ok': False
         }
@@ -224,7 +217,6 @@ class TestOBSImageBuildResultService(object):
         self.obs_result._send_job_result_for_upload = Mock()
         data = {
             "id": "123",
-            "job_file": "tempfile",
             "download_url": "http://download.suse.de/ibs/Devel:/"
                             "PubCloud:/Stable:/Images12/images",
             "image": "test-image-oem",
@@ -262,7 +254,6 @@ class TestOBSImageBuildResultService(object):
         mock_OBSImageBuildResult.return_value = job_worker
         data = {
             "id": "123",
-            "job_file": "tempfile",
             "download_url": "http://download.suse.de/ibs/Devel:/"
                             "PubCloud:/Stable:/Images12/images",
             "image": "test-image-oem",
@@ -280,7 +271,6 @@ class TestOBSImageBuildResultService(object):
         mock_OBSImageBuildResult.return_value = job_worker
         data = {
             "id": "123",
-            "job_file": "tempfile",
             "download_url": "http://download.suse.de/ibs/Devel:/"
                             "PubCloud:/Stable:/Images12/images",
             "image": "test-image-oem",
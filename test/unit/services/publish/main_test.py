@@ -28,6 +28,31 @@ class TestPublishServiceMain(object):
             }
         )
 
+    @patch('mash.services.publish_service.BaseJobFactory')
+    @patch('mash.services.publish_service.BaseConfig')
+    @patch('mash.services.publish_service.AsyncListenerService')
+    def test_publish_main_asyncio(
+        self, mock_publish_service, mock_config, mock_factory
+    ):
+        config = Mock()
+        config.get_listener_engine.return_value = 'asyncio'
+        config.get_publish_thread_pool_count.return_value = 50
+        mock_config.return_value = config
+
+        factory = Mock()
+        mock_factory.return_value = factory
+
+        main()
+        config.get_listener_engine.assert_called_once_with('publish')
+        mock_publish_service.assert_called_once_with(
+            service_exchange='publish',
+            config=config,
+            custom_args={
+                'job_factory': factory,
+                'thread_pool_count': 50
+            }
+        )
+
     @patch('mash.services.publish_service.BaseJobFactory')
     @patch('mash.services.publish_service.BaseConfig')
     @patch('mash.services.publish_service.ListenerService')
@@ -24,6 +24,27 @@ class TestUpload(object):
             }
         )
 
+    @patch('mash.services.raw_image_upload_service.BaseJobFactory')
+    @patch('mash.services.raw_image_upload_service.UploadConfig')
+    @patch('mash.services.raw_image_upload_service.AsyncListenerService')
+    def test_main_asyncio(self, mock_listener_service, mock_config, mock_factory):
+        config = Mock()
+        config.get_listener_engine.return_value = 'asyncio'
+        mock_config.return_value = config
+
+        factory = Mock()
+        mock_factory.return_value = factory
+
+        main()
+        config.get_listener_engine.assert_called_once_with('raw_image_upload')
+        mock_listener_service.assert_called_once_with(
+            service_exchange='raw_image_upload',
+            config=config,
+            custom_args={
+                'job_factory': factory
+            }
+        )
+
     @patch('mash.services.raw_image_upload_service.UploadConfig')
     @patch('mash.services.raw_image_upload_service.ListenerService')
     @patch('sys.exit')
@@ -1,3 +1,5 @@
+import asyncio
+
 from pytest import raises
 from unittest.mock import Mock, patch
 
@@ -75,6 +77,53 @@ class TestEC2ReplicateJob(object):
         )
         assert self.job.status == FAILED
 
+    @patch('mash.services.replicate.ec2_job.asyncio.sleep')
+    @patch.object(EC2ReplicateJob, '_wait_on_image_async')
+    @patch.object(EC2ReplicateJob, '_replicate_to_region')
+    @patch.object(EC2ReplicateJob, 'request_credentials_async')
+    def test_replicate_async(
+        self, mock_request_credentials, mock_replicate_to_region,
+        mock_wait_on_image, mock_sleep
+    ):
+        mock_replicate_to_region.return_value = 'ami-54321'
+        mock_wait_on_image.side_effect = Exception('Broken!')
+
+        asyncio.run(self.job.run_job_async())
+
+        mock_request_credentials.assert_awaited_once_with(['test-aws'])
+        mock_replicate_to_region.assert_called_once_with(
+            self.job.credentials['test-aws'], 'ami-12345',
+            'us-east-1', 'us-east-2'
+        )
+        mock_sleep.assert_awaited_once_with(300)
+        mock_wait_on_image.assert_awaited_once_with(
+            self.job.credentials['test-aws']['access_key_id'],
+            self.job.credentials['test-aws']['secret_access_key'],
+            'ami-54321',
+            'us-east-2'
+        )
+        self.job._log_callback.warning.assert_called_once_with(
+            'Replicate to us-east-2 region failed: Broken!'
+        )
+        assert self.job.status == FAILED
+
+    @patch('mash.services.replicate.ec2_job.asyncio.sleep')
+    @patch.object(EC2ReplicateJob, '_get_image_state')
+    def test_replicate_wait_on_image_async(
+        self, mock_get_image_state, mock_sleep
+    ):
+        mock_sleep.return_value = None
+        mock_get_image_state.side_effect = ['pending', 'available']
+
+        asyncio.run(
+            self.job._wait_on_image_async(
+                '123456', '654321', 'ami-54321', 'us-east-2'
+            )
+        )
+
+        assert mock_get_image_state.call_count == 2
+        mock_sleep.assert_awaited_once_with(60)
+
     @patch.object(EC2ReplicateJob, 'image_exists')
     @patch('mash.services.replicate.ec2_job.get_client')
     def test_replicate_to_region(
@@ -24,6 +24,29 @@ class TestReplicateServiceMain(object):
             }
         )
 
+    @patch('mash.services.replicate_service.BaseJobFactory')
+    @patch('mash.services.replicate_service.BaseConfig')
+    @patch('mash.services.replicate_service.AsyncListenerService')
+    def test_replicate_main_asyncio(
+        self, mock_replicate_service, mock_config, mock_factory
+    ):
+        config = Mock()
+        config.get_listener_engine.return_value = 'asyncio'
+        mock_config.return_value = config
+
+        factory = Mock()
+        mock_factory.return_value = factory
+
+        main()
+        config.get_listener_engine.assert_called_once_with('replicate')
+        mock_replicate_service.assert_called_once_with(
+            service_exchange='replicate',
+            config=config,
+            custom_args={
+                'job_factory': factory
+            }
+        )
+
     @patch('mash.services.replicate_service.BaseJobFactory')
     @patch('mash.services.replicate_service.BaseConfig')
     @patch('mash.services.replicate_service.ListenerService')
@@ -181,6 +181,7 @@ class TestEC2TestJob(object):
             'cloud_architecture': 'aarch64'
         }
         job = EC2TestJob(job_config, self.config)
+        assert job_config['instance_type'] == 'a1.large'
         job._log_callback = Mock()
         job.credentials = {
             'test-aws-cn': {
@@ -24,6 +24,27 @@ class TestImgProofTestServiceMain(object):
             }
         )
 
+    @patch('mash.services.test_service.BaseJobFactory')
+    @patch('mash.services.test_service.TestConfig')
+    @patch('mash.services.test_service.AsyncListenerService')
+    def test_main_asyncio(self, mock_test_service, mock_config, mock_factory):
+        config = Mock()
+        config.get_listener_engine.return_value = 'asyncio'
+        mock_config.return_value = config
+
+        factory = Mock()
+        mock_factory.return_value = factory
+
+        main()
+        config.get_listener_engine.assert_called_once_with('test')
+        mock_test_service.assert_called_once_with(
+            service_exchange='test',
+            config=config,
+            custom_args={
+                'job_factory': factory
+            }
+        )
+
     @patch('mash.services.test_service.BaseJobFactory')
     @patch('mash.services.test_service.TestConfig')
     @patch('mash.services.test_service.ListenerService')
@@ -0,0 +1,117 @@
+import gzip
+import importlib
+import sys
+
+from pytest import raises
+from unittest.mock import Mock, patch
+
+from mash.mash_exceptions import MashCodecException
+from mash.utils import codec
+from mash.utils.codec import (
+    decode_message,
+    encode_message,
+    get_compressor,
+    get_serializer
+)
+
+
+class TestCodec(object):
+    def setup(self):
+        self.data = {'test_job': {'id': '1', 'regions': ['us-east-1']}}
+
+    def test_encode_json(self):
+        body, properties = encode_message(self.data)
+
+        assert body == b'{"test_job":{"id":"1","regions":["us-east-1"]}}'
+        assert properties == {'content_type': 'application/json'}
+        assert decode_message(body, **properties) == self.data
+
+    def test_encode_json_string(self):
+        body, properties = encode_message('{"id": "1"}')
+
+        assert body == '{"id": "1"}'
+        assert properties == {'content_type': 'application/json'}
+
+    def test_encode_compressed(self):
+        body, properties = encode_message(
+            self.data, compression='gzip', compress_threshold=10
+        )
+
+        assert properties == {
+            'content_type': 'application/json',
+            'content_encoding': 'gzip'
+        }
+        assert gzip.decompress(body).startswith(b'{"test_job"')
+        assert decode_message(body, **properties) == self.data
+
+        # Json string is compressed as utf-8
+        body, properties = encode_message(
+            '{"id": "1"}', compression='gzip', compress_threshold=1
+        )
+        assert gzip.decompress(body) == b'{"id": "1"}'
+
+        # Body decoded to a string by the AMQP client
+        decompress = Mock(return_value=b'{"id": "1"}')
+        with patch.dict(
+            'mash.utils.codec.compressors', {'test': (None, decompress)}
+        ):
+            assert decode_message('abc', content_encoding='test') == {
+                'id': '1'
+            }
+
+        decompress.assert_called_once_with(b'abc')
+
+        # Below threshold
+        body, properties = encode_message(
+            '{"id": "1"}', compression='gzip', compress_threshold=1024
+        )
+        assert properties == {'content_type': 'application/json'}
+
+    def test_decode_legacy_message(self):
+        assert decode_message('{\n    "id": "1"\n}') == {'id': '1'}
+
+    @patch.dict(
+        'mash.utils.codec.serializers',
+        {'application/msgpack': (str.encode, bytes.decode)}
+    )
+    def test_decode_binary_from_string(self):
+        assert decode_message('abc', 'application/msgpack') == 'abc'
+
+    def test_unsupported(self):
+        with raises(MashCodecException):
+            get_serializer('application/xml')
+
+        with raises(MashCodecException):
+            get_compressor('br')
+
+        with raises(MashCodecException):
+            decode_message(b'{}', content_encoding='br')
+
+    @patch('mash.utils.codec.zstandard')
+    def test_zstd(self, mock_zstandard):
+        compressor = mock_zstandard.ZstdCompressor.return_value
+        compressor.compress.return_value = b'compressed'
+        decompressor = mock_zstandard.ZstdDecompressor.return_value
+        decompressor.decompress.return_value = b'{}'
+
+        assert codec.zstd_compress(b'{}') == b'compressed'
+        assert codec.zstd_decompress(b'compressed') == b'{}'
+
+    @patch.dict('mash.utils.codec.compressors')
+    def test_zstd_not_installed(self):
+        codec.compressors.pop('zstd', None)
+
+        with raises(MashCodecException):
+            encode_message(self.data, compression='zstd')
+
+    def test_optional_formats(self):
+        modules = {'msgpack': Mock(), 'zstandard': Mock()}
+
+        try:
+            with patch.dict(sys.modules, modules):
+                importlib.reload(codec)
+
+            assert 'application/msgpack' in codec.serializers
+            assert 'zstd' in codec.compressors
+        finally:
+            importlib.reload(codec)
@@ -1,6 +1,12 @@
+import queue
+import smtplib
+
 from unittest.mock import patch, MagicMock
 
-from mash.utils.email_notification import EmailNotification
+from mash.utils.email_notification import (
+    EmailNotification,
+    NotificationWorker
+)
 
 
 @patch('mash.utils.email_notification.smtplib')
@@ -50,3 +56,234 @@ def test_send_email_notification(mock_smtp):
     log.warning.assert_called_once_with(
         'Unable to send notification email: Broke!'
     )
+
+
+@patch('mash.utils.email_notification.time.monotonic')
+@patch('mash.utils.email_notification.smtplib.SMTP')
+def test_email_notification_connection_reuse(mock_smtp, mock_monotonic):
+    log = MagicMock()
+    first_server = MagicMock()
+    second_server = MagicMock()
+    mock_smtp.side_effect = [first_server, second_server, MagicMock()]
+    mock_monotonic.return_value = 100
+
+    notif_class = EmailNotification(
+        'localhost', 25, 'test@fake.com', 'super.secret', False,
+        log_callback=log
+    )
+
+    notif_class.send_notification('Job 1', 'Subject', 'user@fake.com')
+    notif_class.send_notification('Job 2', 'Subject', 'user@fake.com')
+
+    mock_smtp.assert_called_once_with('localhost', 25, timeout=30)
+    first_server.login.assert_called_once_with(
+        'test@fake.com', 'super.secret'
+    )
+    assert first_server.send_message.call_count == 2
+
+    # Server dropped the connection, message is sent on a new one
+    first_server.send_message.side_effect = \
+        smtplib.SMTPServerDisconnected('Closed')
+    notif_class.send_notification('Job 3', 'Subject', 'user@fake.com')
+
+    assert second_server.send_message.call_count == 1
+    assert not log.warning.called
+
+    # Idle connection is closed
+    mock_monotonic.return_value = 200
+    notif_class.send_notification('Job 4', 'Subject', 'user@fake.com')
+
+    second_server.quit.assert_called_once_with()
+    assert mock_smtp.call_count == 3
+
+
+@patch('mash.utils.email_notification.smtplib.SMTP')
+def test_email_notification_send_error_no_retry(mock_smtp):
+    log = MagicMock()
+    smtp_server = MagicMock()
+    mock_smtp.return_value = smtp_server
+
+    notif_class = EmailNotification(
+        'localhost', 25, 'test@fake.com', None, False,
+        log_callback=log
+    )
+    notif_class.send_notification('Job 1', 'Subject', 'user@fake.com')
+
+    # Rejected recipient is not retried and the connection is kept
+    smtp_server.send_message.side_effect = smtplib.SMTPRecipientsRefused(
+        {'user@fake.com': (550, b'No such user')}
+    )
+    notif_class.send_notification('Job 2', 'Subject', 'user@fake.com')
+
+    assert smtp_server.send_message.call_count == 2
+    assert mock_smtp.call_count == 1
+    assert notif_class.smtp_server == smtp_server
+    assert log.warning.call_count == 1
+
+    # Connection timed out and new connection fails
+    smtp_server.send_message.side_effect = TimeoutError('Timed out')
+    smtp_server.quit.side_effect = Exception('Not connected')
+    mock_smtp.side_effect = ConnectionRefusedError('Refused')
+    notif_class.send_notification('Job 3', 'Subject', 'user@fake.com')
+
+    assert notif_class.smtp_server is None
+    log.warning.assert_called_with(
+        'Unable to send notification email: Refused'
+    )
+
+
+class TestNotificationWorker(object):
+    @patch('mash.utils.email_notification.threading.Thread')
+    def setup(self, mock_thread):
+        self.log = MagicMock()
+        self.notification_class = MagicMock()
+        self.worker = NotificationWorker(
+            self.notification_class,
+            min_interval=10,
+            max_queue_size=2,
+            log_callback=self.log
+        )
+
+    def test_send_notification_queue_full(self):
+        for job in range(3):
+            self.worker.send_notification('Job', 'Subject', 'a@fake.com')
+
+        self.log.warning.assert_called_once_with(
+            'Notification queue full, dropped notification to a@fake.com'
+        )
+
+    @patch('mash.utils.email_notification.time.monotonic')
+    def test_send_pending(self, mock_monotonic):
+        mock_monotonic.return_value = 100
+
+        self.worker._add_pending(('Job 1', 'Subject', 'a@fake.com'))
+        self.worker._add_pending(('Job 2', 'Subject', 'a@fake.com'))
+        self.worker._add_pending(('Job 3', 'Subject', 'b@fake.com'))
+
+        self.log.warning.assert_called_once_with(
+            'Too many pending notifications, dropped notification '
+            'to b@fake.com'
+        )
+
+        # Second notification waits for the rate limit
+        assert self.worker._send_pending() == 10
+        self.notification_class.send_notification.assert_called_once_with(
+            'Job 1', 'Subject', 'a@fake.com'
+        )
+
+        mock_monotonic.return_value = 105
+        assert self.worker._send_pending() == 5
+        assert self.notification_class.send_notification.call_count == 1
+
+        mock_monotonic.return_value = 110
+        assert self.worker._send_pending() is None
+        self.notification_class.send_notification.assert_called_with(
+            'Job 2', 'Subject', 'a@fake.com'
+        )
+        assert not self.worker.pending
+        assert self.worker.pending_count == 0
+
+    def test_send_pending_digest(self):
+        self.worker.digest = True
+        self.worker._add_pending(('Job 1', 'Subject', 'a@fake.com'))
+        self.worker._add_pending(('Job 2', 'Subject', 'a@fake.com'))
+
+        self.worker._send_pending()
+
+        self.notification_class.send_notification.assert_called_once_with(
+            'Job 1\n\n{0}\n\nJob 2'.format('-' * 40),
+            'Subject (2 jobs)',
+            'a@fake.com'
+        )
+
+    @patch('mash.utils.email_notification.time.monotonic')
+    def test_send_pending_rate_limited(self, mock_monotonic):
+        mock_monotonic.return_value = 100
+        self.worker._add_pending(('Job 1', 'Subject', 'a@fake.com'))
+        self.worker._add_pending(('Job 2', 'Subject', 'a@fake.com'))
+
+        # Recipient was sent a notification recently
+        self.worker.next_send['a@fake.com'] = 105
+        assert self.worker._send_pending() == 5
+        assert not self.notification_class.send_notification.called
+
+        # Remaining notification waits for the next interval
+        self.worker.next_send['a@fake.com'] = 100
+        assert self.worker._send_pending() == 10
+        assert self.worker.pending_count == 1
+
+        # Flush on stop ignores the rate limit
+        assert self.worker._send_pending(force=True) is None
+        assert self.notification_class.send_notification.call_count == 2
+        assert not self.worker.pending
+
+        # Expired rate limits are removed
+        mock_monotonic.return_value = 200
+        self.worker._send_pending()
+        assert not self.worker.next_send
+
+    def test_run(self):
+        self.worker.queue.put(('Job 1', 'Subject', 'a@fake.com'))
+        self.worker.queue.put(('Job 2', 'Subject', 'a@fake.com'))
+        self.worker.max_queue_size = 3
+        self.worker.queue.maxsize = 3
+        self.worker.queue.put(self.worker._stop)
+
+        self.worker._run()
+
+        # Pending notifications are sent on stop
+        assert self.notification_class.send_notification.call_count == 2
+        self.notification_class.close.assert_called_once_with()
+
+    @patch('mash.utils.email_notification.time.monotonic')
+    def test_run_send_error(self, mock_monotonic):
+        mock_monotonic.return_value = 100
+        self.notification_class.send_notification.side_effect = [
+            Exception('Broken'), None
+        ]
+        self.worker.queue.put(('Job 1', 'Subject', 'a@fake.com'))
+        self.worker.queue.put(self.worker._stop)
+
+        with patch.object(
+            self.worker.queue, 'get', wraps=self.worker.queue.get
+        ) as mock_get:
+            self.worker._run()
+
+        self.log.warning.assert_called_once_with(
+            'Unable to send notifications: Broken'
+        )
+        # Next wait is the min interval after an error
+        assert mock_get.call_args_list[-1][1] == {'timeout': 10}
+        self.notification_class.close.assert_called_once_with()
+
+    def test_run_queue_empty(self):
+        self.worker.queue = MagicMock()
+        self.worker.queue.get.side_effect = [
+            queue.Empty, self.worker._stop
+        ]
+
+        self.worker._run()
+
+        assert not self.notification_class.send_notification.called
+        self.notification_class.close.assert_called_once_with()
+
+    def test_close(self):
+        self.worker.close(timeout=5)
+
+        assert self.worker.queue.get_nowait() is self.worker._stop
+        self.worker.worker.join.assert_called_once_with(5)
+
+    def test_close_queue_full(self):
+        self.worker.send_notification('Job 1', 'Subject', 'a@fake.com')
+        self.worker.send_notification('Job 2', 'Subject', 'a@fake.com')
+
+        # Close does not block on the full queue
+        self.worker.close(timeout=5)
+        assert self.worker.stopping.is_set()
+        self.worker.worker.join.assert_called_once_with(5)
+
+        # Worker stops once the queued notifications are received
+        self.worker._run()
+
+        assert self.notification_class.send_notification.call_count == 2
+        self.notification_class.close.assert_called_once_with()
@@ -16,10 +16,14 @@
 # along with mash.  If not, see <http://www.gnu.org/licenses/>
 #
 
+import asyncio
+import gzip
 import io
+import os
 
 from pytest import raises
-from unittest.mock import call, MagicMock, patch
+from tempfile import TemporaryDirectory
+from unittest.mock import AsyncMock, call, MagicMock, patch
 
 from mash.mash_exceptions import MashException, MashLogSetupException
 from mash.utils.json_format import JsonFormat
@@ -31,11 +35,10 @@ from mash.utils.mash_utils import (
     create_ssh_key_pair,
     format_string_with_date,
     remove_file,
-    persist_json,
+    compress_file,
     load_json,
-    restart_job,
-    restart_jobs,
     handle_request,
+    handle_request_async,
     setup_logfile,
     setup_rabbitmq_log_handler,
     get_fingerprint_from_private_key,
@@ -127,14 +130,42 @@ def test_remove_file(mock_remove):
     mock_remove.assert_called_once_with('job-test.json')
 
 
-def test_persist_json():
-    with patch('builtins.open', create=True) as mock_open:
-        mock_open.return_value = MagicMock(spec=io.IOBase)
+def test_compress_file():
+    with TemporaryDirectory() as test_dir:
+        log_file = os.path.join(test_dir, 'test.log')
 
-        persist_json('tmp-dir/job-1.json', {'id': '1'})
+        with open(log_file, 'w') as test_log:
+            test_log.write('Test log\n')
 
-        file_handle = mock_open.return_value.__enter__.return_value
-        file_handle.write.assert_called_with('{\n    "id": "1"\n}')
+        os.utime(log_file, (100, 100))
+
+        assert compress_file(log_file) == log_file + '.gz'
+        assert not os.path.exists(log_file)
+        assert os.path.getmtime(log_file + '.gz') == 100
+
+        with gzip.open(log_file + '.gz', 'rt') as test_log:
+            assert test_log.read() == 'Test log\n'
+
+        # Compressing again appends to the compressed file
+        with open(log_file, 'w') as test_log:
+            test_log.write('More log\n')
+
+        compress_file(log_file)
+
+        with gzip.open(log_file + '.gz', 'rt') as test_log:
+            assert test_log.read() == 'Test log\nMore log\n'
+
+        # Failed compression leaves the file uncompressed
+        with open(log_file, 'w') as test_log:
+            test_log.write('Test log\n')
+
+        with patch('mash.utils.mash_utils.shutil.copyfileobj') as mock_copy:
+            mock_copy.side_effect = OSError('No space left on device')
+
+            with raises(OSError):
+                compress_file(log_file)
+
+        assert sorted(os.listdir(test_dir)) == ['test.log', 'test.log.gz']
 
 
 @patch('mash.utils.mash_utils.json.load')
@@ -152,31 +183,6 @@ def test_load_json(mock_load_json):
     assert data['id'] == '123'
 
 
-@patch('mash.utils.mash_utils.load_json')
-def test_restart_job(mock_json_load):
-    mock_json_load.return_value = {'id': '123'}
-    callback = MagicMock()
-
-    restart_job('tmp/job-123.json', callback)
-    mock_json_load.assert_called_once_with(
-        'tmp/job-123.json'
-    )
-    callback.assert_called_once_with({'id': '123'})
-
-
-@patch('mash.utils.mash_utils.restart_job')
-@patch('mash.utils.mash_utils.os.listdir')
-def test_restart_jobs(mock_os_listdir, mock_restart_job):
-    mock_os_listdir.return_value = ['job-123.json']
-    callback = MagicMock()
-
-    restart_jobs('tmp/', callback)
-    mock_restart_job.assert_called_once_with(
-        'tmp/job-123.json',
-        callback
-    )
-
-
 @patch('mash.utils.mash_utils.requests')
 def test_handle_request(mock_requests):
     response = MagicMock()
@@ -199,15 +205,51 @@ def test_handle_request_failed(mock_requests):
         handle_request('localhost', '/jobs', 'get')
 
 
-@patch('mash.utils.mash_utils.logging')
+def test_handle_request_async():
+    response = MagicMock()
+    response.status = 200
+    response.json = AsyncMock(return_value={'job_id': '1'})
+
+    session = MagicMock()
+    session.request.return_value.__aenter__.return_value = response
+
+    result = asyncio.run(
+        handle_request_async(
+            session, 'localhost', '/jobs', 'get', job_data={'id': '1'}
+        )
+    )
+    assert result == {'job_id': '1'}
+    session.request.assert_called_once_with(
+        'get', 'localhost/jobs', data=JsonFormat.json_message({'id': '1'})
+    )
+
+
+def test_handle_request_async_failed():
+    response = MagicMock()
+    response.status = 400
+    response.reason = 'Not Found'
+    response.json = AsyncMock(return_value={})
+
+    session = MagicMock()
+    session.request.return_value.__aenter__.return_value = response
+
+    with raises(MashException) as error:
+        asyncio.run(
+            handle_request_async(session, 'localhost', '/jobs', 'get')
+        )
+
+    assert str(error.value) == 'Request to localhost/jobs failed: Not Found'
+
+
+@patch('mash.utils.mash_utils.WatchedFileHandler')
 @patch('mash.utils.mash_utils.os')
-def test_setup_logfile(mock_os, mock_logging):
+def test_setup_logfile(mock_os, mock_handler):
     mock_os.path.isdir.return_value = False
     mock_os.path.dirname.return_value = '/file/dir'
 
     setup_logfile('/file/dir/fake.path')
     mock_os.makedirs.assert_called_once_with('/file/dir')
-    mock_logging.FileHandler.assert_called_once_with(
+    mock_handler.assert_called_once_with(
         filename='/file/dir/fake.path', encoding='utf-8'
     )
 
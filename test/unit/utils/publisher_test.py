@@ -0,0 +1,161 @@
+from unittest.mock import Mock, patch
+
+from amqpstorm import AMQPChannelError, AMQPMessageError
+from pamqp import specification
+from pamqp.body import ContentBody
+from pamqp.header import ContentHeader
+from pytest import raises
+
+from mash.utils.publisher import ConfirmPublisher
+
+
+class TestConfirmPublisher(object):
+    def setup(self):
+        self.channel = Mock()
+        self.channel.is_open = True
+        self.channel.is_closed = False
+        self.on_frame = self.channel.on_frame
+        self.publisher = ConfirmPublisher(self.channel, window=2, timeout=0)
+
+    def publish(self, message='message'):
+        return self.publisher.publish(
+            message, 'job_document', 'obs', {'delivery_mode': 2}
+        )
+
+    def test_confirm_select(self):
+        confirm = self.channel.rpc_request.call_args[0][0]
+        assert isinstance(confirm, specification.Confirm.Select)
+        assert self.channel.on_frame == self.publisher.on_frame
+        assert self.publisher.is_open
+
+    def test_publish_ack(self):
+        first, second = self.publish(), self.publish()
+
+        self.channel.basic.publish.assert_called_with(
+            body='message',
+            routing_key='job_document',
+            exchange='obs',
+            properties={'delivery_mode': 2},
+            mandatory=True
+        )
+
+        # Window of outstanding confirms is full
+        with raises(AMQPChannelError):
+            self.publish()
+
+        self.publisher.on_frame(specification.Basic.Ack(delivery_tag=1))
+        assert first.result() is True
+        assert not second.done()
+
+        third = self.publish()
+        self.publisher.on_frame(
+            specification.Basic.Ack(delivery_tag=3, multiple=True)
+        )
+        self.publisher.wait([first, second, third])
+        assert not self.publisher.pending
+
+        # Unknown delivery tag is ignored
+        self.publisher.on_frame(specification.Basic.Ack(delivery_tag=3))
+
+    def test_publish_nack(self):
+        first, second = self.publish(), self.publish()
+
+        self.publisher.on_frame(
+            specification.Basic.Nack(delivery_tag=0, multiple=True)
+        )
+
+        with raises(AMQPMessageError):
+            self.publisher.wait([first, second])
+
+        assert isinstance(second.exception(), AMQPMessageError)
+
+    def test_publish_return(self):
+        first, second = self.publish(), self.publish('returned')
+
+        # Returned message content is not passed on to the channel
+        self.publisher.on_frame(
+            specification.Basic.Return(
+                reply_code=312, reply_text='NO_ROUTE',
+                exchange='obs', routing_key='job_document'
+            )
+        )
+        self.publisher.on_frame(ContentHeader(body_size=8))
+        self.publisher.on_frame(ContentBody(b'retu'))
+        self.publisher.on_frame(ContentBody(b'rned'))
+        assert self.publisher.return_body_size is None
+
+        self.publisher.on_frame(specification.Basic.Ack(delivery_tag=2))
+        self.publisher.on_frame(specification.Basic.Ack(delivery_tag=1))
+
+        assert first.result() is True
+        with raises(AMQPMessageError) as error:
+            self.publisher.wait([first, second])
+
+        assert 'NO_ROUTE (312)' in str(error.value)
+
+        # Message without body
+        third = self.publish()
+        self.publisher.on_frame(
+            specification.Basic.Return(reply_code=312, reply_text='NO_ROUTE')
+        )
+        self.publisher.on_frame(ContentHeader(body_size=0))
+        self.publisher.on_frame(specification.Basic.Ack(delivery_tag=3))
+
+        assert isinstance(third.exception(), AMQPMessageError)
+        self.on_frame.assert_not_called()
+
+    def test_channel_close(self):
+        future = self.publish()
+
+        frame = specification.Channel.Close(reply_code=406)
+        self.publisher.on_frame(frame)
+
+        self.on_frame.assert_called_once_with(frame)
+        assert isinstance(future.exception(), AMQPChannelError)
+        assert not self.publisher.is_open
+
+        with raises(AMQPChannelError):
+            self.publish()
+
+    def test_publish_error(self):
+        future = self.publish()
+        self.channel.basic.publish.side_effect = AMQPChannelError('Broken')
+
+        with raises(AMQPChannelError):
+            self.publish()
+
+        assert isinstance(future.exception(), AMQPChannelError)
+        assert not self.publisher.pending
+
+    @patch('mash.utils.publisher.wait_futures')
+    @patch('mash.utils.publisher.time.monotonic')
+    def test_wait_timeout(self, mock_monotonic, mock_wait_futures):
+        mock_monotonic.side_effect = [0, 1]
+        first, second = self.publish(), self.publish()
+        mock_wait_futures.side_effect = [
+            Mock(done=set()), Mock(done={first})
+        ]
+
+        with raises(AMQPChannelError):
+            self.publisher.wait([first])
+
+        # All outstanding messages fail and the publisher is closed
+        assert isinstance(second.exception(), AMQPChannelError)
+        assert not self.publisher.pending
+        assert not self.publisher.is_open
+
+        with raises(AMQPChannelError):
+            self.publish()
+
+    @patch('mash.utils.publisher.wait_futures')
+    def test_wait_channel_closed(self, mock_wait_futures):
+        future = self.publish()
+        self.channel.is_closed = True
+        mock_wait_futures.side_effect = [Mock(done=set()), Mock(done={future})]
+
+        # Pending messages fail when the channel closed
+        with raises(AMQPChannelError):
+            self.publisher.wait([future])
+
+        assert not self.publisher.pending
+        assert not self.publisher.is_open